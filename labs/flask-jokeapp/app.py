@@ -1,49 +1,146 @@
-from flask import Flask, render_template, jsonify
+import math
+from functools import partial
+
+from flask import Flask, Response, current_app, render_template, jsonify, make_response, request
 from datetime import datetime
-from services.joke_service import get_joke, ALLOWED_CATEGORIES
+from services import (
+    assets, compression, http_cache, joke_service, joke_stream, json_provider, metrics, profiling,
+    template_cache
+)
+from services.joke_service import (
+    get_joke, get_joke_async, iter_jokes_batch, ALLOWED_CATEGORIES, BATCH_MAX_COUNT
+)
+from services.http_cache import cache_joke, cache_page
+from services.joke_stream import JokeStream
+from services.page_cache import PageCache
+from services.prefetch import JokePrefetcher
 
-app = Flask(__name__)
 app_version = "1.0.0"
 
+# Defaults; override with FLASK_-prefixed environment variables,
+# e.g. FLASK_JOKE_PREFETCH_ENABLED=true, or with create_app(config)
+DEFAULT_CONFIG = dict(
+    JOKE_API_BASE_URL=joke_service.API_BASE_URL,
+    JOKE_BACKEND='http',
+    JOKE_CORPUS_PATH=None,
+    JOKE_PREFETCH_ENABLED=False,
+    JOKE_PREFETCH_DEPTH=5,
+    JOKE_PREFETCH_LOW_WATER=2,
+    JOKE_PREFETCH_WORKERS=2,
+    JOKE_PREFETCH_MAX_AGE=300,
+    JOKE_STALE_WHILE_REVALIDATE=joke_service.STALE_WHILE_REVALIDATE,
+    JOKE_STALE_IF_ERROR=joke_service.STALE_IF_ERROR,
+    JOKE_STALE_OVERRIDES=joke_service.STALE_OVERRIDES,
+    JOKE_REQUEST_TIMEOUT=joke_service.REQUEST_TIMEOUT,
+    JOKE_ADAPTIVE_TIMEOUT=joke_service.ADAPTIVE_TIMEOUT,
+    JOKE_HEDGE_ENABLED=joke_service.HEDGE_ENABLED,
+    JOKE_HEDGE_BUDGET=joke_service.HEDGE_BUDGET,
+    JOKE_QUOTA_ENABLED=joke_service.QUOTA_ENABLED,
+    JOKE_QUOTA_LIMIT=joke_service.QUOTA_LIMIT,
+    JOKE_QUOTA_WINDOW=joke_service.QUOTA_WINDOW,
+    JOKE_QUOTA_MAX_WAIT=joke_service.QUOTA_MAX_WAIT,
+    JOKE_QUOTA_SHARE=joke_service.QUOTA_SHARE,
+    JOKE_STREAM_INTERVAL=joke_stream.STREAM_INTERVAL,
+    JOKE_STREAM_MAX_SUBSCRIBERS=joke_stream.STREAM_MAX_SUBSCRIBERS,
+    JOKE_STREAM_BACKLOG=joke_stream.STREAM_BACKLOG,
+    JOKE_STREAM_HEARTBEAT=joke_stream.STREAM_HEARTBEAT,
+    PAGE_CACHE_MAX_AGE=http_cache.PAGE_CACHE_MAX_AGE,
+    STATIC_CACHE_MAX_AGE=http_cache.STATIC_CACHE_MAX_AGE,
+    JOKE_CACHE_MAX_AGE=http_cache.JOKE_CACHE_MAX_AGE,
+    TEMPLATE_PRECOMPILE=False,
+    WARMUP_ENABLED=False,
+    WARMUP_PATHS=template_cache.WARMUP_PATHS,
+    COMPRESS_ENABLED=True,
+    COMPRESS_MIN_SIZE=compression.COMPRESS_MIN_SIZE,
+    JSON_ENCODER=json_provider.JSON_ENCODER,
+    METRICS_ENABLED=True,
+    PROFILE_ENABLED=False,
+    PROFILE_TOKEN='',
+    PROFILE_SAMPLE_RATE=profiling.PROFILE_SAMPLE_RATE,
+    PROFILE_KEEP=profiling.PROFILE_KEEP,
+)
+
 
-@app.context_processor
 def inject_year():
     """Inject current year into all templates."""
     return {'current_year': datetime.now().year}
 
 
-@app.route('/')
+def _prefetcher() -> JokePrefetcher:
+    """Prefetch buffers of the current app."""
+    return current_app.extensions['prefetcher']
+
+
+def _stream() -> JokeStream:
+    """Joke stream of the current app."""
+    return current_app.extensions['joke_stream']
+
+
+def _page_cache() -> PageCache:
+    """Rendered bodies of the current app's static-content pages."""
+    return current_app.extensions['page_cache']
+
+
+def wants_json() -> bool:
+    """Return True if the request's Accept header prefers JSON to HTML."""
+    best = request.accept_mimetypes.best_match(('text/html', 'application/json'))
+    return best == 'application/json'
+
+
+def joke_json(joke_data):
+    """Serialise a joke result: 200, or 502 if the upstream lookup failed."""
+    return jsonify(joke_data), 200 if joke_data['success'] else 502
+
+
+def joke_response(joke_data, **context):
+    """
+    Answer a /joke route in the representation the client asked for.
+    
+    Clients that prefer ``application/json`` get the result as JSON and no
+    template is rendered; everyone else gets joke.html. Both carry
+    ``Vary: Accept`` so shared caches keep them apart.
+    """
+    if wants_json():
+        response = make_response(joke_json(joke_data))
+    else:
+        response = make_response(render_template('joke.html', joke_data=joke_data, **context))
+    response.vary.add('Accept')
+    return response
+
+
+@cache_page
 def home():
     """Render the home page."""
     welcome_message = "Get a laugh with our collection of jokes!"
-    return render_template('home.html', app_version=app_version, welcome_message=welcome_message)
+    return _page_cache().render('home.html', app_version=app_version, welcome_message=welcome_message)
 
 
-@app.route('/about')
+@cache_page
 def about():
     """Render the about page."""
-    return render_template('about.html')
+    return _page_cache().render('about.html')
 
 
-@app.route('/contact')
+@cache_page
 def contact():
     """Render the contact page."""
-    return render_template('contact.html')
+    return _page_cache().render('contact.html')
 
 
-@app.route('/joke')
+@cache_joke
 def get_random_joke():
     """
     Fetch and display a random joke from any category.
     
     Returns:
-        Rendered template with joke data or error message.
+        Rendered template with joke data or error message, or the joke
+        as JSON if the Accept header prefers it.
     """
-    joke_data = get_joke("Any")
-    return render_template('joke.html', joke_data=joke_data)
+    joke_data = _prefetcher().pop("Any") or get_joke("Any")
+    return joke_response(joke_data)
 
 
-@app.route('/joke/<category>')
+@cache_joke
 def get_joke_by_category(category):
     """
     Fetch and display a joke from a specified category.
@@ -52,20 +149,255 @@ def get_joke_by_category(category):
         category (str): The joke category (Programming, Miscellaneous, Dark, etc.)
     
     Returns:
-        Rendered template with joke data or error message.
+        Rendered template with joke data or error message, or the joke
+        as JSON if the Accept header prefers it.
     """
     # Sanitize category name (capitalize first letter)
     category = category.capitalize()
     
-    joke_data = get_joke(category)
-    return render_template('joke.html', joke_data=joke_data, category=category)
+    joke_data = _prefetcher().pop(category) or get_joke(category)
+    return joke_response(joke_data, category=category)
+
+
+@cache_joke
+async def get_random_joke_async():
+    """
+    Async variant of get_random_joke(); does not block on the upstream call.
+    
+    Returns:
+        Rendered template with joke data or error message, or JSON.
+    """
+    joke_data = _prefetcher().pop("Any") or await get_joke_async("Any")
+    return joke_response(joke_data)
+
+
+@cache_joke
+async def get_joke_by_category_async(category):
+    """
+    Async variant of get_joke_by_category().
+    
+    Args:
+        category (str): The joke category (Programming, Miscellaneous, Dark, etc.)
+    
+    Returns:
+        Rendered template with joke data or error message, or JSON.
+    """
+    category = category.capitalize()
+    
+    joke_data = _prefetcher().pop(category) or await get_joke_async(category)
+    return joke_response(joke_data, category=category)
+
+
+@cache_joke
+def get_random_joke_api():
+    """
+    Return a random joke from any category as JSON.
+    
+    Returns:
+        The get_joke() result as JSON; status 502 if it failed.
+    """
+    return joke_json(_prefetcher().pop("Any") or get_joke("Any"))
+
+
+@cache_joke
+def get_joke_by_category_api(category):
+    """
+    Return a joke from a specified category as JSON.
+    
+    Args:
+        category (str): The joke category, case-insensitive.
+    
+    Returns:
+        The get_joke() result as JSON; status 502 if it failed, or a JSON
+        error with status 400 for an unknown category.
+    """
+    category = category.capitalize()
+    if category not in ALLOWED_CATEGORIES:
+        return jsonify(error=f"Unknown category: {category}"), 400
+    
+    return joke_json(_prefetcher().pop(category) or get_joke(category))
+
+
+@cache_joke
+def get_jokes_batch_api():
+    """
+    Stream several jokes fetched concurrently as newline-delimited JSON.
+    
+    Query parameters:
+        categories: Comma-separated categories (default "Any").
+        count: Total number of jokes (1 to BATCH_MAX_COUNT, default 1).
+        type: Optional joke type filter ('single' or 'twopart').
+    
+    Returns:
+        An application/x-ndjson stream with one joke result per line,
+        or a JSON error with status 400 for invalid parameters.
+    """
+    categories = [
+        name.strip().capitalize()
+        for name in request.args.get('categories', 'Any').split(',')
+        if name.strip()
+    ]
+    unknown = [name for name in categories if name not in ALLOWED_CATEGORIES]
+    if not categories or unknown:
+        return jsonify(error=f"Unknown categories: {', '.join(unknown) or 'none given'}"), 400
+    
+    count = request.args.get('count', 1, type=int)
+    if not 1 <= count <= BATCH_MAX_COUNT:
+        return jsonify(error=f"count must be between 1 and {BATCH_MAX_COUNT}"), 400
+    
+    jokes = iter_jokes_batch(categories, count, request.args.get('type'))
+    dumps = current_app.json.dumps  # the body is generated outside the app context
+    return Response((dumps(joke) + '\n' for joke in jokes), mimetype='application/x-ndjson')
+
+
+def stream_jokes():
+    """
+    Push jokes to the client as Server-Sent Events.
+    
+    Query parameters:
+        category: Joke category (default "Any").
+    
+    Returns:
+        A text/event-stream of ``joke`` events, one every
+        JOKE_STREAM_INTERVAL seconds, or a JSON error with status 400 for
+        an unknown category and 503 when JOKE_STREAM_MAX_SUBSCRIBERS
+        streams are already open.
+    """
+    category = request.args.get('category', 'Any').strip().capitalize()
+    if category not in ALLOWED_CATEGORIES:
+        return jsonify(error=f"Unknown category: {category}"), 400
+    
+    stream = _stream()
+    subscription = stream.subscribe(category)
+    if subscription is None:
+        response = jsonify(error="Too many open streams")
+        response.status_code = 503
+        response.headers['Retry-After'] = str(math.ceil(stream.interval))
+        return response
+    
+    response = Response(subscription.events(), mimetype='text/event-stream')
+    response.call_on_close(subscription.close)  # also when the body was never iterated
+    response.cache_control.no_cache = True
+    response.headers['X-Accel-Buffering'] = 'no'  # stop nginx from buffering events
+    return response
 
 
-@app.route('/health')
+@cache_joke
 def health():
-    """Return the health status of the application."""
-    return jsonify(status='ok')
+    """
+    Return the health status of the application.
+    
+    Status is 'degraded' while the JokeAPI circuit breaker is not closed;
+    the breaker state and its recent transitions are included.
+    """
+    status = 'ok' if joke_service.is_circuit_closed() else 'degraded'
+    return jsonify(
+        status=status,
+        circuit=joke_service.get_circuit_stats(),
+        prefetch=_prefetcher().stats(),
+        stream=_stream().stats()
+    )
+
+
+# URL rule -> view, registered on every app by create_app()
+ROUTES = [
+    ('/', home),
+    ('/about', about),
+    ('/contact', contact),
+    ('/joke', get_random_joke),
+    ('/joke/<category>', get_joke_by_category),
+    ('/async/joke', get_random_joke_async),
+    ('/async/joke/<category>', get_joke_by_category_async),
+    ('/api/joke', get_random_joke_api),
+    ('/api/joke/<category>', get_joke_by_category_api),
+    ('/api/jokes', get_jokes_batch_api),
+    ('/stream/jokes', stream_jokes),
+    ('/health', health),
+]
+
+
+def create_app(config: dict = None) -> Flask:
+    """
+    Build and configure the application.
+    
+    Settings are applied in order: DEFAULT_CONFIG, FLASK_-prefixed
+    environment variables, then config. Each app gets its own prefetch
+    buffers, joke stream and page cache (``app.extensions['prefetcher']``,
+    ``['joke_stream']`` and ``['page_cache']``); the joke service is
+    process-wide, so the app created last configures it.
+    
+    Args:
+        config (dict, optional): Settings overriding the defaults and the
+                                 environment.
+    
+    Returns:
+        Flask: The configured application.
+    
+    Example:
+        >>> app = create_app({'JOKE_BACKEND': 'corpus', 'JOKE_CORPUS_PATH': 'data/jokes.jsonl'})
+        >>> app.test_client().get('/api/joke').status_code
+        200
+    """
+    app = Flask(__name__)
+    app.config.from_mapping(DEFAULT_CONFIG)
+    app.config.from_prefixed_env()
+    app.config.from_mapping(config or {})
+    
+    metrics.init_app(app)  # first, so requests answered by other hooks are counted
+    profiling.init_app(app)
+    json_provider.init_app(app)
+    joke_service.init_app(app)
+    http_cache.init_app(app)
+    assets.init_app(app)
+    template_cache.init_app(app)
+    compression.init_app(app)
+    
+    # Buffers bypass the response cache so each slot holds a distinct joke
+    prefetcher = JokePrefetcher(
+        fetch=partial(get_joke, use_cache=False),
+        categories=ALLOWED_CATEGORIES,
+        depth=app.config['JOKE_PREFETCH_DEPTH'],
+        low_water=app.config['JOKE_PREFETCH_LOW_WATER'],
+        max_workers=app.config['JOKE_PREFETCH_WORKERS'],
+        max_age=app.config['JOKE_PREFETCH_MAX_AGE'],
+    )
+    # services.prefetch stops it at exit, and services.joke_stream the stream
+    if app.config['JOKE_PREFETCH_ENABLED']:
+        prefetcher.start()
+    
+    # One producer per category feeds every open /stream/jokes connection;
+    # like the prefetch buffers it bypasses the response cache
+    stream = JokeStream(
+        fetch=partial(get_joke, use_cache=False),
+        encode=app.json.dumps,
+        interval=app.config['JOKE_STREAM_INTERVAL'],
+        max_subscribers=app.config['JOKE_STREAM_MAX_SUBSCRIBERS'],
+        backlog=app.config['JOKE_STREAM_BACKLOG'],
+        heartbeat=app.config['JOKE_STREAM_HEARTBEAT'],
+    )
+    
+    app.extensions.update(prefetcher=prefetcher, joke_stream=stream, page_cache=PageCache())
+    app.context_processor(inject_year)
+    for rule, view in ROUTES:
+        app.add_url_rule(rule, view_func=view)
+    
+    # Load compiled templates now, or run the static-content pages once, so
+    # the first real request does not pay for it; both are off unless enabled
+    # (gunicorn.conf.py turns precompiling on), so importing the app is cheap
+    if app.config['WARMUP_ENABLED']:
+        template_cache.warm_up(app, app.config['WARMUP_PATHS'])
+    elif app.config['TEMPLATE_PRECOMPILE']:
+        template_cache.precompile(app)
+    return app
+
+
+# The app served by `flask --app app`, `python app.py` and gunicorn.conf.py
+app = create_app()
+prefetcher = app.extensions['prefetcher']
+stream = app.extensions['joke_stream']
+page_cache = app.extensions['page_cache']
 
 
 if __name__ == '__main__':
+    # Development server only; see gunicorn.conf.py for production
     app.run(host='0.0.0.0', port=5000, debug=True)
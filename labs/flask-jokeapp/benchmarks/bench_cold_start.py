@@ -0,0 +1,85 @@
+"""
+Benchmark: first-request latency of a fresh worker process.
+
+Starts a new Python process per run, imports the app and times its first
+request to each page, comparing:
+
+- cold: no bytecode cache, templates compiled on first use
+- bytecode: templates loaded from the precompiled on-disk cache at boot
+- warm-up: bytecode cache plus template_cache.warm_up() before serving
+
+Jokes come from the bundled corpus so no network is involved.
+
+Usage:
+    python -m benchmarks.bench_cold_start --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+PATHS = ['/', '/about', '/contact', '/joke', '/joke/Programming']
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from app import app
+boot = time.perf_counter() - start
+client = app.test_client()
+first = {}
+for path in sys.argv[1:]:
+    start = time.perf_counter()
+    client.get(path).close()
+    first[path] = (time.perf_counter() - start) * 1000
+print(json.dumps({'boot_ms': boot * 1000, 'first_ms': first}))
+"""
+
+
+def run_once(env: dict) -> dict:
+    """Run the child in a fresh interpreter and return its timings."""
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, *PATHS],
+        cwd=APP_DIR, env={**os.environ, **env}, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=5, help="Fresh processes per mode")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        base = {
+            'FLASK_JOKE_BACKEND': 'corpus',
+            'FLASK_JOKE_CORPUS_PATH': str(APP_DIR / 'data' / 'jokes.jsonl'),
+        }
+        subprocess.run(
+            [sys.executable, '-m', 'flask', '--app', 'app', 'precompile-templates'],
+            cwd=APP_DIR, env={**os.environ, **base, 'FLASK_TEMPLATE_CACHE_DIR': cache_dir},
+            check=True, capture_output=True
+        )
+        modes = {
+            'cold': {'FLASK_TEMPLATE_CACHE_DIR': 'false', 'FLASK_TEMPLATE_PRECOMPILE': 'false'},
+            'bytecode': {'FLASK_TEMPLATE_CACHE_DIR': cache_dir, 'FLASK_TEMPLATE_PRECOMPILE': 'true'},
+            'warm-up': {'FLASK_TEMPLATE_CACHE_DIR': cache_dir, 'FLASK_WARMUP_ENABLED': 'true'},
+        }
+
+        print(f"Median of {args.runs} fresh processes per mode (ms)\n")
+        print(f"{'mode':<10}{'boot':>8}" + ''.join(f"{path:>19}" for path in PATHS))
+        print("-" * (18 + 19 * len(PATHS)))
+        for mode, env in modes.items():
+            samples = [run_once({**base, **env}) for _ in range(args.runs)]
+            boot = statistics.median(sample['boot_ms'] for sample in samples)
+            first = [statistics.median(sample['first_ms'][path] for sample in samples) for path in PATHS]
+            print(f"{mode:<10}{boot:>8.1f}" + ''.join(f"{value:>19.2f}" for value in first))
+
+
+if __name__ == '__main__':
+    main()
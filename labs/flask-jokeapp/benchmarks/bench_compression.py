@@ -0,0 +1,89 @@
+"""
+Benchmark: bytes on the wire and CPU cost per request for each encoding.
+
+Requests pages, a joke, an NDJSON batch and the stylesheet through the test
+client with ``Accept-Encoding`` set to identity, gzip and (if the brotli
+package is installed) br, and reports the response size and the process
+CPU time per request. The built stylesheet is measured both compressed on the
+fly and served from a precompressed ``.gz`` / ``.br`` variant.
+
+Jokes come from the bundled corpus so no network is involved.
+
+Usage:
+    python -m benchmarks.bench_compression --requests 500
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+os.environ.setdefault('FLASK_JOKE_BACKEND', 'corpus')
+os.environ.setdefault('FLASK_JOKE_CORPUS_PATH', str(APP_DIR / 'data' / 'jokes.jsonl'))
+
+from app import app  # noqa: E402
+from services import assets, compression  # noqa: E402
+
+PATHS = ['/', '/about', '/joke/Programming', '/api/jokes?categories=Pun&count=20']
+
+
+def measure(client, path: str, encoding: str, requests: int) -> tuple:
+    """Return (bytes on the wire, CPU microseconds) per request."""
+    headers = {'Accept-Encoding': encoding}
+    size = len(client.get(path, headers=headers).get_data())
+    start = time.process_time()
+    for _ in range(requests):
+        client.get(path, headers=headers).get_data()
+    cpu = (time.process_time() - start) / requests * 1e6
+    return size, cpu
+
+
+def report(label: str, rows: list) -> None:
+    """Print one path's rows as bytes / CPU, with savings against identity."""
+    identity_size, identity_cpu = rows[0][1]
+    for encoding, (size, cpu) in rows:
+        saved = 100 * (1 - size / identity_size)
+        print(f"{label:<38}{encoding:<10}{size:>9} B{saved:>8.1f} %{cpu:>10.0f} us{cpu - identity_cpu:>+10.0f} us")
+        label = ''
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--requests', type=int, default=500, help="Requests per path and encoding")
+    args = parser.parse_args()
+
+    encodings = ['identity'] + list(reversed(compression.available_encodings()))
+    client = app.test_client()
+
+    print(f"{'path':<38}{'encoding':<10}{'on wire':>11}{'saved':>10}{'CPU/req':>13}{'vs identity':>12}")
+    print("-" * 94)
+    for path in PATHS:
+        report(path, [(encoding, measure(client, path, encoding, args.requests)) for encoding in encodings])
+
+    # Stylesheet: dynamic compression vs precompressed variants
+    stylesheet = f"{assets.DIST_DIR}/{assets.load_manifest(app.static_folder)['app.css']}"
+    stylesheet_url = f"/static/{stylesheet}"
+    data = (Path(app.static_folder) / stylesheet).read_bytes()
+    rows = [('identity', measure(client, stylesheet_url, 'identity', args.requests))]
+    for encoding in encodings[1:]:
+        start = time.process_time()
+        for _ in range(args.requests):
+            compressed = compression.compress(data, encoding)
+        cpu = (time.process_time() - start) / args.requests * 1e6 + rows[0][1][1]
+        rows.append((f"{encoding}*", (len(compressed), cpu)))
+
+    written = compression.precompress_static(app.static_folder)
+    try:
+        for encoding in encodings[1:]:
+            rows.append((f"{encoding}.pre", measure(client, stylesheet_url, encoding, args.requests)))
+    finally:
+        for path in written:
+            os.remove(path)
+    report('/static/dist/app.css', rows)
+    print("\n* compressed on the fly (estimated: identity + compress());"
+          " .pre = precompressed variant served from disk")
+
+
+if __name__ == '__main__':
+    main()
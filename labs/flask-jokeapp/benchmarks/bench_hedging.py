@@ -0,0 +1,90 @@
+"""
+Benchmark: tail latency of get_joke() with and without hedged requests.
+
+Runs the same sequence of uncached get_joke() calls against a local
+FakeJokeAPI with a heavy-tailed latency distribution, once with a fixed
+timeout and no hedging, and once with adaptive timeouts and hedging, and
+reports latency percentiles and the extra upstream load hedging added.
+
+Nothing touches the network beyond 127.0.0.1.
+
+Usage:
+    python -m benchmarks.bench_hedging --calls 400 --latency lognormal:20:1.0
+"""
+
+import argparse
+import time
+
+from benchmarks.fake_jokeapi import FakeJokeAPI
+from services import joke_service
+from services.latency import LatencyWindow
+
+MODES = {
+    'fixed timeout': {'adaptive': False, 'hedge': False},
+    'adaptive + hedging': {'adaptive': True, 'hedge': True},
+}
+
+
+def run_mode(upstream: FakeJokeAPI, calls: int, adaptive: bool, hedge: bool) -> dict:
+    """Time calls sequential get_joke() calls in one mode."""
+    joke_service.reset_latency()
+    joke_service.reset_circuit_breaker()
+    joke_service.configure_timeouts(adaptive=adaptive)
+    joke_service.configure_hedging(enabled=hedge)
+    before = upstream.stats['requests']
+    sent_before = joke_service.get_latency_stats()['hedges_sent']
+    won_before = joke_service.get_latency_stats()['hedges_won']
+
+    window = LatencyWindow(size=calls, min_samples=1)
+    failures = 0
+    for _ in range(calls):
+        started = time.perf_counter()
+        result = joke_service.get_joke('Programming', use_cache=False)
+        window.observe(time.perf_counter() - started)
+        failures += not result['success']
+
+    stats = joke_service.get_latency_stats()
+    return {
+        'p50': window.percentile(50), 'p95': window.percentile(95),
+        'p99': window.percentile(99), 'max': window.percentile(100),
+        'upstream': upstream.stats['requests'] - before,
+        'hedges': stats['hedges_sent'] - sent_before,
+        'won': stats['hedges_won'] - won_before,
+        'failures': failures,
+        'timeout': stats['timeout']
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--calls', type=int, default=400, help="get_joke() calls per mode")
+    parser.add_argument('--latency', default='lognormal:20:1.0',
+                        help="Upstream latency distribution, see fake_jokeapi.parse_latency()")
+    args = parser.parse_args()
+
+    saved_api = joke_service.API_BASE_URL
+    saved_adaptive, saved_hedge = joke_service.ADAPTIVE_TIMEOUT, joke_service.HEDGE_ENABLED
+    with FakeJokeAPI(latency=args.latency) as upstream:
+        joke_service.configure_api(upstream.base_url)
+        try:
+            print(f"{args.calls} uncached calls, upstream latency {args.latency} ms:\n")
+            print(f"{'mode':<20}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+                  f"{'extra load':>12}{'hedges won':>12}{'failed':>8}")
+            print("-" * 88)
+            for label, mode in MODES.items():
+                stats = run_mode(upstream, args.calls, **mode)
+                extra = stats['upstream'] / args.calls - 1
+                won = f"{stats['won']}/{stats['hedges']}"
+                latencies = ''.join(f"{stats[key] * 1000:>7.1f}ms" for key in ('p50', 'p95', 'p99', 'max'))
+                print(f"{label:<20}{latencies}{extra:>11.1%}{won:>12}{stats['failures']:>8}")
+            print(f"\nAdaptive timeout after the run: {stats['timeout'] * 1000:.0f} ms "
+                  f"(fixed: {joke_service.REQUEST_TIMEOUT * 1000:.0f} ms)")
+        finally:
+            joke_service.configure_api(saved_api)
+            joke_service.configure_timeouts(adaptive=saved_adaptive)
+            joke_service.configure_hedging(enabled=saved_hedge)
+            joke_service.close_hedge_executor()
+
+
+if __name__ == '__main__':
+    main()
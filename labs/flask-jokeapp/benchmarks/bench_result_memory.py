@@ -0,0 +1,122 @@
+"""
+Benchmark: memory and allocations of JokeResult against the old result dicts.
+
+Two measurements, both with tracemalloc:
+
+- Retained size: bytes held per result when many are kept alive (e.g. in
+  the response cache, prefetch buffers or a batch), for a JokeResult and
+  for the seven-key dict it replaced.
+- Per-call allocations on the service paths that used to build or copy a
+  dict on every call: a cache hit, a timeout, an HTTP 503 and a JokeAPI
+  error payload. Each path is called many times with every return value
+  kept, so the bytes allocated per call show whether it built a new object
+  or returned a shared one. The "dict" column emulates the previous code,
+  which returned a fresh dict copy on each of these paths.
+
+Upstream calls are answered offline; nothing touches the network.
+
+Usage:
+    python -m benchmarks.bench_result_memory --calls 20000
+"""
+
+import argparse
+import sys
+import timeit
+import tracemalloc
+from contextlib import ExitStack
+from unittest.mock import patch
+
+import requests
+
+from benchmarks.microbench import ERROR, SINGLE, TWOPART, canned_response
+from services import joke_service
+from services.joke_result import JokeResult
+
+
+def retained_bytes(make, count: int) -> float:
+    """Traced bytes per object for count objects built by make() and kept alive."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = [make() for _ in range(count)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del kept
+    return (after - before) / count - 8  # minus the list slot holding each one
+
+
+class _FixedSession:
+    """Session stand-in whose get() raises error() or returns a fixed response."""
+
+    def __init__(self, error=None, response=None):
+        self._error, self._response = error, response
+
+    def get(self, url, timeout=None):
+        if self._error is not None:
+            raise self._error()  # a fresh exception, or tracebacks pile up on one
+        return self._response
+
+
+def _http_503() -> requests.Response:
+    response = canned_response({})
+    response.status_code, response.reason = 503, 'Service Unavailable'
+    return response
+
+
+PATHS = {
+    'cache hit': (_FixedSession(response=canned_response(TWOPART)), True),
+    'timeout': (_FixedSession(error=requests.exceptions.Timeout), False),
+    'HTTP 503': (_FixedSession(response=_http_503()), False),
+    'JokeAPI error': (_FixedSession(response=canned_response(ERROR)), False),
+}
+
+
+def measure_path(session, use_cache: bool, calls: int) -> dict:
+    """Bytes per call and time per call of get_joke() over session."""
+    with ExitStack() as stack:
+        stack.enter_context(patch.object(joke_service, 'get_session', lambda: session))
+        # Keep the breaker closed so every call reaches the failure branch
+        stack.enter_context(patch.object(joke_service._circuit_breaker, 'allow_request', lambda: True))
+        joke_service.clear_cache()
+        call = lambda: joke_service.get_joke('Programming', use_cache=use_cache)
+        call()  # warm the cache / shared error results
+
+        results = {}
+        for label, fn in (('JokeResult', call), ('dict', lambda: call().to_dict())):
+            results[label] = {
+                'bytes': retained_bytes(fn, calls),
+                'us': min(timeit.repeat(fn, number=calls // 10, repeat=5)) / (calls // 10) * 1e6
+            }
+        joke_service.clear_cache()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--calls', type=int, default=20_000, help="Calls (and kept results) per measurement")
+    args = parser.parse_args()
+
+    single = joke_service._parse_joke_data(SINGLE)
+    print(f"Retained size per result ({args.calls} kept alive, Python {sys.version.split()[0]}):\n")
+    print(f"{'result':<16}{'dict':>10}{'JokeResult':>12}")
+    print("-" * 38)
+    for label, payload in (('single', SINGLE), ('twopart', TWOPART), ('error', ERROR)):
+        result = joke_service._parse_joke_data(payload)
+        as_dict = retained_bytes(result.to_dict, args.calls)
+        compact = retained_bytes(lambda: JokeResult(*result.astuple()), args.calls)
+        print(f"{label:<16}{as_dict:>8.0f} B{compact:>10.0f} B")
+    print(f"{'(getsizeof)':<16}{sys.getsizeof(single.to_dict()):>8} B{sys.getsizeof(single):>10} B")
+
+    print("\nget_joke() allocations and time per call:\n")
+    print(f"{'':<16}{'bytes per call':^22}{'time per call':^24}")
+    print(f"{'path':<16}{'dict':>10}{'JokeResult':>12}{'dict':>12}{'JokeResult':>12}")
+    print("-" * 62)
+    for label, (session, use_cache) in PATHS.items():
+        stats = measure_path(session, use_cache, args.calls)
+        print(f"{label:<16}{stats['dict']['bytes']:>8.0f} B{stats['JokeResult']['bytes']:>10.0f} B"
+              f"{stats['dict']['us']:>10.2f}us{stats['JokeResult']['us']:>10.2f}us")
+
+
+if __name__ == '__main__':
+    main()
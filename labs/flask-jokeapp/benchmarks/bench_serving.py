@@ -0,0 +1,180 @@
+"""
+Benchmark: throughput of the development server vs the gunicorn profile.
+
+Starts the app as a separate server process in each mode and drives it with
+closed-loop keep-alive clients for a fixed time:
+
+- dev server: ``flask --app app run --debug``, the same server as
+  ``python app.py`` (werkzeug, with the reloader and debugger);
+- gunicorn: ``gunicorn -c gunicorn.conf.py``, pre-forked gthread workers
+  from a preloaded app;
+- gunicorn, no preload: the same, with every worker importing the app.
+
+Jokes come from the bundled corpus, so no request waits on the network and
+the numbers measure serving alone. Reports requests per second, latency
+percentiles, errors, and the memory of the server's processes (PSS, which
+splits shared pages between the processes that map them; Linux only).
+
+Usage:
+    python -m benchmarks.bench_serving --clients 16 --duration 10
+    python -m benchmarks.bench_serving --workers 4 --threads 8
+"""
+
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+from benchmarks.load_test import percentile
+
+APP_DIR = Path(__file__).resolve().parent.parent
+PATHS = ['/', '/joke/Programming', '/api/joke/Programming', '/api/jokes?count=5']
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(mode: str, port: int, workers: int = None, threads: int = None) -> list:
+    """Command line that serves the app on port in mode (see server_env for preloading)."""
+    if mode == 'dev server':
+        return [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--debug', '--port', str(port)]
+    command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}']
+    if workers:
+        command += ['--workers', str(workers)]
+    if threads:
+        command += ['--threads', str(threads)]
+    return command
+
+
+def server_env(mode: str) -> dict:
+    """Environment for the server: the corpus backend, and preloading per mode."""
+    env = {**os.environ, 'FLASK_JOKE_BACKEND': 'corpus', 'FLASK_JOKE_CORPUS_PATH': 'data/jokes.jsonl'}
+    if mode.endswith('no preload'):
+        env['GUNICORN_PRELOAD'] = '0'
+    return env
+
+
+def wait_until_up(base_url: str, timeout: float = 30.0) -> None:
+    """Poll /health until the server answers."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f'{base_url}/health', timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"server at {base_url} did not start")
+
+
+def process_tree_pss(pid: int) -> tuple:
+    """Return (process count, total PSS in kB) of pid and its descendants."""
+    pids = [pid]
+    for parent in pids:
+        for task in Path(f'/proc/{parent}/task').iterdir():
+            pids.extend(int(child) for child in (task / 'children').read_text().split())
+    total = 0
+    for member in pids:
+        for line in Path(f'/proc/{member}/smaps_rollup').read_text().splitlines():
+            if line.startswith('Pss:'):
+                total += int(line.split()[1])
+    return len(pids), total
+
+
+def drive(base_url: str, clients: int, duration: float, paths: list) -> dict:
+    """Run clients closed-loop keep-alive clients for duration seconds."""
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(offset):
+        mine, failed = [], 0
+        with requests.Session() as session:
+            i = offset
+            while time.monotonic() < deadline:
+                path = paths[i % len(paths)]
+                i += 1
+                start = time.perf_counter()
+                try:
+                    response = session.get(base_url + path, timeout=30)
+                    response.content
+                    failed += response.status_code >= 500
+                except requests.RequestException:
+                    failed += 1
+                mine.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(mine)
+            errors.append(failed)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    latencies.sort()
+    return {
+        'rps': len(latencies) / elapsed,
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99),
+        'errors': sum(errors)
+    }
+
+
+def run_mode(mode: str, args) -> dict:
+    """Start the server in mode, load it, measure its memory and stop it."""
+    port = free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    server = subprocess.Popen(
+        server_command(mode, port, args.workers, args.threads),
+        cwd=APP_DIR, env=server_env(mode), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_up(base_url)
+        drive(base_url, args.clients, min(args.duration, 2.0), args.paths)  # warm up
+        stats = drive(base_url, args.clients, args.duration, args.paths)
+        stats['processes'], stats['pss_kb'] = process_tree_pss(server.pid)
+        return stats
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--clients', type=int, default=16, help="Concurrent keep-alive clients")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds of load per mode")
+    parser.add_argument('--workers', type=int, help="gunicorn workers (default: gunicorn.conf.py)")
+    parser.add_argument('--threads', type=int, help="gunicorn threads per worker (default: gunicorn.conf.py)")
+    parser.add_argument('--path', action='append', dest='paths', help="Path to request (repeatable)")
+    parser.add_argument('--mode', action='append', dest='modes',
+                        choices=['dev server', 'gunicorn', 'gunicorn, no preload'],
+                        help="Server to measure (repeatable); default all")
+    args = parser.parse_args()
+    args.paths = args.paths or PATHS
+    modes = args.modes or ['dev server', 'gunicorn', 'gunicorn, no preload']
+
+    print(f"{args.clients} clients, {args.duration:g}s per mode, {os.cpu_count()} CPUs, "
+          f"paths: {' '.join(args.paths)}\n")
+    print(f"{'mode':<22}{'req/s':>9}{'p50':>10}{'p99':>10}{'errors':>8}{'procs':>7}{'PSS':>10}")
+    print("-" * 76)
+    for mode in modes:
+        stats = run_mode(mode, args)
+        print(f"{mode:<22}{stats['rps']:>9.0f}{stats['p50'] * 1000:>8.1f}ms{stats['p99'] * 1000:>8.1f}ms"
+              f"{stats['errors']:>8}{stats['processes']:>7}{stats['pss_kb'] / 1024:>8.1f}MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark: memory per worker for the in-memory corpus vs the mmap store.
+
+Generates a synthetic corpus, compiles it into a joke store, then starts
+several worker processes that each open the backend and serve random jokes
+while all of them are alive. Each worker reports its RSS and PSS
+(proportional set size, which splits shared pages between the processes
+that map them) from /proc/self/smaps_rollup, so Linux is required.
+
+Usage:
+    python -m benchmarks.bench_store_rss --jokes 200000 --workers 4
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from services.corpus import FLAG_NAMES, JokeCorpus, load_jokes
+from services.joke_store import JokeStore, build_store
+
+CATEGORIES = ["Programming", "Misc", "Dark", "Pun", "Spooky", "Christmas"]
+
+
+def make_corpus(path: Path, count: int) -> None:
+    """Write count synthetic jokes of realistic length as JSONL."""
+    rng = random.Random(42)
+    words = "why did the developer cross road bug because it was dark mode array".split()
+    with path.open('w', encoding='utf-8') as corpus_file:
+        for i in range(count):
+            sentence = lambda n: ' '.join(rng.choice(words) for _ in range(n)).capitalize()
+            joke = {'id': i, 'category': rng.choice(CATEGORIES),
+                    'flags': {name: rng.random() < 0.05 for name in FLAG_NAMES}}
+            if rng.random() < 0.5:
+                joke.update(type='single', joke=sentence(18) + '.')
+            else:
+                joke.update(type='twopart', setup=sentence(10) + '?', delivery=sentence(8) + '!')
+            corpus_file.write(json.dumps(joke) + '\n')
+
+
+def read_memory() -> dict:
+    """Return RSS and PSS of the current process in kB."""
+    memory = {}
+    with open('/proc/self/smaps_rollup') as rollup:
+        for line in rollup:
+            name, _, rest = line.partition(':')
+            if name in ('Rss', 'Pss'):
+                memory[name.lower()] = int(rest.split()[0])
+    return memory
+
+
+def worker(mode: str, path: str, picks: int, barrier, results) -> None:
+    """Open the backend, serve jokes, and report memory while all workers run."""
+    before = read_memory()
+    start = time.perf_counter()
+    backend = JokeCorpus.load(path) if mode == 'corpus' else JokeStore.open(path)
+    load_time = time.perf_counter() - start
+
+    for _ in range(picks):
+        backend.random_payload(random.choice(CATEGORIES), blacklist_flags=['nsfw'])
+
+    barrier.wait()
+    after = read_memory()
+    results.put({
+        'rss_kb': after['rss'] - before['rss'],
+        'pss_kb': after['pss'] - before['pss'],
+        'load_ms': load_time * 1000
+    })
+    barrier.wait()
+
+
+def run(mode: str, path: Path, workers: int, picks: int) -> dict:
+    """Run one mode and average the per-worker measurements."""
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(mode, str(path), picks, barrier, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    samples = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return {key: sum(sample[key] for sample in samples) / workers for key in samples[0]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--jokes', type=int, default=200_000, help="Synthetic corpus size")
+    parser.add_argument('--workers', type=int, default=4, help="Worker processes per mode")
+    parser.add_argument('--picks', type=int, default=10_000, help="Random jokes served per worker")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus_path = Path(tmp) / 'jokes.jsonl'
+        store_path = Path(tmp) / 'jokes.jokestore'
+        make_corpus(corpus_path, args.jokes)
+        build_store(load_jokes(corpus_path), store_path)
+
+        print(f"Corpus: {args.jokes} jokes, JSONL {corpus_path.stat().st_size / 1e6:.1f} MB, "
+              f"store {store_path.stat().st_size / 1e6:.1f} MB, {args.workers} workers\n")
+        print(f"{'backend':<10}{'RSS/worker':>14}{'PSS/worker':>14}{'open time':>12}")
+        print("-" * 50)
+        for mode, path in (('corpus', corpus_path), ('mmap', store_path)):
+            stats = run(mode, path, args.workers, args.picks)
+            print(f"{mode:<10}{stats['rss_kb'] / 1024:>11.1f} MB{stats['pss_kb'] / 1024:>11.1f} MB"
+                  f"{stats['load_ms']:>9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark: N kiosk clients polling /api/joke versus holding /stream/jokes open.
+
+Starts a local FakeJokeAPI and the app (threaded werkzeug server), then for
+the same number of clients, interval and duration:
+
+- polling: every client requests /api/joke/<category> once per interval;
+- streaming: every client holds one /stream/jokes connection open.
+
+Reports the jokes clients received, the HTTP requests the app handled and
+the upstream calls it made. The response cache is disabled in both modes so
+every poll gets a fresh joke, as a kiosk expects. Nothing touches the
+network beyond 127.0.0.1.
+
+Usage:
+    python -m benchmarks.bench_stream --clients 50 --interval 1 --duration 10
+"""
+
+import argparse
+import threading
+import time
+
+import requests
+
+from benchmarks.fake_jokeapi import FakeJokeAPI
+from benchmarks.load_test import serve_app
+
+
+def poll(base_url: str, category: str, interval: float, deadline: float, counts: dict,
+         lock: threading.Lock) -> None:
+    """Request one joke per interval until deadline."""
+    with requests.Session() as session:
+        next_poll = time.monotonic()
+        while next_poll < deadline:
+            ok = session.get(f'{base_url}/api/joke/{category}', timeout=10).ok
+            with lock:
+                counts['requests'] += 1
+                counts['jokes'] += ok
+            next_poll += interval
+            time.sleep(max(next_poll - time.monotonic(), 0))
+
+
+def listen(base_url: str, category: str, interval: float, deadline: float, counts: dict,
+           lock: threading.Lock) -> None:
+    """Hold one event stream open until deadline, counting joke events."""
+    with requests.get(f'{base_url}/stream/jokes', params={'category': category},
+                      stream=True, timeout=10) as response:
+        with lock:
+            counts['requests'] += 1
+        for line in response.iter_lines():
+            if line.startswith(b'event: joke'):
+                with lock:
+                    counts['jokes'] += 1
+            if time.monotonic() >= deadline:
+                break
+
+
+def run_mode(client, base_url: str, upstream: FakeJokeAPI, clients: int, interval: float,
+             duration: float, category: str) -> dict:
+    """Run clients concurrent clients of one kind for duration seconds."""
+    counts = {'requests': 0, 'jokes': 0}
+    lock = threading.Lock()
+    before = upstream.stats['requests']
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=client, args=(base_url, category, interval, deadline, counts, lock))
+        for _ in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return dict(counts, upstream=upstream.stats['requests'] - before)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--clients', type=int, default=50, help="Concurrent clients")
+    parser.add_argument('--interval', type=float, default=1.0, help="Seconds between jokes")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds per mode")
+    parser.add_argument('--category', default='Programming', help="Joke category")
+    args = parser.parse_args()
+
+    with FakeJokeAPI() as upstream:
+        server = serve_app(upstream.base_url, disable_cache=True)
+        from app import stream
+        stream.interval = args.interval
+        stream.max_subscribers = max(stream.max_subscribers, args.clients)
+        base_url = f'http://127.0.0.1:{server.port}'
+        try:
+            print(f"{args.clients} clients, one joke per {args.interval:g}s, {args.duration:g}s per mode:\n")
+            print(f"{'mode':<12}{'jokes':>9}{'requests':>10}{'upstream':>10}{'upstream/joke':>15}")
+            print("-" * 56)
+            for label, client in (('polling', poll), ('streaming', listen)):
+                stats = run_mode(client, base_url, upstream, args.clients, args.interval,
+                                 args.duration, args.category)
+                per_joke = stats['upstream'] / stats['jokes'] if stats['jokes'] else float('nan')
+                print(f"{label:<12}{stats['jokes']:>9}{stats['requests']:>10}"
+                      f"{stats['upstream']:>10}{per_joke:>15.3f}")
+        finally:
+            stream.stop()
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
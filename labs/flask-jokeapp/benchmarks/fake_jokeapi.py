@@ -0,0 +1,306 @@
+"""
+Local stand-in for JokeAPI, for load tests that must not touch v2.jokeapi.dev.
+
+Serves ``GET /joke/<category>`` with the same response shapes as JokeAPI:
+single and twopart jokes, ``amount`` batches, and error payloads. Jokes come
+from the bundled corpus. Upstream behaviour is configurable:
+
+- latency: ``fixed:MS``, ``uniform:LO:HI``, ``normal:MEAN:SD``,
+  ``lognormal:MEDIAN:SIGMA`` or ``exp:MEAN`` (milliseconds)
+- error rate: fraction of requests answered with HTTP 500
+- slowloris rate: fraction of responses dribbled out a few bytes at a time
+  over ``--slowloris-seconds``, so no single read times out
+- rate limit: like JokeAPI's per-IP quota, at most ``--rate-limit``
+  requests per ``--rate-window`` seconds; every response carries
+  ``RateLimit-Limit``, ``RateLimit-Remaining`` and ``RateLimit-Reset``, and
+  requests over the limit get HTTP 429 with ``Retry-After``
+
+Point the app at it with ``FLASK_JOKE_API_BASE_URL``.
+
+Usage:
+    python -m benchmarks.fake_jokeapi --port 8081 --latency lognormal:40:0.5 --error-rate 0.01
+    python -m benchmarks.fake_jokeapi --port 8081 --rate-limit 120 --rate-window 60
+    FLASK_JOKE_API_BASE_URL=http://127.0.0.1:8081/joke flask --app app run
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from services.corpus import FLAG_NAMES, JokeCorpus
+
+DEFAULT_CORPUS = Path(__file__).resolve().parent.parent / 'data' / 'jokes.jsonl'
+MAX_AMOUNT = 10
+SLOWLORIS_CHUNK = 8  # bytes per write while dribbling a response
+
+
+def parse_latency(spec: str):
+    """
+    Build a latency sampler from a distribution spec.
+
+    Args:
+        spec (str): ``fixed:MS``, ``uniform:LO:HI``, ``normal:MEAN:SD``,
+                    ``lognormal:MEDIAN:SIGMA`` or ``exp:MEAN``; times in ms.
+
+    Returns:
+        callable: Takes a random.Random and returns a delay in seconds.
+
+    Raises:
+        ValueError: If the spec is malformed.
+
+    Example:
+        >>> parse_latency('fixed:20')(random.Random())
+        0.02
+    """
+    name, _, args = spec.partition(':')
+    try:
+        values = [float(value) for value in args.split(':')] if args else []
+    except ValueError:
+        raise ValueError(f"Bad latency spec: {spec}") from None
+    samplers = {
+        'fixed': (1, lambda rng, ms: ms),
+        'uniform': (2, lambda rng, lo, hi: rng.uniform(lo, hi)),
+        'normal': (2, lambda rng, mean, sd: rng.gauss(mean, sd)),
+        'lognormal': (2, lambda rng, median, sigma: rng.lognormvariate(math.log(median), sigma)),
+        'exp': (1, lambda rng, mean: rng.expovariate(1 / mean)),
+    }
+    if name not in samplers or len(values) != samplers[name][0]:
+        raise ValueError(f"Bad latency spec: {spec}")
+    sample = samplers[name][1]
+    return lambda rng: max(sample(rng, *values), 0.0) / 1000
+
+
+def error_payload(code: int, message: str, caused_by: str) -> dict:
+    """Body of a JokeAPI error response."""
+    return {
+        'error': True,
+        'internalError': code >= 500,
+        'code': code,
+        'message': message,
+        'causedBy': [caused_by],
+        'additionalInfo': caused_by,
+        'timestamp': int(time.time() * 1000)
+    }
+
+
+class FakeJokeAPI:
+    """
+    Threaded HTTP server speaking enough of JokeAPI for the app.
+
+    Example:
+        >>> with FakeJokeAPI(latency='fixed:20', error_rate=0.05) as upstream:
+        ...     joke_service.configure_api(upstream.base_url)
+    """
+
+    def __init__(self, corpus_path=DEFAULT_CORPUS, latency: str = 'fixed:0',
+                 error_rate: float = 0.0, slowloris_rate: float = 0.0,
+                 slowloris_seconds: float = 2.0, host: str = '127.0.0.1', port: int = 0,
+                 seed: int = None, rate_limit: int = 0, rate_window: float = 60.0):
+        """
+        Args:
+            corpus_path: Joke corpus served (JSONL or SQLite).
+            latency (str): Response delay distribution, see parse_latency().
+            error_rate (float): Fraction of requests answered with HTTP 500.
+            slowloris_rate (float): Fraction of responses sent slowly.
+            slowloris_seconds (float): Time a slow response takes to send.
+            host (str): Interface to bind.
+            port (int): Port to bind; 0 picks a free one.
+            seed (int, optional): Seed for reproducible runs.
+            rate_limit (int): Requests allowed per rate_window; 0 for no limit.
+            rate_window (float): Length of the fixed rate limit window in seconds.
+        """
+        self.corpus = JokeCorpus.load(corpus_path)
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.slowloris_rate = slowloris_rate
+        self.slowloris_seconds = slowloris_seconds
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.stats = {'requests': 0, 'jokes': 0, 'errors': 0, 'slowloris': 0, 'not_found': 0,
+                      'rate_limited': 0}
+        self._window_start = time.monotonic()
+        self._window_used = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        """Value for API_BASE_URL / JOKE_API_BASE_URL."""
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/joke'
+
+    def start(self) -> 'FakeJokeAPI':
+        """Serve in a daemon thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-jokeapi',
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve in the calling thread until interrupted."""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def respond(self, path: str):
+        """
+        Decide the response for a request path.
+
+        Args:
+            path (str): Request path and query string.
+
+        Returns:
+            tuple: (status, payload dict, delay in seconds, slowloris flag,
+                    extra headers dict)
+        """
+        with self._lock:
+            self.stats['requests'] += 1
+            delay = self.latency(self._rng)
+            failed = self._rng.random() < self.error_rate
+            slow = self._rng.random() < self.slowloris_rate
+            headers = self._rate_limit_headers()
+
+        if 'Retry-After' in headers:
+            self._count('rate_limited')
+            payload = error_payload(101, 'Request blocked by rate limiting',
+                                    'You have exceeded the limit of requests per window.')
+            return 429, payload, delay, False, headers
+        status, payload, delay, slow = self._joke_response(path, delay, slow, failed)
+        return status, payload, delay, slow, headers
+
+    def _rate_limit_headers(self) -> dict:
+        """Count a request against the rate limit window (lock held)."""
+        if not self.rate_limit:
+            return {}
+        now = time.monotonic()
+        if now - self._window_start >= self.rate_window:
+            self._window_start, self._window_used = now, 0
+        reset = math.ceil(self._window_start + self.rate_window - now)
+        limited = self._window_used >= self.rate_limit
+        if not limited:
+            self._window_used += 1
+        headers = {
+            'RateLimit-Limit': str(self.rate_limit),
+            'RateLimit-Remaining': str(self.rate_limit - self._window_used),
+            'RateLimit-Reset': str(reset)
+        }
+        if limited:
+            headers['Retry-After'] = str(reset)
+        return headers
+
+    def _joke_response(self, path: str, delay: float, slow: bool, failed: bool):
+        """Response for a request within the rate limit."""
+        url = urlsplit(path)
+        parts = url.path.strip('/').split('/')
+        if failed:
+            self._count('errors')
+            return 500, error_payload(500, 'Internal Error', 'Simulated upstream failure'), delay, slow
+        if len(parts) != 2 or parts[0] != 'joke' or not parts[1]:
+            self._count('not_found')
+            return 404, error_payload(404, 'Not Found', f'No endpoint at {url.path}'), delay, slow
+
+        query = parse_qs(url.query)
+        joke_type = query.get('type', [None])[0]
+        flags = [name for name in query.get('blacklistFlags', [''])[0].split(',') if name in FLAG_NAMES]
+        try:
+            amount = min(max(int(query.get('amount', ['1'])[0]), 1), MAX_AMOUNT)
+        except ValueError:
+            amount = 1
+        jokes = [self.corpus.random_payload(parts[1], joke_type, flags) for _ in range(amount)]
+        if jokes[0] is None:
+            self._count('not_found')
+            return 400, error_payload(106, 'No matching joke found',
+                                      'No jokes were found that match your provided filter(s).'), delay, slow
+
+        self._count('jokes', amount)
+        if slow:
+            self._count('slowloris')
+        if amount == 1:
+            return 200, jokes[0], delay, slow
+        return 200, {'error': False, 'amount': amount, 'jokes': jokes}, delay, slow
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += amount
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+            disable_nagle_algorithm = True  # headers and body are separate writes
+
+            def do_GET(self):
+                status, payload, delay, slow, headers = api.respond(self.path)
+                body = json.dumps(payload).encode('utf-8')
+                time.sleep(delay)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if not slow:
+                    self.wfile.write(body)
+                    return
+                chunks = [body[i:i + SLOWLORIS_CHUNK] for i in range(0, len(body), SLOWLORIS_CHUNK)]
+                pause = api.slowloris_seconds / len(chunks)
+                for chunk in chunks:
+                    self.wfile.write(chunk)
+                    self.wfile.flush()
+                    time.sleep(pause)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--corpus', default=str(DEFAULT_CORPUS), help="JSONL or SQLite joke corpus")
+    parser.add_argument('--latency', default='fixed:0', help="Delay distribution, e.g. lognormal:40:0.5")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of HTTP 500 responses")
+    parser.add_argument('--slowloris-rate', type=float, default=0.0, help="Fraction of slow responses")
+    parser.add_argument('--slowloris-seconds', type=float, default=2.0, help="Duration of a slow response")
+    parser.add_argument('--rate-limit', type=int, default=0, help="Requests per window; 0 for no limit")
+    parser.add_argument('--rate-window', type=float, default=60.0, help="Rate limit window in seconds")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    upstream = FakeJokeAPI(args.corpus, args.latency, args.error_rate, args.slowloris_rate,
+                           args.slowloris_seconds, args.host, args.port, args.seed,
+                           args.rate_limit, args.rate_window)
+    print(f"Fake JokeAPI on {upstream.base_url} (Ctrl+C to stop)")
+    try:
+        upstream.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(upstream.stats))
+
+
+if __name__ == '__main__':
+    main()
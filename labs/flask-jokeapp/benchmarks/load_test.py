@@ -0,0 +1,193 @@
+"""
+Load test: drive the app at a target request rate and report latency.
+
+By default the app is served in-process by a threaded werkzeug server, with
+its JokeAPI client pointed at a local FakeJokeAPI, so no request leaves the
+machine. Use ``--target`` to load an already running server instead (e.g.
+gunicorn started with ``FLASK_JOKE_API_BASE_URL`` set to a fake_jokeapi).
+
+The generator is open-loop: request i is due at ``start + i / rps`` whether
+or not earlier requests have finished. Latency is measured from that due
+time, so queueing behind a slow server is counted instead of hidden
+(coordinated omission); pure service time is reported alongside.
+
+Usage:
+    python -m benchmarks.load_test --rps 200 --duration 10 --latency lognormal:40:0.5
+    python -m benchmarks.load_test --target http://127.0.0.1:8000 --path /joke/Pun --rps 500
+"""
+
+import argparse
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from werkzeug.serving import make_server
+
+from benchmarks.fake_jokeapi import FakeJokeAPI
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """
+    Nearest-rank percentile of an ascending list.
+
+    Args:
+        sorted_values (list): Values in ascending order.
+        q (float): Percentile between 0 and 100.
+
+    Returns:
+        float: The value, or 0.0 for an empty list.
+
+    Example:
+        >>> percentile([1, 2, 3, 4], 50)
+        2
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(int(-(-q * len(sorted_values) // 100)), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_load(base_url: str, paths: list, rps: float, duration: float, concurrency: int,
+             timeout: float = 30.0) -> dict:
+    """
+    Send ``rps * duration`` GET requests on an open-loop schedule.
+
+    Paths are requested round-robin. Each worker thread keeps its own
+    keep-alive session.
+
+    Args:
+        base_url (str): Server root, e.g. ``http://127.0.0.1:5000``.
+        paths (list): Paths to request.
+        rps (float): Target requests per second.
+        duration (float): Seconds to generate load for.
+        concurrency (int): Max requests in flight.
+        timeout (float): Per-request timeout in seconds.
+
+    Returns:
+        dict: 'sent', 'elapsed', 'offered' (requests/s while sending),
+              'throughput' (completed requests/s), 'statuses' (status or
+              exception name -> count), and 'latency' / 'service' (sorted
+              lists of seconds).
+    """
+    total = int(rps * duration)
+    local = threading.local()
+    lock = threading.Lock()
+    latency, service, statuses = [], [], Counter()
+
+    def send(path, due):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            response = session.get(base_url + path, timeout=timeout)
+            response.content
+            outcome = response.status_code
+        except requests.RequestException as e:
+            outcome = type(e).__name__
+        finished = time.perf_counter()
+        with lock:
+            latency.append(finished - due)
+            service.append(finished - started)
+            statuses[outcome] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for i in range(total):
+            due = start + i / rps
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, paths[i % len(paths)], due)
+        send_window = time.perf_counter() - start
+    elapsed = time.perf_counter() - start
+
+    return {
+        'sent': total,
+        'elapsed': elapsed,
+        'offered': total / send_window if send_window else 0.0,
+        'throughput': total / elapsed if elapsed else 0.0,
+        'statuses': dict(statuses),
+        'latency': sorted(latency),
+        'service': sorted(service)
+    }
+
+
+def report(result: dict, rps: float) -> None:
+    """Print throughput, status counts and latency percentiles."""
+    print(f"sent {result['sent']} requests at {result['offered']:.1f} req/s (target {rps:g}); "
+          f"completed in {result['elapsed']:.2f} s: {result['throughput']:.1f} req/s")
+    statuses = ', '.join(f"{status}: {count}" for status, count in sorted(result['statuses'].items(), key=str))
+    print(f"responses: {statuses}")
+    print(f"{'':<10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for label in ('latency', 'service'):
+        values = result[label]
+        cells = ''.join(f"{percentile(values, q) * 1000:>8.1f}ms" for q in (50, 95, 99, 100))
+        print(f"{label:<10}{cells}")
+    print("latency = from scheduled send time; service = from actual send time")
+
+
+def serve_app(upstream_url: str, disable_cache: bool, rate_limit: int = 0, rate_window: float = 60):
+    """
+    Start the app on a free port, backed by upstream_url; return the server.
+
+    The app's upstream quota is set to the stand-in's rate limit, or turned
+    off when the stand-in has none.
+    """
+    os.environ['FLASK_JOKE_API_BASE_URL'] = upstream_url
+    os.environ['FLASK_JOKE_BACKEND'] = 'http'
+    from app import app
+    from services import joke_service
+    if disable_cache:
+        joke_service.configure_cache(enabled=False)
+    if rate_limit:
+        joke_service.configure_quota(enabled=True, limit=rate_limit, window=rate_window)
+    else:
+        joke_service.configure_quota(enabled=False)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # no access log
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--target', help="Base URL of a running server; default: serve the app in-process")
+    parser.add_argument('--path', action='append', dest='paths',
+                        help="Path to request (repeatable); default /joke/Programming")
+    parser.add_argument('--rps', type=float, default=100, help="Target requests per second")
+    parser.add_argument('--duration', type=float, default=10, help="Seconds of load")
+    parser.add_argument('--concurrency', type=int, default=64, help="Max requests in flight")
+    parser.add_argument('--no-cache', action='store_true', help="Disable the app's joke cache (in-process only)")
+    parser.add_argument('--latency', default='lognormal:40:0.5', help="Fake upstream delay distribution")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fake upstream HTTP 500 fraction")
+    parser.add_argument('--slowloris-rate', type=float, default=0.0, help="Fake upstream slow-response fraction")
+    parser.add_argument('--rate-limit', type=int, default=0,
+                        help="Fake upstream requests per --rate-window; 0 for no limit")
+    parser.add_argument('--rate-window', type=float, default=60.0, help="Fake upstream rate limit window")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+    paths = args.paths or ['/joke/Programming']
+
+    if args.target:
+        report(run_load(args.target.rstrip('/'), paths, args.rps, args.duration, args.concurrency), args.rps)
+        return
+
+    with FakeJokeAPI(latency=args.latency, error_rate=args.error_rate,
+                     slowloris_rate=args.slowloris_rate, seed=args.seed,
+                     rate_limit=args.rate_limit, rate_window=args.rate_window) as upstream:
+        server = serve_app(upstream.base_url, args.no_cache, args.rate_limit, args.rate_window)
+        try:
+            base_url = f"http://127.0.0.1:{server.server_port}"
+            report(run_load(base_url, paths, args.rps, args.duration, args.concurrency), args.rps)
+            print(f"upstream: {upstream.stats}")
+        finally:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
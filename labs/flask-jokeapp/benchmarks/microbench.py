@@ -0,0 +1,394 @@
+"""
+Microbenchmarks for the service and rendering hot paths, with a regression gate.
+
+Covers URL building, JokeAPI payload parsing, get_joke() result
+construction, joke.html rendering for each payload shape, JSON encoding,
+and test-client round trips per route (HTML and JSON). Upstream calls return canned JokeAPI responses
+(real ``requests`` / ``httpx`` response objects, so JSON decoding still
+runs); nothing touches the network.
+
+Each benchmark is timed with timeit: calls are batched until a batch takes
+``--min-time`` seconds, the batch is repeated ``--repeat`` times, and the
+fastest repeat is kept (the least noisy estimate on a busy machine).
+Batches alternate with batches of a fixed pure-Python calibration workload,
+and each benchmark is scored as its time relative to the calibration. The
+score cancels out the machine getting faster or slower during and between
+runs (shared VMs, CPU frequency), which otherwise swamps real regressions.
+
+Scores are compared with a baseline file; the run exits with status 1 when
+any benchmark's score is worse than its baseline by more than
+``--threshold``. Record a baseline with ``--save`` on the interpreter and
+architecture that runs the comparison.
+
+Usage:
+    python -m benchmarks.microbench                 # compare with baseline
+    python -m benchmarks.microbench --save          # record a new baseline
+    python -m benchmarks.microbench -k render --threshold 0.1
+"""
+
+import argparse
+import json
+import platform
+import sys
+import timeit
+from contextlib import ExitStack
+from pathlib import Path
+from unittest.mock import patch
+
+import requests
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'microbench_baseline.json'
+THRESHOLD = 0.25  # fail when more than 25 % slower than the baseline
+
+SINGLE = {
+    'error': False, 'category': 'Programming', 'type': 'single',
+    'joke': "Why do Java developers wear glasses? Because they don't C#.",
+    'flags': {'nsfw': False, 'religious': False, 'political': False,
+              'racist': False, 'sexist': False, 'explicit': False},
+    'id': 0, 'safe': True, 'lang': 'en'
+}
+TWOPART = {
+    'error': False, 'category': 'Programming', 'type': 'twopart',
+    'setup': 'Why do programmers prefer dark mode?', 'delivery': 'Because light attracts bugs.',
+    'flags': SINGLE['flags'], 'id': 1, 'safe': True, 'lang': 'en'
+}
+ERROR = {
+    'error': True, 'internalError': False, 'code': 106, 'message': 'No matching joke found',
+    'causedBy': ['No jokes were found that match your provided filter(s).'],
+    'additionalInfo': 'Error while finalizing joke filtering: No jokes were found.'
+}
+
+BENCHMARKS = {}
+
+
+def benchmark(name: str):
+    """
+    Register a benchmark.
+
+    The decorated function does any setup and returns the zero-argument
+    callable that is timed.
+
+    Args:
+        name (str): Unique benchmark name, used as the baseline key.
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def canned_response(payload: dict) -> requests.Response:
+    """A requests.Response carrying payload as its JSON body."""
+    response = requests.Response()
+    response.status_code = 200
+    response._content = json.dumps(payload).encode('utf-8')
+    response.headers['Content-Type'] = 'application/json'
+    response.encoding = 'utf-8'
+    return response
+
+
+class CannedSession:
+    """Stands in for the pooled requests.Session; answers every URL with a joke."""
+
+    def __init__(self):
+        self._single = canned_response(TWOPART)
+        self._batch = canned_response({'error': False, 'amount': 10, 'jokes': [SINGLE, TWOPART] * 5})
+
+    def get(self, url, timeout=None):
+        return self._batch if 'amount=' in url else self._single
+
+
+def offline(stack: ExitStack) -> None:
+    """Route every upstream call made by joke_service to canned responses."""
+    from services import joke_service
+    from services.quota import QuotaBucket
+
+    session = CannedSession()
+    stack.enter_context(patch.object(joke_service, 'get_session', lambda: session))
+    stack.enter_context(patch.object(joke_service, 'CACHE_ENABLED', False))
+    # The canned upstream has no rate limit; keep the quota in the path, never empty
+    stack.enter_context(patch.object(joke_service, '_quota', QuotaBucket(limit=10 ** 12, window=1)))
+    if joke_service.httpx is not None:
+        httpx = joke_service.httpx
+        body = json.dumps(TWOPART).encode('utf-8')
+        transport = httpx.MockTransport(
+            lambda request: httpx.Response(200, content=body,
+                                           headers={'Content-Type': 'application/json'})
+        )
+        client = httpx.AsyncClient(transport=transport)
+        stack.enter_context(patch.object(joke_service, '_get_async_client', lambda: client))
+
+
+# ===== Service benchmarks =====
+
+@benchmark('build_joke_url')
+def bench_build_joke_url():
+    from services.joke_service import build_joke_url
+    return lambda: build_joke_url('Programming')
+
+
+@benchmark('build_joke_url_filtered')
+def bench_build_joke_url_filtered():
+    from services.joke_service import build_joke_url
+    return lambda: build_joke_url('Programming', 'twopart', amount=5, blacklist_flags=['nsfw', 'racist'])
+
+
+@benchmark('parse_single')
+def bench_parse_single():
+    from services.joke_service import _parse_joke_data
+    return lambda: _parse_joke_data(SINGLE)
+
+
+@benchmark('parse_twopart')
+def bench_parse_twopart():
+    from services.joke_service import _parse_joke_data
+    return lambda: _parse_joke_data(TWOPART)
+
+
+@benchmark('parse_error')
+def bench_parse_error():
+    from services.joke_service import _parse_joke_data
+    return lambda: _parse_joke_data(ERROR)
+
+
+@benchmark('get_joke_uncached')
+def bench_get_joke_uncached():
+    """Full get_joke(): URL, breaker, fetch, JSON decode, parse, metrics."""
+    from services.joke_service import get_joke
+    return lambda: get_joke('Programming', use_cache=False)
+
+
+# ===== Rendering benchmarks =====
+
+def _render(joke_data: dict):
+    from flask import render_template
+    from app import app
+
+    def render():
+        with app.test_request_context('/joke/Programming'):
+            return render_template('joke.html', joke_data=joke_data, category='Programming')
+    return render
+
+
+@benchmark('render_joke_single')
+def bench_render_single():
+    from services.joke_service import _parse_joke_data
+    return _render(_parse_joke_data(SINGLE))
+
+
+@benchmark('render_joke_twopart')
+def bench_render_twopart():
+    from services.joke_service import _parse_joke_data
+    return _render(_parse_joke_data(TWOPART))
+
+
+@benchmark('render_joke_error')
+def bench_render_error():
+    from services.joke_service import _parse_joke_data
+    return _render(_parse_joke_data(ERROR))
+
+
+# ===== JSON encoding benchmarks =====
+
+@benchmark('encode_joke')
+def bench_encode_joke():
+    """The configured provider (orjson when installed)."""
+    from app import app
+    from services.joke_service import _parse_joke_data
+    result = _parse_joke_data(TWOPART)
+    return lambda: app.json.dumps(result)
+
+
+@benchmark('encode_joke_stdlib')
+def bench_encode_joke_stdlib():
+    from app import app
+    from services.joke_service import _parse_joke_data
+    from services.json_provider import StdlibJSONProvider
+    provider, result = StdlibJSONProvider(app), _parse_joke_data(TWOPART)
+    return lambda: provider.dumps(result)
+
+
+# ===== Route round trips =====
+
+ROUTES = {
+    'route_home': '/',
+    'route_about': '/about',
+    'route_joke': '/joke',
+    'route_joke_category': '/joke/Programming',
+    'route_async_joke_category': '/async/joke/Programming',
+    'route_api_joke_category': '/api/joke/Programming',
+    'route_api_jokes': '/api/jokes?categories=Programming,Pun&count=10',
+    'route_health': '/health',
+}
+
+
+# Negotiated routes, requested with Accept: application/json
+JSON_ROUTES = {
+    'route_joke_category_json': '/joke/Programming',
+}
+
+
+def _route(path: str, headers: dict = None):
+    from app import app
+    client = app.test_client()
+
+    def round_trip():
+        response = client.get(path, headers=headers)
+        response.get_data()
+        response.close()
+    return round_trip
+
+
+for _name, _path in ROUTES.items():
+    benchmark(_name)(lambda path=_path: _route(path))
+for _name, _path in JSON_ROUTES.items():
+    benchmark(_name)(lambda path=_path: _route(path, {'Accept': 'application/json'}))
+
+
+# ===== Runner =====
+
+def calibration() -> int:
+    """Fixed reference workload: dict, str and JSON work typical of a request."""
+    payload = json.loads(json.dumps(SINGLE))
+    words = ' '.join(f"{key}={value}" for key, value in payload.items()).split()
+    return sum(len(word) for word in sorted(words))
+
+
+def _batch_size(fn, min_time: float) -> int:
+    """Calls of fn that take about min_time seconds."""
+    number, elapsed = timeit.Timer(fn).autorange()
+    return max(int(number * min_time / max(elapsed, 1e-9)), 1)
+
+
+def measure(fn, repeat: int = 15, min_time: float = 0.05) -> tuple:
+    """
+    Time fn against the calibration workload.
+
+    Args:
+        fn (callable): Zero-argument callable to time.
+        repeat (int): Timed batches of each; the fastest of each wins.
+        min_time (float): Seconds each batch should take.
+
+    Returns:
+        tuple: (nanoseconds per call, time relative to calibration())
+    """
+    number, reference_number = _batch_size(fn, min_time), _batch_size(calibration, min_time)
+    timer, reference = timeit.Timer(fn), timeit.Timer(calibration)
+    best = reference_best = float('inf')
+    for _ in range(repeat):
+        reference_best = min(reference_best, reference.timeit(reference_number) / reference_number)
+        best = min(best, timer.timeit(number) / number)
+    return best * 1e9, best / reference_best
+
+
+def run(names: list, repeat: int = 15, min_time: float = 0.05) -> dict:
+    """
+    Run the named benchmarks offline.
+
+    Returns:
+        dict: Benchmark name -> {'ns': per-call time, 'relative': score}.
+    """
+    results = {}
+    with ExitStack() as stack:
+        offline(stack)
+        for name in names:
+            fn = BENCHMARKS[name]()
+            fn()  # warm caches and lazy state before timing
+            ns, relative = measure(fn, repeat, min_time)
+            results[name] = {'ns': round(ns, 1), 'relative': round(relative, 4)}
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float = THRESHOLD) -> list:
+    """
+    Compare scores with the baseline.
+
+    Args:
+        results (dict): Name -> {'ns', 'relative'} for this run.
+        baseline (dict): Name -> {'ns', 'relative'} recorded earlier.
+        threshold (float): Allowed slowdown as a fraction, e.g. 0.25.
+
+    Returns:
+        list: (name, result, baseline result or None, change in score or
+              None, status) tuples, where status is 'ok', 'faster',
+              'REGRESSED' or 'new'.
+    """
+    rows = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            rows.append((name, result, None, None, 'new'))
+            continue
+        change = result['relative'] / base['relative'] - 1
+        if change > threshold:
+            status = 'REGRESSED'
+        elif change < -threshold:
+            status = 'faster'
+        else:
+            status = 'ok'
+        rows.append((name, result, base, change, status))
+    return rows
+
+
+def load_baseline(path: Path) -> dict:
+    """Return the saved baseline file contents, or an empty baseline."""
+    try:
+        return json.loads(Path(path).read_text())
+    except FileNotFoundError:
+        return {'machine': {}, 'results': {}}
+
+
+def machine_info() -> dict:
+    """Describe the interpreter and host the numbers were taken on."""
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'system': platform.system()
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('-k', dest='pattern', default='', help="Only run benchmarks whose name contains this")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH, help="Baseline JSON file")
+    parser.add_argument('--save', action='store_true', help="Write this run's results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help="Allowed slowdown, e.g. 0.25 = 25 %%")
+    parser.add_argument('--repeat', type=int, default=15, help="Timed batches per benchmark")
+    parser.add_argument('--min-time', type=float, default=0.05, help="Seconds per timed batch")
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if args.pattern in name]
+    baseline = load_baseline(args.baseline)
+    if baseline['results'] and baseline['machine'] != machine_info():
+        print(f"warning: baseline was recorded on {baseline['machine']}, this is {machine_info()}",
+              file=sys.stderr)
+
+    results = run(names, args.repeat, args.min_time)
+    rows = compare(results, baseline['results'], args.threshold)
+
+    print(f"{'benchmark':<28}{'time':>12}{'baseline':>12}{'score':>9}{'change':>9}  status")
+    print('-' * 79)
+    for name, result, base, change, status in rows:
+        base_text = f"{base['ns'] / 1000:>10.2f}us" if base is not None else f"{'-':>12}"
+        change_text = f"{change * 100:>+8.1f}%" if change is not None else f"{'-':>9}"
+        print(f"{name:<28}{result['ns'] / 1000:>10.2f}us{base_text}"
+              f"{result['relative']:>9.2f}{change_text}  {status}")
+    print("\nscore = time relative to the calibration workload; change compares scores")
+
+    if args.save:
+        saved = dict(baseline['results'], **results)
+        args.baseline.write_text(json.dumps({'machine': machine_info(), 'results': saved},
+                                            indent=2, sort_keys=True) + '\n')
+        print(f"\nSaved {len(results)} results to {args.baseline}")
+        return 0
+
+    regressed = [row[0] for row in rows if row[4] == 'REGRESSED']
+    if regressed:
+        print(f"\n{len(regressed)} benchmark(s) regressed more than {args.threshold:.0%}: {', '.join(regressed)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
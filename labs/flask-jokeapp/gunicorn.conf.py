@@ -0,0 +1,78 @@
+"""
+Gunicorn configuration: the production serving profile.
+
+Run from this directory; gunicorn reads ./gunicorn.conf.py by itself:
+
+    gunicorn
+    gunicorn -w 4 --threads 32 --bind 127.0.0.1:8000   # flags override this file
+
+The master imports the app once (``preload_app``) and forks the workers from
+it, so they share the loaded code, templates and joke store through
+copy-on-write. Each worker is a gthread worker: one process per CPU runs the
+Python code, and its threads overlap the waits on JokeAPI.
+
+Graceful restarts: ``kill -HUP <master>`` starts new workers and stops the
+old ones once their requests finish (up to ``graceful_timeout``). The app is
+preloaded, so deploy new code by restarting the master, or with
+``kill -USR2 <master>`` followed by ``kill -TERM <old master>``.
+
+Environment: PORT, WEB_CONCURRENCY (workers), GUNICORN_THREADS (threads per
+worker) and GUNICORN_PRELOAD=0 (import the app in every worker instead).
+Templates are compiled when the app is imported unless
+FLASK_TEMPLATE_PRECOMPILE=false.
+"""
+
+import gc
+import os
+import signal
+import threading
+
+CPUS = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count() or 1
+
+wsgi_app = 'app:app'
+
+# Compile the templates once in the master, before it forks the workers
+os.environ.setdefault('FLASK_TEMPLATE_PRECOMPILE', 'true')
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# ===== Workers =====
+workers = int(os.environ.get('WEB_CONCURRENCY', CPUS))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+
+# ===== Timeouts =====
+timeout = 30           # seconds before a silent worker is killed and replaced
+graceful_timeout = 30  # seconds a stopping worker may spend finishing requests
+keepalive = 5          # seconds an idle keep-alive connection stays open
+
+
+def pre_fork(server, worker):
+    """Move the preloaded objects out of the collector's reach before forking."""
+    # A collection in a worker would write to every tracked object's header
+    # and unshare the pages holding it; frozen objects are never scanned
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    """Size this worker's share of the process-wide limits and hook graceful shutdown."""
+    app = worker.wsgi
+    from services import joke_service
+
+    # JokeAPI's limit is for this host's IP; each worker keeps its share of it,
+    # including of the limit upstream advertises
+    joke_service.configure_quota(share=app.config['JOKE_QUOTA_SHARE'] / worker.cfg.workers)
+
+    # Every open event stream holds a thread; keep half of them for other requests
+    stream = app.extensions['joke_stream']
+    stream.max_subscribers = max(min(stream.max_subscribers, worker.cfg.threads // 2), 1)
+
+    # A stopping worker waits for its open connections, and event streams never
+    # finish by themselves: end them so clients reconnect to a live worker
+    handle_exit = worker.handle_exit
+
+    def end_streams_and_exit(sig, frame):
+        handle_exit(sig, frame)
+        threading.Thread(target=stream.stop, daemon=True).start()  # stop() takes a lock
+
+    signal.signal(signal.SIGTERM, end_streams_and_exit)
@@ -0,0 +1,527 @@
+"""
+Front-end Asset Pipeline Module
+
+Builds self-hosted, fingerprinted CSS and JS into ``static/dist/`` so pages
+need no third-party CDN:
+
+- the vendored Bootstrap CSS and ``assets/style.css`` are purged of every
+  rule whose classes or ids never appear in ``templates/``, then minified
+  into ``app.<hash>.css``
+- the rules needed above the fold (the navbar, the grid, the home page
+  hero and the joke card) are written to ``critical.css`` and inlined into
+  pages; it must stay under ``CRITICAL_BUDGET`` bytes
+- the vendored Bootstrap JS is copied to ``bootstrap.<hash>.js``
+- ``manifest.json`` maps logical names to the built files
+
+The build is pure Python and runs offline:
+
+    flask --app app build-assets
+"""
+
+import hashlib
+import json
+import os
+import re
+
+import click
+from flask import url_for
+from markupsafe import Markup
+
+ASSETS_DIR = 'assets'
+DIST_DIR = 'dist'  # inside the static folder
+MANIFEST = 'manifest.json'
+
+CSS_SOURCES = ('vendor/bootstrap/bootstrap.min.css', 'style.css')
+JS_SOURCES = {'bootstrap.js': 'vendor/bootstrap/bootstrap.min.js'}
+
+# Classes added at runtime by Bootstrap's JS (collapse, alerts, buttons)
+SAFELIST = {
+    'show', 'showing', 'hiding', 'collapse', 'collapsing', 'collapsed',
+    'fade', 'active', 'disabled', 'was-validated'
+}
+
+# Characters of each page's content block treated as above the fold
+CRITICAL_CHARS = 800
+
+# Classes styled by critical.css: the navbar, the grid, the hero and the joke
+# card. Entries ending in '-' match every class with that prefix.
+CRITICAL_CLASSES = (
+    'navbar', 'navbar-', 'nav-', 'collapse', 'bg-dark',
+    'container', 'container-', 'row', 'col-', 'mx-auto', 'ms-auto', 'text-center',
+    'hero-', 'display-', 'lead', 'fw-bold', 'btn', 'btn-primary', 'btn-lg',
+    'card', 'card-'
+)
+
+# Element selectors inlined; the rest of the reboot waits for app.css
+CRITICAL_ELEMENTS = {':root', 'body', 'h1'}
+
+# Size limit of critical.css in bytes, checked by the test suite
+CRITICAL_BUDGET = 12 * 1024
+
+_STRING = r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\''
+_COMMENT_RE = re.compile(rf'({_STRING})|/\*(!?)(.*?)\*/', re.S)
+_TOKEN_RE = re.compile(r'[\w-]+')
+_SELECTOR_NAME_RE = re.compile(r'([.#])((?:[\w-]|\\.)+)')
+_DATA_ATTRIBUTE_RE = re.compile(r'\[\s*(data-[\w-]+)')
+_VAR_USE_RE = re.compile(r'var\(\s*(--[\w-]+)')
+# Interaction states and decorative pseudo-elements that first paint never shows
+_STATE_RE = re.compile(
+    r':(?:hover|focus|active|disabled|checked|visited)\b'
+    r'|::?(?:after|before|-webkit-|-moz-|placeholder|file-selector-button|selection)'
+)
+
+
+# ===== CSS parsing =====
+
+def strip_comments(css: str) -> tuple:
+    """
+    Remove comments from css.
+
+    Returns:
+        tuple: (css without comments, list of ``/*! ... */`` license banners)
+    """
+    banners = []
+
+    def replace(match):
+        if match.group(1):
+            return match.group(1)
+        if match.group(2):
+            banners.append(f"/*!{match.group(3)}*/")
+        return ''
+
+    return _COMMENT_RE.sub(replace, css), banners
+
+
+def _scan(css: str, start: int, stops: str) -> int:
+    """Return the index of the next stop character outside strings/parens."""
+    depth = 0
+    i = start
+    while i < len(css):
+        char = css[i]
+        if char in '"\'':
+            i = _skip_string(css, i)
+            continue
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif depth == 0 and char in stops:
+            return i
+        i += 1
+    return len(css)
+
+
+def _skip_string(css: str, i: int) -> int:
+    """Return the index just past the string starting at css[i]."""
+    quote = css[i]
+    i += 1
+    while i < len(css) and css[i] != quote:
+        i += 2 if css[i] == '\\' else 1
+    return i + 1
+
+
+def parse_css(css: str, start: int = 0) -> tuple:
+    """
+    Parse comment-free css into nodes.
+
+    Nodes are ``('rule', selector, declarations)``, ``('group', prelude,
+    children)`` for block at-rules (@media, @supports, @keyframes...) and
+    ``('statement', text)`` for at-rules ending in ``;``.
+
+    Returns:
+        tuple: (nodes, index just past the closing brace or end of css)
+    """
+    nodes = []
+    i = start
+    while True:
+        j = _scan(css, i, '{;}')
+        prelude = css[i:j].strip()
+        if j >= len(css):
+            return nodes, j
+        char = css[j]
+        if char == '}':
+            return nodes, j + 1
+        if char == ';':
+            if prelude:
+                nodes.append(('statement', prelude))
+            i = j + 1
+        elif prelude.startswith('@') and not prelude.startswith(('@font-face', '@page')):
+            children, i = parse_css(css, j + 1)
+            nodes.append(('group', prelude, children))
+        else:
+            end = _scan(css, j + 1, '}')
+            nodes.append(('rule', prelude, css[j + 1:end]))
+            i = end + 1
+
+
+def split_top_level(text: str, separator: str) -> list:
+    """Split text on separator, ignoring separators in strings or parens."""
+    parts = []
+    start = 0
+    while True:
+        end = _scan(text, start, separator)
+        parts.append(text[start:end])
+        if end >= len(text):
+            return parts
+        start = end + 1
+
+
+# ===== Purging =====
+
+def template_tokens(template_dir: str) -> set:
+    """Collect every word-like token in the templates (class, id and JS names)."""
+    tokens = set()
+    for root, _, files in os.walk(template_dir):
+        for name in files:
+            if name.endswith('.html'):
+                with open(os.path.join(root, name), encoding='utf-8') as template:
+                    tokens.update(_TOKEN_RE.findall(template.read()))
+    return tokens
+
+
+def critical_tokens(template_dir: str, layout: str = 'base.html') -> set:
+    """
+    Collect tokens from the above-the-fold markup.
+
+    That is the layout template up to its ``content`` block (the footer is
+    below the fold) plus the first CRITICAL_CHARS characters of every page's
+    ``content`` block.
+    """
+    tokens = set()
+    for name in sorted(os.listdir(template_dir)):
+        if not name.endswith('.html'):
+            continue
+        with open(os.path.join(template_dir, name), encoding='utf-8') as template:
+            text = template.read()
+        start = text.find('{% block content %}')
+        if name == layout:
+            text = text[:start] if start >= 0 else text
+        else:
+            text = text[max(start, 0):][:CRITICAL_CHARS]
+        tokens.update(_TOKEN_RE.findall(text))
+    return tokens
+
+
+def selector_is_used(selector: str, used: set) -> bool:
+    """
+    Return True if every class, id and ``data-*`` attribute in selector is
+    in used.
+
+    Names inside ``:not(...)``, attribute values and strings don't count.
+    """
+    simplified = re.sub(_STRING, '', selector)
+    if any(name not in used for name in _DATA_ATTRIBUTE_RE.findall(simplified)):
+        return False
+    simplified = re.sub(r'\[[^\]]*\]', '', simplified)
+    previous = None
+    while previous != simplified:
+        previous = simplified
+        simplified = re.sub(r':not\([^()]*\)', '', simplified)
+    for _, name in _SELECTOR_NAME_RE.findall(simplified):
+        if re.sub(r'\\(.)', r'\1', name) not in used:
+            return False
+    return True
+
+
+def purge(nodes: list, used: set) -> list:
+    """Drop selectors, rules and empty groups that the markup never uses."""
+    kept = []
+    for node in nodes:
+        if node[0] == 'rule':
+            _, selector, body = node
+            if selector.startswith('@'):
+                kept.append(node)
+                continue
+            selectors = [part.strip() for part in split_top_level(selector, ',')]
+            selectors = [part for part in selectors if selector_is_used(part, used)]
+            if selectors:
+                kept.append(('rule', ','.join(selectors), body))
+        elif node[0] == 'group':
+            _, prelude, children = node
+            if prelude.startswith(('@keyframes', '@-webkit-keyframes')):
+                kept.append(node)
+                continue
+            children = purge(children, used)
+            if children:
+                kept.append(('group', prelude, children))
+        else:
+            kept.append(node)
+    return kept
+
+
+def _is_critical(selector: str) -> bool:
+    """Return True if selector styles first paint of a CRITICAL_CLASSES component."""
+    if _STATE_RE.search(selector):
+        return False
+    simplified = re.sub(r':not\([^()]*\)', '', re.sub(r'\[[^\]]*\]', '', selector))
+    names = [name for kind, name in _SELECTOR_NAME_RE.findall(simplified) if kind == '.']
+    if not names:
+        return selector in CRITICAL_ELEMENTS
+    return all(
+        any(name == entry or (entry.endswith('-') and name.startswith(entry)) for entry in CRITICAL_CLASSES)
+        for name in names
+    )
+
+
+def above_the_fold(nodes: list) -> list:
+    """
+    Keep the selectors of purged nodes that first paint needs.
+
+    Those are the CRITICAL_ELEMENTS and selectors built only from
+    CRITICAL_CLASSES, minus interaction states. Keyframes are left for
+    prune_unused.
+    """
+    kept = []
+    for node in nodes:
+        if node[0] == 'rule':
+            selectors = [part.strip() for part in split_top_level(node[1], ',')]
+            selectors = [part for part in selectors if _is_critical(part)]
+            if selectors:
+                kept.append(('rule', ','.join(selectors), node[2]))
+        elif node[0] == 'group':
+            children = node[2] if 'keyframes' in node[1] else above_the_fold(node[2])
+            if children:
+                kept.append(('group', node[1], children))
+        else:
+            kept.append(node)
+    return kept
+
+
+def _declarations(body: str) -> list:
+    """Split a rule body into (property, value) pairs."""
+    pairs = []
+    for declaration in split_top_level(body, ';'):
+        prop, _, value = declaration.partition(':')
+        if prop.strip() and value.strip():
+            pairs.append((prop.strip(), value.strip()))
+    return pairs
+
+
+def _walk_rules(nodes: list):
+    """Yield every ('rule', ...) node, descending into groups."""
+    for node in nodes:
+        if node[0] == 'rule':
+            yield node
+        elif node[0] == 'group':
+            yield from _walk_rules(node[2])
+
+
+def prune_unused(nodes: list, used: set) -> list:
+    """
+    Drop unused custom properties and keyframes.
+
+    A ``--name`` declaration is kept if ``var(--name)`` appears in a kept
+    declaration or the name appears in the templates; ``@keyframes name`` is
+    kept if name appears in a kept declaration.
+    """
+    referenced = set(name for name in used if name.startswith('--'))
+    while True:
+        found = set(referenced)
+        for _, _, body in _walk_rules(nodes):
+            for prop, value in _declarations(body):
+                if not prop.startswith('--') or prop in found:
+                    found.update(_VAR_USE_RE.findall(value))
+        if found == referenced:
+            break
+        referenced = found
+
+    def prune(nodes):
+        kept = []
+        for node in nodes:
+            if node[0] == 'rule':
+                body = ';'.join(
+                    f"{prop}:{value}" for prop, value in _declarations(node[2])
+                    if not prop.startswith('--') or prop in referenced
+                )
+                if body:
+                    kept.append(('rule', node[1], body))
+            elif node[0] == 'group':
+                children = node[2] if 'keyframes' in node[1] else prune(node[2])
+                if children:
+                    kept.append(('group', node[1], children))
+            else:
+                kept.append(node)
+        return kept
+
+    nodes = prune(nodes)
+    animations = set()
+    for node in nodes:
+        if node[0] != 'group' or 'keyframes' not in node[1]:
+            for _, _, body in _walk_rules([node]):
+                animations.update(_TOKEN_RE.findall(body))
+    return [
+        node for node in nodes
+        if node[0] != 'group' or 'keyframes' not in node[1] or node[1].split()[-1] in animations
+    ]
+
+
+# ===== Minifying =====
+
+def _collapse(text: str) -> str:
+    """Collapse whitespace outside strings."""
+    parts = re.split(f'({_STRING})', text)
+    for i in range(0, len(parts), 2):
+        parts[i] = re.sub(r'\s+', ' ', parts[i])
+    return ''.join(parts).strip()
+
+
+def _minify_selector(selector: str) -> str:
+    selector = _collapse(selector)
+    return re.sub(r'\s*([>+~,])\s*', r'\1', selector)
+
+
+def serialize(nodes: list) -> str:
+    """Write nodes back out as minified CSS."""
+    out = []
+    for node in nodes:
+        if node[0] == 'rule':
+            body = ';'.join(f"{prop}:{_collapse(value)}" for prop, value in _declarations(node[2]))
+            out.append(f"{_minify_selector(node[1])}{{{body}}}")
+        elif node[0] == 'group':
+            prelude = re.sub(r'\(\s+', '(', _collapse(node[1]))
+            prelude = re.sub(r'\s*([:,)])\s*', r'\1', prelude).replace(')and', ') and')
+            out.append(f"{prelude}{{{serialize(node[2])}}}")
+        else:
+            out.append(f"{_collapse(node[1])};")
+    return ''.join(out)
+
+
+def build_css(sources: list, used: set, critical: bool = False) -> str:
+    """
+    Concatenate, purge and minify CSS sources.
+
+    Args:
+        sources (list): CSS file contents, in cascade order.
+        used (set): Tokens found in the templates, plus any safelist.
+        critical (bool): Keep only the above-the-fold rules (see above_the_fold).
+
+    Returns:
+        str: The minified stylesheet, led by the sources' license banners.
+    """
+    banners = []
+    nodes = []
+    for css in sources:
+        css, found = strip_comments(css)
+        banners.extend(found)
+        nodes.extend(parse_css(css)[0])
+    nodes = purge(nodes, used)
+    if critical:
+        nodes = above_the_fold(nodes)
+    nodes = prune_unused(nodes, used)
+    # @charset must come first and only once
+    charset = [node for node in nodes if node[0] == 'statement' and node[1].startswith('@charset')]
+    nodes = [node for node in nodes if node not in charset]
+    head = serialize(charset[:1]) + ''.join(f"{banner}\n" for banner in banners)
+    return head + serialize(nodes)
+
+
+# ===== Build =====
+
+def _fingerprint(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def build(root_path: str, static_folder: str, template_folder: str) -> dict:
+    """
+    Build every asset into ``<static>/dist`` and write the manifest.
+
+    Earlier builds' fingerprinted files are removed.
+
+    Args:
+        root_path (str): Application root holding the ``assets/`` folder.
+        static_folder (str): The app's static folder.
+        template_folder (str): The app's template folder.
+
+    Returns:
+        dict: The manifest, mapping logical names to file names in dist.
+    """
+    assets_dir = os.path.join(root_path, ASSETS_DIR)
+    dist_dir = os.path.join(static_folder, DIST_DIR)
+    os.makedirs(dist_dir, exist_ok=True)
+    for name in os.listdir(dist_dir):
+        os.remove(os.path.join(dist_dir, name))
+
+    sources = []
+    for source in CSS_SOURCES:
+        with open(os.path.join(assets_dir, source), encoding='utf-8') as css_file:
+            sources.append(css_file.read())
+
+    manifest = {}
+
+    def write(logical: str, data: bytes, fingerprint: bool = True):
+        stem, ext = os.path.splitext(logical)
+        name = f"{stem}.{_fingerprint(data)}{ext}" if fingerprint else logical
+        with open(os.path.join(dist_dir, name), 'wb') as out:
+            out.write(data)
+        manifest[logical] = name
+
+    used = template_tokens(template_folder) | SAFELIST
+    write('app.css', build_css(sources, used).encode('utf-8'))
+    # Runtime states (SAFELIST) only matter once the full stylesheet is in
+    critical = build_css(sources, critical_tokens(template_folder), critical=True)
+    write('critical.css', critical.encode('utf-8'), fingerprint=False)
+    for logical, source in JS_SOURCES.items():
+        with open(os.path.join(assets_dir, source), 'rb') as js_file:
+            write(logical, js_file.read())
+
+    with open(os.path.join(dist_dir, MANIFEST), 'w', encoding='utf-8') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+        manifest_file.write('\n')
+    return manifest
+
+
+# ===== Flask integration =====
+
+def load_manifest(static_folder: str) -> dict:
+    """Read ``<static>/dist/manifest.json``; empty if it has not been built."""
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST), encoding='utf-8') as manifest_file:
+            return json.load(manifest_file)
+    except FileNotFoundError:
+        return {}
+
+
+def init_app(app) -> None:
+    """
+    Register the ``asset_url`` / ``inline_asset`` template helpers and the
+    ``build-assets`` command.
+
+    Args:
+        app (Flask): The application to configure.
+    """
+    manifest = load_manifest(app.static_folder)
+    inlined = {}
+
+    def dist_name(logical: str) -> str:
+        try:
+            return manifest[logical]
+        except KeyError:
+            raise RuntimeError(
+                f"Asset {logical!r} is not built; run 'flask --app app build-assets'"
+            ) from None
+
+    def asset_url(logical: str) -> str:
+        """URL of a built asset, e.g. asset_url('app.css')."""
+        return url_for('static', filename=f"{DIST_DIR}/{dist_name(logical)}")
+
+    def inline_asset(logical: str) -> Markup:
+        """Contents of a built asset, for <style> or <script> tags."""
+        if logical not in inlined:
+            path = os.path.join(app.static_folder, DIST_DIR, dist_name(logical))
+            with open(path, encoding='utf-8') as asset_file:
+                inlined[logical] = Markup(asset_file.read())
+        return inlined[logical]
+
+    app.jinja_env.globals.update(asset_url=asset_url, inline_asset=inline_asset)
+
+    @app.cli.command('build-assets')
+    def build_assets_command():
+        """Purge, minify and fingerprint CSS/JS into static/dist."""
+        built = build(app.root_path, app.static_folder,
+                      os.path.join(app.root_path, app.template_folder))
+        manifest.clear()
+        manifest.update(built)
+        inlined.clear()
+        for logical, name in sorted(built.items()):
+            size = os.path.getsize(os.path.join(app.static_folder, DIST_DIR, name))
+            click.echo(f"  {logical:<14} -> {DIST_DIR}/{name} ({size} bytes)")
@@ -0,0 +1,127 @@
+"""
+Response Cache Module
+
+A small thread-safe TTL + LRU cache used to serve repeat JokeAPI requests
+without going upstream.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Bounded mapping whose entries expire after a fixed time-to-live.
+
+    Entries are kept in least-recently-used order; when the cache is full the
+    oldest entry is evicted. Expired entries are dropped lazily on lookup.
+
+    Example:
+        >>> cache = TTLCache(maxsize=2, ttl=30)
+        >>> cache.set('a', 1)
+        >>> cache.get('a')
+        1
+        >>> cache.get('missing') is None
+        True
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 30.0, timer=time.monotonic):
+        """
+        Args:
+            maxsize (int): Maximum number of entries kept in the cache.
+            ttl (float): Seconds an entry stays fresh after it is stored.
+            timer (callable): Monotonic clock, overridable for tests.
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        """
+        Return the cached value for key, or default if missing or expired.
+
+        Args:
+            key: Cache key.
+            default: Value returned on a miss.
+
+        Returns:
+            The cached value or default.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at <= self._timer():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value) -> None:
+        """
+        Store value under key, evicting the least recently used entry if full.
+
+        Args:
+            key: Cache key.
+            value: Value to cache.
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+            self._data[key] = (self._timer() + self.ttl, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def _after_fork(self) -> None:
+        """Replace the lock inherited from the parent process; entries are kept."""
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+
+    def stats(self) -> dict:
+        """
+        Return cache counters.
+
+        Returns:
+            dict: 'hits', 'misses', 'evictions', 'expirations', 'size',
+                  'maxsize' and 'hit_ratio' (0.0 when nothing was looked up).
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hit_ratio': self.hits / lookups if lookups else 0.0
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
@@ -0,0 +1,167 @@
+"""
+Circuit Breaker Module
+
+Stops calling JokeAPI while it is failing so requests fail fast instead of
+each waiting out the full request timeout.
+"""
+
+import threading
+import time
+from collections import deque
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    Three-state circuit breaker.
+
+    - closed: calls go through; consecutive failures are counted and the
+      circuit opens once they reach ``failure_threshold``.
+    - open: calls are rejected until ``cooldown`` seconds have passed.
+    - half_open: up to ``half_open_max_calls`` trial calls go through; a
+      success closes the circuit, a failure opens it again.
+
+    Callers ask ``allow_request()`` before each call and report the outcome
+    with ``record_success()`` or ``record_failure()``, or with
+    ``release_trial()`` when the outcome says nothing about upstream health.
+
+    Example:
+        >>> breaker = CircuitBreaker(failure_threshold=3, cooldown=30)
+        >>> if breaker.allow_request():
+        ...     ok = call_upstream()
+        ...     breaker.record_success() if ok else breaker.record_failure()
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0,
+                 half_open_max_calls: int = 1, history: int = 20,
+                 timer=time.monotonic, clock=time.time):
+        """
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit.
+            cooldown (float): Seconds the circuit stays open before a trial call.
+            half_open_max_calls (int): Concurrent trial calls allowed when half open.
+            history (int): Number of state transitions to remember.
+            timer (callable): Monotonic clock, overridable for tests.
+            clock (callable): Wall clock used to timestamp transitions.
+        """
+        if failure_threshold < 1:
+            raise ValueError("failure_threshold must be at least 1")
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.half_open_max_calls = half_open_max_calls
+        self._timer = timer
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_calls = 0
+        self._transitions = deque(maxlen=history)
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        """Current state, moving from open to half_open once the cooldown ends."""
+        with self._lock:
+            self._check_cooldown()
+            return self._state
+
+    def allow_request(self) -> bool:
+        """
+        Decide whether a call may go upstream.
+
+        Returns:
+            bool: True if the call may proceed; False to fail fast.
+        """
+        with self._lock:
+            self._check_cooldown()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._trial_calls < self.half_open_max_calls:
+                self._trial_calls += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        """Report a successful call; closes a half-open circuit."""
+        with self._lock:
+            self._failures = 0
+            if self._state == HALF_OPEN:
+                self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        """Report a failed call; may open the circuit."""
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or (
+                self._state == CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._transition(OPEN)
+
+    def release_trial(self) -> None:
+        """
+        Report a call that neither succeeded nor failed (e.g. an HTTP 429).
+
+        The state is unchanged; a half-open circuit gets the call's trial
+        slot back, so a later call can decide whether to close it.
+        """
+        with self._lock:
+            if self._state == HALF_OPEN and self._trial_calls:
+                self._trial_calls -= 1
+
+    def _after_fork(self) -> None:
+        """Replace the lock inherited from the parent process; the state is kept."""
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        """Return to the closed state and forget counters and history."""
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._trial_calls = 0
+            self._transitions.clear()
+            self.rejected = 0
+
+    def stats(self) -> dict:
+        """
+        Report state, counters and recent transitions.
+
+        Returns:
+            dict: 'state', 'consecutive_failures', 'failure_threshold',
+                  'cooldown', 'retry_in' (seconds until a trial call, or
+                  None), 'rejected' and 'transitions' (oldest first, each
+                  with 'from', 'to' and a Unix timestamp 'at').
+        """
+        with self._lock:
+            self._check_cooldown()
+            retry_in = None
+            if self._state == OPEN:
+                retry_in = round(max(self._opened_at + self.cooldown - self._timer(), 0.0), 3)
+            return {
+                'state': self._state,
+                'consecutive_failures': self._failures,
+                'failure_threshold': self.failure_threshold,
+                'cooldown': self.cooldown,
+                'retry_in': retry_in,
+                'rejected': self.rejected,
+                'transitions': list(self._transitions)
+            }
+
+    def _check_cooldown(self) -> None:
+        """Move from open to half_open once the cooldown has passed (lock held)."""
+        if self._state == OPEN and self._timer() - self._opened_at >= self.cooldown:
+            self._transition(HALF_OPEN)
+
+    def _transition(self, state: str) -> None:
+        """Switch to state and record the transition (lock held)."""
+        self._transitions.append({'from': self._state, 'to': state, 'at': self._clock()})
+        self._state = state
+        self._trial_calls = 0
+        if state == OPEN:
+            self._opened_at = self._timer()
+        elif state == CLOSED:
+            self._failures = 0
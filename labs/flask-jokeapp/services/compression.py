@@ -0,0 +1,266 @@
+"""
+Response Compression Module
+
+Compresses text responses with gzip, or brotli when the ``brotli`` package
+is installed, according to the request's ``Accept-Encoding``. Streamed
+responses are compressed chunk by chunk. Static files can be compressed
+ahead of time (``style.css.gz`` / ``style.css.br``) and those variants are
+then served as-is, with no per-request compression work.
+
+Precompress the static folder (e.g. during a deploy) with:
+
+    flask --app app compress-static
+"""
+
+import gzip
+import mimetypes
+import os
+import zlib
+
+import click
+from flask import g, request, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only
+    brotli = None
+
+COMPRESS_MIN_SIZE = 500   # bytes; smaller bodies are sent as-is
+COMPRESS_LEVEL = 6        # gzip level for dynamic responses
+BROTLI_QUALITY = 5        # brotli quality for dynamic responses
+COMPRESS_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/javascript',
+    'application/javascript', 'application/json', 'application/x-ndjson',
+    'image/svg+xml'
+}
+PRECOMPRESS_EXTENSIONS = ('.css', '.js', '.html', '.svg', '.json', '.txt')
+
+# File suffix of each precompressed variant, best first
+VARIANT_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def available_encodings() -> list:
+    """Return the content codings this process can produce, best first."""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate_encoding(accept_encodings, encodings=None):
+    """
+    Pick the best coding the client accepts.
+
+    Args:
+        accept_encodings: The request's parsed ``Accept-Encoding`` header.
+        encodings (list, optional): Candidate codings, best first. Defaults
+                                    to available_encodings().
+
+    Returns:
+        str or None: 'br', 'gzip', or None to send the body uncompressed.
+    """
+    candidates = available_encodings() if encodings is None else encodings
+    best = None
+    best_quality = 0
+    for encoding in candidates:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data: bytes, encoding: str, level: int = None) -> bytes:
+    """
+    Compress data in one shot.
+
+    Args:
+        data (bytes): Body to compress.
+        encoding (str): 'gzip' or 'br'.
+        level (int, optional): gzip level or brotli quality; defaults to
+                               COMPRESS_LEVEL / BROTLI_QUALITY.
+
+    Returns:
+        bytes: The compressed body.
+    """
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY if level is None else level)
+    return gzip.compress(data, COMPRESS_LEVEL if level is None else level, mtime=0)
+
+
+def compress_stream(chunks, encoding: str):
+    """
+    Compress an iterable of byte chunks, flushing after each one.
+
+    Flushing keeps streamed responses (such as NDJSON) incremental: every
+    chunk the view yields reaches the client without waiting for the next.
+
+    Args:
+        chunks (iterable): Body chunks (bytes).
+        encoding (str): 'gzip' or 'br'.
+
+    Yields:
+        bytes: Compressed chunks.
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def precompress_static(static_folder: str, encodings=None) -> list:
+    """
+    Write ``.gz`` (and ``.br``) variants next to compressible static files.
+
+    Variants that are at least as new as their source are left alone;
+    variants that would not be smaller are not written.
+
+    Args:
+        static_folder (str): Folder to walk.
+        encodings (list, optional): Codings to write. Defaults to
+                                    available_encodings().
+
+    Returns:
+        list: Paths of the variants written.
+    """
+    written = []
+    for root, _, files in os.walk(static_folder):
+        for name in files:
+            if not name.endswith(PRECOMPRESS_EXTENSIONS):
+                continue
+            source = os.path.join(root, name)
+            with open(source, 'rb') as source_file:
+                data = source_file.read()
+            if len(data) < COMPRESS_MIN_SIZE:
+                continue
+            for encoding in encodings or available_encodings():
+                variant = source + VARIANT_SUFFIXES[encoding]
+                if _is_fresh(variant, source):
+                    continue
+                compressed = compress(data, encoding, level=11 if encoding == 'br' else 9)
+                if len(compressed) >= len(data):
+                    continue
+                with open(variant, 'wb') as variant_file:
+                    variant_file.write(compressed)
+                written.append(variant)
+    return written
+
+
+def _is_fresh(variant: str, source: str) -> bool:
+    """Return True if variant exists and is not older than source."""
+    try:
+        return os.stat(variant).st_mtime_ns >= os.stat(source).st_mtime_ns
+    except OSError:
+        return False
+
+
+def init_app(app) -> None:
+    """
+    Register response compression, precompressed static serving and the
+    ``compress-static`` command.
+
+    Config keys ``COMPRESS_ENABLED`` and ``COMPRESS_MIN_SIZE`` are read on
+    each request.
+
+    Args:
+        app (Flask): The application to configure.
+    """
+    app.config.setdefault('COMPRESS_ENABLED', True)
+    app.config.setdefault('COMPRESS_MIN_SIZE', COMPRESS_MIN_SIZE)
+
+    @app.before_request
+    def serve_precompressed_static():
+        if request.endpoint != 'static' or not app.config['COMPRESS_ENABLED']:
+            return None
+        filename = request.view_args['filename']
+        source = safe_join(app.static_folder, filename)
+        if source is None:
+            return None
+        encodings = [
+            encoding for encoding in VARIANT_SUFFIXES
+            if _is_fresh(source + VARIANT_SUFFIXES[encoding], source)
+        ]
+        if not encodings:
+            return None
+        encoding = negotiate_encoding(request.accept_encodings, encodings)
+        if encoding is None:
+            # The identity file is served, but other clients get a variant
+            g.static_variants = True
+            return None
+        response = send_from_directory(
+            app.static_folder, filename + VARIANT_SUFFIXES[encoding],
+            mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        )
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+
+    @app.after_request
+    def compress_response(response):
+        if not app.config['COMPRESS_ENABLED']:
+            return response
+        if g.pop('static_variants', False):
+            response.vary.add('Accept-Encoding')
+        return _compress_response(response, app.config['COMPRESS_MIN_SIZE'])
+
+    @app.cli.command('compress-static')
+    def compress_static_command():
+        """Write .gz/.br variants of compressible static files."""
+        written = precompress_static(app.static_folder)
+        for path in written:
+            click.echo(f"  {os.path.relpath(path, app.static_folder)}")
+        click.echo(f"Wrote {len(written)} precompressed files ({', '.join(available_encodings())})")
+
+
+def _compress_response(response, min_size: int):
+    """Compress response in place if it is eligible and the client agrees."""
+    if (
+        response.mimetype not in COMPRESS_MIMETYPES
+        or response.status_code < 200 or response.status_code in (204, 206)
+        or 'Content-Encoding' in response.headers
+        or response.direct_passthrough
+    ):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    # HEAD responses still carry the body here (the server drops it), so they
+    # are compressed like GET and get the same Content-Encoding and length
+    if response.status_code == 304:
+        _weaken_etag(response)
+        return response
+
+    if response.is_streamed:
+        response.response = compress_stream(response.iter_encoded(), encoding)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        response.set_data(compress(data, encoding))
+
+    response.headers['Content-Encoding'] = encoding
+    _weaken_etag(response)
+    return response
+
+
+def _weaken_etag(response) -> None:
+    """
+    Mark a strong ETag weak.
+
+    The compressed bytes differ from the identity body the ETag was computed
+    for; a weak ETag still matches during If-None-Match revalidation.
+    """
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
@@ -0,0 +1,194 @@
+"""
+Local Joke Corpus Module
+
+Loads a dump of JokeAPI jokes (JSONL or SQLite) into memory and indexes it
+so a random joke matching a category / type / flag filter can be picked in
+O(1), without calling JokeAPI.
+"""
+
+import json
+import random
+import sqlite3
+import threading
+from pathlib import Path
+
+FLAG_NAMES = ('nsfw', 'religious', 'political', 'racist', 'sexist', 'explicit')
+
+# JokeAPI accepts "Miscellaneous" in URLs but labels those jokes "Misc"
+CATEGORY_ALIASES = {'Miscellaneous': 'Misc'}
+
+JOKE_TYPES = ('single', 'twopart')
+
+
+def flags_to_mask(flags) -> int:
+    """
+    Pack flag names into a bitmask.
+
+    Args:
+        flags: A JokeAPI ``flags`` dict ({'nsfw': False, ...}) or an iterable
+               of flag names to set.
+
+    Returns:
+        int: Bitmask with bit i set for FLAG_NAMES[i].
+    """
+    if isinstance(flags, dict):
+        names = [name for name, value in flags.items() if value]
+    else:
+        names = flags or ()
+    mask = 0
+    for name in names:
+        if name not in FLAG_NAMES:
+            raise ValueError(f"Unknown flag: {name}")
+        mask |= 1 << FLAG_NAMES.index(name)
+    return mask
+
+
+def normalize_category(category: str) -> str:
+    """Map a URL category name onto the label stored with each joke."""
+    return CATEGORY_ALIASES.get(category, category)
+
+
+class JokeCorpus:
+    """
+    In-memory, indexed collection of JokeAPI-shaped joke payloads.
+
+    Jokes are grouped into buckets keyed by (categories, joke_type,
+    blacklist mask). The unfiltered bucket for every category and type is
+    built at load time; other filter combinations are built on first use and
+    memoized, so every later lookup is a dict hit plus ``random.choice``.
+
+    Example:
+        >>> corpus = JokeCorpus.load("data/jokes.jsonl")
+        >>> corpus.random_payload("Programming", "twopart", ["nsfw"])['type']
+        'twopart'
+    """
+
+    def __init__(self, jokes: list):
+        """
+        Args:
+            jokes (list): JokeAPI joke payloads, each with at least
+                          'category', 'type' and 'joke' or 'setup'/'delivery'.
+        """
+        self._jokes = []
+        self._masks = []
+        for joke in jokes:
+            if joke.get('type') not in JOKE_TYPES:
+                raise ValueError(f"Joke {joke.get('id')} has invalid type: {joke.get('type')}")
+            joke = dict(joke, error=False)
+            joke.setdefault('flags', {name: False for name in FLAG_NAMES})
+            self._jokes.append(joke)
+            self._masks.append(flags_to_mask(joke['flags']))
+
+        self.categories = sorted({joke['category'] for joke in self._jokes})
+        self._buckets = {}
+        self._lock = threading.Lock()
+        # Unfiltered buckets for every category/type, built in one pass
+        for i, joke in enumerate(self._jokes):
+            for category in ('Any', joke['category']):
+                for joke_type in (None, joke['type']):
+                    self._buckets.setdefault(((category,), joke_type, 0), []).append(i)
+
+    @classmethod
+    def load(cls, path) -> 'JokeCorpus':
+        """
+        Load a corpus from a ``.jsonl`` file or a SQLite database.
+
+        JSONL files hold one JokeAPI joke object per line. SQLite databases
+        need a ``jokes`` table with columns id, category, type, joke, setup,
+        delivery and flags (a JSON object string).
+
+        Args:
+            path (str | Path): Corpus file.
+
+        Returns:
+            JokeCorpus: The loaded corpus.
+        """
+        return cls(load_jokes(path))
+
+    def __len__(self) -> int:
+        return len(self._jokes)
+
+    def random_payload(self, category: str = 'Any', joke_type: str = None,
+                       blacklist_flags=None):
+        """
+        Pick a random joke matching the filter.
+
+        Args:
+            category (str): Category name, "Any", or comma-separated names.
+            joke_type (str, optional): 'single' or 'twopart'.
+            blacklist_flags (iterable, optional): Flag names the joke must not have.
+
+        Returns:
+            dict or None: A JokeAPI joke payload, or None if nothing matches.
+        """
+        categories = tuple(sorted(
+            normalize_category(name.strip()) for name in category.split(',') if name.strip()
+        ))
+        if joke_type not in JOKE_TYPES:
+            joke_type = None
+        bucket = self._bucket(categories, joke_type, flags_to_mask(blacklist_flags))
+        if not bucket:
+            return None
+        return self._jokes[random.choice(bucket)]
+
+    def _bucket(self, categories: tuple, joke_type: str, blacklist: int) -> list:
+        """Return the memoized list of joke indexes for a filter combination."""
+        key = (categories, joke_type, blacklist)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            # Don't memoize unknown names; they come straight from the URL
+            if any(name != 'Any' and name not in self.categories for name in categories):
+                return []
+            with self._lock:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    any_category = 'Any' in categories
+                    bucket = [
+                        i for i, joke in enumerate(self._jokes)
+                        if (any_category or joke['category'] in categories)
+                        and (joke_type is None or joke['type'] == joke_type)
+                        and not self._masks[i] & blacklist
+                    ]
+                    self._buckets[key] = bucket
+        return bucket
+
+
+def load_jokes(path) -> list:
+    """
+    Read every joke from a ``.jsonl`` file or a SQLite database.
+
+    Args:
+        path (str | Path): Corpus file.
+
+    Returns:
+        list: JokeAPI joke payloads.
+    """
+    path = Path(path)
+    if path.suffix in ('.db', '.sqlite', '.sqlite3'):
+        return _load_sqlite(path)
+    with path.open(encoding='utf-8') as corpus_file:
+        return [json.loads(line) for line in corpus_file if line.strip()]
+
+
+def _load_sqlite(path: Path) -> list:
+    """Read every row of the ``jokes`` table as a JokeAPI payload."""
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        connection.row_factory = sqlite3.Row
+        rows = connection.execute(
+            "SELECT id, category, type, joke, setup, delivery, flags FROM jokes"
+        ).fetchall()
+    finally:
+        connection.close()
+
+    jokes = []
+    for row in rows:
+        joke = {'id': row['id'], 'category': row['category'], 'type': row['type']}
+        if row['type'] == 'single':
+            joke['joke'] = row['joke']
+        else:
+            joke['setup'] = row['setup']
+            joke['delivery'] = row['delivery']
+        joke['flags'] = json.loads(row['flags']) if row['flags'] else {}
+        jokes.append(joke)
+    return jokes
@@ -0,0 +1,160 @@
+"""
+HTTP Cache Module
+
+Response caching policies for the Flask app, so browsers and a CDN can
+answer most page traffic without reaching the app:
+
+- static-content pages get a strong ETag, a short public max-age and
+  304 responses to matching ``If-None-Match`` requests
+- ``url_for('static', ...)`` URLs carry a content hash (``?v=<hash>``), and
+  fingerprinted static files are served with a far-future, immutable policy
+- joke routes, whose content changes on every request, are marked no-store
+  (or given a short max-age)
+"""
+
+import hashlib
+import inspect
+import os
+import threading
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+PAGE_CACHE_MAX_AGE = 300          # seconds a shared cache may reuse a page before revalidating
+STATIC_CACHE_MAX_AGE = 31536000   # one year; fingerprinted URLs change with their content
+JOKE_CACHE_MAX_AGE = 0            # 0 means no-store; otherwise seconds a joke may be reused
+
+FINGERPRINT_LENGTH = 12
+
+_fingerprints = {}  # path -> ((mtime_ns, size), digest)
+_fingerprints_lock = threading.Lock()
+
+
+def static_fingerprint(static_folder: str, filename: str):
+    """
+    Return a short content hash for a static file.
+
+    Hashes are memoized per file and recomputed when its size or mtime
+    changes.
+
+    Args:
+        static_folder (str): The app's static folder.
+        filename (str): Path relative to static_folder.
+
+    Returns:
+        str or None: Hex digest prefix, or None if the file does not exist.
+    """
+    path = os.path.join(static_folder, filename)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    with _fingerprints_lock:
+        cached = _fingerprints.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    with open(path, 'rb') as static_file:
+        digest = hashlib.sha256(static_file.read()).hexdigest()[:FINGERPRINT_LENGTH]
+    with _fingerprints_lock:
+        _fingerprints[path] = (version, digest)
+    return digest
+
+
+def cache_page(view):
+    """
+    Decorate a view whose output only changes with the code and templates.
+
+    The rendered body gets a strong ETag and ``Cache-Control: public,
+    max-age=PAGE_CACHE_MAX_AGE``; a request whose ``If-None-Match`` matches
+    gets an empty 304 response.
+
+    Example:
+        >>> @app.route('/about')
+        ... @cache_page
+        ... def about():
+        ...     return render_template('about.html')
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        response = make_response(view(*args, **kwargs))
+        if response.status_code != 200:
+            return response
+        response.cache_control.public = True
+        response.cache_control.max_age = current_app.config.get(
+            'PAGE_CACHE_MAX_AGE', PAGE_CACHE_MAX_AGE
+        )
+        response.add_etag()
+        return response.make_conditional(request)
+    return wrapper
+
+
+def cache_joke(view):
+    """
+    Decorate a view that returns a fresh joke on every request.
+
+    With ``JOKE_CACHE_MAX_AGE`` at 0 (the default) responses are marked
+    ``no-store``; a positive value lets shared caches reuse a joke for that
+    many seconds. Works for both sync and async views.
+    """
+    if inspect.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            return _apply_joke_policy(make_response(await view(*args, **kwargs)))
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return _apply_joke_policy(make_response(view(*args, **kwargs)))
+    return wrapper
+
+
+def _apply_joke_policy(response):
+    """Set the joke Cache-Control policy on response."""
+    max_age = current_app.config.get('JOKE_CACHE_MAX_AGE', JOKE_CACHE_MAX_AGE)
+    if max_age > 0 and response.status_code == 200:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    else:
+        response.cache_control.no_store = True
+    return response
+
+
+def init_app(app) -> None:
+    """
+    Register static URL fingerprinting and the static cache policy.
+
+    ``url_for('static', filename=...)`` gains a ``v`` query argument holding
+    the file's content hash. A static request whose ``v`` matches the
+    current hash is served with ``Cache-Control: public,
+    max-age=STATIC_CACHE_MAX_AGE, immutable``; others keep Flask's default
+    revalidation.
+
+    Args:
+        app (Flask): The application to configure.
+    """
+    app.config.setdefault('PAGE_CACHE_MAX_AGE', PAGE_CACHE_MAX_AGE)
+    app.config.setdefault('STATIC_CACHE_MAX_AGE', STATIC_CACHE_MAX_AGE)
+    app.config.setdefault('JOKE_CACHE_MAX_AGE', JOKE_CACHE_MAX_AGE)
+
+    @app.url_defaults
+    def add_static_fingerprint(endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            digest = static_fingerprint(app.static_folder, values['filename'])
+            if digest is not None:
+                values['v'] = digest
+
+    @app.after_request
+    def cache_fingerprinted_static(response):
+        if request.endpoint != 'static' or response.status_code not in (200, 304):
+            return response
+        version = request.args.get('v')
+        filename = (request.view_args or {}).get('filename')
+        if version and filename and version == static_fingerprint(app.static_folder, filename):
+            response.cache_control.public = True
+            response.cache_control.max_age = app.config['STATIC_CACHE_MAX_AGE']
+            response.cache_control.immutable = True
+            response.cache_control.no_cache = None
+        return response
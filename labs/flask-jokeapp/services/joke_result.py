@@ -0,0 +1,140 @@
+"""
+Joke Result Module
+
+The immutable value returned by every joke_service lookup. A JokeResult
+stores its seven fields in ``__slots__`` (no per-instance ``__dict__``), so
+it is a fraction of the size of the equivalent dict, and because it cannot
+be changed the same instance can be cached, coalesced and handed to any
+number of callers without defensive copies. Fixed failures are built once
+and shared.
+
+Existing dict-style code keeps working: a JokeResult is a read-only
+Mapping, so ``result['joke']``, ``result.get('success')``, ``dict(result)``
+and comparison with a dict all behave as before.
+"""
+
+from collections.abc import Mapping
+from operator import attrgetter
+
+FIELDS = ('success', 'joke_type', 'joke', 'setup', 'delivery', 'category', 'error')
+_FIELD_SET = frozenset(FIELDS)
+
+
+class JokeResult(Mapping):
+    """
+    Read-only joke lookup result.
+
+    Fields are available as attributes (``result.joke``, as templates use
+    them) and as mapping keys (``result['joke']``). Both are read-only: the
+    values live in private slots behind getter-only properties, which keeps
+    construction as cheap as plain slot assignment.
+
+    Example:
+        >>> result = JokeResult.single("Why do Java developers wear glasses?", 'Programming')
+        >>> result.success, result['joke_type']
+        (True, 'single')
+        >>> result == dict(result)
+        True
+        >>> result['joke'] = 'changed'
+        Traceback (most recent call last):
+        TypeError: 'JokeResult' object does not support item assignment
+    """
+
+    __slots__ = ('_success', '_joke_type', '_joke', '_setup', '_delivery', '_category', '_error')
+
+    def __init__(self, success: bool, joke_type: str = None, joke: str = None, setup: str = None,
+                 delivery: str = None, category: str = None, error: str = ''):
+        self._success = success
+        self._joke_type = joke_type
+        self._joke = joke
+        self._setup = setup
+        self._delivery = delivery
+        self._category = category
+        self._error = error
+
+    success = property(attrgetter('_success'), doc="True if a joke was fetched.")
+    joke_type = property(attrgetter('_joke_type'), doc="'single' or 'twopart'; None on failure.")
+    joke = property(attrgetter('_joke'), doc="Joke text of a single joke.")
+    setup = property(attrgetter('_setup'), doc="Setup of a twopart joke.")
+    delivery = property(attrgetter('_delivery'), doc="Punchline of a twopart joke.")
+    category = property(attrgetter('_category'), doc="Joke category.")
+    error = property(attrgetter('_error'), doc="Error message; empty on success.")
+
+    @classmethod
+    def single(cls, joke: str, category: str) -> 'JokeResult':
+        """A successful one-line joke."""
+        return cls(True, 'single', joke, None, None, category)
+
+    @classmethod
+    def twopart(cls, setup: str, delivery: str, category: str) -> 'JokeResult':
+        """A successful setup/delivery joke."""
+        return cls(True, 'twopart', None, setup, delivery, category)
+
+    @classmethod
+    def failure(cls, message: str) -> 'JokeResult':
+        """A failed lookup carrying message."""
+        return cls(False, error=message)
+
+    # ===== Sharing =====
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (JokeResult, self.astuple())
+
+    # ===== Mapping protocol =====
+
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def __contains__(self, key):
+        return key in _FIELD_SET
+
+    def __eq__(self, other):
+        if isinstance(other, JokeResult):
+            return self.astuple() == other.astuple()
+        if isinstance(other, Mapping):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    __hash__ = None  # equal to dicts, which are unhashable
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in FIELDS)
+        return f"JokeResult({fields})"
+
+    # ===== Conversion =====
+
+    def astuple(self) -> tuple:
+        """Field values in FIELDS order."""
+        return (self._success, self._joke_type, self._joke, self._setup,
+                self._delivery, self._category, self._error)
+
+    def to_dict(self) -> dict:
+        """
+        A new plain dict of the fields, e.g. for JSON encoding.
+
+        Returns:
+            dict: The result in the shape documented on get_joke().
+        """
+        return {
+            'success': self._success,
+            'joke_type': self._joke_type,
+            'joke': self._joke,
+            'setup': self._setup,
+            'delivery': self._delivery,
+            'category': self._category,
+            'error': self._error
+        }
@@ -2,13 +2,42 @@
 JokeAPI Service Module
 
 Handles all interactions with the JokeAPI, including fetching jokes,
-URL construction, and error handling.
+URL construction, connection pooling, and error handling.
+Both a blocking API (get_joke) and an asyncio API (get_joke_async) are
+provided; they return the same immutable JokeResult.
 """
 
+import asyncio
+import atexit
+import functools
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from services import metrics
+from services.cache import TTLCache
+from services.circuit_breaker import CircuitBreaker, CLOSED
+from services.corpus import JokeCorpus
+from services.joke_result import JokeResult
+from services.joke_store import JokeStore
+from services.latency import HedgeBudget, LatencyWindow
+from services.quota import NO_LIMITS, QuotaBucket, parse_rate_limit_headers
+from services.single_flight import AsyncSingleFlight, SingleFlight
+
+try:
+    import httpx
+except ImportError:  # optional; get_joke_async falls back to a worker thread
+    httpx = None
 
 # ===== API Constants =====
-API_BASE_URL = "https://v2.jokeapi.dev/joke"
+API_BASE_URL = "https://v2.jokeapi.dev/joke"  # override with configure_api() or JOKE_API_BASE_URL
 
 ALLOWED_CATEGORIES = [
     "Any",
@@ -20,11 +49,831 @@ ALLOWED_CATEGORIES = [
     "Christmas"
 ]
 
+MAX_AMOUNT = 10  # most jokes JokeAPI returns for one request
+
+# ===== Backend Configuration =====
+JOKE_BACKEND = "http"  # "http" calls JokeAPI; "corpus" / "mmap" serve a local dump
+CORPUS_PATH = None     # JSONL/SQLite dump ("corpus") or joke store file ("mmap")
+
 # ===== Request Configuration =====
-REQUEST_TIMEOUT = 5  # seconds
+REQUEST_TIMEOUT = 5  # seconds; ceiling for adaptive timeouts, and the timeout until there are samples
+
+# ===== Adaptive Timeout Configuration =====
+ADAPTIVE_TIMEOUT = True   # derive the timeout from recent upstream latency
+TIMEOUT_PERCENTILE = 99   # latency percentile the timeout is based on
+TIMEOUT_MULTIPLIER = 3    # timeout = percentile latency x multiplier, within the bounds
+TIMEOUT_MIN = 0.5         # seconds; floor for adaptive timeouts
+LATENCY_WINDOW = 256      # recent upstream calls the estimate is computed over
+LATENCY_MIN_SAMPLES = 20  # calls needed before timeouts adapt and hedging starts
+
+# ===== Hedging Configuration =====
+HEDGE_ENABLED = True   # send a second request when the first is slower than usual
+HEDGE_PERCENTILE = 95  # latency percentile after which the hedge is sent
+HEDGE_MIN_DELAY = 0.01  # seconds; never hedge sooner than this
+HEDGE_BUDGET = 0.1     # hedges allowed per primary request (0.1 = at most 10% extra load)
+HEDGE_BURST = 10       # hedges that may be saved up for a burst of slow responses
+HEDGE_MAX_WORKERS = 64  # threads running hedged sync calls; beyond this calls are not hedged
+
+# ===== Upstream Quota Configuration =====
+QUOTA_ENABLED = True   # keep upstream calls under JokeAPI's per-IP rate limit
+QUOTA_LIMIT = 120      # requests per window (JokeAPI's limit); RateLimit-Limit replaces it
+QUOTA_WINDOW = 60      # seconds
+QUOTA_SHARE = 1.0      # fraction of the limit for this process, e.g. 1/4 for one of four workers
+QUOTA_MAX_WAIT = 0.5   # seconds a call may queue for a token before it is shed
+QUOTA_RETRY_AFTER = 5  # seconds to pause after an HTTP 429 that gives no Retry-After
+
+# ===== Batch Configuration =====
+BATCH_MAX_WORKERS = 8  # concurrent upstream requests shared by all batches
+BATCH_MAX_COUNT = 50   # most jokes one batch may ask for
+
+# ===== Connection Pool Configuration =====
+POOL_CONNECTIONS = 4   # number of per-host connection pools to keep
+POOL_MAXSIZE = 20      # max keep-alive connections kept per host
+POOL_BLOCK = False     # wait for a free connection instead of opening an extra one
+POOL_KEEP_ALIVE = True  # reuse connections between requests
+
+# ===== Async Client Configuration =====
+ASYNC_MAX_CONNECTIONS = 200  # max concurrent upstream connections for get_joke_async
+ASYNC_MAX_KEEPALIVE = 20     # idle keep-alive connections kept by the async pool
+
+# ===== Response Cache Configuration =====
+CACHE_ENABLED = True
+CACHE_TTL = 30       # seconds a successful joke is served from memory
+CACHE_MAXSIZE = 256  # max cached URLs before LRU eviction
+
+# ===== Request Coalescing Configuration =====
+COALESCE_ENABLED = True  # concurrent identical cacheable requests share one upstream call
+
+# ===== Circuit Breaker Configuration =====
+CIRCUIT_FAILURE_THRESHOLD = 5   # consecutive upstream failures that open the circuit
+CIRCUIT_COOLDOWN = 30           # seconds to fail fast before a trial request
+CIRCUIT_HALF_OPEN_MAX_CALLS = 1  # trial requests allowed while half open
+FALLBACK_MAX_AGE = 3600         # seconds a last good joke may be served while open
+
+CIRCUIT_OPEN_MESSAGE = 'JokeAPI is temporarily unavailable. Please try again shortly.'
+
+# ===== Stale Serving Configuration =====
+# Windows are seconds past CACHE_TTL; 0 turns the behaviour off
+STALE_WHILE_REVALIDATE = 0  # serve an expired joke at once and refresh it in the background
+STALE_IF_ERROR = 0          # serve the last good joke when the upstream call fails
+STALE_OVERRIDES = {}        # per-category windows, e.g. {'Dark': {'stale_if_error': 600}}
+STALE_KINDS = ('stale_while_revalidate', 'stale_if_error')
+
+# ===== Shared Error Results =====
+# Results are immutable, so fixed failures are built once and returned as is
+TIMEOUT_RESULT = JokeResult.failure('Request timed out. The API is taking too long to respond.')
+CONNECTION_RESULT = JokeResult.failure(
+    'Connection failed. Please check your internet connection and try again.'
+)
+INVALID_JSON_RESULT = JokeResult.failure('Failed to parse API response. Invalid JSON received.')
+CIRCUIT_OPEN_RESULT = JokeResult.failure(CIRCUIT_OPEN_MESSAGE)
+NO_MATCH_RESULT = JokeResult.failure('JokeAPI error: No matching joke found')
+RATE_LIMITED_RESULT = JokeResult.failure('JokeAPI rate limit reached. Please try again shortly.')
+
+_corpus = None
+_session = None
+_session_lock = threading.Lock()
+_pool_counters = {'requests': 0, 'connects': 0}
+_pool_counters_lock = threading.Lock()
+_response_cache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL)
+_last_good = TTLCache(maxsize=CACHE_MAXSIZE, ttl=FALLBACK_MAX_AGE)  # url -> (stored_at, result)
+_refreshing = set()  # URLs with a background refresh running
+_refreshing_lock = threading.Lock()
+_latency = LatencyWindow(size=LATENCY_WINDOW, min_samples=LATENCY_MIN_SAMPLES)
+_hedge_budget = HedgeBudget(ratio=HEDGE_BUDGET, burst=HEDGE_BURST)
+_quota = QuotaBucket(limit=QUOTA_LIMIT, window=QUOTA_WINDOW, share=QUOTA_SHARE)
+_inflight = SingleFlight()
+_inflight_async = AsyncSingleFlight()  # used only on the service event loop
+_circuit_breaker = CircuitBreaker(
+    failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+    cooldown=CIRCUIT_COOLDOWN,
+    half_open_max_calls=CIRCUIT_HALF_OPEN_MAX_CALLS
+)
+
+
+# ===== Metrics =====
+UPSTREAM_OUTCOMES = metrics.Counter(
+    'jokeapp_upstream_requests', 'JokeAPI calls by outcome', ['outcome']
+)
+UPSTREAM_LATENCY = metrics.Histogram(
+    'jokeapp_upstream_request_duration_seconds', 'JokeAPI call latency', ['category']
+)
+UPSTREAM_IN_FLIGHT = metrics.Gauge(
+    'jokeapp_upstream_requests_in_flight', 'JokeAPI calls currently waiting for a response'
+)
+STALE_SERVED = metrics.Counter(
+    'jokeapp_stale_served', 'Jokes served past their cache TTL, by reason', ['reason']
+)
+STALE_REFRESHES = metrics.Counter(
+    'jokeapp_stale_refreshes', 'Background refreshes of stale jokes', ['result']
+)
+HEDGED_REQUESTS = metrics.Counter(
+    'jokeapp_hedged_requests', 'Hedged JokeAPI calls sent, won, or skipped for lack of budget or quota',
+    ['result']
+)
+metrics.CallbackMetric(
+    'jokeapp_upstream_timeout_seconds', 'Current JokeAPI request timeout', 'gauge',
+    lambda: [({}, request_timeout())]
+)
+metrics.CallbackMetric(
+    'jokeapp_quota_requests', 'Upstream calls granted, granted after queueing, or shed by the quota',
+    'counter', lambda: [({'result': key}, _quota.stats()[key]) for key in ('granted', 'queued', 'shed')]
+)
+metrics.CallbackMetric(
+    'jokeapp_quota_tokens', 'Upstream requests the quota allows right now', 'gauge',
+    lambda: [({}, _quota.stats()['tokens'])]
+)
+metrics.CallbackMetric(
+    'jokeapp_joke_cache', 'Response cache lookups', 'counter',
+    lambda: [({'result': key}, _response_cache.stats()[key]) for key in ('hits', 'misses')]
+)
+metrics.CallbackMetric(
+    'jokeapp_coalesced_requests', 'Requests that shared another request\'s upstream call',
+    'counter', lambda: [({}, get_coalesce_stats()['coalesced'])]
+)
+metrics.CallbackMetric(
+    'jokeapp_circuit_open', '1 while the JokeAPI circuit breaker is not closed', 'gauge',
+    lambda: [({}, int(_circuit_breaker.state != CLOSED))]
+)
+
+
+def _url_category(api_url: str) -> str:
+    """Category path segment of a JokeAPI URL, e.g. 'Programming,Pun'."""
+    return api_url[len(API_BASE_URL):].strip('/').split('?', 1)[0] or 'Any'
+
+
+def _category_label(api_url: str) -> str:
+    """Metric label for the category of api_url: an allowed category, else 'other'."""
+    # /joke/<category> accepts any string; a label per string would grow without bound
+    category = _url_category(api_url)
+    return category if category in ALLOWED_CATEGORIES else 'other'
+
+
+def _timed_upstream(fetch):
+    """Track in-flight count and latency of an upstream fetch function."""
+    if asyncio.iscoroutinefunction(fetch):
+        @functools.wraps(fetch)
+        async def timed_async(api_url, *args, **kwargs):
+            started = time.perf_counter()
+            UPSTREAM_IN_FLIGHT.inc()
+            result = None
+            try:
+                result = await fetch(api_url, *args, **kwargs)
+                return result
+            finally:
+                UPSTREAM_IN_FLIGHT.dec()
+                _observe_latency(api_url, time.perf_counter() - started, result)
+        return timed_async
+
+    @functools.wraps(fetch)
+    def timed(api_url, *args, **kwargs):
+        started = time.perf_counter()
+        UPSTREAM_IN_FLIGHT.inc()
+        result = None
+        try:
+            result = fetch(api_url, *args, **kwargs)
+            return result
+        finally:
+            UPSTREAM_IN_FLIGHT.dec()
+            _observe_latency(api_url, time.perf_counter() - started, result)
+    return timed
+
+
+def _observe_latency(api_url: str, seconds: float, result) -> None:
+    """
+    Record the latency of one upstream call.
+    
+    A timed-out call only shows the latency was above its timeout, so it
+    enters the rolling window at the REQUEST_TIMEOUT ceiling; a few timeouts
+    are enough to lift an adaptive timeout that has become too tight.
+    Cancelled calls (no result, e.g. a losing hedge) stay out of the window.
+    """
+    UPSTREAM_LATENCY.labels(_category_label(api_url)).observe(seconds)
+    if result is TIMEOUT_RESULT:
+        _latency.observe(max(seconds, REQUEST_TIMEOUT))
+    elif result is not None:
+        _latency.observe(seconds)
+
+
+def _count(counter: str) -> None:
+    with _pool_counters_lock:
+        _pool_counters[counter] += 1
+
+
+class _CountingHTTPConnection(HTTPConnection):
+    """HTTP connection that records every new socket it opens."""
+
+    def connect(self):
+        _count('connects')
+        super().connect()
+
+
+class _CountingHTTPSConnection(HTTPSConnection):
+    """HTTPS connection that records every new socket (TCP + TLS handshake)."""
+
+    def connect(self):
+        _count('connects')
+        super().connect()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
 
+class _PooledAdapter(HTTPAdapter):
+    """HTTPAdapter that keeps pool hit/miss counters."""
 
-def build_joke_url(category: str, joke_type: str = None) -> str:
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _CountingHTTPConnectionPool,
+            'https': _CountingHTTPSConnectionPool
+        }
+
+    def send(self, request, **kwargs):
+        _count('requests')
+        return super().send(request, **kwargs)
+
+
+def _create_session() -> requests.Session:
+    """Build a Session whose adapter pools connections per host."""
+    session = requests.Session()
+    adapter = _PooledAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        pool_block=POOL_BLOCK
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers['Connection'] = 'keep-alive' if POOL_KEEP_ALIVE else 'close'
+    return session
+
+
+def get_session() -> requests.Session:
+    """
+    Return the shared HTTP session, creating it on first use.
+    
+    The session is shared by every thread; urllib3 connection pools are
+    thread-safe, so concurrent requests reuse the same keep-alive connections
+    instead of paying a new TCP and TLS handshake on every call.
+    
+    Returns:
+        requests.Session: The process-wide session used for JokeAPI calls.
+    """
+    global _session
+    session = _session
+    if session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session()
+            session = _session
+    return session
+
+
+def configure_pool(pool_connections: int = None, pool_maxsize: int = None,
+                   pool_block: bool = None, keep_alive: bool = None) -> None:
+    """
+    Update the connection pool settings and recreate the shared session.
+    
+    Args:
+        pool_connections (int, optional): Number of per-host pools to keep.
+        pool_maxsize (int, optional): Max connections kept alive per host.
+        pool_block (bool, optional): Block when the pool is exhausted.
+        keep_alive (bool, optional): Reuse connections between requests.
+    """
+    global POOL_CONNECTIONS, POOL_MAXSIZE, POOL_BLOCK, POOL_KEEP_ALIVE
+    if pool_connections is not None:
+        POOL_CONNECTIONS = pool_connections
+    if pool_maxsize is not None:
+        POOL_MAXSIZE = pool_maxsize
+    if pool_block is not None:
+        POOL_BLOCK = pool_block
+    if keep_alive is not None:
+        POOL_KEEP_ALIVE = keep_alive
+    close_session()
+
+
+def close_session() -> None:
+    """Close the shared session, release its connections and reset pool stats."""
+    global _session
+    with _session_lock:
+        session, _session = _session, None
+    if session is not None:
+        session.close()
+    with _pool_counters_lock:
+        _pool_counters['requests'] = 0
+        _pool_counters['connects'] = 0
+
+
+def get_pool_stats() -> dict:
+    """
+    Report connection reuse for the shared session.
+    
+    A hit is a request served over an already-open connection; a miss is a
+    request that had to open a new socket (and, for HTTPS, a TLS handshake).
+    
+    Returns:
+        dict: Counters with keys 'hosts', 'requests', 'hits' and 'misses'.
+    """
+    session = _session
+    hosts = 0
+    if session is not None:
+        adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+        for adapter in adapters.values():
+            hosts += len(adapter.poolmanager.pools)
+    
+    with _pool_counters_lock:
+        requests_made = _pool_counters['requests']
+        misses = _pool_counters['connects']
+    return {
+        'hosts': hosts,
+        'requests': requests_made,
+        'hits': max(requests_made - misses, 0),
+        'misses': misses
+    }
+
+
+def configure_cache(ttl: float = None, maxsize: int = None, enabled: bool = None) -> None:
+    """
+    Update the response cache settings. The cache is emptied.
+    
+    Args:
+        ttl (float, optional): Seconds a successful joke stays cached.
+        maxsize (int, optional): Max number of cached URLs.
+        enabled (bool, optional): Turn the cache on or off.
+    """
+    global CACHE_TTL, CACHE_MAXSIZE, CACHE_ENABLED, _response_cache
+    if ttl is not None:
+        CACHE_TTL = ttl
+    if maxsize is not None:
+        CACHE_MAXSIZE = maxsize
+    if enabled is not None:
+        CACHE_ENABLED = enabled
+    _response_cache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL)
+    _last_good.ttl = _fallback_retention()
+
+
+def clear_cache() -> None:
+    """Drop every cached joke and reset the cache counters."""
+    _response_cache.clear()
+
+
+def get_cache_stats() -> dict:
+    """
+    Report response cache counters.
+    
+    Returns:
+        dict: 'hits', 'misses', 'evictions', 'expirations', 'size',
+              'maxsize' and 'hit_ratio'.
+    """
+    return _response_cache.stats()
+
+
+def configure_coalescing(enabled: bool = None) -> None:
+    """
+    Turn request coalescing on or off.
+    
+    Args:
+        enabled (bool, optional): Share one upstream call between concurrent
+                                  identical requests.
+    """
+    global COALESCE_ENABLED
+    if enabled is not None:
+        COALESCE_ENABLED = enabled
+
+
+def get_coalesce_stats() -> dict:
+    """
+    Report request coalescing counters for the sync and async paths combined.
+    
+    Returns:
+        dict: 'flights' (upstream calls made for coalescable requests),
+              'coalesced' (requests that shared another request's call)
+              and 'in_flight'.
+    """
+    sync_stats = _inflight.stats()
+    async_stats = _inflight_async.stats()
+    return {key: sync_stats[key] + async_stats[key] for key in sync_stats}
+
+
+def configure_circuit_breaker(failure_threshold: int = None, cooldown: float = None,
+                              half_open_max_calls: int = None) -> None:
+    """
+    Update the circuit breaker settings. The circuit is reset to closed.
+    
+    Args:
+        failure_threshold (int, optional): Consecutive failures that open the circuit.
+        cooldown (float, optional): Seconds to fail fast before a trial request.
+        half_open_max_calls (int, optional): Trial requests allowed while half open.
+    """
+    global CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_COOLDOWN, CIRCUIT_HALF_OPEN_MAX_CALLS
+    global _circuit_breaker
+    if failure_threshold is not None:
+        CIRCUIT_FAILURE_THRESHOLD = failure_threshold
+    if cooldown is not None:
+        CIRCUIT_COOLDOWN = cooldown
+    if half_open_max_calls is not None:
+        CIRCUIT_HALF_OPEN_MAX_CALLS = half_open_max_calls
+    _circuit_breaker = CircuitBreaker(
+        failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+        cooldown=CIRCUIT_COOLDOWN,
+        half_open_max_calls=CIRCUIT_HALF_OPEN_MAX_CALLS
+    )
+
+
+def configure_stale(while_revalidate: float = None, if_error: float = None,
+                    overrides: dict = None) -> None:
+    """
+    Update the stale serving windows.
+    
+    Args:
+        while_revalidate (float, optional): Seconds past CACHE_TTL an expired
+            joke is still served while a background refresh runs.
+        if_error (float, optional): Seconds past CACHE_TTL the last good joke
+            is served when the upstream call fails.
+        overrides (dict, optional): Category -> {'stale_while_revalidate': s,
+            'stale_if_error': s}; missing kinds use the defaults. Replaces
+            the current overrides.
+    
+    Raises:
+        ValueError: If a window is negative or an override names an
+                    unknown kind.
+    
+    Example:
+        >>> configure_stale(while_revalidate=60, if_error=3600,
+        ...                 overrides={'Christmas': {'stale_while_revalidate': 86400}})
+    """
+    global STALE_WHILE_REVALIDATE, STALE_IF_ERROR, STALE_OVERRIDES
+    overrides = STALE_OVERRIDES if overrides is None else overrides
+    windows = [value for value in (while_revalidate, if_error) if value is not None]
+    for category, kinds in overrides.items():
+        unknown = set(kinds) - set(STALE_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown stale window for {category}: {', '.join(sorted(unknown))}")
+        windows.extend(kinds.values())
+    if any(window < 0 for window in windows):
+        raise ValueError("Stale windows must not be negative")
+    
+    if while_revalidate is not None:
+        STALE_WHILE_REVALIDATE = while_revalidate
+    if if_error is not None:
+        STALE_IF_ERROR = if_error
+    STALE_OVERRIDES = {category: dict(kinds) for category, kinds in overrides.items()}
+    _last_good.ttl = _fallback_retention()
+
+
+def stale_windows(category: str) -> dict:
+    """
+    Return the stale windows that apply to category.
+    
+    Args:
+        category (str): Category as it appears in the URL, e.g. 'Programming'.
+    
+    Returns:
+        dict: 'stale_while_revalidate' and 'stale_if_error' in seconds.
+    """
+    windows = {'stale_while_revalidate': STALE_WHILE_REVALIDATE, 'stale_if_error': STALE_IF_ERROR}
+    windows.update(STALE_OVERRIDES.get(category, {}))
+    return windows
+
+
+def get_stale_stats() -> dict:
+    """
+    Report how often stale jokes were served.
+    
+    Returns:
+        dict: 'served_while_revalidate', 'served_if_error',
+              'served_circuit_open', 'served_rate_limited', 'refreshes_ok',
+              'refreshes_failed' and
+              'refreshing' (background refreshes running now).
+    """
+    with _refreshing_lock:
+        refreshing = len(_refreshing)
+    return {
+        'served_while_revalidate': STALE_SERVED.labels('revalidate').value(),
+        'served_if_error': STALE_SERVED.labels('error').value(),
+        'served_circuit_open': STALE_SERVED.labels('circuit_open').value(),
+        'served_rate_limited': STALE_SERVED.labels('rate_limited').value(),
+        'refreshes_ok': STALE_REFRESHES.labels('ok').value(),
+        'refreshes_failed': STALE_REFRESHES.labels('failed').value(),
+        'refreshing': refreshing
+    }
+
+
+def _fallback_retention() -> float:
+    """Seconds a last good joke must be kept for fallback and stale serving."""
+    windows = [STALE_WHILE_REVALIDATE, STALE_IF_ERROR]
+    windows.extend(window for kinds in STALE_OVERRIDES.values() for window in kinds.values())
+    return max(FALLBACK_MAX_AGE, CACHE_TTL + max(windows))
+
+
+def configure_timeouts(timeout: float = None, adaptive: bool = None, percentile: float = None,
+                       multiplier: float = None, minimum: float = None) -> None:
+    """
+    Update the upstream request timeout settings.
+    
+    Args:
+        timeout (float, optional): Seconds; the fixed timeout, and the
+            ceiling for adaptive timeouts.
+        adaptive (bool, optional): Derive the timeout from recent latency.
+        percentile (float, optional): Latency percentile the adaptive
+            timeout is based on.
+        multiplier (float, optional): Headroom applied to that percentile.
+        minimum (float, optional): Seconds; floor for adaptive timeouts.
+    
+    Raises:
+        ValueError: If a value is out of range or minimum exceeds timeout.
+    
+    Example:
+        >>> configure_timeouts(timeout=5, percentile=99, multiplier=3, minimum=0.5)
+    """
+    global REQUEST_TIMEOUT, ADAPTIVE_TIMEOUT, TIMEOUT_PERCENTILE, TIMEOUT_MULTIPLIER, TIMEOUT_MIN
+    new_timeout = REQUEST_TIMEOUT if timeout is None else timeout
+    new_minimum = TIMEOUT_MIN if minimum is None else minimum
+    if new_timeout <= 0 or new_minimum <= 0:
+        raise ValueError("Timeouts must be positive")
+    if new_minimum > new_timeout:
+        raise ValueError("The minimum timeout must not exceed the timeout")
+    if percentile is not None and not 0 < percentile <= 100:
+        raise ValueError("percentile must be between 0 and 100")
+    if multiplier is not None and multiplier < 1:
+        raise ValueError("multiplier must be at least 1")
+    
+    REQUEST_TIMEOUT, TIMEOUT_MIN = new_timeout, new_minimum
+    if adaptive is not None:
+        ADAPTIVE_TIMEOUT = adaptive
+    if percentile is not None:
+        TIMEOUT_PERCENTILE = percentile
+    if multiplier is not None:
+        TIMEOUT_MULTIPLIER = multiplier
+
+
+def configure_hedging(enabled: bool = None, percentile: float = None, budget: float = None,
+                      burst: float = None, min_delay: float = None) -> None:
+    """
+    Update the hedged request settings. Saved hedge tokens are dropped.
+    
+    Args:
+        enabled (bool, optional): Send a second request when the first is slow.
+        percentile (float, optional): Latency percentile after which the
+            hedge is sent.
+        budget (float, optional): Hedges allowed per primary request.
+        burst (float, optional): Hedges that may be saved up.
+        min_delay (float, optional): Seconds; never hedge sooner than this.
+    
+    Raises:
+        ValueError: If a value is out of range.
+    
+    Example:
+        >>> configure_hedging(percentile=95, budget=0.05)
+    """
+    global HEDGE_ENABLED, HEDGE_PERCENTILE, HEDGE_BUDGET, HEDGE_BURST, HEDGE_MIN_DELAY
+    global _hedge_budget
+    if percentile is not None and not 0 < percentile <= 100:
+        raise ValueError("percentile must be between 0 and 100")
+    if min_delay is not None and min_delay < 0:
+        raise ValueError("min_delay must not be negative")
+    new_budget = HedgeBudget(
+        ratio=HEDGE_BUDGET if budget is None else budget,
+        burst=HEDGE_BURST if burst is None else burst
+    )
+    
+    if enabled is not None:
+        HEDGE_ENABLED = enabled
+    if percentile is not None:
+        HEDGE_PERCENTILE = percentile
+    if min_delay is not None:
+        HEDGE_MIN_DELAY = min_delay
+    HEDGE_BUDGET, HEDGE_BURST = new_budget.ratio, new_budget.burst
+    _hedge_budget = new_budget
+
+
+def request_timeout() -> float:
+    """
+    Return the timeout for the next upstream call.
+    
+    With ADAPTIVE_TIMEOUT this is the TIMEOUT_PERCENTILE latency of the
+    recent calls times TIMEOUT_MULTIPLIER, kept between TIMEOUT_MIN and
+    REQUEST_TIMEOUT; until LATENCY_MIN_SAMPLES calls have been timed, and
+    with ADAPTIVE_TIMEOUT off, it is REQUEST_TIMEOUT.
+    
+    Returns:
+        float: Seconds.
+    """
+    if not ADAPTIVE_TIMEOUT:
+        return REQUEST_TIMEOUT
+    latency = _latency.percentile(TIMEOUT_PERCENTILE)
+    if latency is None:
+        return REQUEST_TIMEOUT
+    return min(max(latency * TIMEOUT_MULTIPLIER, TIMEOUT_MIN), REQUEST_TIMEOUT)
+
+
+def get_latency_stats() -> dict:
+    """
+    Report the rolling upstream latency estimate, timeout and hedging counters.
+    
+    Returns:
+        dict: 'samples', 'p50', 'p95' and 'p99' (seconds, None until enough
+              samples), 'timeout', 'hedges_sent', 'hedges_won' (hedges that
+              answered first), 'hedges_skipped' (no budget or quota left)
+              and 'hedge_tokens'.
+    """
+    return {
+        'samples': len(_latency),
+        'p50': _latency.percentile(50),
+        'p95': _latency.percentile(95),
+        'p99': _latency.percentile(99),
+        'timeout': request_timeout(),
+        'hedges_sent': HEDGED_REQUESTS.labels('sent').value(),
+        'hedges_won': HEDGED_REQUESTS.labels('won').value(),
+        'hedges_skipped': HEDGED_REQUESTS.labels('skipped').value(),
+        'hedge_tokens': _hedge_budget.tokens
+    }
+
+
+def reset_latency() -> None:
+    """Forget the latency samples and saved hedge tokens."""
+    _latency.clear()
+    _hedge_budget.reset()
+
+
+def configure_quota(enabled: bool = None, limit: int = None, window: float = None,
+                    max_wait: float = None, share: float = None) -> None:
+    """
+    Update the upstream quota settings.
+    
+    A new limit, window or share starts a full bucket; otherwise the current
+    bucket, and any pause upstream imposed on it, is kept.
+    
+    Args:
+        enabled (bool, optional): Hold upstream calls to the quota.
+        limit (int, optional): Requests allowed per window, until upstream
+            advertises its own with RateLimit-Limit.
+        window (float, optional): Window length in seconds.
+        max_wait (float, optional): Seconds a call may queue for a token
+            before it is shed.
+        share (float, optional): Fraction of the limit, configured or
+            advertised, this process may use.
+    
+    Raises:
+        ValueError: If a value is out of range.
+    
+    Example:
+        >>> configure_quota(share=1 / 2, max_wait=0.2)  # e.g. two workers on one IP
+    """
+    global QUOTA_ENABLED, QUOTA_LIMIT, QUOTA_WINDOW, QUOTA_MAX_WAIT, QUOTA_SHARE, _quota
+    if max_wait is not None and max_wait < 0:
+        raise ValueError("max_wait must not be negative")
+    limit = QUOTA_LIMIT if limit is None else limit
+    window = QUOTA_WINDOW if window is None else window
+    share = QUOTA_SHARE if share is None else share
+    if (limit, window, share) != (QUOTA_LIMIT, QUOTA_WINDOW, QUOTA_SHARE):
+        _quota = QuotaBucket(limit=limit, window=window, share=share)
+        QUOTA_LIMIT, QUOTA_WINDOW, QUOTA_SHARE = limit, window, share
+    
+    if enabled is not None:
+        QUOTA_ENABLED = enabled
+    if max_wait is not None:
+        QUOTA_MAX_WAIT = max_wait
+
+
+def get_quota_stats() -> dict:
+    """
+    Report the upstream quota.
+    
+    Returns:
+        dict: See QuotaBucket.stats(), plus 'enabled'.
+    """
+    return dict(_quota.stats(), enabled=QUOTA_ENABLED)
+
+
+def reset_quota() -> None:
+    """Start a full quota at QUOTA_LIMIT, forgetting what upstream advertised."""
+    global _quota
+    _quota = QuotaBucket(limit=QUOTA_LIMIT, window=QUOTA_WINDOW, share=QUOTA_SHARE)
+
+
+def reset_circuit_breaker() -> None:
+    """Close the circuit and forget the last good jokes kept for fallback."""
+    _circuit_breaker.reset()
+    _last_good.clear()
+
+
+def get_circuit_stats() -> dict:
+    """
+    Report circuit breaker state and recent transitions.
+    
+    Returns:
+        dict: See CircuitBreaker.stats().
+    """
+    return _circuit_breaker.stats()
+
+
+def is_circuit_closed() -> bool:
+    """Return True while upstream calls are allowed without restriction."""
+    return _circuit_breaker.state == CLOSED
+
+
+def configure_api(base_url: str = None) -> None:
+    """
+    Point the HTTP backend at another JokeAPI-compatible server.
+    
+    Args:
+        base_url (str, optional): URL that category names are appended to,
+                                  e.g. ``http://127.0.0.1:8081/joke``.
+    """
+    global API_BASE_URL
+    if base_url:
+        API_BASE_URL = base_url.rstrip('/')
+
+
+def configure_backend(backend: str = "http", corpus_path: str = None) -> None:
+    """
+    Choose where jokes come from.
+    
+    Args:
+        backend (str): "http" to call JokeAPI, "corpus" to serve jokes from a
+                       JSONL/SQLite dump loaded into memory, or "mmap" to serve
+                       them from a memory-mapped joke store shared by every
+                       worker process (see services.joke_store).
+        corpus_path (str, optional): Dump or store file; required unless "http".
+    
+    Raises:
+        ValueError: If the backend is unknown or corpus_path is missing.
+    """
+    global JOKE_BACKEND, CORPUS_PATH, _corpus
+    if backend == "http":
+        _corpus = None
+    elif backend in ("corpus", "mmap"):
+        if not corpus_path:
+            raise ValueError(f"The {backend} backend needs a corpus_path")
+        if backend == "corpus":
+            _corpus = JokeCorpus.load(corpus_path)
+        else:
+            _corpus = JokeStore.open(corpus_path)
+    else:
+        raise ValueError(f"Unknown joke backend: {backend}")
+    JOKE_BACKEND = backend
+    CORPUS_PATH = corpus_path
+
+
+def init_app(app) -> None:
+    """
+    Register the joke service with a Flask application.
+    
+    Applies the ``JOKE_API_BASE_URL``, ``JOKE_BACKEND``,
+    ``JOKE_CORPUS_PATH``, ``JOKE_STALE_*``, ``JOKE_REQUEST_TIMEOUT``,
+    ``JOKE_ADAPTIVE_TIMEOUT``, ``JOKE_HEDGE_*`` and ``JOKE_QUOTA_*`` config
+    keys when present.
+    Flask has no application shutdown signal, so the session is closed from
+    an ``atexit`` hook when the worker process exits.
+    
+    Args:
+        app (Flask): The application using the service.
+    """
+    configure_api(app.config.get('JOKE_API_BASE_URL'))
+    if 'JOKE_BACKEND' in app.config:
+        configure_backend(app.config['JOKE_BACKEND'], app.config.get('JOKE_CORPUS_PATH'))
+    configure_stale(
+        while_revalidate=app.config.get('JOKE_STALE_WHILE_REVALIDATE'),
+        if_error=app.config.get('JOKE_STALE_IF_ERROR'),
+        overrides=app.config.get('JOKE_STALE_OVERRIDES')
+    )
+    configure_timeouts(
+        timeout=app.config.get('JOKE_REQUEST_TIMEOUT'),
+        adaptive=app.config.get('JOKE_ADAPTIVE_TIMEOUT')
+    )
+    configure_hedging(
+        enabled=app.config.get('JOKE_HEDGE_ENABLED'),
+        budget=app.config.get('JOKE_HEDGE_BUDGET')
+    )
+    configure_quota(
+        enabled=app.config.get('JOKE_QUOTA_ENABLED'),
+        limit=app.config.get('JOKE_QUOTA_LIMIT'),
+        window=app.config.get('JOKE_QUOTA_WINDOW'),
+        max_wait=app.config.get('JOKE_QUOTA_MAX_WAIT'),
+        share=app.config.get('JOKE_QUOTA_SHARE')
+    )
+    app.extensions['joke_service'] = {
+        'pool_stats': get_pool_stats,
+        'cache_stats': get_cache_stats,
+        'circuit_stats': get_circuit_stats,
+        'coalesce_stats': get_coalesce_stats,
+        'stale_stats': get_stale_stats,
+        'latency_stats': get_latency_stats,
+        'quota_stats': get_quota_stats
+    }
+    for hook in (close_session, close_batch_executor, close_hedge_executor, close_async_client):
+        atexit.unregister(hook)
+        atexit.register(hook)
+
+
+def build_joke_url(category: str, joke_type: str = None, amount: int = None,
+                   blacklist_flags=None) -> str:
     """
     Construct the JokeAPI URL for fetching jokes.
     
@@ -32,6 +881,9 @@ def build_joke_url(category: str, joke_type: str = None) -> str:
         category (str): Joke category (Any, Programming, Miscellaneous, etc.)
         joke_type (str, optional): Filter by joke type ('single' or 'twopart').
                                    If None, both types are returned.
+        amount (int, optional): Number of jokes to return in one response
+                                (2 to MAX_AMOUNT). If None, one joke is returned.
+        blacklist_flags (iterable, optional): Flags to exclude, e.g. ['nsfw'].
     
     Returns:
         str: The complete API URL for fetching jokes.
@@ -42,25 +894,62 @@ def build_joke_url(category: str, joke_type: str = None) -> str:
         
         >>> build_joke_url("Programming", "single")
         'https://v2.jokeapi.dev/joke/Programming?type=single'
+        
+        >>> build_joke_url("Pun", amount=5)
+        'https://v2.jokeapi.dev/joke/Pun?amount=5'
     """
     url = f"{API_BASE_URL}/{category}"
+    params = []
     
     if joke_type and joke_type in ["single", "twopart"]:
-        url += f"?type={joke_type}"
+        params.append(f"type={joke_type}")
+    
+    if blacklist_flags:
+        params.append(f"blacklistFlags={','.join(sorted(blacklist_flags))}")
+    
+    if amount and amount > 1:
+        params.append(f"amount={min(amount, MAX_AMOUNT)}")
+    
+    if params:
+        url += "?" + "&".join(params)
     
     return url
 
 
-def get_joke(category: str = "Any") -> dict:
+def get_joke(category: str = "Any", joke_type: str = None, use_cache: bool = True,
+             blacklist_flags=None) -> JokeResult:
     """
     Fetch a joke from JokeAPI.
     
+    Successful results are cached per request URL for ``CACHE_TTL`` seconds,
+    so repeat requests for the same category are served without an upstream
+    call. Errors are never cached. On a cache miss, concurrent calls for the
+    same URL share a single upstream request (see ``COALESCE_ENABLED``).
+    While the circuit breaker is open the call fails fast, serving the last
+    good joke for the URL if there is one. Within the category's stale
+    windows (see configure_stale()) an expired joke is served while it is
+    refreshed in the background, and the last good joke replaces an
+    upstream failure. Upstream calls use a timeout derived from recent
+    latency and are sent again if they are slower than usual (see
+    configure_timeouts() and configure_hedging()). Upstream calls are held
+    to JokeAPI's rate limit; a call the quota sheds gets the last good joke
+    for the URL, or a rate limit error (see configure_quota()). With
+    use_cache=False no last good joke is ever served. With the
+    "corpus" or "mmap" backend the joke is picked from the local dump
+    instead.
+    
     Args:
         category (str): Joke category (Any, Programming, Miscellaneous, Dark, etc.)
                        Defaults to "Any" for random category selection.
+        joke_type (str, optional): Filter by joke type ('single' or 'twopart').
+        use_cache (bool): Set to False to always make a separate upstream
+                          call, e.g. when collecting distinct jokes for the
+                          prefetch buffers.
+        blacklist_flags (iterable, optional): Flags to exclude, e.g. ['nsfw'].
     
     Returns:
-        dict: A dictionary containing:
+        JokeResult: An immutable result, readable as attributes or as a
+        read-only mapping (``result['joke']``), with the fields:
             - 'success' (bool): True if joke fetched successfully, False otherwise
             - 'joke_type' (str): Either 'single' or 'twopart'
             - 'joke' (str): The complete joke text (for single jokes)
@@ -79,115 +968,896 @@ def get_joke(category: str = "Any") -> dict:
         ... else:
         ...     print(f"Error: {result['error']}")
     """
+    if _corpus is not None:
+        return _corpus_joke(category, joke_type, blacklist_flags)
+    
+    # Construct API endpoint; the URL doubles as the cache key
+    api_url = build_joke_url(category, joke_type, blacklist_flags=blacklist_flags)
+    
+    # The last good joke is kept even when the response cache is off
+    fallback = use_cache
+    use_cache = use_cache and CACHE_ENABLED
+    
+    if use_cache:
+        cached = _response_cache.get(api_url)
+        if cached is not None:
+            return cached
+        stale = _stale_result(api_url, 'stale_while_revalidate')
+        if stale is not None:
+            STALE_SERVED.labels('revalidate').inc()
+            _start_refresh(api_url)
+            return stale
+    
+    if use_cache and COALESCE_ENABLED:
+        # Callers that accept a cached joke also accept a shared one
+        result = _inflight.do(api_url, lambda: _fetch_upstream(api_url, use_cache, fallback))
+    else:
+        result = _fetch_upstream(api_url, use_cache, fallback)
+    return result if result['success'] or not use_cache else _stale_if_error(api_url, result)
+
+
+def _fetch_upstream(api_url: str, use_cache: bool, fallback: bool) -> JokeResult:
+    """
+    Check the quota and circuit breaker, call JokeAPI and remember a good result.
+    
+    With fallback, a call that is shed, blocked by the open circuit or
+    answered with HTTP 429 gets the last good joke for api_url instead of
+    the failure.
+    """
+    if not _take_quota():
+        return _fallback_result(api_url, RATE_LIMITED_RESULT, 'rate_limited', fallback)
+    if not _circuit_breaker.allow_request():
+        _return_quota()
+        return _fallback_result(api_url, CIRCUIT_OPEN_RESULT, 'circuit_open', fallback)
+    
+    result = _fetch_hedged(api_url)
+    _remember(api_url, result, use_cache)
+    if result is RATE_LIMITED_RESULT:
+        return _fallback_result(api_url, result, 'rate_limited', fallback)
+    return result
+
+
+def _corpus_joke(category: str, joke_type: str = None, blacklist_flags=None) -> JokeResult:
+    """Pick a joke from the local corpus and shape it like an API result."""
+    payload = _corpus.random_payload(category, joke_type, blacklist_flags)
+    if payload is None:
+        return NO_MATCH_RESULT
+    return _parse_joke_data(payload)
+
+
+def _remember(api_url: str, result: JokeResult, use_cache: bool) -> None:
+    """Store a successful result for the cache, fallback and stale serving."""
+    if result['success']:
+        _last_good.set(api_url, (time.monotonic(), result))
+        if use_cache:
+            _response_cache.set(api_url, result)
+
+
+def _fallback_result(api_url: str, failure: JokeResult, reason: str, fallback: bool) -> JokeResult:
+    """
+    Fail fast: the last good joke for api_url, else failure.
+    
+    Only callers that accept a cached joke fall back. use_cache=False
+    callers (prefetch buffers, event streams) want a fresh joke, so they
+    get the failure.
+    """
+    entry = _last_good.get(api_url) if fallback else None
+    if entry is not None:
+        STALE_SERVED.labels(reason).inc()
+        return entry[1]
+    return failure
+
+
+def _take_quota() -> bool:
+    """Take a quota token for an upstream call, queueing up to QUOTA_MAX_WAIT."""
+    return not QUOTA_ENABLED or _quota.acquire(QUOTA_MAX_WAIT)
+
+
+async def _take_quota_async() -> bool:
+    """Async counterpart of _take_quota()."""
+    return not QUOTA_ENABLED or await _quota.acquire_async(QUOTA_MAX_WAIT)
+
+
+def _return_quota() -> None:
+    """Give back a token taken for a call that was not sent."""
+    if QUOTA_ENABLED:
+        _quota.release()
+
+
+def _sync_quota(status_code: int, headers) -> None:
+    """
+    Update the quota from an upstream response.
+    
+    The RateLimit-* headers keep the bucket at or below what upstream says
+    is left. An HTTP 429 pauses upstream calls for its Retry-After, else
+    until RateLimit-Reset, else for QUOTA_RETRY_AFTER seconds.
+    """
+    if not QUOTA_ENABLED:
+        return
+    limits = parse_rate_limit_headers(headers)
+    if status_code != 429:
+        limits['retry_after'] = None
+    elif limits['retry_after'] is None:
+        limits['retry_after'] = QUOTA_RETRY_AFTER if limits['reset'] is None else limits['reset']
+    if limits != NO_LIMITS:
+        _quota.sync(**limits)
+
+
+def _stale_result(api_url: str, kind: str):
+    """
+    The last good joke for api_url if it is within the kind window.
+    
+    Args:
+        api_url (str): Request URL, also the cache key.
+        kind (str): 'stale_while_revalidate' or 'stale_if_error'.
+    
+    Returns:
+        JokeResult or None: The joke, or None if there is none young enough.
+    """
+    window = stale_windows(_url_category(api_url))[kind]
+    if window <= 0:
+        return None
+    entry = _last_good.get(api_url)
+    if entry is None or time.monotonic() - entry[0] > CACHE_TTL + window:
+        return None
+    return entry[1]
+
+
+def _stale_if_error(api_url: str, failure: JokeResult) -> JokeResult:
+    """Replace an upstream failure with the last good joke, if allowed."""
+    stale = _stale_result(api_url, 'stale_if_error')
+    if stale is None:
+        return failure
+    STALE_SERVED.labels('error').inc()
+    return stale
+
+
+def _start_refresh(api_url: str, use_async: bool = False) -> None:
+    """
+    Refresh api_url in the background unless a refresh is already running.
+    
+    Sync callers refresh on the batch worker pool; async callers on the
+    service loop. Refreshes join any in-flight request for the URL.
+    """
+    with _refreshing_lock:
+        if api_url in _refreshing:
+            return
+        _refreshing.add(api_url)
     try:
-        # Construct API endpoint
-        api_url = build_joke_url(category)
-        
-        # Make request with timeout
-        response = requests.get(api_url, timeout=REQUEST_TIMEOUT)
+        if use_async:
+            future = asyncio.run_coroutine_threadsafe(_refresh_async(api_url), _get_async_loop())
+        else:
+            future = _get_batch_executor().submit(_refresh, api_url)
+    except RuntimeError:  # pool or loop shutting down
+        _refresh_done(api_url)
+        return
+    future.add_done_callback(lambda future: _refresh_done(api_url, future))
+
+
+def _refresh(api_url: str) -> JokeResult:
+    """Fetch api_url into the cache, sharing any in-flight request."""
+    return _inflight.do(api_url, lambda: _fetch_upstream(api_url, True, True))
+
+
+async def _refresh_async(api_url: str) -> JokeResult:
+    """Async counterpart of _refresh(); runs on the service loop."""
+    return await _inflight_async.do(api_url, lambda: _fetch_upstream_async(api_url, True, True))
+
+
+def _refresh_done(api_url: str, future=None) -> None:
+    """Count a finished refresh and allow the next one for api_url."""
+    with _refreshing_lock:
+        _refreshing.discard(api_url)
+    if future is not None and not future.cancelled():
+        ok = future.exception() is None and future.result()['success']
+        STALE_REFRESHES.labels('ok' if ok else 'failed').inc()
+
+
+def _record_outcome(outcome: str, status_code: int = None) -> None:
+    """Count the result of one upstream call and feed it to the circuit breaker."""
+    UPSTREAM_OUTCOMES.labels(outcome).inc()
+    _report_to_breaker(outcome, status_code)
+
+
+def _report_to_breaker(outcome: str, status_code: int = None) -> None:
+    """
+    Feed the result of one upstream call to the circuit breaker.
+    
+    Timeouts, connection and transport errors, unreadable bodies and HTTP
+    5xx count as failures. Other HTTP 4xx responses and JokeAPI error
+    payloads mean upstream is answering, so they count as successes. HTTP
+    429 ('rate_limited') is left to the quota and counts as neither; a
+    half-open circuit gets its trial slot back.
+    """
+    if outcome == 'rate_limited':
+        _circuit_breaker.release_trial()
+        return
+    if outcome == 'http':
+        failed = isinstance(status_code, int) and status_code >= 500
+    else:
+        failed = outcome != 'ok'
+    
+    if failed:
+        _circuit_breaker.record_failure()
+    else:
+        _circuit_breaker.record_success()
+
+
+class _AttemptOutcome:
+    """
+    Outcome recorder for one attempt of a hedged call.
+    
+    The outcome is counted at once, but only the attempt whose result the
+    caller gets reports it to the circuit breaker: a hedged call passed
+    allow_request() once, so it is judged once, and a slow loser that
+    times out after the winner answered is not a failure.
+    """
+    
+    __slots__ = ('outcome', 'status_code')
+    
+    def __init__(self):
+        self.outcome = None
+        self.status_code = None
+    
+    def __call__(self, outcome: str, status_code: int = None) -> None:
+        UPSTREAM_OUTCOMES.labels(outcome).inc()
+        self.outcome, self.status_code = outcome, status_code
+    
+    def report(self) -> None:
+        """Feed the recorded outcome to the circuit breaker."""
+        if self.outcome is not None:
+            _report_to_breaker(self.outcome, self.status_code)
+
+
+@functools.lru_cache(maxsize=64)
+def _http_error_result(status_code: int, reason: str) -> JokeResult:
+    """Shared failed result for an HTTP error status."""
+    return JokeResult.failure(f'HTTP Error {status_code}: {reason}')
+
+
+@functools.lru_cache(maxsize=64)
+def _api_error_result(message: str) -> JokeResult:
+    """Shared failed result for a JokeAPI error payload message."""
+    return JokeResult.failure(f"JokeAPI error: {message}")
+
+
+def _parse_joke_data(data: dict) -> JokeResult:
+    """
+    Convert a decoded JokeAPI payload into a result.
+    
+    Args:
+        data (dict): JSON body returned by JokeAPI.
+    
+    Returns:
+        JokeResult: Result in the shape documented on get_joke().
+    """
+    # Check if API returned an error
+    if data.get('error'):
+        return _api_error_result(str(data.get('message', 'Unknown error')))
+    
+    # Extract joke data based on type
+    if data.get('type', 'single') == 'single':
+        return JokeResult.single(data.get('joke', ''), data.get('category', ''))
+    # twopart
+    return JokeResult.twopart(data.get('setup', ''), data.get('delivery', ''), data.get('category', ''))
+
+
+def _parse_joke_batch(data: dict) -> list:
+    """
+    Convert a JokeAPI payload fetched with ``amount`` into a list of results.
+    
+    Args:
+        data (dict): JSON body returned by JokeAPI.
+    
+    Returns:
+        list: JokeResults in the shape documented on get_joke().
+    """
+    if data.get('error') or 'jokes' not in data:
+        return [_parse_joke_data(data)]
+    return [_parse_joke_data(joke) for joke in data['jokes']]
+
+
+@_timed_upstream
+def _fetch_joke(api_url: str, parse=_parse_joke_data, record=_record_outcome):
+    """
+    Request a joke from JokeAPI and convert the response into a result.
+    
+    Args:
+        api_url (str): Fully built JokeAPI URL.
+        parse (callable): Converts the decoded JSON body into the return value.
+        record (callable): Called with the outcome of the call (see
+                           _record_outcome()).
+    
+    Returns:
+        JokeResult: Result in the shape documented on get_joke(), or
+                    whatever parse returns on success.
+    """
+    try:
+        # Make request with the current timeout over the pooled session
+        response = get_session().get(api_url, timeout=request_timeout())
+        _sync_quota(response.status_code, response.headers)
         response.raise_for_status()
         
         # Parse JSON response
-        data = response.json()
-        
-        # Check if API returned an error
-        if data.get('error'):
-            return {
-                'success': False,
-                'joke_type': None,
-                'joke': None,
-                'setup': None,
-                'delivery': None,
-                'category': None,
-                'error': f"JokeAPI error: {data.get('message', 'Unknown error')}"
-            }
-        
-        # Extract joke data based on type
-        joke_type = data.get('type', 'single')
-        
-        if joke_type == 'single':
-            return {
-                'success': True,
-                'joke_type': 'single',
-                'joke': data.get('joke', ''),
-                'setup': None,
-                'delivery': None,
-                'category': data.get('category', ''),
-                'error': ''
-            }
-        else:  # twopart
-            return {
-                'success': True,
-                'joke_type': 'twopart',
-                'joke': None,
-                'setup': data.get('setup', ''),
-                'delivery': data.get('delivery', ''),
-                'category': data.get('category', ''),
-                'error': ''
-            }
+        result = parse(response.json())
+        record('ok')
+        return result
     
     except requests.exceptions.Timeout:
-        return {
-            'success': False,
-            'joke_type': None,
-            'joke': None,
-            'setup': None,
-            'delivery': None,
-            'category': None,
-            'error': 'Request timed out. The API is taking too long to respond.'
-        }
+        record('timeout')
+        return TIMEOUT_RESULT
     
     except requests.exceptions.ConnectionError:
-        return {
-            'success': False,
-            'joke_type': None,
-            'joke': None,
-            'setup': None,
-            'delivery': None,
-            'category': None,
-            'error': 'Connection failed. Please check your internet connection and try again.'
-        }
+        record('connection')
+        return CONNECTION_RESULT
     
     except requests.exceptions.HTTPError as e:
-        return {
-            'success': False,
-            'joke_type': None,
-            'joke': None,
-            'setup': None,
-            'delivery': None,
-            'category': None,
-            'error': f'HTTP Error {e.response.status_code}: {e.response.reason}'
-        }
+        if e.response.status_code == 429:
+            record('rate_limited')
+            return RATE_LIMITED_RESULT
+        record('http', e.response.status_code)
+        return _http_error_result(e.response.status_code, e.response.reason)
     
     except requests.exceptions.RequestException as e:
-        return {
-            'success': False,
-            'joke_type': None,
-            'joke': None,
-            'setup': None,
-            'delivery': None,
-            'category': None,
-            'error': f'Request error: {str(e)}'
-        }
+        record('request')
+        return JokeResult.failure(f'Request error: {str(e)}')
     
     except ValueError:  # JSON decode error
-        return {
-            'success': False,
-            'joke_type': None,
-            'joke': None,
-            'setup': None,
-            'delivery': None,
-            'category': None,
-            'error': 'Failed to parse API response. Invalid JSON received.'
-        }
+        record('json')
+        return INVALID_JSON_RESULT
     
     except Exception as e:
-        return {
-            'success': False,
-            'joke_type': None,
-            'joke': None,
-            'setup': None,
-            'delivery': None,
-            'category': None,
-            'error': f'Unexpected error: {str(e)}'
-        }
+        record('unexpected')
+        return JokeResult.failure(f'Unexpected error: {str(e)}')
+
+
+# ===== Hedged Requests =====
+
+_hedge_executor = None
+_hedge_lock = threading.Lock()
+_hedge_slots = threading.BoundedSemaphore(HEDGE_MAX_WORKERS)
+
+
+def _hedge_delay():
+    """
+    Seconds to wait before hedging the next call, or None if it cannot be hedged.
+    
+    Every hedgeable call earns hedge budget. Calls are not hedged while
+    hedging is off, before LATENCY_MIN_SAMPLES calls have been timed, or
+    while the circuit is not closed (a half-open circuit allows only its
+    trial calls).
+    """
+    if not HEDGE_ENABLED or _circuit_breaker.state != CLOSED:
+        return None
+    _hedge_budget.deposit()
+    latency = _latency.percentile(HEDGE_PERCENTILE)
+    if latency is None:
+        return None
+    return max(latency, HEDGE_MIN_DELAY)
+
+
+def _may_hedge() -> bool:
+    """
+    Spend hedge budget and a quota token on a hedge, if both are available.
+    
+    A hedge the quota refuses is not a shed request, so it is not counted
+    as one, and its budget is given back.
+    """
+    if not _hedge_budget.try_spend():
+        return False
+    if QUOTA_ENABLED and not _quota.try_acquire(shed=False):
+        _hedge_budget.refund()
+        return False
+    return True
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    """Return the pool running hedged sync calls, creating it on first use."""
+    global _hedge_executor
+    executor = _hedge_executor
+    if executor is None:
+        with _hedge_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(
+                    max_workers=HEDGE_MAX_WORKERS,
+                    thread_name_prefix='joke-hedge'
+                )
+            executor = _hedge_executor
+    return executor
+
+
+def close_hedge_executor() -> None:
+    """Shut down the hedged request pool."""
+    global _hedge_executor
+    with _hedge_lock:
+        executor, _hedge_executor = _hedge_executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit_attempt(api_url: str, record):
+    """Start one call on the hedge pool; None if every worker is busy."""
+    if not _hedge_slots.acquire(blocking=False):
+        return None
+    try:
+        future = _get_hedge_executor().submit(_fetch_joke, api_url, record=record)
+    except RuntimeError:  # pool shutting down
+        _hedge_slots.release()
+        return None
+    future.add_done_callback(lambda future: _hedge_slots.release())
+    return future
+
+
+def _submit_hedge(api_url: str, record):
+    """Start the hedge of a slow call; None if budget, quota or a worker is missing."""
+    if not _may_hedge():
+        return None
+    hedge = _submit_attempt(api_url, record)
+    if hedge is None:
+        _hedge_budget.refund()
+        _return_quota()
+    return hedge
+
+
+def _fetch_hedged(api_url: str) -> JokeResult:
+    """
+    Call JokeAPI, sending the request again if the first call is slow.
+    
+    Once the latency window is warm the call runs on the hedge pool while
+    the caller waits up to the HEDGE_PERCENTILE latency. If it has not
+    answered by then and the hedge budget allows, a second identical call
+    is sent and the first successful answer wins. A blocking call cannot be
+    interrupted, so the loser finishes in the background and its result is
+    dropped. Only the returned result is reported to the circuit breaker
+    (see _AttemptOutcome). Calls that cannot be hedged run on the caller's
+    thread.
+    """
+    delay = _hedge_delay()
+    primary_outcome = _AttemptOutcome()
+    primary = _submit_attempt(api_url, primary_outcome) if delay is not None else None
+    if primary is None:
+        return _fetch_joke(api_url)
+    outcomes = {primary: primary_outcome}
+    try:
+        result = primary.result(timeout=delay)
+    except FutureTimeoutError:
+        pass
+    else:
+        primary_outcome.report()
+        return result
+    
+    hedge_outcome = _AttemptOutcome()
+    hedge = _submit_hedge(api_url, hedge_outcome)
+    if hedge is None:
+        HEDGED_REQUESTS.labels('skipped').inc()
+        result = primary.result()
+        primary_outcome.report()
+        return result
+    HEDGED_REQUESTS.labels('sent').inc()
+    outcomes[hedge] = hedge_outcome
+    
+    pending, result = set(outcomes), None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            result, last = future.result(), future
+            if result['success']:
+                if future is hedge:
+                    HEDGED_REQUESTS.labels('won').inc()
+                outcomes[future].report()
+                return result
+    outcomes[last].report()
+    return result  # both failed
+
+
+async def _fetch_hedged_async(api_url: str) -> JokeResult:
+    """
+    Async counterpart of _fetch_hedged(); runs on the service loop.
+    
+    Both calls are tasks on the service loop, so the losing call is
+    cancelled as soon as the other answers.
+    """
+    delay = _hedge_delay()
+    if delay is None:
+        return await _fetch_joke_async(api_url)
+    
+    primary_outcome = _AttemptOutcome()
+    primary = asyncio.ensure_future(_fetch_joke_async(api_url, record=primary_outcome))
+    outcomes = {primary: primary_outcome}
+    try:
+        done, _ = await asyncio.wait([primary], timeout=delay)
+        if done:
+            primary_outcome.report()
+            return primary.result()
+        if not _may_hedge():
+            HEDGED_REQUESTS.labels('skipped').inc()
+            result = await primary
+            primary_outcome.report()
+            return result
+        hedge_outcome = _AttemptOutcome()
+        hedge = asyncio.ensure_future(_fetch_joke_async(api_url, record=hedge_outcome))
+        outcomes[hedge] = hedge_outcome
+        HEDGED_REQUESTS.labels('sent').inc()
+        
+        pending, result = set(outcomes), None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result, last = task.result(), task
+                if result['success']:
+                    if task is hedge:
+                        HEDGED_REQUESTS.labels('won').inc()
+                    outcomes[task].report()
+                    return result
+        outcomes[last].report()
+        return result  # both failed
+    finally:
+        for task in outcomes:
+            task.cancel()
+
+
+# ===== Batch API =====
+
+_batch_executor = None
+_batch_lock = threading.Lock()
+
+
+def _get_batch_executor() -> ThreadPoolExecutor:
+    """Return the pool shared by batches and stale refreshes, creating it on first use."""
+    global _batch_executor
+    executor = _batch_executor
+    if executor is None:
+        with _batch_lock:
+            if _batch_executor is None:
+                _batch_executor = ThreadPoolExecutor(
+                    max_workers=BATCH_MAX_WORKERS,
+                    thread_name_prefix='joke-batch'
+                )
+            executor = _batch_executor
+    return executor
+
+
+def close_batch_executor() -> None:
+    """Shut down the batch worker pool."""
+    global _batch_executor
+    with _batch_lock:
+        executor, _batch_executor = _batch_executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _plan_batch(categories: list, count: int) -> list:
+    """
+    Split count jokes across categories into upstream requests.
+    
+    Jokes are dealt round-robin across categories, then each category's
+    share is split into requests of at most MAX_AMOUNT jokes.
+    
+    Returns:
+        list: (category, amount) tuples, one per upstream request.
+    """
+    shares = [count // len(categories)] * len(categories)
+    for i in range(count % len(categories)):
+        shares[i] += 1
+    
+    plan = []
+    for category, share in zip(categories, shares):
+        while share > 0:
+            amount = min(share, MAX_AMOUNT)
+            plan.append((category, amount))
+            share -= amount
+    return plan
+
+
+def _fetch_joke_chunk(category: str, amount: int, joke_type: str = None) -> list:
+    """Fetch up to amount jokes for one category with a single request."""
+    if _corpus is not None:
+        return [_corpus_joke(category, joke_type) for _ in range(amount)]
+    if not _take_quota():
+        return [RATE_LIMITED_RESULT]
+    if not _circuit_breaker.allow_request():
+        _return_quota()
+        return [CIRCUIT_OPEN_RESULT]
+    api_url = build_joke_url(category, joke_type, amount)
+    results = _fetch_joke(api_url, parse=_parse_joke_batch)
+    return results if isinstance(results, list) else [results]
+
+
+def iter_jokes_batch(categories: list, count: int, joke_type: str = None):
+    """
+    Fetch count jokes across categories, yielding results as they arrive.
+    
+    Upstream requests run concurrently on a bounded, shared worker pool and
+    use JokeAPI's ``amount`` parameter, so the batch takes roughly one round
+    trip instead of count. Batches bypass the response cache.
+    
+    Args:
+        categories (list): Categories to draw jokes from.
+        count (int): Total number of jokes wanted (1 to BATCH_MAX_COUNT).
+        joke_type (str, optional): Filter by joke type ('single' or 'twopart').
+    
+    Returns:
+        iterator: JokeResults in the shape documented on get_joke(), in
+                  completion order. A failed upstream request yields one
+                  error result.
+    
+    Raises:
+        ValueError: If categories is empty or count is out of range.
+    """
+    if not categories:
+        raise ValueError("At least one category is required")
+    if not 1 <= count <= BATCH_MAX_COUNT:
+        raise ValueError(f"count must be between 1 and {BATCH_MAX_COUNT}")
+    
+    # Validate and submit eagerly so the fan-out starts before iteration
+    executor = _get_batch_executor()
+    futures = [
+        executor.submit(_fetch_joke_chunk, category, amount, joke_type)
+        for category, amount in _plan_batch(categories, count)
+    ]
+    return _iter_completed(futures)
+
+
+def _iter_completed(futures: list):
+    """Yield chunk results in completion order; cancel leftovers on close."""
+    try:
+        for future in as_completed(futures):
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def get_jokes_batch(categories: list, count: int, joke_type: str = None) -> list:
+    """
+    Fetch count jokes across categories in about one upstream round trip.
+    
+    Args:
+        categories (list): Categories to draw jokes from.
+        count (int): Total number of jokes wanted (1 to BATCH_MAX_COUNT).
+        joke_type (str, optional): Filter by joke type ('single' or 'twopart').
+    
+    Returns:
+        list: JokeResults in completion order.
+    
+    Example:
+        >>> jokes = get_jokes_batch(["Programming", "Pun"], 10)
+        >>> sum(joke['success'] for joke in jokes)
+        10
+    """
+    return list(iter_jokes_batch(categories, count, joke_type))
+
+
+# ===== Async API =====
+
+_async_loop = None
+_async_thread = None
+_async_client = None
+_async_lock = threading.Lock()
+
+
+def _get_async_loop() -> asyncio.AbstractEventLoop:
+    """
+    Return the service event loop, starting its thread on first use.
+    
+    All async upstream calls run on this one loop so they share a single
+    httpx connection pool, whichever loop the caller is running on (Flask
+    runs each async view on its own short-lived loop).
+    """
+    global _async_loop, _async_thread
+    loop = _async_loop
+    if loop is None:
+        with _async_lock:
+            if _async_loop is None:
+                _async_loop = asyncio.new_event_loop()
+                _async_thread = threading.Thread(
+                    target=_async_loop.run_forever,
+                    name='joke-service-loop',
+                    daemon=True
+                )
+                _async_thread.start()
+            loop = _async_loop
+    return loop
+
+
+def _get_async_client():
+    """Return the shared httpx client. Must be called on the service loop."""
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=ASYNC_MAX_KEEPALIVE
+            ),
+            timeout=REQUEST_TIMEOUT
+        )
+    return _async_client
+
+
+async def _run_on_service_loop(coro):
+    """Await coro on the service loop from any event loop."""
+    loop = _get_async_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+def close_async_client() -> None:
+    """Close the async connection pool and stop the service loop."""
+    global _async_loop, _async_thread
+    with _async_lock:
+        loop, _async_loop = _async_loop, None
+        thread, _async_thread = _async_thread, None
+    if loop is None:
+        return
+    
+    async def _shutdown():
+        global _async_client
+        _inflight_async.clear()
+        client, _async_client = _async_client, None
+        if client is not None:
+            await client.aclose()
+    
+    try:
+        asyncio.run_coroutine_threadsafe(_shutdown(), loop).result(timeout=REQUEST_TIMEOUT)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=REQUEST_TIMEOUT)
+        if not loop.is_running():
+            loop.close()
+
+
+async def get_joke_async(category: str = "Any", joke_type: str = None,
+                         use_cache: bool = True, blacklist_flags=None) -> JokeResult:
+    """
+    Fetch a joke from JokeAPI without blocking the calling event loop.
+    
+    Shares the response cache with get_joke() and returns the same
+    JokeResult. Concurrent async calls for the same URL are coalesced on the
+    service loop into one upstream request. Upstream calls go through one
+    pooled httpx.AsyncClient, so a single process can keep hundreds of
+    requests in flight. Without httpx installed the blocking client is run
+    on a worker thread instead.
+    
+    Args:
+        category (str): Joke category. Defaults to "Any".
+        joke_type (str, optional): Filter by joke type ('single' or 'twopart').
+        use_cache (bool): Set to False to always go upstream.
+        blacklist_flags (iterable, optional): Flags to exclude, e.g. ['nsfw'].
+    
+    Returns:
+        JokeResult: Result in the shape documented on get_joke().
+    
+    Example:
+        >>> result = await get_joke_async("Programming")
+        >>> result['success']
+        True
+    """
+    if _corpus is not None:
+        return _corpus_joke(category, joke_type, blacklist_flags)
+    
+    api_url = build_joke_url(category, joke_type, blacklist_flags=blacklist_flags)
+    fallback = use_cache
+    use_cache = use_cache and CACHE_ENABLED
+    
+    if use_cache:
+        cached = _response_cache.get(api_url)
+        if cached is not None:
+            return cached
+        stale = _stale_result(api_url, 'stale_while_revalidate')
+        if stale is not None:
+            STALE_SERVED.labels('revalidate').inc()
+            _start_refresh(api_url, use_async=True)
+            return stale
+    
+    if use_cache and COALESCE_ENABLED:
+        result = await _run_on_service_loop(_inflight_async.do(
+            api_url, lambda: _fetch_upstream_async(api_url, use_cache, fallback)
+        ))
+    else:
+        result = await _run_on_service_loop(_fetch_upstream_async(api_url, use_cache, fallback))
+    return result if result['success'] or not use_cache else _stale_if_error(api_url, result)
+
+
+async def _fetch_upstream_async(api_url: str, use_cache: bool, fallback: bool) -> JokeResult:
+    """Async counterpart of _fetch_upstream(); runs on the service loop."""
+    if not await _take_quota_async():
+        return _fallback_result(api_url, RATE_LIMITED_RESULT, 'rate_limited', fallback)
+    if not _circuit_breaker.allow_request():
+        _return_quota()
+        return _fallback_result(api_url, CIRCUIT_OPEN_RESULT, 'circuit_open', fallback)
+    
+    result = await _fetch_hedged_async(api_url)
+    _remember(api_url, result, use_cache)
+    if result is RATE_LIMITED_RESULT:
+        return _fallback_result(api_url, result, 'rate_limited', fallback)
+    return result
+
+
+@_timed_upstream
+async def _fetch_joke_async(api_url: str, record=_record_outcome) -> JokeResult:
+    """
+    Async counterpart of _fetch_joke(); runs on the service loop.
+    
+    Args:
+        api_url (str): Fully built JokeAPI URL.
+        record (callable): Called with the outcome of the call.
+    
+    Returns:
+        JokeResult: Result in the shape documented on get_joke().
+    """
+    if httpx is None:
+        # Unwrapped: this call is already being timed
+        return await asyncio.to_thread(_fetch_joke.__wrapped__, api_url, record=record)
+    
+    try:
+        response = await _get_async_client().get(api_url, timeout=request_timeout())
+        _sync_quota(response.status_code, response.headers)
+        response.raise_for_status()
+        result = _parse_joke_data(response.json())
+        record('ok')
+        return result
+    
+    except httpx.TimeoutException:
+        record('timeout')
+        return TIMEOUT_RESULT
+    
+    except httpx.NetworkError:
+        record('connection')
+        return CONNECTION_RESULT
+    
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 429:
+            record('rate_limited')
+            return RATE_LIMITED_RESULT
+        record('http', e.response.status_code)
+        return _http_error_result(e.response.status_code, e.response.reason_phrase)
+    
+    except httpx.HTTPError as e:
+        record('request')
+        return JokeResult.failure(f'Request error: {str(e)}')
+    
+    except ValueError:  # JSON decode error
+        record('json')
+        return INVALID_JSON_RESULT
+    
+    except Exception as e:
+        record('unexpected')
+        return JokeResult.failure(f'Unexpected error: {str(e)}')
+
+
+# ===== Process Forking =====
+
+def _reset_after_fork() -> None:
+    """
+    Drop the connections, pools and threads inherited from the parent process.
+    
+    A pre-forking server (e.g. gunicorn with ``preload_app``) forks workers
+    from a master that has imported, and may have warmed up, the app. Only
+    the forking thread survives in the child, so the parent's pool threads,
+    service loop and in-flight calls would never finish there; each worker
+    starts its own on first use instead. Caches, latency samples, the quota
+    and circuit state are kept, but their locks are replaced: one of those
+    threads may have held a lock when the parent forked, and it would
+    never be released in the child.
+    """
+    global _session, _session_lock, _pool_counters_lock, _batch_executor, _batch_lock
+    global _hedge_executor, _hedge_lock, _hedge_slots
+    global _async_loop, _async_thread, _async_client, _async_lock
+    global _inflight, _inflight_async, _refreshing_lock
+    for shared in (_response_cache, _last_good, _latency, _hedge_budget, _quota, _circuit_breaker):
+        shared._after_fork()
+    _session, _session_lock = None, threading.Lock()
+    _pool_counters_lock = threading.Lock()
+    _batch_executor, _batch_lock = None, threading.Lock()
+    _hedge_executor, _hedge_lock = None, threading.Lock()
+    _hedge_slots = threading.BoundedSemaphore(HEDGE_MAX_WORKERS)
+    _async_loop = _async_thread = _async_client = None
+    _async_lock = threading.Lock()
+    _inflight, _inflight_async = SingleFlight(), AsyncSingleFlight()
+    _refreshing.clear()
+    _refreshing_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):  # POSIX only
+    os.register_at_fork(after_in_child=_reset_after_fork)
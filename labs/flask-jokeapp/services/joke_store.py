@@ -0,0 +1,276 @@
+"""
+Memory-Mapped Joke Store Module
+
+A compact, read-only on-disk joke format that is opened with ``mmap``. Every
+worker process maps the same file, so the jokes occupy one copy of physical
+memory (the page cache) no matter how many workers run, and a joke is only
+decoded when it is picked.
+
+File layout (all integers little-endian):
+
+    header      magic b"JKST", version, joke/category/group counts and the
+                offsets of the sections below
+    categories  for each category: u16 byte length + UTF-8 name
+    groups      one entry per (category, type): category id, type id,
+                first record index, record count
+    records     one fixed-size entry per joke, sorted by (category, type):
+                id, type id, flag mask, category id and the offset/length of
+                its text fields in the string blob
+    strings     packed UTF-8 text of every joke
+
+Build a store from a JSONL or SQLite corpus with:
+
+    python -m services.joke_store data/jokes.jsonl data/jokes.jokestore
+"""
+
+import argparse
+import mmap
+import random
+import struct
+from pathlib import Path
+
+from services.corpus import FLAG_NAMES, JOKE_TYPES, flags_to_mask, load_jokes, normalize_category
+
+MAGIC = b"JKST"
+VERSION = 1
+
+# magic, version, reserved, joke_count, category_count, group_count,
+# groups_offset, records_offset, strings_offset
+HEADER = struct.Struct('<4sHHIIIIII')
+# category_id, type_id, reserved, first, count
+GROUP = struct.Struct('<HBBII')
+# joke id, type_id, flag mask, category_id, text1 offset/length, text2 offset/length
+RECORD = struct.Struct('<IBBHIIII')
+
+# Random probes before falling back to a scan when a blacklist filter rejects
+# most of the candidates
+MAX_PROBES = 16
+
+
+def build_store(jokes: list, path) -> int:
+    """
+    Compile joke payloads into a store file.
+
+    Args:
+        jokes (list): JokeAPI joke payloads.
+        path (str | Path): Output file.
+
+    Returns:
+        int: Number of jokes written.
+    """
+    categories = sorted({joke['category'] for joke in jokes})
+    category_ids = {name: i for i, name in enumerate(categories)}
+    ordered = sorted(
+        jokes, key=lambda joke: (category_ids[joke['category']], JOKE_TYPES.index(joke['type']))
+    )
+
+    blob = bytearray()
+
+    def add_text(text):
+        data = (text or '').encode('utf-8')
+        offset = len(blob)
+        blob.extend(data)
+        return offset, len(data)
+
+    records = bytearray()
+    groups = []
+    for index, joke in enumerate(ordered):
+        type_id = JOKE_TYPES.index(joke['type'])
+        category_id = category_ids[joke['category']]
+        if joke['type'] == 'single':
+            text1, text2 = add_text(joke.get('joke')), (0, 0)
+        else:
+            text1, text2 = add_text(joke.get('setup')), add_text(joke.get('delivery'))
+        records += RECORD.pack(
+            int(joke.get('id', index)), type_id, flags_to_mask(joke.get('flags', {})),
+            category_id, *text1, *text2
+        )
+        if groups and groups[-1][:2] == [category_id, type_id]:
+            groups[-1][3] += 1
+        else:
+            groups.append([category_id, type_id, index, 1])
+
+    category_table = bytearray()
+    for name in categories:
+        encoded = name.encode('utf-8')
+        category_table += struct.pack('<H', len(encoded)) + encoded
+
+    groups_offset = HEADER.size + len(category_table)
+    records_offset = groups_offset + GROUP.size * len(groups)
+    strings_offset = records_offset + len(records)
+
+    with open(path, 'wb') as store_file:
+        store_file.write(HEADER.pack(
+            MAGIC, VERSION, 0, len(ordered), len(categories), len(groups),
+            groups_offset, records_offset, strings_offset
+        ))
+        store_file.write(category_table)
+        for category_id, type_id, first, count in groups:
+            store_file.write(GROUP.pack(category_id, type_id, 0, first, count))
+        store_file.write(records)
+        store_file.write(blob)
+    return len(ordered)
+
+
+class JokeStore:
+    """
+    Read-only view over a memory-mapped store file.
+
+    Offers the same ``random_payload()`` interface as JokeCorpus, so the
+    joke service can use either as its local backend.
+
+    Example:
+        >>> store = JokeStore.open("data/jokes.jokestore")
+        >>> store.random_payload("Pun")['category']
+        'Pun'
+    """
+
+    def __init__(self, buffer):
+        """
+        Args:
+            buffer: A bytes-like object (normally an mmap) holding a store file.
+        """
+        magic, version, _, joke_count, category_count, group_count, \
+            groups_offset, records_offset, strings_offset = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a joke store file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported joke store version: {version}")
+
+        self._buffer = buffer
+        self._joke_count = joke_count
+        self._records_offset = records_offset
+        self._strings_offset = strings_offset
+
+        offset = HEADER.size
+        self.categories = []
+        for _ in range(category_count):
+            (length,) = struct.unpack_from('<H', buffer, offset)
+            self.categories.append(bytes(buffer[offset + 2:offset + 2 + length]).decode('utf-8'))
+            offset += 2 + length
+        self._category_ids = {name: i for i, name in enumerate(self.categories)}
+
+        # (category_id, type_id) -> (first, count); at most 2 per category
+        self._groups = {}
+        for i in range(group_count):
+            category_id, type_id, _, first, count = GROUP.unpack_from(
+                buffer, groups_offset + i * GROUP.size
+            )
+            self._groups[(category_id, type_id)] = (first, count)
+
+    @classmethod
+    def open(cls, path) -> 'JokeStore':
+        """
+        Memory-map a store file.
+
+        Args:
+            path (str | Path): Store file written by build_store().
+
+        Returns:
+            JokeStore: The opened store.
+        """
+        with open(path, 'rb') as store_file:
+            return cls(mmap.mmap(store_file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def close(self) -> None:
+        """Unmap the file."""
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    def __len__(self) -> int:
+        return self._joke_count
+
+    def random_payload(self, category: str = 'Any', joke_type: str = None,
+                       blacklist_flags=None):
+        """
+        Pick and decode a random joke matching the filter.
+
+        Args:
+            category (str): Category name, "Any", or comma-separated names.
+            joke_type (str, optional): 'single' or 'twopart'.
+            blacklist_flags (iterable, optional): Flag names the joke must not have.
+
+        Returns:
+            dict or None: A JokeAPI joke payload, or None if nothing matches.
+        """
+        ranges = self._ranges(category, joke_type)
+        total = sum(count for _, count in ranges)
+        if not total:
+            return None
+
+        blacklist = flags_to_mask(blacklist_flags)
+        for _ in range(MAX_PROBES if blacklist else 1):
+            index = self._nth(ranges, random.randrange(total))
+            if not self._record(index)[2] & blacklist:
+                return self._decode(index)
+
+        matches = [
+            index
+            for first, count in ranges
+            for index in range(first, first + count)
+            if not self._record(index)[2] & blacklist
+        ]
+        return self._decode(random.choice(matches)) if matches else None
+
+    def _ranges(self, category: str, joke_type: str) -> list:
+        """Return (first, count) record ranges for a category/type filter."""
+        names = [normalize_category(name.strip()) for name in category.split(',') if name.strip()]
+        if 'Any' in names:
+            category_ids = range(len(self.categories))
+        else:
+            category_ids = [self._category_ids[name] for name in names if name in self._category_ids]
+        type_ids = [JOKE_TYPES.index(joke_type)] if joke_type in JOKE_TYPES else range(len(JOKE_TYPES))
+        return [
+            self._groups[key]
+            for key in ((c, t) for c in category_ids for t in type_ids)
+            if key in self._groups
+        ]
+
+    @staticmethod
+    def _nth(ranges: list, n: int) -> int:
+        """Map the n-th candidate across ranges onto a record index."""
+        for first, count in ranges:
+            if n < count:
+                return first + n
+            n -= count
+        raise IndexError(n)
+
+    def _record(self, index: int) -> tuple:
+        return RECORD.unpack_from(self._buffer, self._records_offset + index * RECORD.size)
+
+    def _text(self, offset: int, length: int) -> str:
+        start = self._strings_offset + offset
+        return str(self._buffer[start:start + length], 'utf-8')
+
+    def _decode(self, index: int) -> dict:
+        """Build the JokeAPI payload for one record."""
+        joke_id, type_id, mask, category_id, off1, len1, off2, len2 = self._record(index)
+        payload = {
+            'error': False,
+            'id': joke_id,
+            'category': self.categories[category_id],
+            'type': JOKE_TYPES[type_id],
+            'flags': {name: bool(mask & (1 << i)) for i, name in enumerate(FLAG_NAMES)}
+        }
+        if type_id == 0:
+            payload['joke'] = self._text(off1, len1)
+        else:
+            payload['setup'] = self._text(off1, len1)
+            payload['delivery'] = self._text(off2, len2)
+        return payload
+
+
+def main(argv=None) -> None:
+    """Command-line entry point: compile a JSONL/SQLite corpus into a store."""
+    parser = argparse.ArgumentParser(description="Build a memory-mapped joke store.")
+    parser.add_argument('source', help="JSONL or SQLite joke corpus")
+    parser.add_argument('output', help="Store file to write")
+    args = parser.parse_args(argv)
+
+    count = build_store(load_jokes(args.source), args.output)
+    size = Path(args.output).stat().st_size
+    print(f"Wrote {count} jokes to {args.output} ({size} bytes)")
+
+
+if __name__ == '__main__':
+    main()
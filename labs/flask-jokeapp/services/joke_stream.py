@@ -0,0 +1,363 @@
+"""
+Joke Stream Module
+
+A continuous feed of jokes for Server-Sent Events clients (kiosks,
+dashboards) that would otherwise poll ``/joke``. One producer thread per
+category fetches a joke every ``interval`` seconds and encodes it once; every
+subscriber of that category reads the same encoded event, so N open streams
+cost one upstream call per tick instead of N.
+
+Producers never wait for subscribers. Each feed keeps the last ``backlog``
+events; a subscriber that falls further behind (a slow client whose socket
+is full) skips ahead to the newest events, and the skipped ones are counted
+as dropped. Memory per feed is therefore bounded however many subscribers
+there are and however slowly they read.
+"""
+
+import atexit
+import os
+import threading
+import time
+import weakref
+from collections import deque
+
+from services import metrics
+
+STREAM_INTERVAL = 5.0          # seconds between jokes on a feed
+STREAM_MAX_SUBSCRIBERS = 100   # open streams per process; each holds a server thread
+STREAM_BACKLOG = 16            # events kept per feed for subscribers that fall behind
+STREAM_HEARTBEAT = 15.0        # seconds of silence before a keep-alive comment
+STREAM_RETRY = 3000            # reconnect delay suggested to EventSource clients, in ms
+
+# Every JokeStream, so forked children can drop the parent's feeds and open
+# streams are ended at exit
+_streams = weakref.WeakSet()
+
+STREAM_SUBSCRIBERS = metrics.Gauge(
+    'jokeapp_stream_subscribers', 'Open joke event streams'
+)
+STREAM_EVENTS = metrics.Counter(
+    'jokeapp_stream_events', 'Joke stream events published, delivered, or dropped for slow subscribers',
+    ['result']
+)
+STREAM_REJECTED = metrics.Counter(
+    'jokeapp_stream_rejected', 'Joke streams refused because the subscriber limit was reached'
+)
+
+
+def format_event(data: str, event: str = None, event_id=None) -> str:
+    """
+    Format one Server-Sent Events message.
+
+    Args:
+        data (str): Event payload; each line becomes a ``data:`` field.
+        event (str, optional): Event type.
+        event_id (optional): Event id, sent as the ``id:`` field.
+
+    Returns:
+        str: The message, ending with the blank line that dispatches it.
+
+    Example:
+        >>> format_event('{"joke": "..."}', event='joke', event_id=7)
+        'id: 7\\nevent: joke\\ndata: {"joke": "..."}\\n\\n'
+    """
+    fields = []
+    if event_id is not None:
+        fields.append(f"id: {event_id}\n")
+    if event:
+        fields.append(f"event: {event}\n")
+    fields.extend(f"data: {line}\n" for line in data.split('\n'))
+    return ''.join(fields) + '\n'
+
+
+class _Feed:
+    """Events of one category and the producer thread that publishes them."""
+
+    def __init__(self, category: str, backlog: int, lock: threading.Lock):
+        self.category = category
+        self.events = deque(maxlen=backlog)  # (seq, formatted event)
+        self.seq = 0
+        self.published_at = None
+        self.subscribers = 0
+        self.closed = False
+        self.changed = threading.Condition(lock)
+        self.thread = None
+
+
+class JokeStream:
+    """
+    Shared per-category joke feeds for Server-Sent Events subscribers.
+
+    ``subscribe()`` starts the category's producer on first use; the
+    producer stops once its last subscriber leaves. New subscribers get the
+    newest event at once instead of waiting for the next tick. At most
+    ``max_subscribers`` streams are open at a time; further subscribe calls
+    return None.
+
+    Example:
+        >>> stream = JokeStream(fetch=get_joke, encode=json.dumps, interval=5)
+        >>> subscription = stream.subscribe("Programming")
+        >>> for chunk in subscription.events():
+        ...     socket.send(chunk.encode())
+    """
+
+    def __init__(self, fetch, encode, interval: float = STREAM_INTERVAL,
+                 max_subscribers: int = STREAM_MAX_SUBSCRIBERS, backlog: int = STREAM_BACKLOG,
+                 heartbeat: float = STREAM_HEARTBEAT, retry: int = STREAM_RETRY,
+                 timer=time.monotonic):
+        """
+        Args:
+            fetch (callable): Called as ``fetch(category)`` once per tick;
+                              returns a JokeResult in the get_joke() shape.
+            encode (callable): Serialises a result to a one-line JSON string.
+            interval (float): Seconds between jokes on a feed.
+            max_subscribers (int): Most streams open at once.
+            backlog (int): Events kept per feed for subscribers that fall behind.
+            heartbeat (float): Seconds of silence before a keep-alive comment.
+            retry (int): Reconnect delay suggested to clients, in milliseconds.
+            timer (callable): Monotonic clock, overridable for tests.
+        """
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        if max_subscribers < 1:
+            raise ValueError("max_subscribers must be at least 1")
+        if backlog < 1:
+            raise ValueError("backlog must be at least 1")
+        self.fetch = fetch
+        self.encode = encode
+        self.interval = interval
+        self.max_subscribers = max_subscribers
+        self.backlog = backlog
+        self.heartbeat = heartbeat
+        self.retry = retry
+        self._timer = timer
+        self._lock = threading.Lock()
+        self._feeds = {}
+        self._subscribers = 0
+        self.published = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.fetch_errors = 0
+        _streams.add(self)
+
+    def subscribe(self, category: str):
+        """
+        Open a stream of jokes for category.
+
+        Args:
+            category (str): Joke category.
+
+        Returns:
+            Subscription or None: The new subscription, or None if
+                                  max_subscribers streams are already open.
+        """
+        with self._lock:
+            if self._subscribers >= self.max_subscribers:
+                self.rejected += 1
+                STREAM_REJECTED.inc()
+                return None
+            feed = self._feeds.get(category)
+            if feed is None:
+                feed = self._feeds[category] = _Feed(category, self.backlog, self._lock)
+            feed.subscribers += 1
+            self._subscribers += 1
+            if feed.thread is None:
+                feed.thread = threading.Thread(
+                    target=self._produce, args=(feed,), name=f'joke-stream-{category}', daemon=True
+                )
+                feed.thread.start()
+            # Start just before the newest event, so it is delivered at once
+            last_seq = feed.events[-1][0] - 1 if feed.events else feed.seq
+        STREAM_SUBSCRIBERS.inc()
+        return Subscription(self, feed, last_seq)
+
+    def _unsubscribe(self, feed: _Feed) -> None:
+        with self._lock:
+            feed.subscribers -= 1
+            self._subscribers -= 1
+            if not feed.subscribers:
+                feed.changed.notify_all()  # let the producer see it is no longer needed
+        STREAM_SUBSCRIBERS.dec()
+
+    def stop(self) -> None:
+        """End every open stream and stop the producers."""
+        with self._lock:
+            feeds, self._feeds = list(self._feeds.values()), {}
+            for feed in feeds:
+                feed.closed = True
+                feed.changed.notify_all()
+
+    def _after_fork(self) -> None:
+        """
+        Forget the feeds inherited from the parent process.
+
+        Their producer threads did not survive the fork, and the parent's
+        subscribers are not served by this process.
+        """
+        self._lock = threading.Lock()
+        self._feeds = {}
+        self._subscribers = 0
+
+    def stats(self) -> dict:
+        """
+        Report open streams and counters.
+
+        Returns:
+            dict: 'subscribers', 'max_subscribers', 'interval', 'published',
+                  'dropped', 'rejected', 'fetch_errors' and 'feeds' mapping
+                  each active category to its 'subscribers' and
+                  'last_event_age' in seconds.
+        """
+        now = self._timer()
+        with self._lock:
+            feeds = {
+                category: {
+                    'subscribers': feed.subscribers,
+                    'last_event_age': None if feed.published_at is None
+                    else round(now - feed.published_at, 3)
+                }
+                for category, feed in self._feeds.items()
+            }
+            return {
+                'subscribers': self._subscribers,
+                'max_subscribers': self.max_subscribers,
+                'interval': self.interval,
+                'published': self.published,
+                'dropped': self.dropped,
+                'rejected': self.rejected,
+                'fetch_errors': self.fetch_errors,
+                'feeds': feeds
+            }
+
+    def _produce(self, feed: _Feed) -> None:
+        """
+        Publish a joke every interval until the feed has no subscribers.
+
+        A fetch that fails or raises counts as a fetch error and is retried
+        on the next tick. If the producer dies anyway, its feed is closed
+        and retired, so the next subscriber starts a new one.
+        """
+        try:
+            while True:
+                with self._lock:
+                    if feed.closed or not feed.subscribers:
+                        self._retire(feed)
+                        return
+                started = self._timer()
+                try:
+                    result = self.fetch(feed.category)
+                    data = self.encode(result) if result.get('success') else None
+                except Exception:
+                    data = None
+                if data is not None:
+                    self._publish(feed, data)
+                else:
+                    with self._lock:
+                        self.fetch_errors += 1
+                with self._lock:
+                    feed.changed.wait_for(
+                        lambda: feed.closed or not feed.subscribers,
+                        timeout=max(started + self.interval - self._timer(), 0)
+                    )
+        finally:
+            with self._lock:
+                if feed.thread is not None:  # left by an exception
+                    feed.closed = True
+                    feed.changed.notify_all()
+                    self._retire(feed)
+
+    def _publish(self, feed: _Feed, data: str) -> None:
+        with self._lock:
+            feed.seq += 1
+            feed.events.append((feed.seq, format_event(data, event='joke', event_id=feed.seq)))
+            feed.published_at = self._timer()
+            self.published += 1
+            feed.changed.notify_all()
+        STREAM_EVENTS.labels('published').inc()
+
+    def _retire(self, feed: _Feed) -> None:
+        """Forget a feed whose producer is exiting (lock held)."""
+        feed.thread = None
+        if self._feeds.get(feed.category) is feed:
+            del self._feeds[feed.category]
+
+
+class Subscription:
+    """One client's view of a feed; iterate ``events()`` to stream it."""
+
+    def __init__(self, stream: JokeStream, feed: _Feed, last_seq: int):
+        self._stream = stream
+        self._feed = feed
+        self.last_seq = last_seq
+        self.delivered = 0
+        self.dropped = 0
+        self._closed = False
+
+    def next_events(self, timeout: float):
+        """
+        Wait up to timeout seconds for events this subscriber has not seen.
+
+        Events that fell out of the feed's backlog while this subscriber was
+        busy are skipped and counted as dropped.
+
+        Returns:
+            list or None: Formatted events, oldest first (empty on timeout),
+                          or None once the stream has been stopped.
+        """
+        feed = self._feed
+        with feed.changed:
+            feed.changed.wait_for(lambda: feed.seq > self.last_seq or feed.closed, timeout)
+            if feed.closed:
+                return None
+            pending = [event for seq, event in feed.events if seq > self.last_seq]
+            missed = feed.seq - self.last_seq - len(pending)
+            self.last_seq = feed.seq
+            if missed:
+                self._stream.dropped += missed
+        if missed:
+            self.dropped += missed
+            STREAM_EVENTS.labels('dropped').inc(missed)
+        return pending
+
+    def events(self):
+        """
+        Yield the Server-Sent Events stream: a retry hint, then jokes as they
+        are published, with a keep-alive comment after heartbeat seconds of
+        silence. A client that has gone away is noticed at the next write;
+        the subscription is closed when the generator is.
+        """
+        try:
+            yield f"retry: {self._stream.retry}\n\n"
+            while True:
+                pending = self.next_events(self._stream.heartbeat)
+                if pending is None:
+                    return
+                if not pending:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield ''.join(pending)
+                self.delivered += len(pending)
+                STREAM_EVENTS.labels('delivered').inc(len(pending))
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Leave the feed; safe to call more than once."""
+        if not self._closed:
+            self._closed = True
+            self._stream._unsubscribe(self._feed)
+
+
+def _reset_after_fork() -> None:
+    for stream in list(_streams):
+        stream._after_fork()
+
+
+def _stop_all() -> None:
+    for stream in list(_streams):
+        stream.stop()
+
+
+atexit.register(_stop_all)
+if hasattr(os, 'register_at_fork'):  # POSIX only
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,118 @@
+"""
+JSON Provider Module
+
+Pluggable JSON encoding for everything the app serialises: ``jsonify()``,
+the JSON API and the NDJSON batch stream. The encoder is picked by the
+``JSON_ENCODER`` setting from ``PROVIDERS``: orjson when the ``orjson``
+package is installed, otherwise the standard library. Both encoders
+serialise JokeResult and produce the same documents (sorted keys, HTTP
+dates, indentation in debug mode); orjson writes non-ASCII characters as
+UTF-8 instead of ``\\u`` escapes.
+"""
+
+from flask.json.provider import DefaultJSONProvider
+
+from services.joke_result import JokeResult
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library encoder is used
+    orjson = None
+
+JSON_ENCODER = 'auto'  # 'auto' (orjson if installed), 'orjson' or 'json'
+
+
+def _default(obj):
+    """Convert types the encoders do not handle natively."""
+    if isinstance(obj, JokeResult):
+        return obj.to_dict()
+    return DefaultJSONProvider.default(obj)
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask's standard library provider, extended to serialise JokeResult."""
+
+    default = staticmethod(_default)
+
+
+class OrjsonJSONProvider(StdlibJSONProvider):
+    """
+    Provider backed by orjson.
+
+    Responses are encoded straight to bytes. Calls that pass
+    ``json.dumps`` / ``json.loads`` keyword arguments, and values orjson
+    cannot encode (e.g. integers wider than 64 bits), fall back to the
+    standard library provider.
+    """
+
+    def dumpb(self, obj, indent: bool = False) -> bytes:
+        """Serialise obj to UTF-8 JSON bytes."""
+        option = orjson.OPT_PASSTHROUGH_DATETIME  # HTTP dates, as the stdlib provider writes
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=option)
+        except orjson.JSONEncodeError:
+            layout = {'indent': 2} if indent else {'separators': (',', ':')}
+            return super().dumps(obj, **layout).encode('utf-8')
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumpb(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumpb(obj, indent) + b'\n', mimetype=self.mimetype)
+
+
+# Encoder name -> provider class; add an entry to plug in another encoder
+PROVIDERS = {'orjson': OrjsonJSONProvider, 'json': StdlibJSONProvider}
+
+
+def select_provider(name: str = JSON_ENCODER) -> type:
+    """
+    Resolve a JSON_ENCODER value to a provider class.
+
+    Args:
+        name (str): 'auto', or a key of PROVIDERS.
+
+    Returns:
+        type: A flask JSONProvider subclass.
+
+    Raises:
+        ValueError: If name is unknown, or is 'orjson' without orjson installed.
+
+    Example:
+        >>> select_provider('json')
+        <class 'services.json_provider.StdlibJSONProvider'>
+    """
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'json'
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown JSON_ENCODER {name!r}; use 'auto' or one of {sorted(PROVIDERS)}")
+    if name == 'orjson' and orjson is None:
+        raise ValueError("JSON_ENCODER 'orjson' requires the orjson package")
+    return PROVIDERS[name]
+
+
+def init_app(app) -> None:
+    """
+    Install the configured JSON provider as ``app.json``.
+
+    Args:
+        app (Flask): The application to configure.
+
+    Raises:
+        ValueError: If ``JSON_ENCODER`` is invalid.
+    """
+    app.config.setdefault('JSON_ENCODER', JSON_ENCODER)
+    app.json = select_provider(app.config['JSON_ENCODER'])(app)
@@ -0,0 +1,158 @@
+"""
+Latency Tracking Module
+
+A rolling window of recent upstream latencies, used to derive request
+timeouts and hedging delays from what JokeAPI is actually doing instead of
+a fixed guess, and a budget that caps how many hedged requests are sent.
+"""
+
+import math
+import threading
+from collections import deque
+
+
+class LatencyWindow:
+    """
+    Thread-safe window of the most recent latency samples.
+
+    Percentiles are computed over the last ``size`` samples by the
+    nearest-rank method. The sorted view is rebuilt lazily, at most once per
+    new sample, so reading percentiles on every request stays cheap.
+
+    Example:
+        >>> window = LatencyWindow(size=100, min_samples=3)
+        >>> for seconds in (0.05, 0.04, 0.30):
+        ...     window.observe(seconds)
+        >>> window.percentile(50)
+        0.05
+    """
+
+    def __init__(self, size: int = 256, min_samples: int = 20):
+        """
+        Args:
+            size (int): Number of recent samples kept.
+            min_samples (int): Samples needed before percentiles are reported.
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        if not 1 <= min_samples <= size:
+            raise ValueError("min_samples must be between 1 and size")
+        self.size = size
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=size)
+        self._sorted = None  # cached sorted copy; None when stale
+        self._lock = threading.Lock()
+        self.observed = 0
+
+    def observe(self, seconds: float) -> None:
+        """Record one latency sample."""
+        with self._lock:
+            self._samples.append(seconds)
+            self._sorted = None
+            self.observed += 1
+
+    def percentile(self, percent: float):
+        """
+        Return the percent-th percentile of the window.
+
+        Args:
+            percent (float): Percentile between 0 and 100.
+
+        Returns:
+            float or None: Latency in seconds, or None until the window holds
+                           ``min_samples`` samples.
+        """
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            if self._sorted is None:
+                self._sorted = sorted(self._samples)
+            ordered = self._sorted
+        rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+        return ordered[min(rank, len(ordered)) - 1]
+
+    def _after_fork(self) -> None:
+        """Replace the lock inherited from the parent process; samples are kept."""
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        """Forget every sample."""
+        with self._lock:
+            self._samples.clear()
+            self._sorted = None
+            self.observed = 0
+
+    def __len__(self):
+        return len(self._samples)
+
+
+class HedgeBudget:
+    """
+    Token bucket limiting hedged requests to a fraction of primary requests.
+
+    Every primary request deposits ``ratio`` tokens, up to ``burst``; every
+    hedge spends one. With ``ratio=0.1`` hedging can add at most about 10%
+    to the upstream request rate, however slow upstream gets. The bucket
+    starts empty.
+
+    Example:
+        >>> budget = HedgeBudget(ratio=0.5, burst=2)
+        >>> budget.deposit(); budget.try_spend()
+        False
+        >>> budget.deposit(); budget.try_spend()
+        True
+    """
+
+    def __init__(self, ratio: float = 0.1, burst: float = 10):
+        """
+        Args:
+            ratio (float): Tokens earned per primary request.
+            burst (float): Most tokens that can be saved up.
+        """
+        if ratio < 0:
+            raise ValueError("ratio must not be negative")
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def deposit(self) -> None:
+        """Credit one primary request."""
+        with self._lock:
+            # Rounded so that e.g. ten deposits of 0.1 make a whole token
+            self._tokens = min(round(self._tokens + self.ratio, 9), self.burst)
+
+    def try_spend(self) -> bool:
+        """
+        Take a token for a hedged request.
+
+        Returns:
+            bool: True if the hedge may be sent.
+        """
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def refund(self) -> None:
+        """Give back a token spent on a hedge that was not sent."""
+        with self._lock:
+            self._tokens = min(self._tokens + 1, self.burst)
+
+    @property
+    def tokens(self) -> float:
+        """Tokens currently available."""
+        with self._lock:
+            return self._tokens
+
+    def _after_fork(self) -> None:
+        """Replace the lock inherited from the parent process; tokens are kept."""
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        """Empty the bucket."""
+        with self._lock:
+            self._tokens = 0.0
@@ -0,0 +1,422 @@
+"""
+Metrics Module
+
+Counters, gauges and histograms exposed on ``/metrics`` in the Prometheus
+text exposition format.
+
+Recording is lock-free on the hot path: every thread updates its own shard
+of each metric, and shards are only summed when ``/metrics`` is scraped. A
+lock is taken once per thread per labelled series, when its shard is
+created, and again when the thread exits and its shard is folded into the
+series' running total.
+"""
+
+import itertools
+import math
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+
+from flask import Response, g, request
+
+# Prometheus client defaults, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Shards, metrics and registries, whose locks are replaced in forked children
+_lock_owners = weakref.WeakSet()
+
+
+class _ShardOwner:
+    """Stand-in for a thread; it dies with the thread's local storage."""
+
+    __slots__ = ('__weakref__',)
+
+
+class _Shards:
+    """
+    Per-thread lists of numbers that are summed on read.
+
+    When a thread exits, its shard is added to ``_retired`` and dropped, so
+    the shards kept follow the live threads rather than every thread seen.
+    """
+
+    __slots__ = ('_size', '_local', '_all', '_retired', '_keys', '_lock', '__weakref__')
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._all = {}
+        self._retired = [0] * size
+        self._keys = itertools.count()
+        self._lock = threading.Lock()
+        _lock_owners.add(self)
+
+    def mine(self) -> list:
+        """Return the calling thread's shard, creating it on first use."""
+        try:
+            return self._local.values
+        except AttributeError:
+            values = [0] * self._size
+            key = next(self._keys)
+            with self._lock:
+                self._all[key] = values
+            # The thread's local storage is cleared when it exits, and the owner with it
+            owner = _ShardOwner()
+            weakref.finalize(owner, self._retire, key)
+            self._local.owner = owner
+            self._local.values = values
+            return values
+
+    def _retire(self, key: int) -> None:
+        """Fold the shard of an exited thread into the running total."""
+        with self._lock:
+            values = self._all.pop(key)
+            for i, value in enumerate(values):
+                self._retired[i] += value
+
+    def totals(self) -> list:
+        """Sum every shard column."""
+        with self._lock:
+            totals = list(self._retired)
+            shards = list(self._all.values())
+        for shard in shards:
+            for i, value in enumerate(shard):
+                totals[i] += value
+        return totals
+
+
+class _Metric:
+    """Base class: a named family of series keyed by label values."""
+
+    type = None
+
+    def __init__(self, name: str, documentation: str, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        _lock_owners.add(self)
+        if not self.labelnames:
+            self._default = self._new_child()
+            self._children[()] = self._default
+        (REGISTRY if registry is None else registry).register(self)
+
+    def labels(self, *values):
+        """
+        Return the series for the given label values.
+
+        Args:
+            *values: One value per label name, in order.
+        """
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def samples(self):
+        """Yield (suffix, labels dict, value) for exposition."""
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in sorted(children):
+            labels = dict(zip(self.labelnames, key))
+            for suffix, extra, value in child.samples():
+                yield suffix, {**labels, **extra}, value
+
+    def _new_child(self):
+        raise NotImplementedError
+
+
+class _CounterChild:
+    __slots__ = ('_shards',)
+
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount: float = 1) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        self._shards.mine()[0] += amount
+
+    def value(self) -> float:
+        return self._shards.totals()[0]
+
+    def samples(self):
+        yield '_total', {}, self.value()
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing count.
+
+    Example:
+        >>> requests_total = Counter('requests', 'Requests served', ['route'])
+        >>> requests_total.labels('/joke').inc()
+    """
+
+    type = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1) -> None:
+        """Increment the unlabelled series."""
+        self._default.inc(amount)
+
+
+class _GaugeChild:
+    __slots__ = ('_shards',)
+
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount: float = 1) -> None:
+        self._shards.mine()[0] += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self._shards.mine()[0] -= amount
+
+    def value(self) -> float:
+        return self._shards.totals()[0]
+
+    def samples(self):
+        yield '', {}, self.value()
+
+
+class Gauge(_Metric):
+    """
+    Value that goes up and down, such as requests in flight.
+
+    Increments and decrements from different threads are summed, so a
+    gauge raised in one thread and lowered in another still adds up.
+    """
+
+    type = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1) -> None:
+        """Raise the unlabelled series."""
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1) -> None:
+        """Lower the unlabelled series."""
+        self._default.dec(amount)
+
+    def track_inprogress(self):
+        """Context manager raising the gauge for the duration of a block."""
+        return _InProgress(self._default)
+
+
+class _InProgress:
+    __slots__ = ('_child',)
+
+    def __init__(self, child):
+        self._child = child
+
+    def __enter__(self):
+        self._child.inc()
+
+    def __exit__(self, *exc_info):
+        self._child.dec()
+
+
+class _HistogramChild:
+    __slots__ = ('_bounds', '_shards')
+
+    def __init__(self, bounds):
+        self._bounds = bounds
+        # one slot per bucket, then +Inf, then the running sum
+        self._shards = _Shards(len(bounds) + 2)
+
+    def observe(self, value: float) -> None:
+        shard = self._shards.mine()
+        shard[bisect_left(self._bounds, value)] += 1
+        shard[-1] += value
+
+    def samples(self):
+        totals = self._shards.totals()
+        cumulative = 0
+        for bound, count in zip(self._bounds + (math.inf,), totals):
+            cumulative += count
+            yield '_bucket', {'le': _format_value(bound)}, cumulative
+        yield '_count', {}, cumulative
+        yield '_sum', {}, totals[-1]
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values in cumulative buckets.
+
+    Example:
+        >>> latency = Histogram('upstream_seconds', 'Upstream latency', ['category'])
+        >>> latency.labels('Pun').observe(0.12)
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS,
+                 registry=None):
+        self.buckets = tuple(sorted(float(bound) for bound in buckets if bound != math.inf))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        """Record a value on the unlabelled series."""
+        self._default.observe(value)
+
+
+class CallbackMetric:
+    """
+    Metric whose samples are computed at scrape time from existing stats.
+
+    Args:
+        name (str): Metric name.
+        documentation (str): Help text.
+        type (str): 'counter' or 'gauge'.
+        callback (callable): Returns a list of (labels dict, value).
+    """
+
+    def __init__(self, name: str, documentation: str, type: str, callback, registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.type = type
+        self._callback = callback
+        (REGISTRY if registry is None else registry).register(self)
+
+    def samples(self):
+        suffix = '_total' if self.type == 'counter' else ''
+        for labels, value in self._callback():
+            yield suffix, labels, value
+
+
+class Registry:
+    """Ordered collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        _lock_owners.add(self)
+
+    def register(self, metric) -> None:
+        """Add metric; names must be unique."""
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Duplicate metric: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def get(self, name: str):
+        """Return the registered metric called name, or None."""
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            help_text = metric.documentation.replace('\\', r'\\').replace('\n', r'\n')
+            lines.append(f"# HELP {metric.name} {help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+        )
+        for name, value in labels.items()
+    )
+    return '{' + pairs + '}'
+
+
+def _format_value(value) -> str:
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+
+# ===== HTTP metrics =====
+
+HTTP_REQUESTS = Counter(
+    'jokeapp_http_requests', 'HTTP requests served', ['method', 'route', 'status']
+)
+HTTP_LATENCY = Histogram(
+    'jokeapp_http_request_duration_seconds', 'Time to produce a response',
+    ['method', 'route']
+)
+HTTP_IN_FLIGHT = Gauge(
+    'jokeapp_http_requests_in_flight', 'HTTP requests currently being handled'
+)
+
+
+def init_app(app) -> None:
+    """
+    Instrument every request and serve ``/metrics``.
+
+    Requests are labelled with their route pattern (e.g.
+    ``/joke/<category>``), never the raw path, so label cardinality stays
+    bounded. Register this before other extensions so their early
+    responses are counted too. Set ``METRICS_ENABLED`` to False to skip.
+
+    Args:
+        app (Flask): The application to instrument.
+    """
+    if not app.config.setdefault('METRICS_ENABLED', True):
+        return
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+
+    @app.after_request
+    def record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def record_request(exc):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        HTTP_IN_FLIGHT.dec()
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        status = g.pop('metrics_status', 500)
+        HTTP_REQUESTS.labels(request.method, route, status).inc()
+        HTTP_LATENCY.labels(request.method, route).observe(time.perf_counter() - started)
+
+    def metrics_view():
+        response = Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+        response.cache_control.no_store = True
+        return response
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+
+
+def _reset_after_fork() -> None:
+    # A thread of the parent may have held any of these locks when it forked
+    for owner in list(_lock_owners):
+        owner._lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):  # POSIX only
+    os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,115 @@
+"""
+Page Cache Module
+
+Keeps fully rendered static-content pages in memory as bytes, so their
+routes become a dictionary lookup instead of a Jinja render per request.
+"""
+
+import hashlib
+import os
+import threading
+from datetime import datetime
+
+from flask import current_app, render_template
+
+
+class PageCache:
+    """
+    In-memory cache of rendered pages, keyed by template and context.
+
+    A page is rendered on first request and its body, ETag and length are
+    kept. All pages are dropped automatically when:
+
+    - the year changes (templates show ``current_year``)
+    - the context changes, e.g. a new ``app_version`` (it is part of the key)
+    - a template file changes while template auto-reload is on (debug mode)
+
+    Example:
+        >>> page_cache = PageCache()
+        >>> @app.route('/about')
+        ... def about():
+        ...     return page_cache.render('about.html')
+    """
+
+    def __init__(self, clock=datetime.now):
+        """
+        Args:
+            clock (callable): Returns the current datetime, overridable for tests.
+        """
+        self._clock = clock
+        self._pages = {}  # (template, context items) -> (body, etag)
+        self._stamp = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def render(self, template_name: str, **context):
+        """
+        Return the cached page for template_name and context as a response.
+
+        Args:
+            template_name (str): Template to render.
+            **context: Template variables; values must be hashable.
+
+        Returns:
+            Response: text/html response with Content-Length and ETag set.
+        """
+        key = (template_name, tuple(sorted(context.items())))
+        stamp = (self._clock().year, self._template_stamp())
+
+        with self._lock:
+            if stamp != self._stamp:
+                if self._pages:
+                    self.invalidations += 1
+                self._pages.clear()
+                self._stamp = stamp
+            page = self._pages.get(key)
+            if page is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if page is None:
+            body = render_template(template_name, **context).encode('utf-8')
+            page = (body, hashlib.sha1(body).hexdigest())
+            with self._lock:
+                if self._stamp == stamp:
+                    self._pages[key] = page
+
+        body, etag = page
+        response = current_app.response_class(body, mimetype='text/html')
+        response.set_etag(etag)
+        return response
+
+    def clear(self) -> None:
+        """Drop every cached page."""
+        with self._lock:
+            self._pages.clear()
+            self._stamp = None
+
+    def stats(self) -> dict:
+        """
+        Report cache counters.
+
+        Returns:
+            dict: 'hits', 'misses', 'invalidations' and 'size'.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'size': len(self._pages)
+            }
+
+    @staticmethod
+    def _template_stamp():
+        """Latest template mtime while auto-reload is on, else None."""
+        if not current_app.jinja_env.auto_reload:
+            return None
+        latest = 0
+        for root, _, files in os.walk(os.path.join(current_app.root_path, current_app.template_folder)):
+            for name in files:
+                latest = max(latest, os.stat(os.path.join(root, name)).st_mtime_ns)
+        return latest
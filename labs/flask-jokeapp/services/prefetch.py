@@ -0,0 +1,227 @@
+"""
+Joke Prefetch Module
+
+Keeps a small buffer of ready-to-serve jokes per category, refilled in the
+background, so routes can answer without waiting on JokeAPI.
+"""
+
+import atexit
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from services.joke_service import ALLOWED_CATEGORIES
+
+# Running prefetchers, whose refill pools are rebuilt in forked children and
+# stopped at exit
+_running = weakref.WeakSet()
+
+
+class JokePrefetcher:
+    """
+    Per-category buffers of pre-fetched jokes with background refill.
+
+    ``pop()`` takes a joke from the front of a buffer in O(1). When a buffer
+    drops below ``low_water`` a refill is scheduled on a small thread pool;
+    at most one refill runs per category at a time. Jokes older than
+    ``max_age`` seconds are discarded instead of being served.
+
+    Example:
+        >>> prefetcher = JokePrefetcher(fetch=get_joke, depth=5, low_water=2)
+        >>> prefetcher.start()
+        >>> joke = prefetcher.pop("Programming") or get_joke("Programming")
+    """
+
+    def __init__(self, fetch, categories=None, depth: int = 5, low_water: int = 2,
+                 max_workers: int = 2, max_age: float = 300.0, timer=time.monotonic):
+        """
+        Args:
+            fetch (callable): Called as ``fetch(category)``; returns a
+                              JokeResult in the get_joke() shape.
+            categories (list, optional): Categories to buffer. Defaults to
+                                         ALLOWED_CATEGORIES.
+            depth (int): Number of jokes to keep per category.
+            low_water (int): Buffer size below which a refill is triggered.
+            max_workers (int): Max concurrent refills.
+            max_age (float): Seconds after which a buffered joke is stale.
+            timer (callable): Monotonic clock, overridable for tests.
+        """
+        if not 0 <= low_water <= depth:
+            raise ValueError("low_water must be between 0 and depth")
+        self.fetch = fetch
+        self.categories = list(categories or ALLOWED_CATEGORIES)
+        self.depth = depth
+        self.low_water = low_water
+        self.max_workers = max_workers
+        self.max_age = max_age
+        self._timer = timer
+        self._buffers = {category: deque() for category in self.categories}
+        self._refilling = set()
+        self._lock = threading.Lock()
+        self._executor = None
+        self.running = False
+        self.hits = 0
+        self.misses = 0
+        self.refills = 0
+        self.stale_evictions = 0
+        self.fetch_errors = 0
+
+    def start(self) -> None:
+        """Start the refill pool and fill every buffer in the background."""
+        with self._lock:
+            if self.running:
+                return
+            self._executor = self._create_executor()
+            self.running = True
+        _running.add(self)
+        for category in self.categories:
+            self._schedule_refill(category)
+
+    def stop(self, wait: bool = True) -> None:
+        """
+        Stop refilling. Buffered jokes stay available to ``pop()``.
+
+        Args:
+            wait (bool): Wait for in-flight refills to finish.
+        """
+        with self._lock:
+            if not self.running:
+                return
+            self.running = False
+            executor, self._executor = self._executor, None
+        _running.discard(self)
+        executor.shutdown(wait=wait, cancel_futures=True)
+
+    def pop(self, category: str):
+        """
+        Take a buffered joke for category.
+
+        Args:
+            category (str): Joke category.
+
+        Returns:
+            JokeResult or None: A joke result, or None if the buffer is empty
+                                or the category is not buffered.
+        """
+        buffer = self._buffers.get(category)
+        if buffer is None:
+            return None
+
+        result = None
+        with self._lock:
+            self._evict_stale(buffer)
+            if buffer:
+                _, result = buffer.popleft()
+                self.hits += 1
+            else:
+                self.misses += 1
+            needs_refill = len(buffer) < self.low_water
+
+        if needs_refill:
+            self._schedule_refill(category)
+        return result
+
+    def stats(self) -> dict:
+        """
+        Report buffer depth and counters.
+
+        Returns:
+            dict: 'running', 'hits', 'misses', 'refills', 'stale_evictions',
+                  'fetch_errors' and 'buffers' mapping each category to its
+                  'size', 'refilling' flag and 'oldest_age' in seconds.
+        """
+        now = self._timer()
+        with self._lock:
+            buffers = {
+                category: {
+                    'size': len(buffer),
+                    'refilling': category in self._refilling,
+                    'oldest_age': round(now - buffer[0][0], 3) if buffer else None
+                }
+                for category, buffer in self._buffers.items()
+            }
+            return {
+                'running': self.running,
+                'depth': self.depth,
+                'low_water': self.low_water,
+                'hits': self.hits,
+                'misses': self.misses,
+                'refills': self.refills,
+                'stale_evictions': self.stale_evictions,
+                'fetch_errors': self.fetch_errors,
+                'buffers': buffers
+            }
+
+    def _create_executor(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='joke-prefetch')
+
+    def _after_fork(self) -> None:
+        """
+        Replace the refill pool inherited from the parent process.
+
+        Its threads did not survive the fork, so refills submitted to it
+        would never run. Buffered jokes are kept.
+        """
+        self._lock = threading.Lock()
+        self._refilling.clear()
+        self._executor = self._create_executor()
+        for category in self.categories:
+            self._schedule_refill(category)
+
+    def _evict_stale(self, buffer: deque) -> None:
+        """Drop jokes older than max_age from the front of buffer (lock held)."""
+        cutoff = self._timer() - self.max_age
+        while buffer and buffer[0][0] <= cutoff:
+            buffer.popleft()
+            self.stale_evictions += 1
+
+    def _schedule_refill(self, category: str) -> None:
+        with self._lock:
+            if not self.running or category in self._refilling:
+                return
+            self._refilling.add(category)
+            executor = self._executor
+        try:
+            executor.submit(self._refill, category)
+        except RuntimeError:  # executor shut down concurrently
+            with self._lock:
+                self._refilling.discard(category)
+
+    def _refill(self, category: str) -> None:
+        """Top up one buffer to depth; stops early on the first failed fetch."""
+        buffer = self._buffers[category]
+        try:
+            while self.running:
+                with self._lock:
+                    self._evict_stale(buffer)
+                    if len(buffer) >= self.depth:
+                        break
+                result = self.fetch(category)
+                if not result.get('success'):
+                    with self._lock:
+                        self.fetch_errors += 1
+                    break
+                with self._lock:
+                    buffer.append((self._timer(), result))
+                    self.refills += 1
+        finally:
+            with self._lock:
+                self._refilling.discard(category)
+
+
+def _restart_after_fork() -> None:
+    for prefetcher in list(_running):
+        prefetcher._after_fork()
+
+
+def _stop_all() -> None:
+    for prefetcher in list(_running):
+        prefetcher.stop(wait=False)
+
+
+atexit.register(_stop_all)
+if hasattr(os, 'register_at_fork'):  # POSIX only
+    os.register_at_fork(after_in_child=_restart_after_fork)
@@ -0,0 +1,425 @@
+"""
+Request Profiling Module
+
+Profiles individual requests and writes the result as collapsed stacks
+(``.folded``, the input format of flamegraph.pl and speedscope) plus a
+self-contained flamegraph (``.svg``) to ``PROFILE_DIR``.
+
+Two profilers are available:
+
+- ``sample``: a background thread snapshots the request thread's stack
+  every ``PROFILE_INTERVAL`` seconds. Weights are sample counts; overhead
+  is low enough for continuous use on a fraction of production traffic.
+- ``trace``: a deterministic ``sys.setprofile`` tracer that times every
+  Python and C call. Weights are microseconds; it is exact but slows the
+  request down several times, so it is only used on explicit request.
+
+A request is profiled when profiling is enabled and either it carries
+``X-Profile-Token: <PROFILE_TOKEN>`` (profiled with ``PROFILE_MODE``), or
+it is picked by ``PROFILE_SAMPLE_RATE`` (always profiled with ``sample``).
+The response then carries ``X-Profile-Id`` naming the files written.
+
+Files are written by a background thread, so rendering the flamegraph
+does not delay the profiled request, and only the newest
+``PROFILE_KEEP`` profiles are kept.
+"""
+
+import hmac
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+import zlib
+from xml.sax.saxutils import escape
+
+from flask import g, request
+
+PROFILE_MODE = 'trace'      # profiler for token-gated requests: 'trace' or 'sample'
+PROFILE_SAMPLE_RATE = 0.0   # fraction of requests profiled with the sampler
+PROFILE_INTERVAL = 0.001    # seconds between stack samples
+PROFILE_HEADER = 'X-Profile-Token'
+PROFILE_KEEP = 100          # newest profiles kept in PROFILE_DIR; older ones are deleted
+PROFILE_BACKLOG = 8         # profiles waiting to be written; more are dropped
+PROFILE_EXTENSIONS = ('.folded', '.svg')
+
+FLAMEGRAPH_WIDTH = 1200
+FLAMEGRAPH_FRAME_HEIGHT = 16
+
+
+def frame_name(code) -> str:
+    """Label a code object as ``function (package/module.py)``."""
+    path = code.co_filename.replace('\\', '/').rsplit('/', 2)
+    return f"{code.co_name} ({'/'.join(path[-2:])})"
+
+
+class SamplingProfiler:
+    """
+    Periodically record the stack of one thread.
+
+    Example:
+        >>> profiler = SamplingProfiler(threading.get_ident())
+        >>> profiler.start()
+        >>> ...
+        >>> profiler.stop()
+        >>> profiler.stacks  # {'main (app.py);index (app.py)': 12, ...}
+    """
+
+    unit = 'samples'
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_INTERVAL):
+        """
+        Args:
+            thread_id (int): Identifier of the thread to sample.
+            interval (float): Seconds between samples.
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """Start sampling in a daemon thread."""
+        self._thread = threading.Thread(target=self._run, name='profiler-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampler thread to exit."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            names = []
+            while frame is not None:
+                names.append(frame_name(frame.f_code))
+                frame = frame.f_back
+            key = ';'.join(reversed(names))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+
+
+class TracingProfiler:
+    """
+    Time every call made by the current thread with ``sys.setprofile``.
+
+    Stacks are rooted at the first call made after start(). Each stack's
+    weight is the self time, in microseconds, spent in its innermost frame.
+    """
+
+    unit = 'µs'
+
+    def __init__(self, timer=time.perf_counter):
+        self.stacks = {}
+        self._timer = timer
+        self._stack = []  # [name, start, time spent in children]
+
+    def start(self) -> None:
+        """Start tracing calls made by the current thread."""
+        sys.setprofile(self._event)
+
+    def stop(self) -> None:
+        """Stop tracing and charge frames that have not returned yet."""
+        sys.setprofile(None)
+        now = self._timer()
+        while self._stack:
+            self._pop(now)
+
+    def _event(self, frame, event, arg):
+        now = self._timer()
+        if event == 'call':
+            self._stack.append([frame_name(frame.f_code), now, 0.0])
+        elif event == 'c_call':
+            self._stack.append([f"{getattr(arg, '__qualname__', arg)} (builtin)", now, 0.0])
+        elif self._stack:  # return, c_return, c_exception
+            self._pop(now)
+
+    def _pop(self, now: float) -> None:
+        path = ';'.join(entry[0] for entry in self._stack)
+        _, started, children = self._stack.pop()
+        elapsed = now - started
+        weight = round((elapsed - children) * 1e6)
+        if weight > 0:
+            self.stacks[path] = self.stacks.get(path, 0) + weight
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+
+def collapse(stacks: dict) -> str:
+    """
+    Format stacks in the collapsed (folded) format, one stack per line.
+
+    Args:
+        stacks (dict): ``'root;child;leaf'`` -> weight.
+
+    Returns:
+        str: Lines of ``root;child;leaf <weight>``.
+    """
+    return ''.join(f"{stack} {weight}\n" for stack, weight in sorted(stacks.items()))
+
+
+def render_flamegraph(stacks: dict, title: str = 'Flame Graph', unit: str = 'samples',
+                      width: int = FLAMEGRAPH_WIDTH) -> str:
+    """
+    Render stacks as a standalone SVG flamegraph.
+
+    Frames are drawn bottom-up, with width proportional to their total
+    weight; hovering a frame shows its name, weight and share.
+
+    Args:
+        stacks (dict): ``'root;child;leaf'`` -> weight.
+        title (str): Heading drawn above the graph.
+        unit (str): Weight unit shown in tooltips.
+        width (int): Image width in pixels.
+
+    Returns:
+        str: SVG document.
+    """
+    root = {'value': 0, 'children': {}}
+    for stack, weight in stacks.items():
+        root['value'] += weight
+        node = root
+        for name in stack.split(';'):
+            node = node['children'].setdefault(name, {'value': 0, 'children': {}})
+            node['value'] += weight
+
+    frames = []  # (depth, x, width, name, value)
+
+    def layout(node, depth, x, scale):
+        for name, child in sorted(node['children'].items()):
+            frame_width = child['value'] * scale
+            if frame_width >= 0.5:
+                frames.append((depth, x, frame_width, name, child['value']))
+                layout(child, depth + 1, x, scale)
+            x += frame_width
+
+    total = root['value'] or 1
+    padding = 10
+    layout(root, 0, padding, (width - 2 * padding) / total)
+
+    row = FLAMEGRAPH_FRAME_HEIGHT
+    depth = max((frame[0] for frame in frames), default=0) + 1
+    height = depth * row + 3 * row
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="Verdana, sans-serif" font-size="11">',
+        f'<rect width="{width}" height="{height}" fill="#f8f8f8"/>',
+        f'<text x="{width / 2}" y="{row + 2}" text-anchor="middle" font-size="15">{escape(title)}</text>'
+    ]
+    for level, x, frame_width, name, value in frames:
+        y = height - (level + 1) * row - padding
+        hue = zlib.crc32(name.encode('utf-8')) % 60
+        label = f"{name} ({value:,} {unit}, {value * 100 / total:.2f}%)"
+        parts.append(
+            f'<g><title>{escape(label)}</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{frame_width:.1f}" height="{row - 1}" '
+            f'fill="hsl({hue},85%,60%)" rx="2"/>'
+        )
+        chars = int((frame_width - 6) / 7)
+        if chars >= 3:
+            text = name if len(name) <= chars else name[:chars - 2] + '..'
+            parts.append(f'<text x="{x + 3:.1f}" y="{y + row - 4}">{escape(text)}</text>')
+        parts.append('</g>')
+    parts.append('</svg>')
+    return '\n'.join(parts) + '\n'
+
+
+def write_profile(directory: str, name: str, profiler, title: str) -> str:
+    """
+    Write a profiler's stacks as ``<name>.folded`` and ``<name>.svg``.
+
+    Args:
+        directory (str): Output directory; created if missing.
+        name (str): File name without extension.
+        profiler: A stopped SamplingProfiler or TracingProfiler.
+        title (str): Flamegraph heading.
+
+    Returns:
+        str: Path of the ``.folded`` file.
+    """
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, name)
+    with open(base + '.folded', 'w', encoding='utf-8') as folded:
+        folded.write(collapse(profiler.stacks))
+    with open(base + '.svg', 'w', encoding='utf-8') as svg:
+        svg.write(render_flamegraph(profiler.stacks, title, profiler.unit))
+    return base + '.folded'
+
+
+def prune_profiles(directory: str, keep: int) -> list:
+    """
+    Delete all but the newest keep profiles in directory.
+
+    A profile is the ``.folded`` and ``.svg`` pair sharing a name; age is
+    the newest modification time of the pair, ties broken by name (names
+    start with a timestamp).
+
+    Args:
+        directory (str): Profile directory.
+        keep (int): Profiles to keep.
+
+    Returns:
+        list: Names of the deleted profiles, oldest first.
+    """
+    modified = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            name, ext = os.path.splitext(entry.name)
+            if ext in PROFILE_EXTENSIONS:
+                modified[name] = max(modified.get(name, 0), entry.stat().st_mtime_ns)
+    oldest = sorted(modified, key=lambda name: (modified[name], name))
+    deleted = oldest[:max(len(oldest) - keep, 0)]
+    for name in deleted:
+        for ext in PROFILE_EXTENSIONS:
+            try:
+                os.remove(os.path.join(directory, name + ext))
+            except FileNotFoundError:
+                pass
+    return deleted
+
+
+class ProfileWriter:
+    """
+    Write finished profiles on a single background thread.
+
+    submit() only queues the profile; the writer thread renders and writes
+    it, then prunes the directory to the newest ``keep`` profiles. While
+    ``backlog`` profiles are waiting, new ones are dropped instead of
+    slowing requests down.
+
+    Example:
+        >>> writer = ProfileWriter('/tmp/profiles', keep=50)
+        >>> writer.submit('req-1', profiler, 'GET /joke')
+        True
+        >>> writer.flush()  # wait until written
+    """
+
+    def __init__(self, directory: str, keep: int = PROFILE_KEEP, backlog: int = PROFILE_BACKLOG):
+        """
+        Args:
+            directory (str): Output directory; created if missing.
+            keep (int): Newest profiles kept in directory.
+            backlog (int): Most profiles waiting to be written.
+        """
+        if keep < 1:
+            raise ValueError("keep must be at least 1")
+        self.directory = directory
+        self.keep = keep
+        self.dropped = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=backlog)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, name: str, profiler, title: str) -> bool:
+        """
+        Queue a stopped profiler's stacks to be written as ``<name>.*``.
+
+        Returns:
+            bool: False if the backlog is full and the profile was dropped.
+        """
+        self._start()
+        try:
+            self._queue.put_nowait((name, profiler, title))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def flush(self) -> None:
+        """Block until every queued profile has been written."""
+        self._queue.join()
+
+    def _start(self) -> None:
+        # Started on first use, so each forked worker gets its own thread
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='profile-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            name, profiler, title = self._queue.get()
+            try:
+                write_profile(self.directory, name, profiler, title)
+                prune_profiles(self.directory, self.keep)
+            except OSError:
+                self.failed += 1
+            finally:
+                self._queue.task_done()
+
+
+def _select_profiler(app):
+    """Return a profiler for the current request, or None to skip it."""
+    config = app.config
+    token = config['PROFILE_TOKEN']
+    supplied = request.headers.get(PROFILE_HEADER)
+    if token and supplied and hmac.compare_digest(supplied, token):
+        if config['PROFILE_MODE'] == 'trace':
+            return TracingProfiler()
+        return SamplingProfiler(threading.get_ident(), config['PROFILE_INTERVAL'])
+    if random.random() < config['PROFILE_SAMPLE_RATE']:
+        return SamplingProfiler(threading.get_ident(), config['PROFILE_INTERVAL'])
+    return None
+
+
+def init_app(app) -> None:
+    """
+    Register the request profiling hooks.
+
+    Nothing is registered unless ``PROFILE_ENABLED`` is true. Other config
+    keys: ``PROFILE_TOKEN`` (empty disables header-triggered profiling),
+    ``PROFILE_MODE``, ``PROFILE_SAMPLE_RATE``, ``PROFILE_INTERVAL``,
+    ``PROFILE_DIR`` (default ``<instance path>/profiles``) and
+    ``PROFILE_KEEP``. The ProfileWriter is stored as
+    ``app.extensions['profile_writer']``.
+
+    Args:
+        app (Flask): The application to profile.
+    """
+    app.config.setdefault('PROFILE_ENABLED', False)
+    app.config.setdefault('PROFILE_TOKEN', '')
+    app.config.setdefault('PROFILE_MODE', PROFILE_MODE)
+    app.config.setdefault('PROFILE_SAMPLE_RATE', PROFILE_SAMPLE_RATE)
+    app.config.setdefault('PROFILE_INTERVAL', PROFILE_INTERVAL)
+    app.config.setdefault('PROFILE_DIR', os.path.join(app.instance_path, 'profiles'))
+    app.config.setdefault('PROFILE_KEEP', PROFILE_KEEP)
+    if not app.config['PROFILE_ENABLED']:
+        return
+    if app.config['PROFILE_MODE'] not in ('trace', 'sample'):
+        raise ValueError(f"Unknown PROFILE_MODE: {app.config['PROFILE_MODE']}")
+    writer = ProfileWriter(app.config['PROFILE_DIR'], app.config['PROFILE_KEEP'])
+    app.extensions['profile_writer'] = writer
+
+    @app.before_request
+    def start_profiler():
+        profiler = _select_profiler(app)
+        if profiler is not None:
+            g.profile_name = '{}-{}-{}'.format(
+                time.strftime('%Y%m%d-%H%M%S'), request.endpoint or 'unmatched', uuid.uuid4().hex[:6]
+            )
+            g.profiler = profiler
+            profiler.start()
+
+    @app.after_request
+    def finish_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.stop()
+            title = f"{request.method} {request.full_path.rstrip('?')}"
+            if writer.submit(g.profile_name, profiler, title):
+                response.headers['X-Profile-Id'] = g.profile_name
+        return response
+
+    @app.teardown_request
+    def stop_profiler(exc):
+        # after_request does not run when the view raised
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.stop()
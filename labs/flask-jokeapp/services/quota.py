@@ -0,0 +1,304 @@
+"""
+Upstream Quota Module
+
+JokeAPI allows each client IP a fixed number of requests per window and
+answers HTTP 429 beyond it. QuotaBucket keeps this process under that limit:
+a thread-safe token bucket that upstream calls draw from, kept in step with
+the ``RateLimit-*`` headers upstream returns and paused by ``Retry-After``
+when a 429 gets through anyway (e.g. because other workers share the IP).
+"""
+
+import asyncio
+import threading
+import time
+from collections.abc import Mapping
+from email.utils import parsedate_to_datetime
+
+EPOCH_THRESHOLD = 1e9  # reset values above this are Unix timestamps, not seconds
+RATE_LIMIT_HEADERS = frozenset({
+    'ratelimit-limit', 'ratelimit-remaining', 'ratelimit-reset', 'retry-after',
+    'x-ratelimit-limit', 'x-ratelimit-remaining', 'x-ratelimit-reset'
+})
+NO_LIMITS = {'limit': None, 'remaining': None, 'reset': None, 'retry_after': None}
+
+
+def _header_seconds(value):
+    """Seconds from a delta-seconds, Unix timestamp or HTTP-date header value."""
+    if value is None:
+        return None
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError, IndexError):
+            return None
+    else:
+        if seconds > EPOCH_THRESHOLD:
+            seconds -= time.time()
+    return max(seconds, 0.0)
+
+
+def parse_rate_limit_headers(headers) -> dict:
+    """
+    Read the rate limit headers of an upstream response.
+
+    Understands ``RateLimit-Limit``, ``RateLimit-Remaining`` and
+    ``RateLimit-Reset`` (also with an ``X-`` prefix), and ``Retry-After``.
+    Reset and Retry-After may be seconds, a Unix timestamp or an HTTP date.
+
+    Args:
+        headers (Mapping): Case-insensitive response headers.
+
+    Returns:
+        dict: 'limit', 'remaining' (ints), 'reset' and 'retry_after'
+              (seconds from now); each None when absent or unreadable.
+
+    Example:
+        >>> parse_rate_limit_headers({'RateLimit-Limit': '120', 'RateLimit-Remaining': '0',
+        ...                           'RateLimit-Reset': '42'})
+        {'limit': 120, 'remaining': 0, 'reset': 42.0, 'retry_after': None}
+    """
+    if not isinstance(headers, Mapping):
+        return dict(NO_LIMITS)
+    # One pass over the headers instead of a case-insensitive lookup per name
+    lowered = {name.lower(): value for name, value in headers.items()}
+    if not lowered.keys() & RATE_LIMIT_HEADERS:
+        return dict(NO_LIMITS)
+
+    def field(name):
+        value = lowered.get(name)
+        return lowered.get(f'x-{name}') if value is None else value
+
+    def count(name):
+        try:
+            return max(int(field(name)), 0)
+        except (TypeError, ValueError):
+            return None
+
+    return {
+        'limit': count('ratelimit-limit'),
+        'remaining': count('ratelimit-remaining'),
+        'reset': _header_seconds(field('ratelimit-reset')),
+        'retry_after': _header_seconds(lowered.get('retry-after'))
+    }
+
+
+class QuotaBucket:
+    """
+    Token bucket holding the upstream requests this process may still send.
+
+    The bucket holds up to ``limit`` tokens and refills at ``limit / window``
+    tokens per second. Each upstream request takes one. A bucket that is one
+    of several sharing an IP (e.g. one per worker process) holds ``share`` of
+    upstream's limit, including a limit adopted from RateLimit-Limit. ``sync()`` lowers the
+    tokens to what upstream says is left and, when nothing is left, pauses
+    the bucket until upstream's reset; ``pause()`` does the same after a 429.
+    Callers either wait a bounded time for a token (``acquire``) or give up
+    at once (``try_acquire``). A caller that would have to wait longer than
+    its timeout is turned away immediately rather than after the wait.
+
+    Example:
+        >>> quota = QuotaBucket(limit=120, window=60)
+        >>> if quota.acquire(timeout=0.5):
+        ...     response = session.get(url)
+        ...     quota.sync(**parse_rate_limit_headers(response.headers))
+    """
+
+    def __init__(self, limit: int = 120, window: float = 60.0, share: float = 1.0,
+                 timer=time.monotonic):
+        """
+        Args:
+            limit (int): Requests upstream allows per window.
+            window (float): Window length in seconds.
+            share (float): Fraction of upstream's limit this bucket may use.
+            timer (callable): Monotonic clock, overridable for tests.
+        """
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        if window <= 0:
+            raise ValueError("window must be positive")
+        if not 0 < share <= 1:
+            raise ValueError("share must be in (0, 1]")
+        self.share = share
+        self.limit = self._share_of(limit)
+        self.window = window
+        self._timer = timer
+        self._lock = threading.Lock()
+        self._tokens = float(limit)
+        self._updated = timer()
+        self._paused_until = 0.0
+        self.granted = 0
+        self.queued = 0
+        self.shed = 0
+        self.throttled = 0
+
+    def _share_of(self, limit: int) -> int:
+        """This bucket's part of an upstream limit, at least one request."""
+        return max(int(limit * self.share), 1)
+
+    def _refill(self, now: float) -> None:
+        """Add the tokens earned since the last update (lock held)."""
+        self._tokens = min(self._tokens + (now - self._updated) * self.limit / self.window, self.limit)
+        self._updated = now
+
+    def _take(self, now: float) -> float:
+        """Take a token and return 0, or return the seconds until one is due (lock held)."""
+        self._refill(now)
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            self.granted += 1
+            return 0.0
+        return (1 - self._tokens) * self.window / self.limit
+
+    def try_acquire(self, shed: bool = True) -> bool:
+        """
+        Take a token without waiting.
+
+        Args:
+            shed (bool): Count a refusal as a shed request. Pass False for
+                optional extra requests, such as hedges, that are simply
+                not sent.
+
+        Returns:
+            bool: True if the request may be sent.
+        """
+        with self._lock:
+            if self._take(self._timer()) == 0:
+                return True
+            if shed:
+                self.shed += 1
+            return False
+
+    def acquire(self, timeout: float = 0.0) -> bool:
+        """
+        Take a token, waiting up to timeout seconds for one.
+
+        Args:
+            timeout (float): Most seconds to wait.
+
+        Returns:
+            bool: True if the request may be sent; False if it should be shed.
+        """
+        deadline = self._timer() + timeout
+        granted, delay = self._poll(deadline, waited=False)
+        while granted is None:
+            time.sleep(delay)
+            granted, delay = self._poll(deadline, waited=True)
+        return granted
+
+    async def acquire_async(self, timeout: float = 0.0) -> bool:
+        """Like acquire(), but sleeps without blocking the event loop."""
+        deadline = self._timer() + timeout
+        granted, delay = self._poll(deadline, waited=False)
+        while granted is None:
+            await asyncio.sleep(delay)
+            granted, delay = self._poll(deadline, waited=True)
+        return granted
+
+    def _poll(self, deadline: float, waited: bool):
+        """
+        One attempt of acquire().
+
+        Returns:
+            tuple: (True, 0) when a token was taken, (False, 0) when none
+                   is due before deadline, or (None, seconds) to wait and
+                   try again.
+        """
+        with self._lock:
+            now = self._timer()
+            delay = self._take(now)
+            if delay == 0:
+                self.queued += waited
+                return True, 0.0
+            if now + delay > deadline:
+                self.shed += 1
+                return False, 0.0
+            return None, delay
+
+    def release(self) -> None:
+        """Return a token taken for a request that was not sent."""
+        with self._lock:
+            self._tokens = min(self._tokens + 1, self.limit)
+            self.granted -= 1
+
+    def sync(self, limit: int = None, remaining: int = None, reset: float = None,
+             retry_after: float = None) -> None:
+        """
+        Bring the bucket in line with upstream's rate limit headers.
+
+        Args:
+            limit (int, optional): Upstream's limit per window; its share
+                becomes the bucket size.
+            remaining (int, optional): Requests upstream will still accept;
+                the bucket never holds more.
+            reset (float, optional): Seconds until upstream's window resets;
+                the bucket pauses until then when nothing remains.
+            retry_after (float, optional): Seconds upstream asked us to wait.
+        """
+        with self._lock:
+            self._refill(self._timer())
+            if limit:
+                self.limit = self._share_of(limit)
+            if remaining is not None:
+                self._tokens = min(self._tokens, float(remaining))
+            if retry_after is not None:
+                self._pause(retry_after)
+            elif remaining == 0 and reset is not None:
+                self._pause(reset)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Send nothing for seconds, e.g. after an HTTP 429.
+
+        Args:
+            seconds (float): Length of the pause.
+        """
+        with self._lock:
+            self._refill(self._timer())
+            self._pause(seconds)
+
+    def _pause(self, seconds: float) -> None:
+        """Empty the bucket and hold it closed for seconds (lock held)."""
+        self._tokens = 0.0
+        self._paused_until = max(self._paused_until, self._timer() + seconds)
+        self.throttled += 1
+
+    def _after_fork(self) -> None:
+        """Replace the lock inherited from the parent process; tokens and counters are kept."""
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        """Refill the bucket, end any pause and zero the counters."""
+        with self._lock:
+            self._tokens = float(self.limit)
+            self._updated = self._timer()
+            self._paused_until = 0.0
+            self.granted = self.queued = self.shed = self.throttled = 0
+
+    def stats(self) -> dict:
+        """
+        Report the bucket state and counters.
+
+        Returns:
+            dict: 'limit' (this bucket's), 'share', 'window', 'tokens',
+                  'paused_for' (seconds),
+                  'granted', 'queued' (granted after waiting), 'shed'
+                  and 'throttled' (pauses imposed by upstream).
+        """
+        with self._lock:
+            now = self._timer()
+            self._refill(now)
+            return {
+                'limit': self.limit,
+                'share': self.share,
+                'window': self.window,
+                'tokens': round(self._tokens, 3),
+                'paused_for': round(max(self._paused_until - now, 0.0), 3),
+                'granted': self.granted,
+                'queued': self.queued,
+                'shed': self.shed,
+                'throttled': self.throttled
+            }
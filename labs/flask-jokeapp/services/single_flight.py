@@ -0,0 +1,161 @@
+"""
+Single-Flight Module
+
+Collapses concurrent identical calls into one: while a call for a key is in
+flight, further callers for the same key wait for it and share its result
+instead of making their own upstream request.
+"""
+
+import asyncio
+import threading
+
+
+class _Call:
+    """One in-flight threaded call and its outcome."""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Thread-based call coalescing.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it runs block until it finishes and receive the same return
+    value, or the same exception. Once the call completes the key is
+    forgotten, so the next caller starts a fresh call.
+
+    Example:
+        >>> flight = SingleFlight()
+        >>> flight.do(url, lambda: fetch(url))  # concurrent callers share one fetch
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.flights = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """
+        Run fn for key, or wait for the call already in flight for key.
+
+        Args:
+            key: Hashable identity of the call.
+            fn (callable): Called with no arguments by the leader.
+
+        Returns:
+            The leader's return value, shared by every caller.
+
+        Raises:
+            Exception: Whatever fn raised, re-raised in every caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.flights += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self) -> dict:
+        """
+        Report coalescing counters.
+
+        Returns:
+            dict: 'flights' (calls actually run), 'coalesced' (callers that
+                  shared another caller's result) and 'in_flight'.
+        """
+        with self._lock:
+            return {
+                'flights': self.flights,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls)
+            }
+
+
+class AsyncSingleFlight:
+    """
+    asyncio call coalescing for a single event loop.
+
+    The leader's coroutine runs as a task; callers for the same key await
+    that task. Followers are shielded from each other, so cancelling one
+    waiter does not cancel the shared call.
+
+    Example:
+        >>> flight = AsyncSingleFlight()
+        >>> await flight.do(url, lambda: fetch_async(url))
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self.flights = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        """
+        Await fn() for key, or join the task already in flight for key.
+
+        Args:
+            key: Hashable identity of the call.
+            fn (callable): Returns the coroutine to run; only called by the leader.
+
+        Returns:
+            The leader's result, shared by every caller.
+
+        Raises:
+            Exception: Whatever the coroutine raised, in every caller.
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            self.flights += 1
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def clear(self) -> None:
+        """Forget in-flight tasks, e.g. when their event loop is shut down."""
+        self._tasks.clear()
+
+    def stats(self) -> dict:
+        """
+        Report coalescing counters.
+
+        Returns:
+            dict: 'flights', 'coalesced' and 'in_flight', as for SingleFlight.
+        """
+        return {
+            'flights': self.flights,
+            'coalesced': self.coalesced,
+            'in_flight': len(self._tasks)
+        }
+
+    def _forget(self, key, task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
@@ -0,0 +1,53 @@
+"""
+Shared pytest fixtures and test helpers.
+"""
+
+import time
+
+import pytest
+
+from services import joke_service
+
+
+# ===== Helpers =====
+
+class FakeClock:
+    """Manually advanced clock; tests set ``now`` and pass it as the timer."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def wait_for(predicate, timeout=2.0):
+    """Poll predicate until it is true or the timeout expires."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return predicate()
+
+
+# ===== Fixtures =====
+
+@pytest.fixture
+def clock():
+    """Provide a controllable clock starting at 0."""
+    return FakeClock()
+
+
+@pytest.fixture(autouse=True)
+def reset_joke_service():
+    """Start every test with an empty cache, a closed circuit, no latency samples and a full quota."""
+    joke_service.clear_cache()
+    joke_service.reset_circuit_breaker()
+    joke_service.reset_latency()
+    joke_service.reset_quota()
+    yield
+    joke_service.clear_cache()
+    joke_service.reset_circuit_breaker()
+    joke_service.reset_latency()
+    joke_service.reset_quota()
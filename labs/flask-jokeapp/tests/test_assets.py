@@ -0,0 +1,185 @@
+"""
+Test suite for the front-end asset pipeline.
+
+Tests cover:
+- CSS parsing, purging and minification
+- Building fingerprinted files and the manifest
+- Template helpers and the committed build output
+"""
+
+import json
+import os
+
+import pytest
+from flask import Flask, render_template_string
+from services import assets
+from services.assets import build, build_css, parse_css, selector_is_used, strip_comments
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ===== Fixtures =====
+
+@pytest.fixture
+def project(tmp_path):
+    """A minimal app tree with assets, templates and a static folder."""
+    vendor = tmp_path / 'assets' / 'vendor' / 'bootstrap'
+    vendor.mkdir(parents=True)
+    (vendor / 'bootstrap.min.css').write_text(
+        '@charset "UTF-8";/*! Bootstrap banner */'
+        ':root{--bs-used:1px;--bs-unused:2px;--bs-chain:var(--bs-used)}'
+        '.btn{padding:var(--bs-chain)}.btn:hover{color:red}.modal{display:none}abbr{cursor:help}'
+        '@media (min-width:768px){.col-md-6{width:50%}.table{color:red}}'
+    )
+    (vendor / 'bootstrap.min.js').write_text('/*! js */console.log(1);')
+    (tmp_path / 'assets' / 'style.css').write_text(
+        '/* custom styles */\n.hero  >  .title {\n    color : #333 ;\n}\n.unused-thing { margin: 0; }\n'
+        '.footer { padding: 1rem; }\n'
+    )
+    templates = tmp_path / 'templates'
+    templates.mkdir()
+    (templates / 'base.html').write_text(
+        '<div class="btn">{% block content %}{% endblock %}</div><footer class="footer"></footer>'
+    )
+    (templates / 'page.html').write_text(
+        '{% extends "base.html" %}{% block content %}'
+        '<div class="hero"><h1 class="title col-md-6">Hi</h1></div>{% endblock %}'
+    )
+    (tmp_path / 'static').mkdir()
+    return tmp_path
+
+
+# ===== Tests =====
+
+class TestCssProcessing:
+    """Test suite for parsing, purging and minifying CSS."""
+
+    def test_strip_comments_keeps_license_banners(self):
+        """Test /*! banners are collected and other comments dropped."""
+        css, banners = strip_comments('/*! keep */a{b:c}/* drop */d{content:"/* not a comment */"}')
+        assert banners == ['/*! keep */']
+        assert css == 'a{b:c}d{content:"/* not a comment */"}'
+
+    def test_parse_nested_groups_and_strings(self):
+        """Test at-rule groups nest and strings may hold braces and semicolons."""
+        nodes, _ = parse_css('@media (x){a{b:c}}d{background:url("data:x;{}")}@import "y";')
+        assert nodes[0] == ('group', '@media (x)', [('rule', 'a', 'b:c')])
+        assert nodes[1] == ('rule', 'd', 'background:url("data:x;{}")')
+        assert nodes[2] == ('statement', '@import "y"')
+
+    @pytest.mark.parametrize('selector, expected', [
+        ('.btn', True),
+        ('.btn.modal', False),
+        ('.btn:not(.modal)', True),
+        ('a[href$=".modal"]', True),
+        ('#main .btn', True),
+        ('#other', False),
+        ('[data-bs-theme=dark] .btn', False),
+        ('body', True),
+    ])
+    def test_selector_is_used(self, selector, expected):
+        """Test selectors are kept only when all their names are used."""
+        assert selector_is_used(selector, {'btn', 'main'}) is expected
+
+    def test_build_css_purges_and_minifies(self, project):
+        """Test unused rules, variables and groups are dropped."""
+        sources = [
+            (project / 'assets' / 'vendor' / 'bootstrap' / 'bootstrap.min.css').read_text(),
+            (project / 'assets' / 'style.css').read_text(),
+        ]
+        css = build_css(sources, {'btn', 'hero', 'title', 'col-md-6'})
+
+        assert css.startswith('@charset "UTF-8";/*! Bootstrap banner */\n')
+        assert ':root{--bs-used:1px;--bs-chain:var(--bs-used)}' in css
+        assert '.btn{padding:var(--bs-chain)}' in css
+        assert '@media (min-width:768px){.col-md-6{width:50%}}' in css
+        assert '.hero>.title{color:#333}' in css
+        for removed in ('--bs-unused', '.modal', '.table', '.unused-thing', 'custom styles'):
+            assert removed not in css
+
+    def test_unused_keyframes_are_dropped(self):
+        """Test keyframes survive only if a kept rule animates with them."""
+        css = build_css(['@keyframes spin{to{x:1}}@keyframes pulse{to{x:1}}'
+                         '.a{animation:spin 1s}.b{animation:pulse 1s}'], {'a'})
+        assert '@keyframes spin' in css
+        assert 'pulse' not in css
+
+
+class TestBuild:
+    """Test suite for build() and the Flask integration."""
+
+    def test_build_writes_fingerprinted_files(self, project):
+        """Test the dist folder gets hashed CSS/JS, critical CSS and a manifest."""
+        manifest = build(str(project), str(project / 'static'), str(project / 'templates'))
+        dist = project / 'static' / 'dist'
+
+        assert manifest['app.css'].startswith('app.') and manifest['app.css'].endswith('.css')
+        assert manifest['bootstrap.js'].startswith('bootstrap.')
+        assert manifest['critical.css'] == 'critical.css'
+        assert json.loads((dist / 'manifest.json').read_text()) == manifest
+        assert (dist / manifest['bootstrap.js']).read_text() == '/*! js */console.log(1);'
+
+    def test_critical_css_covers_layout(self, project):
+        """Test critical CSS holds the layout rules."""
+        build(str(project), str(project / 'static'), str(project / 'templates'))
+        critical = (project / 'static' / 'dist' / 'critical.css').read_text()
+        assert '.btn{' in critical
+        assert '.modal' not in critical
+
+    def test_critical_css_keeps_only_first_paint(self, project):
+        """Test states, the reboot, the footer and other components wait for app.css."""
+        manifest = build(str(project), str(project / 'static'), str(project / 'templates'))
+        dist = project / 'static' / 'dist'
+        critical = (dist / 'critical.css').read_text()
+        full = (dist / manifest['app.css']).read_text()
+
+        for rule in ('.btn:hover{', 'abbr{', '.footer{', '.hero>.title{'):
+            assert rule in full
+            assert rule not in critical
+
+    def test_critical_css_fits_budget(self):
+        """Test the committed critical.css stays within CRITICAL_BUDGET."""
+        size = os.path.getsize(os.path.join(APP_DIR, 'static', 'dist', 'critical.css'))
+        assert size <= assets.CRITICAL_BUDGET, (
+            f"critical.css is {size} bytes, over the {assets.CRITICAL_BUDGET} byte budget; "
+            "trim CRITICAL_CLASSES"
+        )
+
+    def test_rebuild_replaces_old_files(self, project):
+        """Test stale fingerprinted files are removed."""
+        first = build(str(project), str(project / 'static'), str(project / 'templates'))
+        (project / 'assets' / 'style.css').write_text('.hero{color:blue}')
+        second = build(str(project), str(project / 'static'), str(project / 'templates'))
+
+        assert first['app.css'] != second['app.css']
+        assert not (project / 'static' / 'dist' / first['app.css']).exists()
+
+    def test_template_helpers_and_command(self, project):
+        """Test build-assets and the asset_url / inline_asset globals."""
+        small_app = Flask(__name__, root_path=str(project))
+        assets.init_app(small_app)
+        result = small_app.test_cli_runner().invoke(args=['build-assets'])
+        assert result.exit_code == 0
+
+        with small_app.test_request_context():
+            url = render_template_string("{{ asset_url('app.css') }}")
+            style = render_template_string("<style>{{ inline_asset('critical.css') }}</style>")
+        assert url.startswith('/static/dist/app.') and url.endswith('.css')
+        assert '.btn{' in style and '&gt;' not in style
+
+    def test_missing_asset_raises_helpful_error(self, project):
+        """Test templates fail clearly before the assets are built."""
+        small_app = Flask(__name__, root_path=str(project))
+        assets.init_app(small_app)
+        with small_app.test_request_context():
+            with pytest.raises(RuntimeError, match='build-assets'):
+                render_template_string("{{ asset_url('app.css') }}")
+
+    def test_committed_build_is_current(self, tmp_path):
+        """Test static/dist matches a fresh build of assets/ and templates/."""
+        manifest = build(APP_DIR, str(tmp_path), os.path.join(APP_DIR, 'templates'))
+        committed = os.path.join(APP_DIR, 'static', 'dist')
+        stale = "static/dist is stale; run 'flask --app app build-assets'"
+        assert manifest == assets.load_manifest(os.path.join(APP_DIR, 'static')), stale
+        with open(os.path.join(committed, 'critical.css'), encoding='utf-8') as critical:
+            assert (tmp_path / 'dist' / 'critical.css').read_text() == critical.read(), stale
@@ -0,0 +1,91 @@
+"""
+Test suite for the TTLCache used by the joke service.
+
+Tests cover:
+- Hits and misses
+- TTL expiry
+- LRU eviction
+- Counters
+"""
+
+import pytest
+from services.cache import TTLCache
+
+
+class TestTTLCache:
+    """Test suite for TTLCache."""
+
+    def test_get_returns_stored_value(self, clock):
+        """Test a stored value is returned while fresh."""
+        cache = TTLCache(maxsize=4, ttl=10, timer=clock)
+        cache.set('a', 1)
+        assert cache.get('a') == 1
+
+    def test_get_missing_returns_default(self, clock):
+        """Test a missing key returns the default."""
+        cache = TTLCache(maxsize=4, ttl=10, timer=clock)
+        assert cache.get('a') is None
+        assert cache.get('a', 'fallback') == 'fallback'
+
+    def test_entries_expire_after_ttl(self, clock):
+        """Test entries are dropped once the TTL has passed."""
+        cache = TTLCache(maxsize=4, ttl=10, timer=clock)
+        cache.set('a', 1)
+        clock.now = 9.9
+        assert cache.get('a') == 1
+        clock.now = 10.0
+        assert cache.get('a') is None
+        assert len(cache) == 0
+        assert cache.stats()['expirations'] == 1
+
+    def test_least_recently_used_entry_is_evicted(self, clock):
+        """Test the LRU entry is evicted when the cache is full."""
+        cache = TTLCache(maxsize=2, ttl=10, timer=clock)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+        assert cache.stats()['evictions'] == 1
+
+    def test_set_existing_key_refreshes_ttl(self, clock):
+        """Test overwriting a key restarts its TTL."""
+        cache = TTLCache(maxsize=2, ttl=10, timer=clock)
+        cache.set('a', 1)
+        clock.now = 8
+        cache.set('a', 2)
+        clock.now = 15
+        assert cache.get('a') == 2
+
+    def test_stats_track_hits_and_misses(self, clock):
+        """Test hit/miss counters and hit ratio."""
+        cache = TTLCache(maxsize=2, ttl=10, timer=clock)
+        cache.set('a', 1)
+        cache.get('a')
+        cache.get('a')
+        cache.get('b')
+
+        stats = cache.stats()
+        assert stats['hits'] == 2
+        assert stats['misses'] == 1
+        assert stats['size'] == 1
+        assert stats['maxsize'] == 2
+        assert stats['hit_ratio'] == pytest.approx(2 / 3)
+
+    def test_clear_resets_entries_and_counters(self, clock):
+        """Test clear() empties the cache and zeroes counters."""
+        cache = TTLCache(maxsize=2, ttl=10, timer=clock)
+        cache.set('a', 1)
+        cache.get('a')
+        cache.clear()
+
+        assert len(cache) == 0
+        assert cache.stats()['hits'] == 0
+
+    def test_invalid_maxsize_raises(self):
+        """Test a non-positive maxsize is rejected."""
+        with pytest.raises(ValueError):
+            TTLCache(maxsize=0)
@@ -0,0 +1,132 @@
+"""
+Test suite for the CircuitBreaker state machine.
+
+Tests cover:
+- Opening after consecutive failures
+- Fail-fast rejection while open
+- Half-open trial calls and recovery
+- Transition history
+"""
+
+import pytest
+from services.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+@pytest.fixture
+def breaker(clock):
+    """Create a breaker that opens after 3 failures for 10 seconds."""
+    return CircuitBreaker(failure_threshold=3, cooldown=10, timer=clock, clock=clock)
+
+
+def trip(breaker):
+    """Record enough failures to open the circuit."""
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+
+class TestCircuitBreaker:
+    """Test suite for CircuitBreaker."""
+
+    def test_starts_closed(self, breaker):
+        """Test a new breaker allows requests."""
+        assert breaker.state == CLOSED
+        assert breaker.allow_request() is True
+
+    def test_opens_after_threshold(self, breaker):
+        """Test consecutive failures up to the threshold open the circuit."""
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert breaker.allow_request() is False
+        assert breaker.stats()['rejected'] == 1
+
+    def test_success_resets_failure_count(self, breaker):
+        """Test a success in between failures keeps the circuit closed."""
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+        assert breaker.stats()['consecutive_failures'] == 1
+
+    def test_half_open_after_cooldown(self, breaker, clock):
+        """Test the circuit moves to half open once the cooldown passes."""
+        trip(breaker)
+        clock.now = 9.9
+        assert breaker.state == OPEN
+        clock.now = 10
+        assert breaker.state == HALF_OPEN
+
+    def test_half_open_limits_trial_calls(self, breaker, clock):
+        """Test only half_open_max_calls requests go through when half open."""
+        trip(breaker)
+        clock.now = 10
+        assert breaker.allow_request() is True
+        assert breaker.allow_request() is False
+
+    def test_half_open_success_closes(self, breaker, clock):
+        """Test a successful trial call closes the circuit."""
+        trip(breaker)
+        clock.now = 10
+        breaker.allow_request()
+        breaker.record_success()
+        assert breaker.state == CLOSED
+
+    def test_half_open_failure_reopens(self, breaker, clock):
+        """Test a failed trial call opens the circuit for another cooldown."""
+        trip(breaker)
+        clock.now = 10
+        breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        clock.now = 15
+        assert breaker.stats()['retry_in'] == pytest.approx(5)
+
+    def test_released_trial_lets_another_call_try(self, breaker, clock):
+        """Test release_trial() gives the slot back without changing state."""
+        trip(breaker)
+        clock.now = 10
+        breaker.allow_request()
+        breaker.release_trial()
+
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow_request() is True
+        breaker.record_success()
+        assert breaker.state == CLOSED
+
+    def test_release_trial_while_closed_is_a_no_op(self, breaker):
+        """Test release_trial() does not affect a closed circuit."""
+        breaker.release_trial()
+        assert breaker.state == CLOSED
+        assert breaker.allow_request() is True
+
+    def test_transitions_are_recorded(self, breaker, clock):
+        """Test stats() lists state transitions with timestamps."""
+        trip(breaker)
+        clock.now = 10
+        breaker.allow_request()
+        breaker.record_success()
+
+        transitions = breaker.stats()['transitions']
+        assert [(t['from'], t['to']) for t in transitions] == [
+            (CLOSED, OPEN), (OPEN, HALF_OPEN), (HALF_OPEN, CLOSED)
+        ]
+        assert transitions[0]['at'] == 0.0
+        assert transitions[1]['at'] == 10
+
+    def test_reset_closes_and_clears_history(self, breaker):
+        """Test reset() returns to a clean closed state."""
+        trip(breaker)
+        breaker.reset()
+        stats = breaker.stats()
+        assert stats['state'] == CLOSED
+        assert stats['transitions'] == []
+        assert stats['rejected'] == 0
+
+    def test_invalid_threshold_raises(self):
+        """Test a non-positive failure threshold is rejected."""
+        with pytest.raises(ValueError):
+            CircuitBreaker(failure_threshold=0)
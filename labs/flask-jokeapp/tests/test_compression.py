@@ -0,0 +1,251 @@
+"""
+Test suite for response compression.
+
+Tests cover:
+- Accept-Encoding negotiation
+- Size threshold and content-type filtering
+- Streaming compression
+- Precompressed static files
+"""
+
+import gzip
+import os
+import zlib
+
+import pytest
+from flask import Flask, Response
+from werkzeug.http import parse_accept_header
+from services import compression
+from services.compression import compress_stream, negotiate_encoding, precompress_static
+
+BIG_TEXT = 'knock knock. who is there? ' * 100
+
+
+# ===== Fixtures =====
+
+@pytest.fixture
+def static_dir(tmp_path):
+    """A static folder with one compressible stylesheet and one tiny file."""
+    static = tmp_path / 'static'
+    static.mkdir()
+    (static / 'site.css').write_text('.joke { color: #333; margin: 0 auto; }\n' * 100)
+    (static / 'tiny.css').write_text('a{}')
+    return static
+
+
+@pytest.fixture
+def small_app(static_dir):
+    """A minimal app with compression enabled."""
+    small_app = Flask(__name__, static_folder=str(static_dir))
+    compression.init_app(small_app)
+
+    @small_app.route('/big')
+    def big():
+        return BIG_TEXT
+
+    @small_app.route('/small')
+    def small():
+        return 'short'
+
+    @small_app.route('/binary')
+    def binary():
+        return Response(b'\0' * 2000, mimetype='application/octet-stream')
+
+    @small_app.route('/stream')
+    def stream():
+        return Response((f'{{"n": {i}}}\n' for i in range(50)), mimetype='application/x-ndjson')
+
+    return small_app
+
+
+def accept(header):
+    """Parse an Accept-Encoding header value."""
+    return parse_accept_header(header)
+
+
+# ===== Tests =====
+
+class TestNegotiation:
+    """Test suite for negotiate_encoding()."""
+
+    def test_prefers_gzip_when_accepted(self):
+        """Test gzip is chosen when the client lists it."""
+        assert negotiate_encoding(accept('gzip, deflate'), ['gzip']) == 'gzip'
+
+    def test_prefers_br_when_both_accepted(self):
+        """Test br wins over gzip at equal quality."""
+        assert negotiate_encoding(accept('gzip, br'), ['br', 'gzip']) == 'br'
+
+    def test_honours_quality_values(self):
+        """Test q-values override the server preference."""
+        assert negotiate_encoding(accept('br;q=0.5, gzip'), ['br', 'gzip']) == 'gzip'
+        assert negotiate_encoding(accept('gzip;q=0'), ['gzip']) is None
+
+    def test_wildcard_and_missing_header(self):
+        """Test * accepts anything and an empty header accepts nothing."""
+        assert negotiate_encoding(accept('*'), ['gzip']) == 'gzip'
+        assert negotiate_encoding(accept(''), ['gzip']) is None
+
+
+class TestCompressStream:
+    """Test suite for compress_stream()."""
+
+    def test_gzip_stream_round_trip(self):
+        """Test the concatenated stream decompresses to the input."""
+        chunks = [f'line {i}\n'.encode() for i in range(100)]
+        assert gzip.decompress(b''.join(compress_stream(chunks, 'gzip'))) == b''.join(chunks)
+
+    def test_gzip_stream_is_incremental(self):
+        """Test each chunk can be decoded as soon as it arrives."""
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        stream = compress_stream(iter([b'first\n', b'second\n']), 'gzip')
+        assert decoder.decompress(next(stream)) == b'first\n'
+
+    @pytest.mark.skipif(compression.brotli is None, reason="brotli not installed")
+    def test_brotli_stream_round_trip(self):
+        """Test brotli streams decode to the input."""
+        chunks = [b'abc' * 100, b'def' * 100]
+        data = b''.join(compress_stream(chunks, 'br'))
+        assert compression.brotli.decompress(data) == b''.join(chunks)
+
+
+class TestCompressionMiddleware:
+    """Test suite for the after_request compression hook."""
+
+    def test_compresses_large_text(self, small_app):
+        """Test a large HTML body is gzipped when accepted."""
+        response = small_app.test_client().get('/big', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response.headers['Vary']
+        assert int(response.headers['Content-Length']) == len(response.data) < len(BIG_TEXT)
+        assert gzip.decompress(response.data).decode() == BIG_TEXT
+
+    def test_identity_without_accept_encoding(self, small_app):
+        """Test clients that don't ask for compression get plain bodies."""
+        response = small_app.test_client().get('/big')
+        assert 'Content-Encoding' not in response.headers
+        assert response.get_data(as_text=True) == BIG_TEXT
+        assert 'Accept-Encoding' in response.headers['Vary']
+
+    def test_small_bodies_are_not_compressed(self, small_app):
+        """Test bodies below COMPRESS_MIN_SIZE are sent as-is."""
+        response = small_app.test_client().get('/small', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in response.headers
+        assert response.data == b'short'
+
+    def test_binary_types_are_not_compressed(self, small_app):
+        """Test non-text mimetypes are skipped."""
+        response = small_app.test_client().get('/binary', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in response.headers
+
+    def test_streamed_response_compressed_incrementally(self, small_app):
+        """Test streamed NDJSON is compressed without a Content-Length."""
+        response = small_app.test_client().get('/stream', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Length' not in response.headers
+        lines = gzip.decompress(response.data).decode().splitlines()
+        assert lines[0] == '{"n": 0}' and len(lines) == 50
+
+    @pytest.mark.parametrize('path', ['/big', '/small', '/stream'])
+    def test_head_gets_the_same_headers_as_get(self, small_app, path):
+        """Test HEAD is negotiated like GET, so both describe the same representation."""
+        client = small_app.test_client()
+        get = client.get(path, headers={'Accept-Encoding': 'gzip'})
+        head = client.head(path, headers={'Accept-Encoding': 'gzip'})
+
+        assert head.data == b''
+        for name in ('Content-Encoding', 'Content-Length', 'Vary', 'ETag'):
+            assert head.headers.get(name) == get.headers.get(name)
+
+    def test_disabled_by_config(self, small_app):
+        """Test COMPRESS_ENABLED=False turns compression off."""
+        small_app.config['COMPRESS_ENABLED'] = False
+        response = small_app.test_client().get('/big', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in response.headers
+
+
+class TestPrecompressedStatic:
+    """Test suite for precompressed static files."""
+
+    def test_precompress_writes_variants(self, static_dir):
+        """Test compressible files get variants and tiny files are skipped."""
+        written = precompress_static(str(static_dir), ['gzip'])
+        assert [path.rsplit('/', 1)[-1] for path in written] == ['site.css.gz']
+        assert precompress_static(str(static_dir), ['gzip']) == []
+
+    def test_serves_variant_when_accepted(self, small_app, static_dir):
+        """Test the .gz file is served as-is with the CSS mimetype."""
+        precompress_static(str(static_dir), ['gzip'])
+        response = small_app.test_client().get('/static/site.css', headers={'Accept-Encoding': 'gzip'})
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.mimetype == 'text/css'
+        assert response.data == (static_dir / 'site.css.gz').read_bytes()
+        assert gzip.decompress(response.data) == (static_dir / 'site.css').read_bytes()
+        response.close()
+
+    def test_serves_plain_file_without_accept_encoding(self, small_app, static_dir):
+        """Test clients without gzip support get the original file."""
+        precompress_static(str(static_dir), ['gzip'])
+        response = small_app.test_client().get('/static/site.css')
+
+        assert 'Content-Encoding' not in response.headers
+        assert response.data == (static_dir / 'site.css').read_bytes()
+        response.close()
+
+    def test_plain_file_with_variant_varies_on_accept_encoding(self, small_app, static_dir):
+        """Test caches don't reuse the identity file for clients that accept gzip."""
+        precompress_static(str(static_dir), ['gzip'])
+        client = small_app.test_client()
+        plain = client.get('/static/site.css', headers={'Accept-Encoding': 'identity'})
+        tiny = client.get('/static/tiny.css')
+
+        assert 'Content-Encoding' not in plain.headers
+        assert 'Accept-Encoding' in plain.headers['Vary']
+        assert 'Vary' not in tiny.headers
+        plain.close()
+        tiny.close()
+
+    def test_stale_variant_is_ignored(self, small_app, static_dir):
+        """Test a variant older than its source is not served."""
+        precompress_static(str(static_dir), ['gzip'])
+        variant = static_dir / 'site.css.gz'
+        os.utime(variant, ns=(0, (static_dir / 'site.css').stat().st_mtime_ns - 1_000_000_000))
+
+        response = small_app.test_client().get('/static/site.css', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in response.headers
+        response.close()
+
+    def test_compress_static_command(self, small_app, static_dir):
+        """Test the flask CLI command writes variants."""
+        result = small_app.test_cli_runner().invoke(args=['compress-static'])
+        assert result.exit_code == 0
+        assert (static_dir / 'site.css.gz').exists()
+
+
+class TestAppCompression:
+    """Test compression on the app's own routes."""
+
+    def test_page_etag_revalidates_when_compressed(self):
+        """Test a compressed page keeps a weak ETag that answers 304."""
+        from app import app
+        client = app.test_client()
+        response = client.get('/about', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['ETag'].startswith('W/')
+
+        again = client.get('/about', headers={
+            'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']
+        })
+        assert again.status_code == 304
+
+    def test_page_head_matches_get(self):
+        """Test HEAD on a page reports the compressed GET's encoding, length and ETag."""
+        from app import app
+        client = app.test_client()
+        get = client.get('/about', headers={'Accept-Encoding': 'gzip'})
+        head = client.head('/about', headers={'Accept-Encoding': 'gzip'})
+
+        assert head.headers['Content-Encoding'] == 'gzip'
+        for name in ('Content-Length', 'Vary', 'ETag'):
+            assert head.headers[name] == get.headers[name]
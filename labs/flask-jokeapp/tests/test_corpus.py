@@ -0,0 +1,141 @@
+"""
+Test suite for the local JokeCorpus backend store.
+
+Tests cover:
+- Loading JSONL and SQLite dumps
+- Filtering by category, type and flags
+- Category aliases and unknown categories
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+from services.corpus import JokeCorpus, flags_to_mask, FLAG_NAMES
+
+CORPUS_PATH = Path(__file__).resolve().parent.parent / 'data' / 'jokes.jsonl'
+
+
+# ===== Fixtures =====
+
+@pytest.fixture
+def jokes():
+    """A tiny corpus covering both joke types and a flagged joke."""
+    return [
+        {'id': 1, 'category': 'Programming', 'type': 'single', 'joke': 'P single',
+         'flags': {'nsfw': False, 'political': False}},
+        {'id': 2, 'category': 'Programming', 'type': 'twopart', 'setup': 'P setup',
+         'delivery': 'P delivery', 'flags': {'nsfw': True, 'political': False}},
+        {'id': 3, 'category': 'Misc', 'type': 'single', 'joke': 'M single',
+         'flags': {'nsfw': False, 'political': True}},
+    ]
+
+
+@pytest.fixture
+def corpus(jokes):
+    """Build a corpus from the tiny joke list."""
+    return JokeCorpus(jokes)
+
+
+# ===== Tests =====
+
+class TestFlagsToMask:
+    """Test suite for flags_to_mask()."""
+
+    def test_dict_flags(self):
+        """Test only true flags are set in the mask."""
+        assert flags_to_mask({'nsfw': True, 'racist': False}) == 1
+
+    def test_flag_names(self):
+        """Test a list of flag names is packed into a mask."""
+        assert flags_to_mask(['nsfw', 'explicit']) == 1 | 1 << FLAG_NAMES.index('explicit')
+
+    def test_unknown_flag_raises(self):
+        """Test unknown flag names are rejected."""
+        with pytest.raises(ValueError):
+            flags_to_mask(['spicy'])
+
+
+class TestJokeCorpus:
+    """Test suite for JokeCorpus selection."""
+
+    def test_filter_by_category(self, corpus):
+        """Test only jokes from the requested category are returned."""
+        for _ in range(20):
+            assert corpus.random_payload('Programming')['category'] == 'Programming'
+
+    def test_filter_by_type(self, corpus):
+        """Test the joke type filter."""
+        assert corpus.random_payload('Programming', 'twopart')['id'] == 2
+
+    def test_blacklist_flags(self, corpus):
+        """Test jokes carrying a blacklisted flag are excluded."""
+        for _ in range(20):
+            assert corpus.random_payload('Any', blacklist_flags=['nsfw', 'political'])['id'] == 1
+
+    def test_any_category_matches_everything(self, corpus):
+        """Test "Any" draws from every category."""
+        ids = {corpus.random_payload('Any')['id'] for _ in range(200)}
+        assert ids == {1, 2, 3}
+
+    def test_miscellaneous_alias(self, corpus):
+        """Test "Miscellaneous" maps onto JokeAPI's "Misc" label."""
+        assert corpus.random_payload('Miscellaneous')['id'] == 3
+
+    def test_comma_separated_categories(self, corpus):
+        """Test several categories can be combined."""
+        ids = {corpus.random_payload('Misc,Programming', 'single')['id'] for _ in range(100)}
+        assert ids == {1, 3}
+
+    def test_no_match_returns_none(self, corpus):
+        """Test an empty filter combination returns None."""
+        assert corpus.random_payload('Misc', 'twopart') is None
+
+    def test_unknown_category_returns_none(self, corpus):
+        """Test unknown categories return None and are not memoized."""
+        assert corpus.random_payload('Nope') is None
+        assert not any('Nope' in key[0] for key in corpus._buckets)
+
+    def test_payload_is_api_shaped(self, corpus):
+        """Test payloads carry error=False like JokeAPI responses."""
+        assert corpus.random_payload('Programming', 'single')['error'] is False
+
+    def test_invalid_joke_type_rejected(self):
+        """Test jokes with an unknown type fail to load."""
+        with pytest.raises(ValueError):
+            JokeCorpus([{'id': 1, 'category': 'Pun', 'type': 'limerick'}])
+
+
+class TestCorpusLoading:
+    """Test suite for JokeCorpus.load()."""
+
+    def test_load_bundled_jsonl(self):
+        """Test the bundled sample corpus loads with every category."""
+        corpus = JokeCorpus.load(CORPUS_PATH)
+        assert len(corpus) > 0
+        assert {'Programming', 'Misc', 'Pun', 'Spooky', 'Christmas', 'Dark'} <= set(corpus.categories)
+
+    def test_load_sqlite(self, tmp_path, jokes):
+        """Test a SQLite dump loads the same jokes."""
+        db_path = tmp_path / 'jokes.db'
+        connection = sqlite3.connect(db_path)
+        connection.execute(
+            "CREATE TABLE jokes (id INTEGER, category TEXT, type TEXT, joke TEXT,"
+            " setup TEXT, delivery TEXT, flags TEXT)"
+        )
+        for joke in jokes:
+            connection.execute(
+                "INSERT INTO jokes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (joke['id'], joke['category'], joke['type'], joke.get('joke'),
+                 joke.get('setup'), joke.get('delivery'), json.dumps(joke['flags']))
+            )
+        connection.commit()
+        connection.close()
+
+        corpus = JokeCorpus.load(db_path)
+
+        assert len(corpus) == 3
+        payload = corpus.random_payload('Programming', 'twopart')
+        assert payload['setup'] == 'P setup'
+        assert payload['delivery'] == 'P delivery'
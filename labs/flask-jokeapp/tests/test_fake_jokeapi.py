@@ -0,0 +1,192 @@
+"""
+Test suite for the local JokeAPI stand-in used by the load tests.
+
+Tests cover:
+- Latency distribution specs
+- JokeAPI response shapes (single, twopart, batch, errors)
+- Error, slowloris and rate limit injection
+- joke_service talking to the stand-in through configure_api()
+"""
+
+import random
+
+import pytest
+import requests
+
+from benchmarks.fake_jokeapi import FakeJokeAPI, parse_latency
+from benchmarks.load_test import percentile
+from services import joke_service
+
+
+# ===== Fixtures =====
+
+@pytest.fixture
+def upstream():
+    """A running stand-in with no delay."""
+    with FakeJokeAPI(seed=1) as server:
+        yield server
+
+
+@pytest.fixture
+def pointed_at(upstream):
+    """Point joke_service at the stand-in for one test."""
+    original = joke_service.API_BASE_URL
+    joke_service.close_session()
+    joke_service.configure_api(upstream.base_url)
+    yield upstream
+    joke_service.configure_api(original)
+    joke_service.close_session()
+
+
+# ===== Tests =====
+
+class TestParseLatency:
+    """Test suite for latency specs."""
+
+    @pytest.mark.parametrize('spec, low, high', [
+        ('fixed:20', 0.02, 0.02),
+        ('uniform:10:30', 0.01, 0.03),
+        ('exp:5', 0.0, 1.0),
+        ('lognormal:40:0.5', 0.0, 10.0),
+    ])
+    def test_samples_within_range(self, spec, low, high):
+        """Test samples are seconds within the distribution's range."""
+        sample = parse_latency(spec)
+        rng = random.Random(0)
+        assert all(low <= sample(rng) <= high for _ in range(100))
+
+    def test_normal_is_clamped_at_zero(self):
+        """Test negative draws become zero delay."""
+        sample = parse_latency('normal:0:100')
+        rng = random.Random(0)
+        assert min(sample(rng) for _ in range(100)) == 0.0
+
+    @pytest.mark.parametrize('spec', ['fixed', 'fixed:a', 'uniform:1', 'pareto:1:2'])
+    def test_bad_spec(self, spec):
+        """Test malformed specs are rejected."""
+        with pytest.raises(ValueError):
+            parse_latency(spec)
+
+
+class TestResponses:
+    """Test suite for the stand-in's JokeAPI response shapes."""
+
+    def test_single_joke(self, upstream):
+        """Test a type filter returns that joke shape."""
+        data = requests.get(f'{upstream.base_url}/Programming?type=single', timeout=5).json()
+        assert data['error'] is False
+        assert data['type'] == 'single'
+        assert data['joke']
+
+    def test_twopart_joke(self, upstream):
+        """Test twopart jokes carry setup and delivery."""
+        data = requests.get(f'{upstream.base_url}/Any?type=twopart', timeout=5).json()
+        assert data['type'] == 'twopart'
+        assert data['setup'] and data['delivery']
+
+    def test_batch(self, upstream):
+        """Test amount returns a jokes list."""
+        data = requests.get(f'{upstream.base_url}/Pun?amount=3', timeout=5).json()
+        assert data['amount'] == 3
+        assert len(data['jokes']) == 3
+
+    def test_no_match_is_jokeapi_error(self, upstream):
+        """Test an unknown category gets JokeAPI's 400 error payload."""
+        response = requests.get(f'{upstream.base_url}/Nonexistent', timeout=5)
+        assert response.status_code == 400
+        assert response.json()['error'] is True
+        assert response.json()['code'] == 106
+
+    def test_error_rate(self):
+        """Test an error rate of 1 fails every request with HTTP 500."""
+        with FakeJokeAPI(error_rate=1.0) as server:
+            response = requests.get(f'{server.base_url}/Any', timeout=5)
+        assert response.status_code == 500
+        assert response.json()['internalError'] is True
+        assert server.stats['errors'] == 1
+
+    def test_rate_limit(self):
+        """Test requests over the limit get HTTP 429 with rate limit headers."""
+        with FakeJokeAPI(rate_limit=2, rate_window=60) as server:
+            responses = [requests.get(f'{server.base_url}/Any', timeout=5) for _ in range(3)]
+
+        assert [response.status_code for response in responses] == [200, 200, 429]
+        assert [response.headers['RateLimit-Remaining'] for response in responses] == ['1', '0', '0']
+        assert responses[0].headers['RateLimit-Limit'] == '2'
+        assert 0 < int(responses[2].headers['Retry-After']) <= 60
+        assert responses[2].json()['code'] == 101
+        assert server.stats['rate_limited'] == 1
+
+    def test_no_rate_limit_headers_by_default(self, upstream):
+        """Test an unlimited stand-in sends no rate limit headers."""
+        response = requests.get(f'{upstream.base_url}/Any', timeout=5)
+        assert 'RateLimit-Limit' not in response.headers
+
+    def test_slowloris_dribbles_body(self):
+        """Test a slow response takes about slowloris_seconds but completes."""
+        with FakeJokeAPI(slowloris_rate=1.0, slowloris_seconds=0.3) as server:
+            response = requests.get(f'{server.base_url}/Any', timeout=5)
+        assert response.json()['error'] is False
+        assert response.elapsed.total_seconds() < 0.3  # headers arrive at once
+        assert server.stats['slowloris'] == 1
+
+
+class TestJokeServiceAgainstStandIn:
+    """Test suite for joke_service with API_BASE_URL overridden."""
+
+    def test_get_joke(self, pointed_at):
+        """Test jokes are fetched from the stand-in."""
+        result = joke_service.get_joke('Programming', use_cache=False)
+        assert result['success'] is True
+        assert pointed_at.stats['requests'] == 1
+
+    def test_upstream_error(self):
+        """Test a 500 from the stand-in becomes an HTTP error result."""
+        original = joke_service.API_BASE_URL
+        with FakeJokeAPI(error_rate=1.0) as server:
+            joke_service.configure_api(server.base_url)
+            try:
+                result = joke_service.get_joke('Any', use_cache=False)
+            finally:
+                joke_service.configure_api(original)
+                joke_service.close_session()
+        assert result['success'] is False
+        assert 'HTTP Error 500' in result['error']
+
+    def test_quota_stays_under_the_rate_limit(self):
+        """Test joke_service stops at the advertised limit instead of collecting 429s."""
+        original = joke_service.API_BASE_URL
+        with FakeJokeAPI(rate_limit=3, rate_window=60) as server:
+            joke_service.configure_api(server.base_url)
+            try:
+                results = [joke_service.get_joke('Programming', use_cache=False) for _ in range(6)]
+            finally:
+                joke_service.configure_api(original)
+                joke_service.close_session()
+
+        assert server.stats['requests'] == 3
+        assert server.stats['rate_limited'] == 0
+        assert all(result['success'] for result in results[:3])
+        assert all(result is joke_service.RATE_LIMITED_RESULT for result in results[3:])
+
+    def test_configure_api_strips_trailing_slash(self):
+        """Test base URLs are normalised and empty values are ignored."""
+        original = joke_service.API_BASE_URL
+        try:
+            joke_service.configure_api('http://127.0.0.1:9/joke/')
+            joke_service.configure_api(None)
+            assert joke_service.build_joke_url('Pun') == 'http://127.0.0.1:9/joke/Pun'
+        finally:
+            joke_service.configure_api(original)
+
+
+class TestPercentile:
+    """Test suite for the load generator's percentile helper."""
+
+    def test_nearest_rank(self):
+        """Test percentiles pick an observed value by rank."""
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile(values, 100) == 100
+        assert percentile([], 50) == 0.0
@@ -0,0 +1,94 @@
+"""
+Test suite for the HTTP cache helpers.
+
+Tests cover:
+- Static file fingerprints
+- The page and joke cache decorators outside the main app
+"""
+
+import os
+
+import pytest
+from flask import Flask
+from services.http_cache import cache_joke, cache_page, static_fingerprint
+
+
+# ===== Fixtures =====
+
+@pytest.fixture
+def small_app():
+    """A minimal app with one page, one sync and one async joke view."""
+    small_app = Flask(__name__)
+
+    @small_app.route('/page')
+    @cache_page
+    def page():
+        return 'static content'
+
+    @small_app.route('/missing')
+    @cache_page
+    def missing():
+        return 'not here', 404
+
+    @small_app.route('/joke')
+    @cache_joke
+    def joke():
+        return 'fresh joke'
+
+    @small_app.route('/async-joke')
+    @cache_joke
+    async def async_joke():
+        return 'fresh async joke'
+
+    return small_app
+
+
+# ===== Tests =====
+
+class TestStaticFingerprint:
+    """Test suite for static_fingerprint()."""
+
+    def test_fingerprint_tracks_content(self, tmp_path):
+        """Test the hash changes when the file changes."""
+        asset = tmp_path / 'site.css'
+        asset.write_text('body { color: red; }')
+        first = static_fingerprint(str(tmp_path), 'site.css')
+
+        asset.write_text('body { color: blue; }')
+        os.utime(asset, ns=(0, asset.stat().st_mtime_ns + 1_000_000))
+        second = static_fingerprint(str(tmp_path), 'site.css')
+
+        assert len(first) == 12
+        assert first != second
+        assert static_fingerprint(str(tmp_path), 'site.css') == second
+
+    def test_missing_file_has_no_fingerprint(self, tmp_path):
+        """Test unknown files return None."""
+        assert static_fingerprint(str(tmp_path), 'nope.css') is None
+
+
+class TestCacheDecorators:
+    """Test suite for cache_page and cache_joke."""
+
+    def test_cache_page_etag_round_trip(self, small_app):
+        """Test cache_page adds an ETag and honours If-None-Match."""
+        client = small_app.test_client()
+        response = client.get('/page')
+        assert response.cache_control.max_age == 300
+
+        again = client.get('/page', headers={'If-None-Match': response.headers['ETag']})
+        assert again.status_code == 304
+
+    def test_cache_page_leaves_errors_alone(self, small_app):
+        """Test non-200 responses are not made cacheable."""
+        response = small_app.test_client().get('/missing')
+        assert response.status_code == 404
+        assert 'ETag' not in response.headers
+        assert 'Cache-Control' not in response.headers
+
+    @pytest.mark.parametrize('path', ['/joke', '/async-joke'])
+    def test_cache_joke_sync_and_async(self, small_app, path):
+        """Test cache_joke wraps sync and async views."""
+        response = small_app.test_client().get(path)
+        assert response.status_code == 200
+        assert response.cache_control.no_store is True
@@ -0,0 +1,112 @@
+"""
+Test suite for the JokeResult value type.
+
+Tests cover:
+- Attribute and dict-style access
+- Immutability and sharing
+- Equality with dicts, conversion and pickling
+"""
+
+import copy
+import json
+import pickle
+
+import pytest
+
+from services.joke_result import FIELDS, JokeResult
+
+
+# ===== Fixtures =====
+
+@pytest.fixture
+def twopart():
+    """A successful two-part result."""
+    return JokeResult.twopart('Why do programmers prefer dark mode?', 'Because light attracts bugs.',
+                              'Programming')
+
+
+# ===== Tests =====
+
+class TestAccess:
+    """Test suite for reading fields."""
+
+    def test_attributes_and_keys_agree(self, twopart):
+        """Test every field reads the same as an attribute and as a key."""
+        for name in FIELDS:
+            assert getattr(twopart, name) == twopart[name]
+
+    def test_constructors(self, twopart):
+        """Test the single, twopart and failure shapes."""
+        single = JokeResult.single('A joke.', 'Pun')
+        failure = JokeResult.failure('Boom')
+
+        assert (single.success, single.joke_type, single.joke, single.setup) == (True, 'single', 'A joke.', None)
+        assert (twopart.joke_type, twopart.joke, twopart.delivery) == ('twopart', None, 'Because light attracts bugs.')
+        assert (failure.success, failure.joke_type, failure.category, failure.error) == (False, None, None, 'Boom')
+        assert single.error == ''
+
+    def test_mapping_protocol(self, twopart):
+        """Test get(), membership, iteration and length behave like the old dict."""
+        assert twopart.get('success') is True
+        assert twopart.get('missing', 'default') == 'default'
+        assert 'setup' in twopart and 'missing' not in twopart
+        assert list(twopart) == list(FIELDS)
+        assert len(twopart) == 7
+        with pytest.raises(KeyError):
+            twopart['missing']
+
+    def test_is_truthy_even_on_failure(self):
+        """Test failures stay truthy, so `pop() or get_joke()` still works."""
+        assert JokeResult.failure('Boom')
+
+    def test_has_no_instance_dict(self, twopart):
+        """Test fields live in slots."""
+        assert not hasattr(twopart, '__dict__')
+
+
+class TestImmutability:
+    """Test suite for read-only results."""
+
+    def test_item_assignment_raises(self, twopart):
+        """Test results cannot be changed through the mapping interface."""
+        with pytest.raises(TypeError):
+            twopart['setup'] = 'changed'
+        with pytest.raises(TypeError):
+            del twopart['setup']
+
+    def test_attribute_assignment_raises(self, twopart):
+        """Test public fields are read-only."""
+        with pytest.raises(AttributeError):
+            twopart.setup = 'changed'
+        with pytest.raises(AttributeError):
+            twopart.extra = 'new'
+
+    def test_copies_are_the_same_object(self, twopart):
+        """Test copying a shared result returns it unchanged."""
+        assert copy.copy(twopart) is twopart
+        assert copy.deepcopy(twopart) is twopart
+
+
+class TestConversion:
+    """Test suite for equality and conversion."""
+
+    def test_equals_equivalent_dict(self, twopart):
+        """Test a result compares equal to its dict form, both ways round."""
+        as_dict = dict(twopart)
+
+        assert twopart == as_dict
+        assert as_dict == twopart
+        assert twopart != dict(as_dict, setup='other')
+        assert twopart != 'not a mapping'
+
+    def test_to_dict_is_json_serialisable(self, twopart):
+        """Test to_dict() gives a plain dict in the documented shape."""
+        assert json.loads(json.dumps(twopart.to_dict())) == twopart
+
+    def test_pickle_round_trip(self, twopart):
+        """Test results can cross process boundaries."""
+        assert pickle.loads(pickle.dumps(twopart)) == twopart
+
+    def test_repr_names_fields(self, twopart):
+        """Test repr shows every field."""
+        assert repr(twopart).startswith("JokeResult(success=True, joke_type='twopart'")
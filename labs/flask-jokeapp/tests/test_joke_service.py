@@ -8,10 +8,23 @@ Tests the JokeAPI service layer including:
 - Response parsing
 """
 
+import asyncio
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pytest
-from unittest.mock import patch, Mock
+from unittest.mock import patch, Mock, AsyncMock
+import httpx
 import requests
-from services.joke_service import get_joke, build_joke_url, ALLOWED_CATEGORIES
+from services import joke_service, metrics
+from services.joke_service import (
+    get_joke, get_joke_async, get_jokes_batch, iter_jokes_batch, build_joke_url, ALLOWED_CATEGORIES
+)
+from tests.conftest import wait_for
 
 
 # ===== Fixtures =====
@@ -68,6 +81,43 @@ def mock_api_error_response():
     }
 
 
+@pytest.fixture
+def local_jokeapi(mock_single_joke_response):
+    """Serve a canned joke from a local keep-alive HTTP server."""
+    body = json.dumps(mock_single_joke_response).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    joke_service.close_session()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}/joke'
+    with patch('services.joke_service.API_BASE_URL', base_url):
+        yield base_url
+    joke_service.close_session()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def no_cache():
+    """Disable the response cache so every call goes upstream."""
+    with patch('services.joke_service.CACHE_ENABLED', False):
+        yield
+
+
 # ===== Tests for build_joke_url() =====
 
 class TestBuildJokeUrl:
@@ -88,6 +138,23 @@ class TestBuildJokeUrl:
         url = build_joke_url('Dark', 'twopart')
         assert url == 'https://v2.jokeapi.dev/joke/Dark?type=twopart'
 
+    def test_build_url_with_amount(self):
+        """Test URL construction with an amount parameter."""
+        assert build_joke_url('Pun', amount=5) == 'https://v2.jokeapi.dev/joke/Pun?amount=5'
+
+    def test_build_url_with_type_and_amount(self):
+        """Test URL construction combining type and amount."""
+        url = build_joke_url('Pun', 'single', 3)
+        assert url == 'https://v2.jokeapi.dev/joke/Pun?type=single&amount=3'
+
+    def test_build_url_caps_amount(self):
+        """Test amount is capped at the JokeAPI maximum."""
+        assert build_joke_url('Pun', amount=25).endswith('?amount=10')
+
+    def test_build_url_ignores_amount_of_one(self):
+        """Test an amount of one builds the single-joke URL."""
+        assert build_joke_url('Pun', amount=1) == 'https://v2.jokeapi.dev/joke/Pun'
+
     def test_build_url_with_invalid_joke_type(self):
         """Test URL construction ignores invalid joke_type."""
         url = build_joke_url('Miscellaneous', 'invalid')
@@ -109,7 +176,7 @@ class TestGetJokeSuccess:
 
     def test_get_joke_returns_single_joke(self, mock_single_joke_response):
         """Test get_joke() returns properly formatted single joke."""
-        with patch('services.joke_service.requests.get') as mock_get:
+        with patch('services.joke_service.requests.Session.get') as mock_get:
             mock_response = Mock()
             mock_response.json.return_value = mock_single_joke_response
             mock_get.return_value = mock_response
@@ -126,7 +193,7 @@ class TestGetJokeSuccess:
 
     def test_get_joke_returns_twopart_joke(self, mock_twopart_joke_response):
         """Test get_joke() returns properly formatted two-part joke."""
-        with patch('services.joke_service.requests.get') as mock_get:
+        with patch('services.joke_service.requests.Session.get') as mock_get:
             mock_response = Mock()
             mock_response.json.return_value = mock_twopart_joke_response
             mock_get.return_value = mock_response
@@ -143,7 +210,7 @@ class TestGetJokeSuccess:
 
     def test_get_joke_with_no_parameters(self, mock_single_joke_response):
         """Test get_joke() with no parameters (default to 'Any')."""
-        with patch('services.joke_service.requests.get') as mock_get:
+        with patch('services.joke_service.requests.Session.get') as mock_get:
             mock_response = Mock()
             mock_response.json.return_value = mock_single_joke_response
             mock_get.return_value = mock_response
@@ -157,7 +224,7 @@ class TestGetJokeSuccess:
     @pytest.mark.parametrize('category', ['Programming', 'Dark', 'Miscellaneous'])
     def test_get_joke_with_multiple_categories(self, category, mock_single_joke_response):
         """Test get_joke() with multiple different categories."""
-        with patch('services.joke_service.requests.get') as mock_get:
+        with patch('services.joke_service.requests.Session.get') as mock_get:
             mock_response = Mock()
             mock_response.json.return_value = mock_single_joke_response
             mock_get.return_value = mock_response
@@ -175,7 +242,7 @@ class TestGetJokeApiErrors:
 
     def test_get_joke_api_returns_error(self, mock_api_error_response):
         """Test get_joke() handles API error response."""
-        with patch('services.joke_service.requests.get') as mock_get:
+        with patch('services.joke_service.requests.Session.get') as mock_get:
             mock_response = Mock()
             mock_response.json.return_value = mock_api_error_response
             mock_get.return_value = mock_response
@@ -195,7 +262,7 @@ class TestGetJokeNetworkErrors:
 
     def test_get_joke_timeout_error(self):
         """Test get_joke() handles request timeout."""
-        with patch('services.joke_service.requests.get') as mock_get:
+        with patch('services.joke_service.requests.Session.get') as mock_get:
             mock_get.side_effect = requests.exceptions.Timeout()
 
             result = get_joke('Programming')
@@ -206,7 +273,7 @@ class TestGetJokeNetworkErrors:
 
     def test_get_joke_connection_error(self):
         """Test get_joke() handles connection error."""
-        with patch('services.joke_service.requests.get') as mock_get:
+        with patch('services.joke_service.requests.Session.get') as mock_get:
             mock_get.side_effect = requests.exceptions.ConnectionError()
 
             result = get_joke('Programming')
@@ -217,7 +284,7 @@ class TestGetJokeNetworkErrors:
 
     def test_get_joke_http_error_404(self):
         """Test get_joke() handles HTTP 404 error."""
-        with patch('services.joke_service.requests.get') as mock_get:
+        with patch('services.joke_service.requests.Session.get') as mock_get:
             mock_response = Mock()
             mock_response.status_code = 404
             mock_response.reason = 'Not Found'
@@ -231,7 +298,7 @@ class TestGetJokeNetworkErrors:
 
     def test_get_joke_http_error_500(self):
         """Test get_joke() handles HTTP 500 error."""
-        with patch('services.joke_service.requests.get') as mock_get:
+        with patch('services.joke_service.requests.Session.get') as mock_get:
             mock_response = Mock()
             mock_response.status_code = 500
             mock_response.reason = 'Internal Server Error'
@@ -245,7 +312,7 @@ class TestGetJokeNetworkErrors:
 
     def test_get_joke_request_exception(self):
         """Test get_joke() handles generic request exception."""
-        with patch('services.joke_service.requests.get') as mock_get:
+        with patch('services.joke_service.requests.Session.get') as mock_get:
             mock_get.side_effect = requests.exceptions.RequestException('Custom error')
 
             result = get_joke('Programming')
@@ -255,7 +322,7 @@ class TestGetJokeNetworkErrors:
 
     def test_get_joke_json_decode_error(self):
         """Test get_joke() handles JSON decode error."""
-        with patch('services.joke_service.requests.get') as mock_get:
+        with patch('services.joke_service.requests.Session.get') as mock_get:
             mock_response = Mock()
             mock_response.json.side_effect = ValueError('Invalid JSON')
             mock_get.return_value = mock_response
@@ -267,7 +334,7 @@ class TestGetJokeNetworkErrors:
 
     def test_get_joke_unexpected_exception(self):
         """Test get_joke() handles unexpected generic exception."""
-        with patch('services.joke_service.requests.get') as mock_get:
+        with patch('services.joke_service.requests.Session.get') as mock_get:
             mock_get.side_effect = Exception('Unexpected error')
 
             result = get_joke('Programming')
@@ -275,6 +342,27 @@ class TestGetJokeNetworkErrors:
             assert result['success'] is False
             assert 'Unexpected error' in result['error']
 
+    @pytest.mark.parametrize('error, shared', [
+        (requests.exceptions.Timeout, 'TIMEOUT_RESULT'),
+        (requests.exceptions.ConnectionError, 'CONNECTION_RESULT'),
+        (ValueError, 'INVALID_JSON_RESULT'),
+    ])
+    def test_fixed_failures_return_shared_result(self, error, shared):
+        """Test fixed failures return one preallocated result."""
+        with patch('services.joke_service.requests.Session.get', side_effect=error()):
+            assert get_joke('Programming') is getattr(joke_service, shared)
+            assert get_joke('Pun') is getattr(joke_service, shared)
+
+    def test_http_errors_share_result_per_status(self):
+        """Test repeated HTTP errors with the same status reuse one result."""
+        response = Mock(status_code=503, reason='Service Unavailable')
+        with patch('services.joke_service.requests.Session.get',
+                   side_effect=requests.exceptions.HTTPError(response=response)):
+            first, second = get_joke('Programming'), get_joke('Pun')
+
+        assert first is second
+        assert first['error'] == 'HTTP Error 503: Service Unavailable'
+
 
 # ===== Integration Tests =====
 
@@ -283,7 +371,7 @@ class TestGetJokeIntegration:
 
     def test_get_joke_complete_success_flow(self, mock_single_joke_response):
         """Test complete successful get_joke() flow."""
-        with patch('services.joke_service.requests.get') as mock_get:
+        with patch('services.joke_service.requests.Session.get') as mock_get:
             mock_response = Mock()
             mock_response.json.return_value = mock_single_joke_response
             mock_get.return_value = mock_response
@@ -307,7 +395,7 @@ class TestGetJokeIntegration:
 
     def test_get_joke_error_response_structure(self):
         """Test that error responses have correct structure."""
-        with patch('services.joke_service.requests.get') as mock_get:
+        with patch('services.joke_service.requests.Session.get') as mock_get:
             mock_get.side_effect = requests.exceptions.Timeout()
 
             result = get_joke('Programming')
@@ -329,7 +417,7 @@ class TestGetJokeEdgeCases:
 
     def test_get_joke_with_empty_string_category(self, mock_single_joke_response):
         """Test get_joke() with empty string category."""
-        with patch('services.joke_service.requests.get') as mock_get:
+        with patch('services.joke_service.requests.Session.get') as mock_get:
             mock_response = Mock()
             mock_response.json.return_value = mock_single_joke_response
             mock_get.return_value = mock_response
@@ -352,7 +440,7 @@ class TestGetJokeEdgeCases:
             'safe': True
         }
         
-        with patch('services.joke_service.requests.get') as mock_get:
+        with patch('services.joke_service.requests.Session.get') as mock_get:
             mock_response = Mock()
             mock_response.json.return_value = mock_response_data
             mock_get.return_value = mock_response
@@ -362,3 +450,1284 @@ class TestGetJokeEdgeCases:
             assert result['success'] is True
             assert '😂' in result['joke']
             assert '"' in result['joke']
+
+
+# ===== Tests for the pooled HTTP session =====
+
+class TestConnectionPool:
+    """Test suite for the shared keep-alive session."""
+
+    def test_get_session_returns_shared_instance(self):
+        """Test get_session() returns the same session on every call."""
+        assert joke_service.get_session() is joke_service.get_session()
+
+    def test_close_session_resets_shared_instance(self):
+        """Test close_session() drops the session so a new one is created."""
+        session = joke_service.get_session()
+        joke_service.close_session()
+        assert joke_service.get_session() is not session
+
+    def test_pool_stats_empty_before_first_request(self):
+        """Test get_pool_stats() reports zeros without a session."""
+        joke_service.close_session()
+        stats = joke_service.get_pool_stats()
+        assert stats == {'hosts': 0, 'requests': 0, 'hits': 0, 'misses': 0}
+
+    def test_connections_are_reused(self, local_jokeapi, no_cache):
+        """Test repeated calls reuse one keep-alive connection."""
+        for _ in range(3):
+            assert get_joke('Programming')['success'] is True
+
+        stats = joke_service.get_pool_stats()
+        assert stats['hosts'] == 1
+        assert stats['requests'] == 3
+        assert stats['misses'] == 1
+        assert stats['hits'] == 2
+
+    def test_keep_alive_disabled_opens_new_connections(self, local_jokeapi, no_cache):
+        """Test disabling keep-alive makes every request a pool miss."""
+        joke_service.configure_pool(keep_alive=False)
+        try:
+            for _ in range(2):
+                get_joke('Programming')
+            stats = joke_service.get_pool_stats()
+            assert stats['misses'] == 2
+            assert stats['hits'] == 0
+        finally:
+            joke_service.configure_pool(keep_alive=True)
+
+    @pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs os.fork")
+    def test_forked_child_drops_inherited_session(self):
+        """Test a forked child starts with its own session and batch pool."""
+        joke_service.get_session()
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:  # child: report, then exit without running pytest's cleanup
+            fresh = joke_service._session is None and joke_service._batch_executor is None
+            os.write(write_end, b'1' if fresh else b'0')
+            os._exit(0)
+        os.close(write_end)
+        try:
+            assert os.read(read_end, 1) == b'1'
+        finally:
+            os.close(read_end)
+            os.waitpid(pid, 0)
+        assert joke_service._session is not None
+
+    @pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs os.fork")
+    def test_forked_child_replaces_held_locks(self):
+        """Test locks held by the parent when it forked are free in the child."""
+        counter = joke_service.UPSTREAM_OUTCOMES.labels('ok')
+        counter.inc()
+        shared = [
+            joke_service._response_cache, joke_service._last_good, joke_service._latency,
+            joke_service._hedge_budget, joke_service._quota, joke_service._circuit_breaker,
+            joke_service.UPSTREAM_OUTCOMES, counter._shards, metrics.REGISTRY
+        ]
+        for owner in shared:
+            owner._lock.acquire()
+        read_end, write_end = os.pipe()
+        try:
+            pid = os.fork()
+            if pid == 0:  # child: report, then exit without running pytest's cleanup
+                free = not any(owner._lock.locked() for owner in shared)
+                os.write(write_end, b'1' if free else b'0')
+                os._exit(0)
+        finally:
+            for owner in shared:
+                owner._lock.release()
+        os.close(write_end)
+        try:
+            assert os.read(read_end, 1) == b'1'
+        finally:
+            os.close(read_end)
+            os.waitpid(pid, 0)
+
+    def test_init_app_registers_extension(self):
+        """Test init_app() exposes pool stats on the Flask app."""
+        from flask import Flask
+
+        app = Flask(__name__)
+        joke_service.init_app(app)
+        assert 'joke_service' in app.extensions
+        assert app.extensions['joke_service']['pool_stats']() == joke_service.get_pool_stats()
+
+
+# ===== Tests for the response cache =====
+
+class TestResponseCache:
+    """Test suite for caching successful get_joke() results."""
+
+    def test_repeat_requests_served_from_cache(self, mock_single_joke_response):
+        """Test repeated calls for one category make a single upstream call."""
+        with patch('services.joke_service.requests.Session.get') as mock_get:
+            mock_response = Mock()
+            mock_response.json.return_value = mock_single_joke_response
+            mock_get.return_value = mock_response
+
+            results = [get_joke('Programming') for _ in range(5)]
+
+            assert mock_get.call_count == 1
+            assert all(result == results[0] for result in results)
+            stats = joke_service.get_cache_stats()
+            assert stats['hits'] == 4
+            assert stats['misses'] == 1
+            assert stats['hit_ratio'] == pytest.approx(0.8)
+
+    def test_cache_keys_on_category_and_type(self, mock_single_joke_response):
+        """Test different categories and joke types use separate entries."""
+        with patch('services.joke_service.requests.Session.get') as mock_get:
+            mock_response = Mock()
+            mock_response.json.return_value = mock_single_joke_response
+            mock_get.return_value = mock_response
+
+            get_joke('Programming')
+            get_joke('Pun')
+            get_joke('Programming', 'single')
+            get_joke('Pun')
+
+            assert mock_get.call_count == 3
+            assert joke_service.get_cache_stats()['size'] == 3
+
+    def test_errors_are_not_cached(self, mock_single_joke_response):
+        """Test timeouts and HTTP 5xx results are never served from cache."""
+        with patch('services.joke_service.requests.Session.get') as mock_get:
+            error_response = Mock(status_code=503, reason='Service Unavailable')
+            mock_get.side_effect = [
+                requests.exceptions.Timeout(),
+                requests.exceptions.HTTPError(response=error_response),
+                Mock(**{'json.return_value': mock_single_joke_response})
+            ]
+
+            assert get_joke('Programming')['success'] is False
+            assert get_joke('Programming')['success'] is False
+            assert get_joke('Programming')['success'] is True
+            assert mock_get.call_count == 3
+
+    def test_api_error_is_not_cached(self, mock_api_error_response):
+        """Test JokeAPI error payloads are not cached."""
+        with patch('services.joke_service.requests.Session.get') as mock_get:
+            mock_response = Mock()
+            mock_response.json.return_value = mock_api_error_response
+            mock_get.return_value = mock_response
+
+            get_joke('Programming')
+            get_joke('Programming')
+
+            assert mock_get.call_count == 2
+
+    def test_cached_result_cannot_be_mutated_by_caller(self, mock_single_joke_response):
+        """Test cached results are shared and read-only."""
+        with patch('services.joke_service.requests.Session.get') as mock_get:
+            mock_response = Mock()
+            mock_response.json.return_value = mock_single_joke_response
+            mock_get.return_value = mock_response
+
+            result = get_joke('Programming')
+            with pytest.raises(TypeError):
+                result['joke'] = 'changed'
+            with pytest.raises(AttributeError):
+                result.joke = 'changed'
+
+            assert get_joke('Programming') is result
+            assert result['joke'] == mock_single_joke_response['joke']
+
+    def test_disabled_cache_always_goes_upstream(self, mock_single_joke_response, no_cache):
+        """Test CACHE_ENABLED = False bypasses the cache."""
+        with patch('services.joke_service.requests.Session.get') as mock_get:
+            mock_response = Mock()
+            mock_response.json.return_value = mock_single_joke_response
+            mock_get.return_value = mock_response
+
+            get_joke('Programming')
+            get_joke('Programming')
+
+            assert mock_get.call_count == 2
+
+    def test_local_server_repeat_traffic_makes_no_upstream_calls(self, local_jokeapi):
+        """Test repeat traffic against a live server is answered from cache."""
+        for _ in range(10):
+            assert get_joke('Programming')['success'] is True
+
+        assert joke_service.get_pool_stats()['requests'] == 1
+        assert joke_service.get_cache_stats()['hits'] == 9
+
+
+# ===== Tests for get_joke_async() =====
+
+class TestGetJokeAsync:
+    """Test suite for the asyncio joke API."""
+
+    def test_async_returns_single_joke(self, mock_single_joke_response):
+        """Test get_joke_async() parses a single joke."""
+        with patch('services.joke_service.httpx.AsyncClient.get', new_callable=AsyncMock) as mock_get:
+            mock_get.return_value = Mock(**{'json.return_value': mock_single_joke_response})
+
+            result = asyncio.run(get_joke_async('Programming'))
+
+            assert result['success'] is True
+            assert result['joke_type'] == 'single'
+            assert result['category'] == 'Programming'
+            assert 'Programming' in mock_get.call_args[0][0]
+
+    def test_async_timeout_error(self):
+        """Test get_joke_async() maps timeouts to the sync error message."""
+        with patch('services.joke_service.httpx.AsyncClient.get', new_callable=AsyncMock) as mock_get:
+            mock_get.side_effect = httpx.ReadTimeout('timed out')
+
+            result = asyncio.run(get_joke_async('Programming'))
+
+            assert result['error'] == 'Request timed out. The API is taking too long to respond.'
+
+    def test_async_connection_error(self):
+        """Test get_joke_async() maps connection failures."""
+        with patch('services.joke_service.httpx.AsyncClient.get', new_callable=AsyncMock) as mock_get:
+            mock_get.side_effect = httpx.ConnectError('refused')
+
+            result = asyncio.run(get_joke_async('Programming'))
+
+            assert result['success'] is False
+            assert 'connection failed' in result['error'].lower()
+
+    def test_async_http_error(self):
+        """Test get_joke_async() reports HTTP status errors."""
+        request = httpx.Request('GET', 'https://v2.jokeapi.dev/joke/Programming')
+        response = httpx.Response(503, request=request)
+        with patch('services.joke_service.httpx.AsyncClient.get', new_callable=AsyncMock) as mock_get:
+            mock_get.return_value = response
+
+            result = asyncio.run(get_joke_async('Programming'))
+
+            assert result['success'] is False
+            assert result['error'] == 'HTTP Error 503: Service Unavailable'
+
+    def test_async_shares_cache_with_sync(self, mock_single_joke_response):
+        """Test a joke cached by get_joke() is served by get_joke_async()."""
+        with patch('services.joke_service.requests.Session.get') as mock_get:
+            mock_get.return_value = Mock(**{'json.return_value': mock_single_joke_response})
+            sync_result = get_joke('Programming')
+
+        with patch('services.joke_service.httpx.AsyncClient.get', new_callable=AsyncMock) as mock_async_get:
+            async_result = asyncio.run(get_joke_async('Programming'))
+
+            mock_async_get.assert_not_called()
+            assert async_result == sync_result
+
+    def test_sync_and_async_return_same_shape(self, local_jokeapi, no_cache):
+        """Test both paths return identical dicts against a live server."""
+        sync_result = get_joke('Programming')
+        async_result = asyncio.run(get_joke_async('Programming'))
+
+        assert async_result == sync_result
+
+    def test_async_calls_run_concurrently(self, local_jokeapi, no_cache):
+        """Test many async calls can be in flight at once."""
+        async def fetch_many():
+            return await asyncio.gather(*(get_joke_async('Programming') for _ in range(50)))
+
+        results = asyncio.run(fetch_many())
+
+        assert len(results) == 50
+        assert all(result['success'] for result in results)
+
+    def test_async_falls_back_to_threads_without_httpx(self, mock_single_joke_response):
+        """Test get_joke_async() uses the blocking client when httpx is missing."""
+        with patch('services.joke_service.httpx', None), \
+                patch('services.joke_service.requests.Session.get') as mock_get:
+            mock_get.return_value = Mock(**{'json.return_value': mock_single_joke_response})
+
+            result = asyncio.run(get_joke_async('Programming'))
+
+            assert result['success'] is True
+            mock_get.assert_called_once()
+
+
+# ===== Tests for request coalescing =====
+
+class TestRequestCoalescing:
+    """Test suite for single-flight upstream requests."""
+
+    @staticmethod
+    def burst(fn, count):
+        """Call fn from count threads at once and return the results."""
+        results = [None] * count
+        barrier = threading.Barrier(count)
+
+        def worker(i):
+            barrier.wait()
+            results[i] = fn()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    @staticmethod
+    def slow_get(payload):
+        """Build a Session.get side effect that answers after a short delay."""
+        def get(*args, **kwargs):
+            time.sleep(0.2)
+            return Mock(**{'json.return_value': payload})
+        return get
+
+    def test_concurrent_requests_share_one_upstream_call(self, mock_single_joke_response):
+        """Test a cold-cache burst for one category makes a single upstream call."""
+        before = joke_service.get_coalesce_stats()['coalesced']
+        with patch('services.joke_service.requests.Session.get',
+                   side_effect=self.slow_get(mock_single_joke_response)) as mock_get:
+            results = self.burst(lambda: get_joke('Programming'), 10)
+
+        assert mock_get.call_count == 1
+        assert all(result['success'] and result['category'] == 'Programming' for result in results)
+        assert joke_service.get_coalesce_stats()['coalesced'] - before == 9
+
+    def test_coalesced_callers_share_one_read_only_result(self, mock_single_joke_response):
+        """Test callers receive the same result and cannot mutate it."""
+        with patch('services.joke_service.requests.Session.get',
+                   side_effect=self.slow_get(mock_single_joke_response)):
+            results = self.burst(lambda: get_joke('Programming'), 3)
+
+        assert all(result is results[0] for result in results)
+        with pytest.raises(TypeError):
+            results[0]['joke'] = 'changed'
+
+    def test_error_result_is_shared_and_not_cached(self):
+        """Test every coalesced caller receives the upstream error dict."""
+        def slow_timeout(*args, **kwargs):
+            time.sleep(0.2)
+            raise requests.exceptions.Timeout()
+
+        with patch('services.joke_service.requests.Session.get', side_effect=slow_timeout) as mock_get:
+            results = self.burst(lambda: get_joke('Programming'), 5)
+
+        assert mock_get.call_count == 1
+        assert all(result['success'] is False for result in results)
+        assert all('timed out' in result['error'] for result in results)
+        assert joke_service.get_cache_stats()['size'] == 0
+
+    def test_uncached_requests_are_not_coalesced(self, mock_single_joke_response):
+        """Test use_cache=False callers each get their own upstream call."""
+        with patch('services.joke_service.requests.Session.get',
+                   side_effect=self.slow_get(mock_single_joke_response)) as mock_get:
+            self.burst(lambda: get_joke('Programming', use_cache=False), 4)
+
+        assert mock_get.call_count == 4
+
+    def test_coalescing_can_be_disabled(self, mock_single_joke_response):
+        """Test configure_coalescing(False) restores one call per request."""
+        joke_service.configure_coalescing(enabled=False)
+        try:
+            with patch('services.joke_service.requests.Session.get',
+                       side_effect=self.slow_get(mock_single_joke_response)) as mock_get:
+                self.burst(lambda: get_joke('Programming'), 4)
+        finally:
+            joke_service.configure_coalescing(enabled=True)
+
+        assert mock_get.call_count == 4
+
+    def test_async_requests_share_one_upstream_call(self, mock_single_joke_response):
+        """Test gathered get_joke_async() calls share one upstream request."""
+        async def slow_get(*args, **kwargs):
+            await asyncio.sleep(0.1)
+            return Mock(**{'json.return_value': mock_single_joke_response})
+
+        async def fetch_many():
+            return await asyncio.gather(*(get_joke_async('Programming') for _ in range(20)))
+
+        before = joke_service.get_coalesce_stats()['coalesced']
+        with patch('services.joke_service.httpx.AsyncClient.get', side_effect=slow_get) as mock_get:
+            results = asyncio.run(fetch_many())
+
+        assert mock_get.call_count == 1
+        assert all(result['success'] for result in results)
+        assert joke_service.get_coalesce_stats()['coalesced'] - before == 19
+
+    def test_async_requests_from_separate_loops_coalesce(self, mock_single_joke_response):
+        """Test async views on different threads and loops share one request."""
+        async def slow_get(*args, **kwargs):
+            await asyncio.sleep(0.2)
+            return Mock(**{'json.return_value': mock_single_joke_response})
+
+        with patch('services.joke_service.httpx.AsyncClient.get', side_effect=slow_get) as mock_get:
+            results = self.burst(lambda: asyncio.run(get_joke_async('Programming')), 5)
+
+        assert mock_get.call_count == 1
+        assert all(result['success'] for result in results)
+
+
+# ===== Tests for get_jokes_batch() =====
+
+def batch_response(url, *args, **kwargs):
+    """Build a fake JokeAPI response honouring the category and amount in url."""
+    parsed = urlparse(url)
+    category = parsed.path.rsplit('/', 1)[-1]
+    amount = int(parse_qs(parsed.query).get('amount', ['1'])[0])
+    jokes = [
+        {'error': False, 'category': category, 'type': 'single', 'joke': f'{category} {i}'}
+        for i in range(amount)
+    ]
+    payload = jokes[0] if amount == 1 else {'error': False, 'amount': amount, 'jokes': jokes}
+    return Mock(**{'json.return_value': payload})
+
+
+class TestGetJokesBatch:
+    """Test suite for batched, concurrent joke fetching."""
+
+    def test_batch_returns_requested_count(self):
+        """Test the batch returns count jokes spread across categories."""
+        with patch('services.joke_service.requests.Session.get', side_effect=batch_response):
+            jokes = get_jokes_batch(['Programming', 'Pun'], 10)
+
+        assert len(jokes) == 10
+        assert all(joke['success'] for joke in jokes)
+        categories = [joke['category'] for joke in jokes]
+        assert categories.count('Programming') == 5
+        assert categories.count('Pun') == 5
+
+    def test_batch_uses_amount_parameter(self):
+        """Test each category is fetched with one amount request."""
+        with patch('services.joke_service.requests.Session.get', side_effect=batch_response) as mock_get:
+            get_jokes_batch(['Programming', 'Pun', 'Dark'], 7)
+
+        urls = sorted(call.args[0] for call in mock_get.call_args_list)
+        assert urls == [
+            'https://v2.jokeapi.dev/joke/Dark?amount=2',
+            'https://v2.jokeapi.dev/joke/Programming?amount=3',
+            'https://v2.jokeapi.dev/joke/Pun?amount=2'
+        ]
+
+    def test_batch_splits_large_requests(self):
+        """Test more than MAX_AMOUNT jokes per category are split into chunks."""
+        with patch('services.joke_service.requests.Session.get', side_effect=batch_response) as mock_get:
+            jokes = get_jokes_batch(['Pun'], 25)
+
+        assert len(jokes) == 25
+        assert mock_get.call_count == 3
+
+    def test_batch_single_joke_chunk(self):
+        """Test a chunk of one joke parses the single-joke payload."""
+        with patch('services.joke_service.requests.Session.get', side_effect=batch_response):
+            jokes = get_jokes_batch(['Programming', 'Pun'], 3)
+
+        assert len(jokes) == 3
+
+    def test_batch_fetches_concurrently(self):
+        """Test batch wall time is close to one upstream round trip."""
+        def slow_response(url, *args, **kwargs):
+            time.sleep(0.2)
+            return batch_response(url)
+
+        with patch('services.joke_service.requests.Session.get', side_effect=slow_response):
+            start = time.perf_counter()
+            jokes = get_jokes_batch(['Programming', 'Pun', 'Dark', 'Spooky'], 8)
+            elapsed = time.perf_counter() - start
+
+        assert len(jokes) == 8
+        assert elapsed < 0.6
+
+    def test_batch_failed_chunk_yields_error(self):
+        """Test a failed upstream request yields an error result."""
+        with patch('services.joke_service.requests.Session.get') as mock_get:
+            mock_get.side_effect = requests.exceptions.Timeout()
+
+            jokes = get_jokes_batch(['Programming'], 3)
+
+        assert len(jokes) == 1
+        assert jokes[0]['success'] is False
+        assert 'timed out' in jokes[0]['error']
+
+    def test_batch_validates_arguments_eagerly(self):
+        """Test invalid arguments raise before any iteration."""
+        with pytest.raises(ValueError):
+            iter_jokes_batch([], 5)
+        with pytest.raises(ValueError):
+            iter_jokes_batch(['Pun'], 0)
+        with pytest.raises(ValueError):
+            iter_jokes_batch(['Pun'], joke_service.BATCH_MAX_COUNT + 1)
+
+
+# ===== Tests for the circuit breaker integration =====
+
+@pytest.fixture
+def breaker_settings():
+    """Open the circuit after two failures; restore defaults afterwards."""
+    joke_service.configure_circuit_breaker(failure_threshold=2, cooldown=60)
+    yield
+    joke_service.configure_circuit_breaker(
+        failure_threshold=5, cooldown=30, half_open_max_calls=1
+    )
+
+
+class TestCircuitBreakerIntegration:
+    """Test suite for fail-fast behaviour of get_joke()."""
+
+    def test_circuit_opens_after_repeated_timeouts(self, breaker_settings):
+        """Test get_joke() stops calling upstream once the circuit opens."""
+        with patch('services.joke_service.requests.Session.get') as mock_get:
+            mock_get.side_effect = requests.exceptions.Timeout()
+
+            get_joke('Programming')
+            get_joke('Programming')
+            result = get_joke('Programming')
+
+            assert mock_get.call_count == 2
+            assert result['success'] is False
+            assert result['error'] == joke_service.CIRCUIT_OPEN_MESSAGE
+            assert joke_service.get_circuit_stats()['state'] == 'open'
+
+    def test_open_circuit_serves_last_good_joke(self, breaker_settings, mock_single_joke_response, no_cache):
+        """Test an open circuit falls back to the last good joke for the URL."""
+        with patch('services.joke_service.requests.Session.get') as mock_get:
+            mock_get.side_effect = [
+                Mock(**{'json.return_value': mock_single_joke_response}),
+                requests.exceptions.ConnectionError(),
+                requests.exceptions.ConnectionError()
+            ]
+            good = get_joke('Programming')
+            get_joke('Programming')
+            get_joke('Programming')
+
+            result = get_joke('Programming')
+
+            assert mock_get.call_count == 3
+            assert result == good
+
+    def test_open_circuit_fails_uncached_callers(self, breaker_settings, mock_single_joke_response):
+        """Test use_cache=False callers get the open-circuit error, not the last good joke."""
+        with patch('services.joke_service.requests.Session.get') as mock_get:
+            mock_get.side_effect = [
+                Mock(**{'json.return_value': mock_single_joke_response}),
+                requests.exceptions.ConnectionError(),
+                requests.exceptions.ConnectionError()
+            ]
+            get_joke('Programming', use_cache=False)
+            get_joke('Programming', use_cache=False)
+            get_joke('Programming', use_cache=False)
+
+            result = get_joke('Programming', use_cache=False)
+
+            assert mock_get.call_count == 3
+            assert result is joke_service.CIRCUIT_OPEN_RESULT
+
+    def test_client_errors_do_not_open_circuit(self, breaker_settings):
+        """Test HTTP 4xx responses do not count as upstream failures."""
+        with patch('services.joke_service.requests.Session.get') as mock_get:
+            mock_response = Mock(status_code=404, reason='Not Found')
+            mock_get.side_effect = requests.exceptions.HTTPError(response=mock_response)
+
+            for _ in range(3):
+                get_joke('Programming')
+
+            assert mock_get.call_count == 3
+            assert joke_service.is_circuit_closed()
+
+    def test_server_errors_open_circuit(self, breaker_settings):
+        """Test HTTP 5xx responses count as failures."""
+        with patch('services.joke_service.requests.Session.get') as mock_get:
+            mock_response = Mock(status_code=502, reason='Bad Gateway')
+            mock_get.side_effect = requests.exceptions.HTTPError(response=mock_response)
+
+            get_joke('Programming')
+            get_joke('Programming')
+
+            assert not joke_service.is_circuit_closed()
+
+    def test_batch_fails_fast_when_open(self, breaker_settings):
+        """Test batch chunks are rejected without upstream calls while open."""
+        with patch('services.joke_service.requests.Session.get') as mock_get:
+            mock_get.side_effect = requests.exceptions.Timeout()
+            get_joke('Programming')
+            get_joke('Programming')
+            mock_get.reset_mock()
+
+            jokes = get_jokes_batch(['Pun', 'Dark'], 4)
+
+            mock_get.assert_not_called()
+            assert all(joke['error'] == joke_service.CIRCUIT_OPEN_MESSAGE for joke in jokes)
+
+    def test_async_fails_fast_when_open(self, breaker_settings):
+        """Test get_joke_async() honours an open circuit."""
+        with patch('services.joke_service.httpx.AsyncClient.get', new_callable=AsyncMock) as mock_get:
+            mock_get.side_effect = httpx.ConnectTimeout('timed out')
+            asyncio.run(get_joke_async('Programming'))
+            asyncio.run(get_joke_async('Programming'))
+
+            result = asyncio.run(get_joke_async('Programming'))
+
+            assert mock_get.await_count == 2
+            assert result['error'] == joke_service.CIRCUIT_OPEN_MESSAGE
+
+
+# ===== Tests for stale serving =====
+
+@pytest.fixture
+def stale_settings():
+    """Expire cached jokes at once and allow a minute of stale serving."""
+    joke_service.configure_cache(ttl=0)
+    joke_service.configure_stale(while_revalidate=60, if_error=60)
+    yield
+    joke_service.configure_stale(while_revalidate=0, if_error=0, overrides={})
+    joke_service.configure_cache(ttl=30)
+
+
+def joke_mock(text):
+    """A Session.get return value carrying a single joke."""
+    return Mock(**{'json.return_value': {'error': False, 'type': 'single', 'joke': text,
+                                         'category': 'Programming'}})
+
+
+def wait_for_refreshes(timeout=2.0):
+    """Block until no background refresh is running."""
+    deadline = time.monotonic() + timeout
+    while joke_service.get_stale_stats()['refreshing'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+class TestStaleServing:
+    """Test suite for stale-while-revalidate and stale-if-error."""
+
+    def test_expired_joke_is_served_while_refreshing(self, stale_settings):
+        """Test an expired joke is returned at once and replaced in the background."""
+        before = joke_service.get_stale_stats()
+        with patch('services.joke_service.requests.Session.get',
+                   side_effect=[joke_mock('first'), joke_mock('second')]) as mock_get:
+            assert get_joke('Programming')['joke'] == 'first'
+            assert get_joke('Programming')['joke'] == 'first'
+            wait_for_refreshes()
+            assert get_joke('Programming')['joke'] == 'second'
+
+        stats = joke_service.get_stale_stats()
+        assert mock_get.call_count == 2
+        assert stats['served_while_revalidate'] - before['served_while_revalidate'] == 2
+        assert stats['refreshes_ok'] - before['refreshes_ok'] >= 1
+
+    def test_one_refresh_per_url(self, stale_settings):
+        """Test concurrent stale hits start a single background refresh."""
+        def get(*args, **kwargs):
+            if get.calls:
+                time.sleep(0.2)
+            get.calls += 1
+            return joke_mock('joke')
+        get.calls = 0
+
+        with patch('services.joke_service.requests.Session.get', side_effect=get):
+            get_joke('Programming')
+            for _ in range(5):
+                get_joke('Programming')
+            wait_for_refreshes()
+
+        assert get.calls == 2
+
+    def test_failure_serves_last_good_joke(self, stale_settings):
+        """Test stale-if-error replaces an upstream failure."""
+        joke_service.configure_stale(while_revalidate=0)
+        before = joke_service.get_stale_stats()['served_if_error']
+        with patch('services.joke_service.requests.Session.get',
+                   side_effect=[joke_mock('good'), requests.exceptions.Timeout()]):
+            get_joke('Programming')
+            result = get_joke('Programming')
+
+        assert result['success'] is True
+        assert result['joke'] == 'good'
+        assert joke_service.get_stale_stats()['served_if_error'] - before == 1
+
+    def test_uncached_callers_get_the_failure(self, stale_settings):
+        """Test use_cache=False callers are never given stale jokes."""
+        with patch('services.joke_service.requests.Session.get',
+                   side_effect=[joke_mock('good'), requests.exceptions.Timeout()]):
+            get_joke('Programming')
+            result = get_joke('Programming', use_cache=False)
+
+        assert result is joke_service.TIMEOUT_RESULT
+
+    def test_jokes_older_than_the_window_are_not_served(self, stale_settings):
+        """Test the failure is returned once the last good joke is too old."""
+        joke_service.configure_stale(while_revalidate=0, if_error=0.05)
+        with patch('services.joke_service.requests.Session.get',
+                   side_effect=[joke_mock('good'), requests.exceptions.Timeout()]):
+            get_joke('Programming')
+            time.sleep(0.1)
+            result = get_joke('Programming')
+
+        assert result['success'] is False
+
+    def test_category_overrides(self, stale_settings):
+        """Test per-category windows replace the defaults."""
+        joke_service.configure_stale(while_revalidate=0,
+                                     overrides={'Dark': {'stale_if_error': 0}})
+        with patch('services.joke_service.requests.Session.get',
+                   side_effect=[joke_mock('a'), joke_mock('b'),
+                                requests.exceptions.Timeout(), requests.exceptions.Timeout()]):
+            get_joke('Programming')
+            get_joke('Dark')
+
+            assert get_joke('Programming')['success'] is True
+            assert get_joke('Dark')['success'] is False
+        assert joke_service.stale_windows('Dark') == {'stale_while_revalidate': 0, 'stale_if_error': 0}
+
+    def test_async_serves_stale_and_refreshes(self, stale_settings, mock_single_joke_response):
+        """Test get_joke_async() serves stale jokes and refreshes on the service loop."""
+        with patch('services.joke_service.httpx.AsyncClient.get', new_callable=AsyncMock) as mock_get:
+            mock_get.return_value = Mock(**{'json.return_value': mock_single_joke_response})
+            first = asyncio.run(get_joke_async('Programming'))
+            second = asyncio.run(get_joke_async('Programming'))
+            wait_for_refreshes()
+
+        assert second is first
+        assert mock_get.await_count == 2
+
+    def test_retention_covers_the_longest_window(self, stale_settings):
+        """Test last good jokes are kept for the longest configured window."""
+        joke_service.configure_stale(overrides={'Christmas': {'stale_while_revalidate': 86400}})
+        assert joke_service._last_good.ttl == 86400 + joke_service.CACHE_TTL
+
+    @pytest.mark.parametrize('kwargs', [
+        {'if_error': -1},
+        {'overrides': {'Dark': {'stale_if_error': -5}}},
+        {'overrides': {'Dark': {'max_age': 5}}},
+    ])
+    def test_invalid_windows_are_rejected(self, kwargs):
+        """Test negative windows and unknown kinds raise ValueError."""
+        with pytest.raises(ValueError):
+            joke_service.configure_stale(**kwargs)
+        assert joke_service.STALE_IF_ERROR == 0
+
+    def test_stale_serving_is_off_by_default(self, mock_single_joke_response):
+        """Test failures are returned as-is with the default windows."""
+        with patch('services.joke_service.requests.Session.get',
+                   side_effect=[joke_mock('good'), requests.exceptions.Timeout()]):
+            get_joke('Programming', use_cache=False)
+            assert get_joke('Programming') is joke_service.TIMEOUT_RESULT
+
+
+# ===== Tests for adaptive timeouts and hedged requests =====
+
+def warm_latency(seconds, count=joke_service.LATENCY_MIN_SAMPLES):
+    """Fill the latency window with count calls that took seconds."""
+    for _ in range(count):
+        joke_service._latency.observe(seconds)
+
+
+@pytest.fixture
+def timeout_settings():
+    """Restore the timeout settings after the test."""
+    saved = (joke_service.REQUEST_TIMEOUT, joke_service.ADAPTIVE_TIMEOUT,
+             joke_service.TIMEOUT_PERCENTILE, joke_service.TIMEOUT_MULTIPLIER, joke_service.TIMEOUT_MIN)
+    yield
+    joke_service.configure_timeouts(*saved)
+
+
+@pytest.fixture
+def hedge_settings():
+    """Earn a hedge on every call and hedge after the warmed-up p95."""
+    saved = (joke_service.HEDGE_ENABLED, joke_service.HEDGE_PERCENTILE, joke_service.HEDGE_BUDGET,
+             joke_service.HEDGE_BURST, joke_service.HEDGE_MIN_DELAY)
+    joke_service.configure_hedging(enabled=True, budget=1)
+    warm_latency(0.01)
+    yield
+    joke_service.configure_hedging(*saved)
+
+
+def slow_then_fast(release, first=None):
+    """Session.get stand-in: the first call waits for release, later calls answer at once."""
+    calls = []
+    lock = threading.Lock()
+
+    def get(*args, **kwargs):
+        with lock:
+            calls.append(args)
+            number = len(calls)
+        if number == 1:
+            release.wait(2)
+            return joke_mock('slow')
+        if first is not None:
+            raise first
+        return joke_mock('fast')
+    get.calls = calls
+    return get
+
+
+class TestAdaptiveTimeouts:
+    """Test suite for timeouts derived from recent upstream latency."""
+
+    def test_fixed_timeout_until_warm(self, mock_single_joke_response):
+        """Test REQUEST_TIMEOUT is used before enough calls have been timed."""
+        warm_latency(0.1, count=joke_service.LATENCY_MIN_SAMPLES - 1)
+        with patch('services.joke_service.requests.Session.get') as mock_get:
+            mock_get.return_value = Mock(**{'json.return_value': mock_single_joke_response})
+            get_joke('Programming', use_cache=False)
+
+        assert mock_get.call_args.kwargs['timeout'] == joke_service.REQUEST_TIMEOUT
+
+    def test_timeout_follows_latency(self, mock_single_joke_response):
+        """Test the timeout is the p99 latency times the multiplier."""
+        warm_latency(0.4)
+        with patch('services.joke_service.requests.Session.get') as mock_get:
+            mock_get.return_value = Mock(**{'json.return_value': mock_single_joke_response})
+            get_joke('Programming', use_cache=False)
+
+        expected = 0.4 * joke_service.TIMEOUT_MULTIPLIER
+        assert mock_get.call_args.kwargs['timeout'] == pytest.approx(expected)
+
+    @pytest.mark.parametrize('seconds, expected', [
+        (0.001, joke_service.TIMEOUT_MIN),
+        (60, joke_service.REQUEST_TIMEOUT),
+    ])
+    def test_timeout_is_bounded(self, seconds, expected):
+        """Test adaptive timeouts stay between TIMEOUT_MIN and REQUEST_TIMEOUT."""
+        warm_latency(seconds)
+        assert joke_service.request_timeout() == expected
+
+    def test_timeouts_lift_a_tight_timeout(self):
+        """Test a few timed-out calls raise the timeout to the ceiling."""
+        warm_latency(0.01)
+        assert joke_service.request_timeout() == joke_service.TIMEOUT_MIN
+
+        with patch('services.joke_service.requests.Session.get',
+                   side_effect=requests.exceptions.Timeout()):
+            for _ in range(3):
+                get_joke('Programming', use_cache=False)
+
+        assert joke_service.request_timeout() == joke_service.REQUEST_TIMEOUT
+
+    def test_adaptive_timeout_can_be_turned_off(self, timeout_settings):
+        """Test the fixed timeout is used when ADAPTIVE_TIMEOUT is off."""
+        joke_service.configure_timeouts(timeout=2, adaptive=False)
+        warm_latency(0.1)
+        assert joke_service.request_timeout() == 2
+
+    def test_async_uses_adaptive_timeout(self, mock_single_joke_response):
+        """Test get_joke_async() passes the adaptive timeout to httpx."""
+        warm_latency(0.4)
+        with patch('services.joke_service.httpx.AsyncClient.get', new_callable=AsyncMock) as mock_get:
+            mock_get.return_value = Mock(**{'json.return_value': mock_single_joke_response})
+            asyncio.run(get_joke_async('Programming', use_cache=False))
+
+        assert mock_get.call_args.kwargs['timeout'] == pytest.approx(0.4 * joke_service.TIMEOUT_MULTIPLIER)
+
+    @pytest.mark.parametrize('kwargs', [
+        {'timeout': 0},
+        {'minimum': 10},
+        {'percentile': 120},
+        {'multiplier': 0.5},
+    ])
+    def test_invalid_settings_are_rejected(self, timeout_settings, kwargs):
+        """Test out-of-range settings raise ValueError and change nothing."""
+        with pytest.raises(ValueError):
+            joke_service.configure_timeouts(**kwargs)
+        assert joke_service.REQUEST_TIMEOUT == 5
+
+    def test_stats(self):
+        """Test get_latency_stats() reports percentiles and the timeout."""
+        assert joke_service.get_latency_stats()['p95'] is None
+
+        warm_latency(0.2)
+        stats = joke_service.get_latency_stats()
+
+        assert stats['samples'] == joke_service.LATENCY_MIN_SAMPLES
+        assert stats['p50'] == stats['p99'] == 0.2
+        assert stats['timeout'] == pytest.approx(0.2 * joke_service.TIMEOUT_MULTIPLIER)
+
+
+class TestHedgedRequests:
+    """Test suite for hedging slow upstream calls."""
+
+    def test_fast_call_is_not_hedged(self, hedge_settings):
+        """Test a call answering within the p95 sends one request."""
+        before = joke_service.get_latency_stats()['hedges_sent']
+        with patch('services.joke_service.requests.Session.get',
+                   return_value=joke_mock('fast')) as mock_get:
+            result = get_joke('Programming', use_cache=False)
+
+        assert result['joke'] == 'fast'
+        assert mock_get.call_count == 1
+        assert joke_service.get_latency_stats()['hedges_sent'] == before
+
+    def test_hedge_answers_first(self, hedge_settings):
+        """Test a slow call is hedged and the first answer is returned."""
+        before = joke_service.get_latency_stats()
+        release = threading.Event()
+        get = slow_then_fast(release)
+        with patch('services.joke_service.requests.Session.get', side_effect=get):
+            result = get_joke('Programming', use_cache=False)
+            release.set()
+
+        stats = joke_service.get_latency_stats()
+        assert result['joke'] == 'fast'
+        assert len(get.calls) == 2
+        assert stats['hedges_sent'] - before['hedges_sent'] == 1
+        assert stats['hedges_won'] - before['hedges_won'] == 1
+
+    def test_failed_hedge_waits_for_primary(self, hedge_settings):
+        """Test a hedge that fails first does not hide a successful primary."""
+        release = threading.Event()
+        get = slow_then_fast(release, first=requests.exceptions.ConnectionError())
+        with patch('services.joke_service.requests.Session.get', side_effect=get):
+            threading.Timer(0.1, release.set).start()
+            result = get_joke('Programming', use_cache=False)
+
+        assert result['success'] is True
+        assert result['joke'] == 'slow'
+
+    def test_budget_limits_hedges(self, hedge_settings):
+        """Test no hedge is sent once the budget is spent."""
+        joke_service.configure_hedging(budget=0)
+        before = joke_service.get_latency_stats()['hedges_skipped']
+        release = threading.Event()
+        get = slow_then_fast(release)
+        with patch('services.joke_service.requests.Session.get', side_effect=get):
+            threading.Timer(0.1, release.set).start()
+            result = get_joke('Programming', use_cache=False)
+
+        assert result['joke'] == 'slow'
+        assert len(get.calls) == 1
+        assert joke_service.get_latency_stats()['hedges_skipped'] - before == 1
+
+    def test_losing_attempt_is_not_a_circuit_failure(self, hedge_settings):
+        """Test a slow primary that times out after the hedge won is not reported to the breaker."""
+        release = threading.Event()
+        calls = []
+
+        def timeout_then_fast(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                release.wait(2)
+                raise requests.exceptions.Timeout()
+            return joke_mock('fast')
+
+        with patch('services.joke_service.requests.Session.get', side_effect=timeout_then_fast):
+            result = get_joke('Programming', use_cache=False)
+            release.set()
+            assert wait_for(lambda: joke_service._hedge_slots._value == joke_service.HEDGE_MAX_WORKERS)
+
+        assert result['joke'] == 'fast'
+        assert joke_service.get_circuit_stats()['consecutive_failures'] == 0
+
+    def test_hedge_refused_by_quota_is_not_shed(self, hedge_settings, quota_settings):
+        """Test a hedge without a quota token is skipped without counting as shed or spending budget."""
+        joke_service.configure_quota(limit=1, max_wait=0)
+        release = threading.Event()
+        get = slow_then_fast(release)
+        with patch('services.joke_service.requests.Session.get', side_effect=get):
+            threading.Timer(0.1, release.set).start()
+            result = get_joke('Programming', use_cache=False)
+
+        assert result['joke'] == 'slow'
+        assert len(get.calls) == 1
+        assert joke_service.get_quota_stats()['shed'] == 0
+        assert joke_service.get_latency_stats()['hedge_tokens'] == 1
+
+    def test_hedge_without_a_worker_returns_its_tokens(self, hedge_settings, quota_settings):
+        """Test a hedge the full pool cannot run gives back its quota token and budget."""
+        joke_service.configure_quota(limit=10, max_wait=0)
+        release = threading.Event()
+        get = slow_then_fast(release)
+        with patch('services.joke_service.requests.Session.get', side_effect=get), \
+                patch('services.joke_service._hedge_slots', threading.BoundedSemaphore(1)):
+            threading.Timer(0.1, release.set).start()
+            result = get_joke('Programming', use_cache=False)
+
+        assert result['joke'] == 'slow'
+        assert len(get.calls) == 1
+        assert joke_service.get_quota_stats()['granted'] == 1
+        assert joke_service.get_latency_stats()['hedge_tokens'] == 1
+
+    def test_hedging_can_be_turned_off(self, hedge_settings):
+        """Test HEDGE_ENABLED=False always sends a single request."""
+        joke_service.configure_hedging(enabled=False)
+        release = threading.Event()
+        get = slow_then_fast(release)
+        with patch('services.joke_service.requests.Session.get', side_effect=get):
+            threading.Timer(0.1, release.set).start()
+            get_joke('Programming', use_cache=False)
+
+        assert len(get.calls) == 1
+
+    def test_async_hedge_cancels_the_loser(self, hedge_settings):
+        """Test the async path returns the hedge and cancels the slow call."""
+        cancelled = []
+
+        async def get(*args, **kwargs):
+            if get.calls:
+                return joke_mock('fast')
+            get.calls.append(args)
+            try:
+                await asyncio.sleep(2)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return joke_mock('slow')
+        get.calls = []
+
+        with patch('services.joke_service.httpx.AsyncClient.get', side_effect=get):
+            result = asyncio.run(get_joke_async('Programming', use_cache=False))
+
+        assert result['joke'] == 'fast'
+        assert cancelled == [True]
+
+
+# ===== Tests for the upstream quota =====
+
+@pytest.fixture
+def quota_settings():
+    """Restore the quota settings after the test."""
+    saved = (joke_service.QUOTA_ENABLED, joke_service.QUOTA_LIMIT,
+             joke_service.QUOTA_WINDOW, joke_service.QUOTA_MAX_WAIT, joke_service.QUOTA_SHARE)
+    yield
+    joke_service.configure_quota(*saved)
+
+
+def upstream_response(status=200, headers=None, text='joke'):
+    """A real requests.Response with the given status and headers."""
+    response = requests.Response()
+    response.status_code = status
+    response.reason = 'Too Many Requests' if status == 429 else 'OK'
+    response.headers.update(headers or {})
+    payload = {'error': False, 'type': 'single', 'joke': text, 'category': 'Programming'}
+    response._content = json.dumps(payload).encode('utf-8')
+    return response
+
+
+class TestUpstreamQuota:
+    """Test suite for holding upstream calls to JokeAPI's rate limit."""
+
+    def test_calls_beyond_the_quota_are_shed(self, quota_settings):
+        """Test no upstream call is made once the bucket is empty."""
+        joke_service.configure_quota(limit=2, max_wait=0)
+        with patch('services.joke_service.requests.Session.get',
+                   return_value=upstream_response()) as mock_get:
+            results = [get_joke(category, use_cache=False) for category in ('Programming', 'Pun', 'Dark')]
+
+        assert mock_get.call_count == 2
+        assert results[2] is joke_service.RATE_LIMITED_RESULT
+        assert joke_service.get_quota_stats()['shed'] == 1
+
+    def test_shed_call_serves_last_good_joke(self, quota_settings, no_cache):
+        """Test a shed call falls back to the last good joke for its URL."""
+        joke_service.configure_quota(limit=1, max_wait=0)
+        before = joke_service.get_stale_stats()['served_rate_limited']
+        with patch('services.joke_service.requests.Session.get',
+                   return_value=upstream_response(text='good')):
+            get_joke('Programming')
+            result = get_joke('Programming')
+
+        assert result['joke'] == 'good'
+        assert joke_service.get_stale_stats()['served_rate_limited'] - before == 1
+
+    def test_uncached_shed_call_gets_the_failure(self, quota_settings):
+        """Test use_cache=False callers are not handed the last good joke when shed."""
+        joke_service.configure_quota(limit=1, max_wait=0)
+        with patch('services.joke_service.requests.Session.get',
+                   return_value=upstream_response(text='good')):
+            get_joke('Programming', use_cache=False)
+            result = get_joke('Programming', use_cache=False)
+
+        assert result is joke_service.RATE_LIMITED_RESULT
+
+    def test_calls_queue_for_the_next_token(self, quota_settings):
+        """Test a call waits up to QUOTA_MAX_WAIT for a token."""
+        joke_service.configure_quota(limit=1, window=0.2, max_wait=1)
+        with patch('services.joke_service.requests.Session.get',
+                   return_value=upstream_response()) as mock_get:
+            get_joke('Programming', use_cache=False)
+            result = get_joke('Pun', use_cache=False)
+
+        assert result['success'] is True
+        assert mock_get.call_count == 2
+        assert joke_service.get_quota_stats()['queued'] == 1
+
+    def test_remaining_header_stops_calls(self):
+        """Test RateLimit-Remaining: 0 pauses calls until RateLimit-Reset."""
+        headers = {'RateLimit-Limit': '120', 'RateLimit-Remaining': '0', 'RateLimit-Reset': '30'}
+        with patch('services.joke_service.requests.Session.get',
+                   return_value=upstream_response(headers=headers)) as mock_get:
+            get_joke('Programming', use_cache=False)
+            result = get_joke('Pun', use_cache=False)
+
+        assert mock_get.call_count == 1
+        assert result is joke_service.RATE_LIMITED_RESULT
+        assert joke_service.get_quota_stats()['paused_for'] > 29
+
+    def test_advertised_limit_keeps_the_worker_share(self, quota_settings):
+        """Test RateLimit-Limit does not replace a worker's share with the whole IP's limit."""
+        joke_service.configure_quota(share=0.25)
+        headers = {'RateLimit-Limit': '200', 'RateLimit-Remaining': '199', 'RateLimit-Reset': '60'}
+        with patch('services.joke_service.requests.Session.get',
+                   return_value=upstream_response(headers=headers)):
+            get_joke('Programming', use_cache=False)
+
+        stats = joke_service.get_quota_stats()
+        assert stats['limit'] == 50
+        assert stats['share'] == 0.25
+
+    def test_429_pauses_without_opening_the_circuit(self):
+        """Test HTTP 429 pauses the quota for Retry-After and is not a breaker failure."""
+        with patch('services.joke_service.requests.Session.get',
+                   return_value=upstream_response(429, {'Retry-After': '20'})) as mock_get:
+            results = [get_joke('Programming', use_cache=False)
+                       for _ in range(joke_service.CIRCUIT_FAILURE_THRESHOLD + 1)]
+
+        assert mock_get.call_count == 1
+        assert all(result is joke_service.RATE_LIMITED_RESULT for result in results)
+        assert joke_service.is_circuit_closed()
+        assert 19 < joke_service.get_quota_stats()['paused_for'] <= 20
+        assert joke_service.UPSTREAM_OUTCOMES.labels('rate_limited').value() >= 1
+
+    def test_429_trial_call_does_not_wedge_half_open_circuit(self, breaker_settings, quota_settings):
+        """Test a 429 on the half-open trial call leaves room for the next trial."""
+        joke_service.configure_circuit_breaker(cooldown=0)
+        joke_service.configure_quota(enabled=False)
+        with patch('services.joke_service.requests.Session.get') as mock_get:
+            mock_get.side_effect = [requests.exceptions.Timeout(), requests.exceptions.Timeout(),
+                                    upstream_response(429), upstream_response(200)]
+            get_joke('Programming', use_cache=False)
+            get_joke('Programming', use_cache=False)
+            assert joke_service.get_circuit_stats()['state'] == 'half_open'
+
+            throttled = get_joke('Programming', use_cache=False)
+            result = get_joke('Programming', use_cache=False)
+
+        assert throttled is joke_service.RATE_LIMITED_RESULT
+        assert result['success'] is True
+        assert mock_get.call_count == 4
+        assert joke_service.is_circuit_closed()
+
+    def test_429_without_headers_pauses_for_default(self):
+        """Test a bare 429 pauses for QUOTA_RETRY_AFTER seconds."""
+        with patch('services.joke_service.requests.Session.get', return_value=upstream_response(429)):
+            get_joke('Programming', use_cache=False)
+
+        paused_for = joke_service.get_quota_stats()['paused_for']
+        assert joke_service.QUOTA_RETRY_AFTER - 1 < paused_for <= joke_service.QUOTA_RETRY_AFTER
+
+    def test_batches_draw_from_the_quota(self, quota_settings):
+        """Test each batch request takes a token."""
+        joke_service.configure_quota(limit=1, max_wait=0)
+        with patch('services.joke_service.requests.Session.get', side_effect=batch_response):
+            results = get_jokes_batch(['Programming', 'Pun'], 2)
+
+        assert joke_service.RATE_LIMITED_RESULT in results
+        assert sum(result['success'] for result in results) == 1
+
+    def test_async_429_pauses_the_quota(self):
+        """Test get_joke_async() reads Retry-After from httpx responses."""
+        request = httpx.Request('GET', 'https://v2.jokeapi.dev/joke/Programming')
+        response = httpx.Response(429, headers={'Retry-After': '20'}, request=request)
+        with patch('services.joke_service.httpx.AsyncClient.get', new_callable=AsyncMock) as mock_get:
+            mock_get.return_value = response
+            first = asyncio.run(get_joke_async('Programming', use_cache=False))
+            second = asyncio.run(get_joke_async('Programming', use_cache=False))
+
+        assert first is second is joke_service.RATE_LIMITED_RESULT
+        assert mock_get.call_count == 1
+
+    def test_quota_can_be_turned_off(self, quota_settings):
+        """Test QUOTA_ENABLED=False sends every call."""
+        joke_service.configure_quota(enabled=False, limit=1)
+        with patch('services.joke_service.requests.Session.get',
+                   return_value=upstream_response()) as mock_get:
+            for _ in range(3):
+                get_joke('Programming', use_cache=False)
+
+        assert mock_get.call_count == 3
+
+    def test_reconfiguring_keeps_an_upstream_pause(self, quota_settings):
+        """Test configure_quota() with unchanged limits keeps the current bucket."""
+        joke_service._quota.pause(30)
+        joke_service.configure_quota(limit=joke_service.QUOTA_LIMIT, max_wait=0.1)
+        assert joke_service.get_quota_stats()['paused_for'] > 29
+
+        joke_service.configure_quota(limit=joke_service.QUOTA_LIMIT + 1)
+        assert joke_service.get_quota_stats()['paused_for'] == 0
+
+
+# ===== Tests for the local corpus backend =====
+
+@pytest.fixture
+def corpus_backend():
+    """Serve jokes from the bundled corpus; switch back to HTTP afterwards."""
+    from tests.test_corpus import CORPUS_PATH
+
+    joke_service.configure_backend('corpus', str(CORPUS_PATH))
+    yield
+    joke_service.configure_backend('http')
+
+
+class TestCorpusBackend:
+    """Test suite for get_joke() with the corpus backend."""
+
+    def test_corpus_backend_makes_no_http_calls(self, corpus_backend):
+        """Test jokes are served without touching the network."""
+        with patch('services.joke_service.requests.Session.get') as mock_get:
+            result = get_joke('Programming')
+
+            mock_get.assert_not_called()
+            assert result['success'] is True
+            assert result['category'] == 'Programming'
+
+    def test_corpus_result_has_http_shape(self, corpus_backend, mock_single_joke_response):
+        """Test corpus results have exactly the HTTP result keys."""
+        corpus_result = get_joke('Programming', 'single')
+        joke_service.configure_backend('http')
+        with patch('services.joke_service.requests.Session.get') as mock_get:
+            mock_get.return_value = Mock(**{'json.return_value': mock_single_joke_response})
+            http_result = get_joke('Programming', 'single')
+
+        assert corpus_result.keys() == http_result.keys()
+        assert corpus_result['joke_type'] == 'single'
+        assert corpus_result['setup'] is None
+
+    def test_corpus_no_match_returns_api_error(self, corpus_backend):
+        """Test an unknown category returns the JokeAPI-style error."""
+        result = get_joke('Nope')
+
+        assert result['success'] is False
+        assert result['error'] == 'JokeAPI error: No matching joke found'
+
+    def test_corpus_blacklist_flags(self, corpus_backend):
+        """Test flag filters apply to the corpus backend."""
+        for _ in range(20):
+            result = get_joke('Misc', blacklist_flags=['sexist', 'political'])
+            assert result['success'] is True
+
+    def test_corpus_async_and_batch(self, corpus_backend):
+        """Test async and batch APIs use the corpus too."""
+        with patch('services.joke_service.requests.Session.get') as mock_get:
+            assert asyncio.run(get_joke_async('Pun'))['category'] == 'Pun'
+            assert len(get_jokes_batch(['Pun', 'Spooky'], 6)) == 6
+            mock_get.assert_not_called()
+
+    def test_mmap_backend_serves_store(self, tmp_path):
+        """Test the mmap backend returns the same result shape."""
+        from tests.test_corpus import CORPUS_PATH
+        from services.joke_store import build_store
+        from services.corpus import load_jokes
+
+        store_path = tmp_path / 'jokes.jokestore'
+        build_store(load_jokes(CORPUS_PATH), store_path)
+        joke_service.configure_backend('mmap', str(store_path))
+        try:
+            with patch('services.joke_service.requests.Session.get') as mock_get:
+                result = get_joke('Spooky', 'twopart')
+                mock_get.assert_not_called()
+        finally:
+            joke_service.configure_backend('http')
+
+        assert result['success'] is True
+        assert result['category'] == 'Spooky'
+        assert result['joke_type'] == 'twopart'
+        assert result['joke'] is None
+
+    def test_unknown_backend_raises(self):
+        """Test configure_backend() rejects unknown backends."""
+        with pytest.raises(ValueError):
+            joke_service.configure_backend('ftp')
+        with pytest.raises(ValueError):
+            joke_service.configure_backend('corpus')
+
+    def test_build_url_with_blacklist_flags(self):
+        """Test blacklist flags are passed to JokeAPI."""
+        url = build_joke_url('Pun', blacklist_flags=['racist', 'nsfw'])
+        assert url == 'https://v2.jokeapi.dev/joke/Pun?blacklistFlags=nsfw,racist'
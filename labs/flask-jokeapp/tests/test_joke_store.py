@@ -0,0 +1,113 @@
+"""
+Test suite for the memory-mapped joke store.
+
+Tests cover:
+- Building and opening store files
+- Filtering by category, type and flags
+- Payload decoding
+- The builder CLI
+"""
+
+import pytest
+from services.corpus import JokeCorpus
+from services.joke_store import JokeStore, build_store, main
+from tests.test_corpus import CORPUS_PATH
+
+
+# ===== Fixtures =====
+
+@pytest.fixture
+def jokes():
+    """A tiny corpus covering both joke types, flags and non-ASCII text."""
+    return [
+        {'id': 10, 'category': 'Programming', 'type': 'single', 'joke': 'P single 😂',
+         'flags': {'nsfw': False}},
+        {'id': 11, 'category': 'Programming', 'type': 'twopart', 'setup': 'P setup',
+         'delivery': 'P délivery', 'flags': {'nsfw': True}},
+        {'id': 12, 'category': 'Misc', 'type': 'single', 'joke': 'M single',
+         'flags': {'political': True}},
+    ]
+
+
+@pytest.fixture
+def store(tmp_path, jokes):
+    """Build and open a store from the tiny corpus."""
+    path = tmp_path / 'jokes.jokestore'
+    build_store(jokes, path)
+    store = JokeStore.open(path)
+    yield store
+    store.close()
+
+
+# ===== Tests =====
+
+class TestJokeStore:
+    """Test suite for JokeStore."""
+
+    def test_store_reports_size_and_categories(self, store):
+        """Test the header and category table are read back."""
+        assert len(store) == 3
+        assert store.categories == ['Misc', 'Programming']
+
+    def test_decodes_single_joke(self, store):
+        """Test a single joke decodes to a JokeAPI payload."""
+        payload = store.random_payload('Programming', 'single')
+        assert payload == {
+            'error': False,
+            'id': 10,
+            'category': 'Programming',
+            'type': 'single',
+            'joke': 'P single 😂',
+            'flags': {'nsfw': False, 'religious': False, 'political': False,
+                      'racist': False, 'sexist': False, 'explicit': False}
+        }
+
+    def test_decodes_twopart_joke(self, store):
+        """Test a two-part joke decodes setup and delivery."""
+        payload = store.random_payload('Programming', 'twopart')
+        assert payload['setup'] == 'P setup'
+        assert payload['delivery'] == 'P délivery'
+        assert payload['flags']['nsfw'] is True
+
+    def test_any_category_matches_everything(self, store):
+        """Test "Any" draws from every category."""
+        ids = {store.random_payload('Any')['id'] for _ in range(200)}
+        assert ids == {10, 11, 12}
+
+    def test_miscellaneous_alias(self, store):
+        """Test "Miscellaneous" maps onto the stored "Misc" label."""
+        assert store.random_payload('Miscellaneous')['id'] == 12
+
+    def test_blacklist_flags(self, store):
+        """Test jokes carrying a blacklisted flag are never returned."""
+        for _ in range(50):
+            assert store.random_payload('Any', blacklist_flags=['nsfw', 'political'])['id'] == 10
+
+    def test_no_match_returns_none(self, store):
+        """Test empty filter combinations return None."""
+        assert store.random_payload('Misc', 'twopart') is None
+        assert store.random_payload('Programming', 'twopart', ['nsfw']) is None
+        assert store.random_payload('Nope') is None
+
+    def test_rejects_non_store_files(self, tmp_path):
+        """Test opening a file without the magic header fails."""
+        path = tmp_path / 'bogus.jokestore'
+        path.write_bytes(b'\0' * 64)
+        with pytest.raises(ValueError):
+            JokeStore.open(path)
+
+    def test_matches_bundled_corpus(self, tmp_path):
+        """Test a store built from the sample corpus serves the same jokes."""
+        path = tmp_path / 'sample.jokestore'
+        corpus = JokeCorpus.load(CORPUS_PATH)
+        main([str(CORPUS_PATH), str(path)])
+
+        store = JokeStore.open(path)
+        try:
+            assert len(store) == len(corpus)
+            assert store.categories == corpus.categories
+            for _ in range(20):
+                payload = store.random_payload('Pun')
+                assert payload['category'] == 'Pun'
+        finally:
+            store.close()
@@ -0,0 +1,301 @@
+"""
+Test suite for the JokeStream Server-Sent Events feeds.
+
+Tests cover:
+- Event formatting
+- One upstream fetch per tick shared by every subscriber
+- Slow subscribers skipping to the backlog
+- The subscriber limit, heartbeats and shutdown
+"""
+
+import json
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from services import joke_stream
+from services.joke_stream import JokeStream, format_event
+from tests.conftest import wait_for
+
+
+# ===== Helpers =====
+
+def make_fetch(successes=None):
+    """Return a fake fetch that numbers its jokes and fails after successes calls."""
+    counter = {'calls': 0}
+    lock = threading.Lock()
+
+    def fetch(category):
+        with lock:
+            counter['calls'] += 1
+            n = counter['calls']
+        if successes is not None and n > successes:
+            return {'success': False, 'error': 'Request timed out.'}
+        return {'success': True, 'joke_type': 'single', 'joke': f'{category} joke {n}',
+                'category': category, 'error': ''}
+
+    fetch.counter = counter
+    return fetch
+
+
+def joke_of(event: str) -> str:
+    """Extract the joke text from a formatted joke event."""
+    data = event.split('data: ', 1)[1].rstrip('\n')
+    return json.loads(data)['joke']
+
+
+@pytest.fixture
+def streams():
+    """Build JokeStreams that are stopped after the test."""
+    created = []
+
+    def build(fetch=None, **kwargs):
+        kwargs.setdefault('interval', 0.01)
+        stream = JokeStream(fetch=fetch or make_fetch(), encode=json.dumps, **kwargs)
+        created.append(stream)
+        return stream
+
+    yield build
+    for stream in created:
+        stream.stop()
+
+
+# ===== Event Formatting =====
+
+class TestFormatEvent:
+    """Test suite for format_event()."""
+
+    def test_data_only(self):
+        """Test a bare payload becomes one data field."""
+        assert format_event('hello') == 'data: hello\n\n'
+
+    def test_id_and_event_type(self):
+        """Test the id and event fields precede the data."""
+        assert format_event('{}', event='joke', event_id=3) == 'id: 3\nevent: joke\ndata: {}\n\n'
+
+    def test_multiline_data_is_split_into_fields(self):
+        """Test each payload line gets its own data field."""
+        assert format_event('a\nb') == 'data: a\ndata: b\n\n'
+
+
+# ===== Shared Feeds =====
+
+class TestSharedFeed:
+    """Test suite for fan-out from one producer per category."""
+
+    def test_subscribers_share_one_fetch_per_tick(self, streams):
+        """Test five subscribers receive the same joke from a single fetch."""
+        fetch = make_fetch()
+        stream = streams(fetch, interval=60)
+        subscriptions = [stream.subscribe('Programming') for _ in range(5)]
+
+        events = [subscription.next_events(timeout=2) for subscription in subscriptions]
+
+        assert [joke_of(pending[0]) for pending in events] == ['Programming joke 1'] * 5
+        assert fetch.counter['calls'] == 1
+        assert stream.stats()['feeds']['Programming']['subscribers'] == 5
+
+    def test_new_subscriber_gets_newest_event_at_once(self, streams):
+        """Test a late subscriber is sent the newest joke without waiting a tick."""
+        stream = streams(interval=60)
+        first = stream.subscribe('Pun')
+        first.next_events(timeout=2)
+
+        late = stream.subscribe('Pun').next_events(timeout=0)
+
+        assert [joke_of(event) for event in late] == ['Pun joke 1']
+
+    def test_categories_have_separate_feeds(self, streams):
+        """Test each category has its own producer."""
+        stream = streams(interval=60)
+        programming = stream.subscribe('Programming').next_events(timeout=2)
+        dark = stream.subscribe('Dark').next_events(timeout=2)
+
+        assert joke_of(programming[0]).startswith('Programming')
+        assert joke_of(dark[0]).startswith('Dark')
+        assert set(stream.stats()['feeds']) == {'Programming', 'Dark'}
+
+    def test_events_arrive_every_interval(self, streams):
+        """Test a subscriber that keeps up sees every joke in order."""
+        stream = streams(interval=0.02)
+        subscription = stream.subscribe('Any')
+        seen = []
+        while len(seen) < 3:
+            seen.extend(subscription.next_events(timeout=2))
+
+        assert [joke_of(event) for event in seen[:3]] == ['Any joke 1', 'Any joke 2', 'Any joke 3']
+        assert subscription.dropped == 0
+
+    def test_producer_stops_with_last_subscriber(self, streams):
+        """Test the producer stops fetching once nobody is subscribed."""
+        fetch = make_fetch()
+        stream = streams(fetch, interval=0.01)
+        subscription = stream.subscribe('Spooky')
+        subscription.next_events(timeout=2)
+
+        subscription.close()
+
+        assert wait_for(lambda: not stream.stats()['feeds'])
+        calls = fetch.counter['calls']
+        time.sleep(0.05)
+        assert fetch.counter['calls'] == calls
+        assert stream.stats()['subscribers'] == 0
+
+
+# ===== Backpressure =====
+
+class TestSlowSubscribers:
+    """Test suite for subscribers that fall behind the feed."""
+
+    def test_slow_subscriber_skips_to_backlog(self, streams):
+        """Test a subscriber that fell behind gets only the backlog and counts the rest as dropped."""
+        stream = streams(make_fetch(successes=6), backlog=2)
+        subscription = stream.subscribe('Programming')
+        assert wait_for(lambda: stream.stats()['published'] == 6)
+
+        pending = subscription.next_events(timeout=0)
+
+        assert [joke_of(event) for event in pending] == ['Programming joke 5', 'Programming joke 6']
+        assert subscription.dropped == 4
+        assert stream.stats()['dropped'] == 4
+
+    def test_slow_subscriber_does_not_hold_back_others(self, streams):
+        """Test an idle subscriber does not delay events for others."""
+        stream = streams(make_fetch(successes=6), backlog=2)
+        slow = stream.subscribe('Programming')
+        fast = stream.subscribe('Programming')
+        seen = []
+        while fast.last_seq < 6:
+            seen.extend(fast.next_events(timeout=2))
+
+        assert len(seen) + fast.dropped == 6
+        assert len(slow.next_events(timeout=0)) == 2
+
+
+# ===== Limits, Heartbeats and Shutdown =====
+
+class TestStreamLifecycle:
+    """Test suite for the subscriber limit, the events() generator and stop()."""
+
+    def test_subscriber_limit(self, streams):
+        """Test subscribe() returns None at the limit until a stream closes."""
+        stream = streams(max_subscribers=1)
+        first = stream.subscribe('Any')
+
+        assert stream.subscribe('Any') is None
+        assert stream.stats()['rejected'] == 1
+
+        first.close()
+        assert stream.subscribe('Any') is not None
+
+    def test_close_is_idempotent(self, streams):
+        """Test closing twice leaves the subscriber count right."""
+        stream = streams()
+        subscription = stream.subscribe('Any')
+        subscription.close()
+        subscription.close()
+
+        assert stream.stats()['subscribers'] == 0
+
+    def test_events_start_with_retry_hint(self, streams):
+        """Test events() sends the retry hint, then jokes, and unsubscribes when closed."""
+        stream = streams(retry=1500)
+        events = stream.subscribe('Any').events()
+
+        assert next(events) == 'retry: 1500\n\n'
+        assert joke_of(next(events)) == 'Any joke 1'
+        events.close()
+
+        assert stream.stats()['subscribers'] == 0
+
+    def test_heartbeat_while_fetches_fail(self, streams):
+        """Test failed fetches publish nothing and a keep-alive is sent instead."""
+        stream = streams(make_fetch(successes=0), heartbeat=0.01)
+        events = stream.subscribe('Any').events()
+        next(events)
+
+        assert next(events) == ': keep-alive\n\n'
+        assert wait_for(lambda: stream.stats()['fetch_errors'] >= 1)
+        assert stream.stats()['published'] == 0
+        events.close()
+
+    def test_fetch_exception_keeps_producing(self, streams):
+        """Test a fetch that raises is counted and the feed keeps publishing."""
+        working = make_fetch()
+        calls = []
+
+        def flaky(category):
+            calls.append(category)
+            if len(calls) <= 2:
+                raise RuntimeError('unexpected payload')
+            return working(category)
+
+        stream = streams(flaky)
+        subscription = stream.subscribe('Any')
+
+        events = []
+        assert wait_for(lambda: events.extend(subscription.next_events(0.01) or []) or events)
+        assert joke_of(events[0]) == 'Any joke 1'
+        assert stream.stats()['fetch_errors'] == 2
+        subscription.close()
+
+    def test_dead_producer_closes_its_feed(self, streams, monkeypatch):
+        """Test a producer that dies ends its streams and a new subscriber gets a new producer."""
+        crashes = []
+        monkeypatch.setattr(threading, 'excepthook', crashes.append)
+        stream = streams()
+        with patch.object(stream, '_publish', side_effect=RuntimeError('boom')):
+            dead = stream.subscribe('Any')
+            assert wait_for(lambda: dead.next_events(0.01) is None)
+            assert wait_for(lambda: crashes)
+        assert stream.stats()['feeds'] == {}
+
+        subscription = stream.subscribe('Any')
+        assert wait_for(lambda: subscription.next_events(0.01))
+        subscription.close()
+
+    def test_stop_ends_open_streams(self, streams):
+        """Test stop() ends every open events() generator."""
+        stream = streams(interval=60)
+        events = stream.subscribe('Any').events()
+        next(events)
+        next(events)
+
+        stream.stop()
+
+        assert list(events) == []
+        assert stream.stats()['subscribers'] == 0
+
+    def test_exit_hook_ends_open_streams(self, streams):
+        """Test the module's atexit hook stops every stream."""
+        subscription = streams().subscribe('Any')
+        subscription.next_events(timeout=2)
+
+        joke_stream._stop_all()
+
+        assert subscription.next_events(timeout=0) is None
+
+    def test_after_fork_forgets_inherited_feeds(self, streams):
+        """Test _after_fork() drops the parent's feeds and subscribers."""
+        stream = streams(interval=60)
+        inherited = stream.subscribe('Any')
+        inherited.next_events(timeout=2)
+
+        stream._after_fork()
+        try:
+            assert stream.stats()['subscribers'] == 0
+            assert stream.stats()['feeds'] == {}
+            assert joke_of(stream.subscribe('Any').next_events(timeout=2)[0]) == 'Any joke 2'
+        finally:
+            with inherited._feed.changed:  # end the parent's producer
+                inherited._feed.closed = True
+                inherited._feed.changed.notify_all()
+
+    @pytest.mark.parametrize('kwargs', [
+        {'interval': 0}, {'max_subscribers': 0}, {'backlog': 0}
+    ])
+    def test_invalid_settings(self, kwargs):
+        """Test out-of-range settings are rejected."""
+        with pytest.raises(ValueError):
+            JokeStream(fetch=make_fetch(), encode=json.dumps, **kwargs)
@@ -0,0 +1,118 @@
+"""
+Test suite for the pluggable JSON provider.
+
+Tests cover:
+- Encoder selection from JSON_ENCODER
+- Matching output from the orjson and standard library providers
+- JokeResult serialisation and fallbacks
+"""
+
+import json
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+
+from services import json_provider
+from services.joke_result import JokeResult
+from services.json_provider import OrjsonJSONProvider, StdlibJSONProvider
+
+requires_orjson = pytest.mark.skipif(json_provider.orjson is None, reason="orjson not installed")
+
+
+# ===== Fixtures =====
+
+@pytest.fixture
+def flask_app():
+    """A bare application to attach providers to."""
+    return Flask(__name__)
+
+
+@pytest.fixture
+def document():
+    """A payload mixing a JokeResult with types needing conversion."""
+    return {
+        'joke': JokeResult.twopart('Setup?', 'Délivery!', 'Pun'),
+        'when': datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+        'count': 3,
+    }
+
+
+# ===== Tests =====
+
+class TestSelectProvider:
+    """Test suite for select_provider() and init_app()."""
+
+    @requires_orjson
+    def test_auto_prefers_orjson(self):
+        """Test 'auto' picks orjson when it is installed."""
+        assert json_provider.select_provider('auto') is OrjsonJSONProvider
+
+    def test_auto_falls_back_to_stdlib(self):
+        """Test 'auto' uses the standard library without orjson."""
+        with patch.object(json_provider, 'orjson', None):
+            assert json_provider.select_provider('auto') is StdlibJSONProvider
+
+    def test_orjson_required_when_forced(self):
+        """Test forcing orjson without the package is a configuration error."""
+        with patch.object(json_provider, 'orjson', None):
+            with pytest.raises(ValueError):
+                json_provider.select_provider('orjson')
+
+    def test_unknown_encoder(self):
+        """Test unknown encoder names are rejected."""
+        with pytest.raises(ValueError):
+            json_provider.select_provider('simplejson')
+
+    def test_init_app_installs_provider(self, flask_app):
+        """Test init_app() reads JSON_ENCODER and sets app.json."""
+        flask_app.config['JSON_ENCODER'] = 'json'
+        json_provider.init_app(flask_app)
+        assert isinstance(flask_app.json, StdlibJSONProvider)
+
+
+@requires_orjson
+class TestOrjsonProvider:
+    """Test suite for output parity between the providers."""
+
+    def test_documents_match_stdlib(self, flask_app, document):
+        """Test both providers encode the same document."""
+        fast, stdlib = OrjsonJSONProvider(flask_app), StdlibJSONProvider(flask_app)
+        assert json.loads(fast.dumps(document)) == json.loads(stdlib.dumps(document))
+
+    def test_response_is_compact_sorted_and_newline_terminated(self, flask_app):
+        """Test response bodies match Flask's default layout."""
+        with flask_app.app_context():
+            response = OrjsonJSONProvider(flask_app).response({'b': 1, 'a': 2})
+        assert response.get_data() == b'{"a":2,"b":1}\n'
+        assert response.mimetype == 'application/json'
+
+    def test_debug_responses_are_indented(self, flask_app):
+        """Test debug mode indents like the standard library provider."""
+        flask_app.debug = True
+        with flask_app.app_context():
+            response = OrjsonJSONProvider(flask_app).response({'a': 1})
+        assert response.get_data() == b'{\n  "a": 1\n}\n'
+
+    def test_unencodable_values_fall_back_to_stdlib(self, flask_app):
+        """Test values orjson rejects are still encoded."""
+        assert json.loads(OrjsonJSONProvider(flask_app).dumps({'big': 2 ** 70})) == {'big': 2 ** 70}
+
+    def test_keyword_arguments_use_stdlib(self, flask_app):
+        """Test json.dumps options are honoured."""
+        assert OrjsonJSONProvider(flask_app).dumps({'a': 1}, indent=4) == '{\n    "a": 1\n}'
+
+
+class TestStdlibProvider:
+    """Test suite for the standard library provider."""
+
+    def test_serialises_joke_result(self, flask_app):
+        """Test JokeResult encodes as its dict form."""
+        result = JokeResult.single('A joke.', 'Pun')
+        assert json.loads(StdlibJSONProvider(flask_app).dumps(result)) == result
+
+    def test_unknown_types_raise(self, flask_app):
+        """Test unsupported values still raise TypeError."""
+        with pytest.raises(TypeError):
+            StdlibJSONProvider(flask_app).dumps({'value': object()})
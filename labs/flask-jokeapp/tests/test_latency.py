@@ -0,0 +1,122 @@
+"""
+Test suite for the latency window and hedge budget.
+
+Tests cover:
+- Nearest-rank percentiles over the most recent samples
+- Minimum sample count before percentiles are reported
+- Hedge budget earning, spending and capping tokens
+"""
+
+import pytest
+
+from services.latency import HedgeBudget, LatencyWindow
+
+
+class TestLatencyWindow:
+    """Test suite for LatencyWindow."""
+
+    def test_no_percentiles_until_min_samples(self):
+        """Test percentile() is None while the window is too small."""
+        window = LatencyWindow(size=10, min_samples=3)
+        window.observe(0.1)
+        window.observe(0.2)
+
+        assert window.percentile(50) is None
+
+        window.observe(0.3)
+        assert window.percentile(50) == 0.2
+
+    def test_nearest_rank_percentiles(self):
+        """Test percentiles pick the nearest-rank sample."""
+        window = LatencyWindow(size=100, min_samples=1)
+        for ms in range(1, 101):
+            window.observe(ms / 1000)
+
+        assert window.percentile(50) == 0.05
+        assert window.percentile(95) == 0.095
+        assert window.percentile(100) == 0.1
+        assert window.percentile(0) == 0.001
+
+    def test_keeps_most_recent_samples(self):
+        """Test old samples fall out of the window."""
+        window = LatencyWindow(size=3, min_samples=1)
+        for seconds in (5.0, 0.1, 0.1, 0.1):
+            window.observe(seconds)
+
+        assert len(window) == 3
+        assert window.percentile(100) == 0.1
+        assert window.observed == 4
+
+    def test_percentile_sees_new_samples(self):
+        """Test the cached sorted view is rebuilt after observe()."""
+        window = LatencyWindow(size=10, min_samples=1)
+        window.observe(0.1)
+        assert window.percentile(100) == 0.1
+
+        window.observe(0.5)
+        assert window.percentile(100) == 0.5
+
+    def test_clear(self):
+        """Test clear() forgets every sample."""
+        window = LatencyWindow(size=10, min_samples=1)
+        window.observe(0.1)
+        window.clear()
+
+        assert len(window) == 0
+        assert window.percentile(50) is None
+
+    @pytest.mark.parametrize('size, min_samples', [(0, 1), (10, 0), (10, 11)])
+    def test_invalid_sizes(self, size, min_samples):
+        """Test impossible window sizes raise ValueError."""
+        with pytest.raises(ValueError):
+            LatencyWindow(size=size, min_samples=min_samples)
+
+
+class TestHedgeBudget:
+    """Test suite for HedgeBudget."""
+
+    def test_starts_empty(self):
+        """Test no hedge is allowed before any request."""
+        assert HedgeBudget().try_spend() is False
+
+    def test_earns_a_fraction_of_requests(self):
+        """Test ten requests at ratio 0.1 earn exactly one hedge."""
+        budget = HedgeBudget(ratio=0.1)
+        for _ in range(10):
+            budget.deposit()
+
+        assert budget.try_spend() is True
+        assert budget.try_spend() is False
+
+    def test_burst_caps_saved_tokens(self):
+        """Test tokens stop accumulating at burst."""
+        budget = HedgeBudget(ratio=1, burst=2)
+        for _ in range(10):
+            budget.deposit()
+
+        assert budget.tokens == 2
+        assert [budget.try_spend() for _ in range(3)] == [True, True, False]
+
+    def test_refund_returns_a_spent_token(self):
+        """Test refund() gives back a token, up to burst."""
+        budget = HedgeBudget(ratio=1, burst=1)
+        budget.deposit()
+        assert budget.try_spend() is True
+        budget.refund()
+        budget.refund()
+
+        assert budget.tokens == 1
+
+    def test_reset(self):
+        """Test reset() empties the bucket."""
+        budget = HedgeBudget(ratio=1)
+        budget.deposit()
+        budget.reset()
+
+        assert budget.try_spend() is False
+
+    @pytest.mark.parametrize('ratio, burst', [(-0.1, 10), (0.1, 0)])
+    def test_invalid_settings(self, ratio, burst):
+        """Test a negative ratio or a burst below one raises ValueError."""
+        with pytest.raises(ValueError):
+            HedgeBudget(ratio=ratio, burst=burst)
@@ -0,0 +1,318 @@
+"""
+Test suite for the metrics module and its instrumentation.
+
+Tests cover:
+- Counter, gauge and histogram semantics
+- Exact totals under concurrent updates from many threads
+- Prometheus text format rendering
+- Per-route request counting and the /metrics endpoint
+- Upstream outcome counters and latency histograms in joke_service
+"""
+
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+from flask import Flask
+
+from services import joke_service, metrics
+from services.metrics import CallbackMetric, Counter, Gauge, Histogram, Registry
+
+
+# ===== Fixtures =====
+
+@pytest.fixture
+def registry():
+    """A registry isolated from the application's metrics."""
+    return Registry()
+
+
+@pytest.fixture
+def metrics_app():
+    """Minimal app instrumented by metrics.init_app()."""
+    app = Flask(__name__)
+    metrics.init_app(app)
+
+    @app.route('/item/<name>')
+    def item(name):
+        return name
+
+    @app.route('/boom')
+    def boom():
+        raise RuntimeError('boom')
+
+    return app
+
+
+def sample_lines(text, name):
+    """Return the exposition lines of text for metric name."""
+    return [line for line in text.splitlines() if line.startswith(name)]
+
+
+# ===== Tests =====
+
+class TestPrimitives:
+    """Test suite for Counter, Gauge and Histogram."""
+
+    def test_counter_counts_per_label_set(self, registry):
+        """Test each label set is a separate series."""
+        counter = Counter('hits', 'Hits', ['route'], registry=registry)
+        counter.labels('/a').inc()
+        counter.labels('/a').inc(2)
+        counter.labels('/b').inc()
+
+        assert counter.labels('/a').value() == 3
+        assert counter.labels('/b').value() == 1
+
+    def test_counter_rejects_negative_increment(self, registry):
+        """Test counters never go down."""
+        counter = Counter('hits', 'Hits', registry=registry)
+        with pytest.raises(ValueError):
+            counter.inc(-1)
+
+    def test_wrong_label_count_raises(self, registry):
+        """Test labels() checks the number of values."""
+        counter = Counter('hits', 'Hits', ['method', 'route'], registry=registry)
+        with pytest.raises(ValueError):
+            counter.labels('GET')
+
+    def test_duplicate_name_raises(self, registry):
+        """Test a registry refuses two metrics with one name."""
+        Counter('hits', 'Hits', registry=registry)
+        with pytest.raises(ValueError):
+            Gauge('hits', 'Hits again', registry=registry)
+
+    def test_gauge_in_progress(self, registry):
+        """Test track_inprogress raises the gauge only inside the block."""
+        gauge = Gauge('busy', 'Busy', registry=registry)
+        with gauge.track_inprogress():
+            assert gauge.labels().value() == 1
+        assert gauge.labels().value() == 0
+
+    def test_gauge_sums_across_threads(self, registry):
+        """Test a gauge raised in one thread and lowered in another is zero."""
+        gauge = Gauge('busy', 'Busy', registry=registry)
+        gauge.inc()
+        thread = threading.Thread(target=gauge.dec)
+        thread.start()
+        thread.join()
+
+        assert gauge.labels().value() == 0
+
+    def test_exited_threads_are_folded_into_totals(self, registry):
+        """Test shards of finished threads are merged, keeping their counts."""
+        counter = Counter('hits', 'Hits', registry=registry)
+        histogram = Histogram('latency', 'Latency', buckets=(0.1,), registry=registry)
+
+        def work():
+            counter.inc()
+            histogram.observe(0.5)
+
+        for _ in range(200):
+            thread = threading.Thread(target=work)
+            thread.start()
+            thread.join()
+
+        assert counter.labels().value() == 200
+        assert 'latency_count 200' in registry.render()
+        assert len(counter.labels()._shards._all) <= 1
+        assert len(histogram.labels()._shards._all) <= 1
+
+    def test_histogram_buckets_are_cumulative(self, registry):
+        """Test bucket counts include every smaller bucket."""
+        histogram = Histogram('latency', 'Latency', buckets=(0.1, 1.0), registry=registry)
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+
+        text = registry.render()
+        assert 'latency_bucket{le="0.1"} 2' in text
+        assert 'latency_bucket{le="1.0"} 3' in text
+        assert 'latency_bucket{le="+Inf"} 4' in text
+        assert 'latency_count 4' in text
+        assert 'latency_sum 2.65' in text
+
+    def test_concurrent_updates_are_exact(self, registry):
+        """Test per-thread shards lose no increments."""
+        counter = Counter('hits', 'Hits', ['route'], registry=registry)
+        histogram = Histogram('latency', 'Latency', registry=registry)
+
+        def work():
+            for _ in range(5000):
+                counter.labels('/a').inc()
+                histogram.observe(0.01)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert counter.labels('/a').value() == 40000
+        assert 'latency_count 40000' in registry.render()
+
+
+class TestRendering:
+    """Test suite for the Prometheus text format."""
+
+    def test_help_type_and_samples(self, registry):
+        """Test each metric renders HELP, TYPE and its samples."""
+        Counter('hits', 'Hits served', ['route'], registry=registry).labels('/a').inc()
+        Gauge('busy', 'Busy workers', registry=registry).inc(3)
+
+        assert registry.render() == (
+            '# HELP hits Hits served\n'
+            '# TYPE hits counter\n'
+            'hits_total{route="/a"} 1\n'
+            '# HELP busy Busy workers\n'
+            '# TYPE busy gauge\n'
+            'busy 3\n'
+        )
+
+    def test_label_values_are_escaped(self, registry):
+        """Test quotes, backslashes and newlines in label values are escaped."""
+        counter = Counter('hits', 'Hits', ['route'], registry=registry)
+        counter.labels('a"b\\c\nd').inc()
+
+        assert 'hits_total{route="a\\"b\\\\c\\nd"} 1' in registry.render()
+
+    def test_callback_metric(self, registry):
+        """Test callback metrics are evaluated at render time."""
+        values = {'size': 1}
+        CallbackMetric('cache_size', 'Entries', 'gauge',
+                       lambda: [({}, values['size'])], registry=registry)
+        values['size'] = 7
+
+        assert 'cache_size 7' in registry.render()
+
+
+class TestRequestInstrumentation:
+    """Test suite for metrics.init_app()."""
+
+    def test_requests_counted_by_route_pattern(self, metrics_app):
+        """Test the route label is the URL rule, not the raw path."""
+        series = metrics.HTTP_REQUESTS.labels('GET', '/item/<name>', 200)
+        before = series.value()
+
+        client = metrics_app.test_client()
+        client.get('/item/a')
+        client.get('/item/b')
+
+        assert series.value() == before + 2
+
+    def test_unmatched_and_failed_requests(self, metrics_app):
+        """Test 404s share one label and exceptions count as 500."""
+        unmatched = metrics.HTTP_REQUESTS.labels('GET', 'unmatched', 404)
+        failed = metrics.HTTP_REQUESTS.labels('GET', '/boom', 500)
+        before = (unmatched.value(), failed.value())
+
+        client = metrics_app.test_client()
+        client.get('/no/such/page')
+        client.get('/boom')
+
+        assert (unmatched.value(), failed.value()) == (before[0] + 1, before[1] + 1)
+
+    def test_in_flight_returns_to_baseline(self, metrics_app):
+        """Test the in-flight gauge is lowered after each request."""
+        before = metrics.HTTP_IN_FLIGHT.labels().value()
+        metrics_app.test_client().get('/item/a')
+
+        assert metrics.HTTP_IN_FLIGHT.labels().value() == before
+
+    def test_metrics_endpoint(self, metrics_app):
+        """Test /metrics serves the registry uncached in the text format."""
+        client = metrics_app.test_client()
+        client.get('/item/a')
+        response = client.get('/metrics')
+
+        assert response.status_code == 200
+        assert response.content_type == metrics.CONTENT_TYPE
+        assert 'no-store' in response.headers['Cache-Control']
+        text = response.get_data(as_text=True)
+        assert sample_lines(text, 'jokeapp_http_requests_total{method="GET",route="/item/<name>"')
+        assert '# TYPE jokeapp_http_request_duration_seconds histogram' in text
+
+    def test_disabled(self):
+        """Test METRICS_ENABLED=False registers nothing."""
+        app = Flask(__name__)
+        app.config['METRICS_ENABLED'] = False
+        metrics.init_app(app)
+
+        assert app.test_client().get('/metrics').status_code == 404
+
+
+class TestUpstreamMetrics:
+    """Test suite for the joke_service instrumentation."""
+
+    @pytest.mark.parametrize('error, outcome', [
+        (requests.exceptions.Timeout(), 'timeout'),
+        (requests.exceptions.ConnectionError(), 'connection'),
+        (requests.exceptions.RequestException('bad'), 'request'),
+        (RuntimeError('boom'), 'unexpected'),
+    ])
+    @patch('services.joke_service.get_session')
+    def test_outcome_per_except_branch(self, mock_session, error, outcome):
+        """Test each failure branch increments its own outcome."""
+        mock_session.return_value.get.side_effect = error
+        series = joke_service.UPSTREAM_OUTCOMES.labels(outcome)
+        before = series.value()
+
+        joke_service.get_joke('Pun', use_cache=False)
+
+        assert series.value() == before + 1
+
+    @patch('services.joke_service.get_session')
+    def test_http_and_json_outcomes(self, mock_session):
+        """Test HTTP errors and undecodable bodies are told apart."""
+        http_error = Mock()
+        http_error.raise_for_status.side_effect = requests.exceptions.HTTPError(
+            response=Mock(status_code=503, reason='Service Unavailable')
+        )
+        bad_json = Mock()
+        bad_json.json.side_effect = ValueError('not json')
+        mock_session.return_value.get.side_effect = [http_error, bad_json]
+        http_series = joke_service.UPSTREAM_OUTCOMES.labels('http')
+        json_series = joke_service.UPSTREAM_OUTCOMES.labels('json')
+        before = (http_series.value(), json_series.value())
+
+        joke_service.get_joke('Pun', use_cache=False)
+        joke_service.get_joke('Pun', use_cache=False)
+
+        assert (http_series.value(), json_series.value()) == (before[0] + 1, before[1] + 1)
+
+    @patch('services.joke_service.get_session')
+    def test_latency_per_category(self, mock_session):
+        """Test upstream latency is observed under the requested category."""
+        mock_session.return_value.get.return_value.json.return_value = {
+            'error': False, 'type': 'single', 'joke': 'Ha', 'category': 'Spooky'
+        }
+        ok = joke_service.UPSTREAM_OUTCOMES.labels('ok')
+        before = ok.value()
+
+        joke_service.get_joke('Spooky', joke_type='single', use_cache=False)
+
+        assert ok.value() == before + 1
+        text = metrics.REGISTRY.render()
+        assert sample_lines(text, 'jokeapp_upstream_request_duration_seconds_count{category="Spooky"}')
+        assert joke_service.UPSTREAM_IN_FLIGHT.labels().value() == 0
+
+    def test_url_category(self):
+        """Test the category label is taken from the URL path."""
+        url = joke_service.build_joke_url('Programming', joke_type='single')
+
+        assert joke_service._url_category(url) == 'Programming'
+        assert joke_service._url_category(joke_service.API_BASE_URL + '/Pun,Dark?amount=3') == 'Pun,Dark'
+
+    @patch('services.joke_service.get_session')
+    def test_unknown_categories_share_one_latency_series(self, mock_session):
+        """Test arbitrary categories from the URL are labelled 'other', adding at most one series."""
+        mock_session.return_value.get.side_effect = requests.exceptions.ConnectionError()
+        before = set(joke_service.UPSTREAM_LATENCY._children)
+
+        for i in range(20):
+            joke_service.get_joke(f'junk{i}', use_cache=False)
+
+        assert set(joke_service.UPSTREAM_LATENCY._children) - before <= {('other',)}
+        text = metrics.REGISTRY.render()
+        assert sample_lines(text, 'jokeapp_upstream_request_duration_seconds_count{category="other"}')
+        assert 'category="junk' not in text
@@ -0,0 +1,85 @@
+"""
+Test suite for the microbenchmark runner.
+
+Tests cover:
+- Regression detection against a baseline
+- Offline execution of every registered benchmark
+- Baseline file round trip
+"""
+
+import json
+from contextlib import ExitStack
+
+import pytest
+
+from benchmarks import microbench
+from services import joke_service
+
+
+class TestCompare:
+    """Test suite for microbench.compare()."""
+
+    def test_statuses(self):
+        """Test scores are classified against the threshold."""
+        results = {
+            'same': {'ns': 100, 'relative': 1.0},
+            'slower': {'ns': 150, 'relative': 1.5},
+            'quicker': {'ns': 50, 'relative': 0.5},
+            'added': {'ns': 10, 'relative': 0.1},
+        }
+        baseline = {name: {'ns': 100, 'relative': 1.0} for name in ('same', 'slower', 'quicker')}
+
+        statuses = {row[0]: row[4] for row in microbench.compare(results, baseline, threshold=0.25)}
+
+        assert statuses == {'same': 'ok', 'slower': 'REGRESSED', 'quicker': 'faster', 'added': 'new'}
+
+    def test_compares_scores_not_times(self):
+        """Test a slower machine with an unchanged score is not a regression."""
+        results = {'bench': {'ns': 300, 'relative': 1.1}}
+        baseline = {'bench': {'ns': 100, 'relative': 1.0}}
+
+        (row,) = microbench.compare(results, baseline, threshold=0.25)
+
+        assert row[4] == 'ok'
+        assert row[3] == pytest.approx(0.1)
+
+
+class TestRun:
+    """Test suite for running benchmarks offline."""
+
+    def test_every_benchmark_runs_offline(self):
+        """Test each benchmark's callable works against the canned upstream."""
+        with ExitStack() as stack:
+            microbench.offline(stack)
+            for name, setup in microbench.BENCHMARKS.items():
+                setup()()
+
+    def test_get_joke_uses_canned_response(self):
+        """Test get_joke() parses the canned twopart payload."""
+        with ExitStack() as stack:
+            microbench.offline(stack)
+            result = joke_service.get_joke('Programming', use_cache=False)
+
+        assert result['success'] is True
+        assert result['delivery'] == microbench.TWOPART['delivery']
+
+    def test_run_reports_time_and_score(self):
+        """Test run() returns a time and a calibrated score per benchmark."""
+        results = microbench.run(['build_joke_url'], repeat=1, min_time=0.001)
+
+        assert results['build_joke_url']['ns'] > 0
+        assert results['build_joke_url']['relative'] > 0
+
+
+class TestBaselineFile:
+    """Test suite for loading baselines."""
+
+    def test_missing_baseline_is_empty(self, tmp_path):
+        """Test a missing file means every benchmark is new."""
+        assert microbench.load_baseline(tmp_path / 'none.json') == {'machine': {}, 'results': {}}
+
+    def test_committed_baseline_covers_every_benchmark(self):
+        """Test the committed baseline has a score for each benchmark."""
+        baseline = json.loads(microbench.BASELINE_PATH.read_text())
+        assert set(baseline['results']) == set(microbench.BENCHMARKS)
+        assert all(entry['relative'] > 0 for entry in baseline['results'].values())
@@ -0,0 +1,127 @@
+"""
+Test suite for the pre-rendered page cache.
+
+Tests cover:
+- Serving repeat requests without re-rendering
+- Invalidation on year rollover, context changes and template edits
+- Integration with the app's static-content routes
+"""
+
+import os
+from datetime import datetime
+
+import pytest
+from unittest.mock import patch
+from flask import Flask, render_template
+from services.page_cache import PageCache
+from tests.conftest import FakeClock
+
+
+# ===== Fixtures =====
+
+@pytest.fixture
+def clock():
+    """Provide a settable replacement for datetime.now."""
+    return FakeClock(datetime(2025, 12, 31, 23, 59))
+
+
+@pytest.fixture
+def page_app(tmp_path, clock):
+    """A small app rendering one page from a temporary template folder."""
+    (tmp_path / 'page.html').write_text('v{{ version }} {{ year }}')
+    page_app = Flask(__name__, template_folder=str(tmp_path))
+    page_app.page_cache = PageCache(clock=clock)
+
+    @page_app.context_processor
+    def inject_year():
+        return {'year': clock().year}
+
+    @page_app.route('/page')
+    def page():
+        return page_app.page_cache.render('page.html', version=page_app.config['VERSION'])
+
+    page_app.config['VERSION'] = '1.0'
+    return page_app
+
+
+# ===== Tests =====
+
+class TestPageCache:
+    """Test suite for PageCache."""
+
+    def test_repeat_requests_are_not_re_rendered(self, page_app):
+        """Test the second request is served from the cache."""
+        client = page_app.test_client()
+        with patch('services.page_cache.render_template', wraps=render_template) as render:
+            first = client.get('/page')
+            second = client.get('/page')
+
+        assert render.call_count == 1
+        assert first.data == second.data == b'v1.0 2025'
+        assert second.headers['Content-Length'] == str(len(second.data))
+        assert second.headers['ETag'] == first.headers['ETag']
+        assert page_app.page_cache.stats() == {'hits': 1, 'misses': 1, 'invalidations': 0, 'size': 1}
+
+    def test_year_rollover_invalidates(self, page_app, clock):
+        """Test pages are re-rendered once the year changes."""
+        client = page_app.test_client()
+        assert client.get('/page').data == b'v1.0 2025'
+
+        clock.now = datetime(2026, 1, 1, 0, 0)
+
+        assert client.get('/page').data == b'v1.0 2026'
+        assert page_app.page_cache.stats()['invalidations'] == 1
+
+    def test_context_change_renders_new_page(self, page_app):
+        """Test a new app version is part of the cache key."""
+        client = page_app.test_client()
+        client.get('/page')
+        page_app.config['VERSION'] = '2.0'
+
+        assert client.get('/page').data == b'v2.0 2025'
+
+    def test_template_edit_invalidates_with_auto_reload(self, page_app, tmp_path):
+        """Test editing a template is picked up in debug mode."""
+        page_app.config['TEMPLATES_AUTO_RELOAD'] = True
+        client = page_app.test_client()
+        client.get('/page')
+
+        template = tmp_path / 'page.html'
+        template.write_text('edited {{ version }}')
+        os.utime(template, ns=(0, template.stat().st_mtime_ns + 1_000_000_000))
+
+        assert client.get('/page').data == b'edited 1.0'
+
+    def test_template_edit_ignored_without_auto_reload(self, page_app, tmp_path):
+        """Test production pages stay cached until restart."""
+        client = page_app.test_client()
+        client.get('/page')
+        (tmp_path / 'page.html').write_text('edited')
+
+        assert client.get('/page').data == b'v1.0 2025'
+
+    def test_clear_drops_pages(self, page_app):
+        """Test clear() forces a re-render."""
+        client = page_app.test_client()
+        client.get('/page')
+        page_app.page_cache.clear()
+        client.get('/page')
+
+        assert page_app.page_cache.stats()['misses'] == 2
+
+
+class TestAppPages:
+    """Test the app's static-content routes use the page cache."""
+
+    @pytest.mark.parametrize('path', ['/', '/about', '/contact'])
+    def test_pages_served_from_cache(self, path):
+        """Test repeat requests for a page are cache hits with identical bodies."""
+        from app import app, page_cache
+        client = app.test_client()
+        first = client.get(path)
+        hits = page_cache.stats()['hits']
+        second = client.get(path)
+
+        assert page_cache.stats()['hits'] == hits + 1
+        assert second.data == first.data
+        assert second.headers['ETag'] == first.headers['ETag']
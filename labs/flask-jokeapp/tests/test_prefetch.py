@@ -0,0 +1,171 @@
+"""
+Test suite for the JokePrefetcher background buffers.
+
+Tests cover:
+- Initial fill and O(1) pops
+- Low-water refills
+- Stale eviction
+- Fetch failures and stats
+"""
+
+import threading
+
+import pytest
+from services.prefetch import JokePrefetcher
+from tests.conftest import wait_for
+
+
+# ===== Helpers =====
+
+def make_fetch(success=True):
+    """Return a fake fetch function that numbers each joke it produces."""
+    counter = {'calls': 0}
+    lock = threading.Lock()
+
+    def fetch(category):
+        with lock:
+            counter['calls'] += 1
+            n = counter['calls']
+        if not success:
+            return {'success': False, 'error': 'Request timed out.'}
+        return {
+            'success': True,
+            'joke_type': 'single',
+            'joke': f'{category} joke {n}',
+            'setup': None,
+            'delivery': None,
+            'category': category,
+            'error': ''
+        }
+
+    fetch.counter = counter
+    return fetch
+
+
+def buffer_size(prefetcher, category):
+    return prefetcher.stats()['buffers'][category]['size']
+
+
+# ===== Fixtures =====
+
+@pytest.fixture
+def prefetcher():
+    """Create a prefetcher over two categories and stop it afterwards."""
+    prefetcher = JokePrefetcher(
+        fetch=make_fetch(),
+        categories=['Programming', 'Pun'],
+        depth=4,
+        low_water=2,
+        max_workers=2
+    )
+    yield prefetcher
+    prefetcher.stop()
+
+
+# ===== Tests =====
+
+class TestJokePrefetcher:
+    """Test suite for JokePrefetcher."""
+
+    def test_start_fills_every_buffer_to_depth(self, prefetcher):
+        """Test start() fills each category buffer."""
+        prefetcher.start()
+        assert wait_for(lambda: all(
+            buffer_size(prefetcher, c) == 4 for c in ('Programming', 'Pun')
+        ))
+
+    def test_pop_returns_buffered_joke(self, prefetcher):
+        """Test pop() returns a joke from the requested category."""
+        prefetcher.start()
+        wait_for(lambda: buffer_size(prefetcher, 'Programming') == 4)
+
+        joke = prefetcher.pop('Programming')
+
+        assert joke['success'] is True
+        assert joke['category'] == 'Programming'
+        assert prefetcher.stats()['hits'] == 1
+
+    def test_pop_without_start_returns_none(self, prefetcher):
+        """Test pop() on an idle prefetcher misses and schedules nothing."""
+        assert prefetcher.pop('Programming') is None
+        stats = prefetcher.stats()
+        assert stats['misses'] == 1
+        assert stats['buffers']['Programming']['refilling'] is False
+
+    def test_pop_unknown_category_returns_none(self, prefetcher):
+        """Test categories that are not buffered return None."""
+        prefetcher.start()
+        assert prefetcher.pop('Unknown') is None
+
+    def test_refill_only_below_low_water(self, prefetcher):
+        """Test a refill is triggered only when the buffer drops below low_water."""
+        prefetcher.start()
+        wait_for(lambda: all(
+            buffer_size(prefetcher, c) == 4 for c in ('Programming', 'Pun')
+        ))
+        calls_after_fill = prefetcher.fetch.counter['calls']
+
+        prefetcher.pop('Programming')
+        prefetcher.pop('Programming')
+        assert prefetcher.fetch.counter['calls'] == calls_after_fill
+
+        prefetcher.pop('Programming')
+        assert wait_for(lambda: buffer_size(prefetcher, 'Programming') == 4)
+        assert prefetcher.fetch.counter['calls'] == calls_after_fill + 3
+
+    def test_stale_jokes_are_evicted(self, clock):
+        """Test jokes older than max_age are never served."""
+        prefetcher = JokePrefetcher(
+            fetch=make_fetch(), categories=['Pun'], depth=2, low_water=0,
+            max_age=60, timer=clock
+        )
+        prefetcher.start()
+        try:
+            wait_for(lambda: buffer_size(prefetcher, 'Pun') == 2)
+            prefetcher.stop()
+            clock.now = 61
+
+            assert prefetcher.pop('Pun') is None
+            assert prefetcher.stats()['stale_evictions'] == 2
+        finally:
+            prefetcher.stop()
+
+    def test_failed_fetches_are_not_buffered(self):
+        """Test error results stop the refill and are counted."""
+        prefetcher = JokePrefetcher(
+            fetch=make_fetch(success=False), categories=['Dark'], depth=3, low_water=1
+        )
+        prefetcher.start()
+        try:
+            assert wait_for(lambda: prefetcher.stats()['fetch_errors'] == 1)
+            assert wait_for(lambda: not prefetcher.stats()['buffers']['Dark']['refilling'])
+            assert buffer_size(prefetcher, 'Dark') == 0
+        finally:
+            prefetcher.stop()
+
+    def test_stats_report_buffers(self, prefetcher):
+        """Test stats() exposes per-category buffer state."""
+        stats = prefetcher.stats()
+        assert stats['running'] is False
+        assert stats['depth'] == 4
+        assert set(stats['buffers']) == {'Programming', 'Pun'}
+        assert stats['buffers']['Pun'] == {'size': 0, 'refilling': False, 'oldest_age': None}
+
+    def test_invalid_low_water_raises(self):
+        """Test low_water above depth is rejected."""
+        with pytest.raises(ValueError):
+            JokePrefetcher(fetch=make_fetch(), depth=2, low_water=3)
+
+    def test_after_fork_replaces_pool_and_refills(self, prefetcher):
+        """Test _after_fork() starts a new refill pool and tops the buffers up."""
+        prefetcher.start()
+        assert wait_for(lambda: buffer_size(prefetcher, 'Programming') == 4)
+        for _ in range(3):
+            prefetcher.pop('Programming')
+        inherited = prefetcher._executor
+
+        prefetcher._after_fork()
+        inherited.shutdown()
+
+        assert prefetcher._executor is not inherited
+        assert wait_for(lambda: buffer_size(prefetcher, 'Programming') == 4)
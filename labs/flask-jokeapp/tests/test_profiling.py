@@ -0,0 +1,264 @@
+"""
+Test suite for the request profiling hook.
+
+Tests cover:
+- Sampling and tracing profilers
+- Collapsed-stack and flamegraph output
+- Token gating, sample rate and the disabled default
+- Background writing and retention
+"""
+
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+
+from services import profiling
+from services.profiling import (
+    ProfileWriter, SamplingProfiler, TracingProfiler, collapse, prune_profiles, render_flamegraph,
+    write_profile
+)
+
+
+# ===== Helpers =====
+
+def busy_leaf():
+    """Burn a little CPU in a recognisable frame."""
+    return sum(i * i for i in range(20000))
+
+
+def busy_root():
+    return busy_leaf() + busy_leaf()
+
+
+# ===== Fixtures =====
+
+@pytest.fixture
+def profiled_app(tmp_path):
+    """Minimal app with profiling enabled and a known token."""
+    app = Flask(__name__)
+    app.config.update(PROFILE_ENABLED=True, PROFILE_TOKEN='secret', PROFILE_DIR=str(tmp_path))
+    profiling.init_app(app)
+
+    @app.route('/work')
+    def work():
+        busy_root()
+        return 'done'
+
+    return app
+
+
+# ===== Tests =====
+
+class TestProfilers:
+    """Test suite for the profiler classes."""
+
+    def test_tracing_profiler_records_call_paths(self):
+        """Test stacks follow the call path and carry microsecond weights."""
+        profiler = TracingProfiler()
+        profiler.start()
+        busy_root()
+        profiler.stop()
+
+        paths = [stack for stack in profiler.stacks if 'busy_leaf' in stack]
+        assert paths
+        assert all('busy_root' in stack.split(';')[0] for stack in paths)
+        assert all(weight > 0 for weight in profiler.stacks.values())
+
+    def test_tracing_profiler_charges_unfinished_frames(self):
+        """Test stop() accounts for frames still on the stack."""
+        profiler = TracingProfiler(timer=lambda: 2.0)
+        profiler._stack = [['outer (a.py)', 0.0, 0.0]]
+        profiler.stop()
+
+        assert profiler.stacks == {'outer (a.py)': 2000000}
+
+    def test_sampling_profiler_samples_target_thread(self):
+        """Test samples are taken from the given thread's stack."""
+        profiler = SamplingProfiler(threading.get_ident(), interval=0.001)
+        profiler.start()
+        time.sleep(0.05)
+        profiler.stop()
+
+        assert sum(profiler.stacks.values()) > 0
+        assert all(stack.endswith('test_sampling_profiler_samples_target_thread (tests/test_profiling.py)')
+                   for stack in profiler.stacks)
+
+
+class TestOutput:
+    """Test suite for collapsed stacks and flamegraphs."""
+
+    def test_collapse_format(self):
+        """Test one 'stack weight' line per stack."""
+        assert collapse({'a;b': 3, 'a': 1}) == 'a 1\na;b 3\n'
+
+    def test_flamegraph_is_valid_svg(self):
+        """Test the flamegraph parses and has a frame per stack element."""
+        svg = render_flamegraph({'main;handler;<render>': 30, 'main;handler': 10}, title='GET /x & y')
+        root = ET.fromstring(svg)
+        titles = [element.text for element in root.iter('{http://www.w3.org/2000/svg}title')]
+
+        assert len(titles) == 3
+        assert any(title.startswith('main (40 samples, 100.00%)') for title in titles)
+        assert any(title.startswith('<render> (30 samples') for title in titles)
+
+    def test_flamegraph_of_nothing(self):
+        """Test an empty profile still renders."""
+        ET.fromstring(render_flamegraph({}))
+
+    def test_write_profile(self, tmp_path):
+        """Test both files are written next to each other."""
+        profiler = TracingProfiler()
+        profiler.stacks = {'a;b': 5}
+        path = write_profile(str(tmp_path / 'out'), 'req', profiler, 'title')
+
+        assert path.endswith('req.folded')
+        assert (tmp_path / 'out' / 'req.folded').read_text() == 'a;b 5\n'
+        assert (tmp_path / 'out' / 'req.svg').exists()
+
+    def test_prune_keeps_newest_profiles(self, tmp_path):
+        """Test the oldest profiles beyond keep are deleted, both files of each."""
+        for age, name in enumerate(['c', 'b', 'a']):
+            for ext in ('.folded', '.svg'):
+                path = tmp_path / f'{name}{ext}'
+                path.write_text('x')
+                os.utime(path, (1000 - age, 1000 - age))
+        (tmp_path / 'notes.txt').write_text('kept')
+
+        assert prune_profiles(str(tmp_path), keep=1) == ['a', 'b']
+        assert sorted(path.name for path in tmp_path.iterdir()) == ['c.folded', 'c.svg', 'notes.txt']
+
+
+class TestProfileWriter:
+    """Test suite for ProfileWriter."""
+
+    def test_writes_in_background_and_prunes(self, tmp_path):
+        """Test queued profiles are written off the caller's thread and pruned to keep."""
+        writer = ProfileWriter(str(tmp_path), keep=2)
+        profiler = TracingProfiler()
+        profiler.stacks = {'a;b': 5}
+        threads = []
+
+        def recording_write(*args):
+            threads.append(threading.current_thread())
+            return write_profile(*args)
+
+        with patch('services.profiling.write_profile', side_effect=recording_write):
+            for number in range(3):
+                assert writer.submit(f'req-{number}', profiler, 'title') is True
+            writer.flush()
+
+        assert threading.current_thread() not in threads
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            'req-1.folded', 'req-1.svg', 'req-2.folded', 'req-2.svg'
+        ]
+
+    def test_full_backlog_drops_profiles(self, tmp_path):
+        """Test submit() does not block when the writer is behind."""
+        writer = ProfileWriter(str(tmp_path), backlog=1)
+        release = threading.Event()
+        with patch('services.profiling.write_profile', side_effect=lambda *args: release.wait(2)):
+            results = [writer.submit(f'req-{number}', TracingProfiler(), 'title') for number in range(4)]
+            release.set()
+            writer.flush()
+
+        assert results[-1] is False
+        assert writer.dropped >= 1
+
+    def test_invalid_keep(self, tmp_path):
+        """Test keep below one raises ValueError."""
+        with pytest.raises(ValueError):
+            ProfileWriter(str(tmp_path), keep=0)
+
+
+class TestRequestHook:
+    """Test suite for profiling.init_app()."""
+
+    def test_token_triggers_profile(self, profiled_app, tmp_path):
+        """Test a request with the token is profiled and named in the response."""
+        response = profiled_app.test_client().get('/work', headers={'X-Profile-Token': 'secret'})
+        profile_id = response.headers['X-Profile-Id']
+        profiled_app.extensions['profile_writer'].flush()
+
+        assert '-work-' in profile_id
+        folded = (tmp_path / f'{profile_id}.folded').read_text()
+        assert 'busy_root (tests/test_profiling.py);busy_leaf (tests/test_profiling.py)' in folded
+        assert (tmp_path / f'{profile_id}.svg').exists()
+
+    def test_profile_dir_keeps_newest(self, profiled_app, tmp_path):
+        """Test PROFILE_KEEP bounds the files written by sampled requests."""
+        profiled_app.extensions['profile_writer'].keep = 2
+        client = profiled_app.test_client()
+        ids = [client.get('/work', headers={'X-Profile-Token': 'secret'}).headers['X-Profile-Id']
+               for _ in range(4)]
+        profiled_app.extensions['profile_writer'].flush()
+
+        assert len(list(tmp_path.iterdir())) == 4
+        assert (tmp_path / f'{ids[-1]}.svg').exists()
+
+    def test_wrong_or_missing_token_not_profiled(self, profiled_app, tmp_path):
+        """Test requests without the right token are left alone."""
+        client = profiled_app.test_client()
+
+        assert 'X-Profile-Id' not in client.get('/work', headers={'X-Profile-Token': 'guess'}).headers
+        assert 'X-Profile-Id' not in client.get('/work').headers
+        assert list(tmp_path.iterdir()) == []
+
+    def test_empty_token_disables_header(self, profiled_app):
+        """Test an unset PROFILE_TOKEN never matches."""
+        profiled_app.config['PROFILE_TOKEN'] = ''
+        response = profiled_app.test_client().get('/work', headers={'X-Profile-Token': ''})
+
+        assert 'X-Profile-Id' not in response.headers
+
+    def test_sample_rate_uses_sampler(self, profiled_app):
+        """Test randomly picked requests use the sampling profiler."""
+        profiled_app.config['PROFILE_SAMPLE_RATE'] = 0.5
+        with patch('services.profiling.random.random', return_value=0.1), \
+                patch.object(SamplingProfiler, 'start') as start, \
+                patch.object(SamplingProfiler, 'stop'):
+            response = profiled_app.test_client().get('/work')
+
+        start.assert_called_once()
+        assert 'X-Profile-Id' in response.headers
+
+    def test_sample_rate_skips_others(self, profiled_app):
+        """Test requests above the sample rate are not profiled."""
+        profiled_app.config['PROFILE_SAMPLE_RATE'] = 0.5
+        with patch('services.profiling.random.random', return_value=0.9):
+            response = profiled_app.test_client().get('/work')
+
+        assert 'X-Profile-Id' not in response.headers
+
+    def test_failed_request_stops_profiler(self, profiled_app):
+        """Test the profiler is stopped when the view raises."""
+        @profiled_app.route('/fail')
+        def fail():
+            raise RuntimeError('boom')
+
+        with patch.object(TracingProfiler, 'stop', autospec=True,
+                          side_effect=TracingProfiler.stop) as stop:
+            profiled_app.test_client().get('/fail', headers={'X-Profile-Token': 'secret'})
+
+        stop.assert_called_once()
+
+    def test_disabled_by_default(self, tmp_path):
+        """Test nothing is profiled unless PROFILE_ENABLED is set."""
+        app = Flask(__name__)
+        app.config.update(PROFILE_TOKEN='secret', PROFILE_DIR=str(tmp_path))
+        profiling.init_app(app)
+        app.add_url_rule('/work', 'work', lambda: 'done')
+
+        response = app.test_client().get('/work', headers={'X-Profile-Token': 'secret'})
+        assert 'X-Profile-Id' not in response.headers
+
+    def test_unknown_mode_rejected(self):
+        """Test a bad PROFILE_MODE fails at start-up."""
+        app = Flask(__name__)
+        app.config.update(PROFILE_ENABLED=True, PROFILE_MODE='magic')
+        with pytest.raises(ValueError):
+            profiling.init_app(app)
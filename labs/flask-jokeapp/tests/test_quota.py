@@ -0,0 +1,193 @@
+"""
+Test suite for the upstream quota bucket.
+
+Tests cover:
+- Reading RateLimit-* and Retry-After headers in their different forms
+- Token refill, waiting and shedding
+- Syncing with upstream headers and pausing after a 429
+"""
+
+import asyncio
+import time
+from email.utils import formatdate
+
+import pytest
+from requests.structures import CaseInsensitiveDict
+
+from services.quota import QuotaBucket, parse_rate_limit_headers
+
+
+@pytest.fixture
+def bucket(clock):
+    """A bucket of 10 requests per 10 seconds on the fake clock."""
+    return QuotaBucket(limit=10, window=10, timer=clock)
+
+
+def drain(bucket):
+    """Take every token in the bucket."""
+    while bucket.try_acquire():
+        pass
+
+
+class TestParseRateLimitHeaders:
+    """Test suite for parse_rate_limit_headers()."""
+
+    def test_standard_headers(self):
+        """Test RateLimit-* headers are read case-insensitively."""
+        headers = CaseInsensitiveDict({'ratelimit-limit': '120', 'RATELIMIT-REMAINING': '7',
+                                       'RateLimit-Reset': '30'})
+        assert parse_rate_limit_headers(headers) == {
+            'limit': 120, 'remaining': 7, 'reset': 30.0, 'retry_after': None
+        }
+
+    def test_x_prefixed_headers(self):
+        """Test X-RateLimit-* headers are understood too."""
+        limits = parse_rate_limit_headers({'X-RateLimit-Limit': '60', 'X-RateLimit-Remaining': '0'})
+        assert limits['limit'] == 60
+        assert limits['remaining'] == 0
+
+    def test_reset_as_unix_timestamp(self):
+        """Test a reset given as a Unix timestamp becomes seconds from now."""
+        limits = parse_rate_limit_headers({'RateLimit-Reset': str(int(time.time()) + 20)})
+        assert 18 <= limits['reset'] <= 20
+
+    def test_retry_after_as_http_date(self):
+        """Test an HTTP-date Retry-After becomes seconds from now."""
+        limits = parse_rate_limit_headers({'Retry-After': formatdate(time.time() + 30, usegmt=True)})
+        assert 28 <= limits['retry_after'] <= 30
+
+    def test_past_dates_are_zero(self):
+        """Test a reset in the past means no wait."""
+        limits = parse_rate_limit_headers({'Retry-After': formatdate(time.time() - 30, usegmt=True)})
+        assert limits['retry_after'] == 0
+
+    @pytest.mark.parametrize('headers', [
+        {},
+        {'Content-Type': 'application/json'},
+        {'RateLimit-Limit': 'lots', 'Retry-After': 'soon'},
+        None,
+        object(),
+    ])
+    def test_missing_or_unreadable(self, headers):
+        """Test absent, malformed or non-mapping headers read as None."""
+        assert parse_rate_limit_headers(headers) == {
+            'limit': None, 'remaining': None, 'reset': None, 'retry_after': None
+        }
+
+
+class TestQuotaBucket:
+    """Test suite for QuotaBucket."""
+
+    def test_starts_full(self, bucket):
+        """Test a new bucket grants limit requests, then sheds."""
+        assert [bucket.try_acquire() for _ in range(11)] == [True] * 10 + [False]
+        stats = bucket.stats()
+        assert stats['granted'] == 10
+        assert stats['shed'] == 1
+
+    def test_optional_requests_are_not_counted_as_shed(self, bucket):
+        """Test try_acquire(shed=False) refuses without counting a shed request."""
+        drain(bucket)
+        shed = bucket.stats()['shed']
+        assert bucket.try_acquire(shed=False) is False
+        assert bucket.stats()['shed'] == shed
+
+    def test_refills_over_the_window(self, bucket, clock):
+        """Test tokens come back at limit / window per second."""
+        drain(bucket)
+        clock.now += 1
+        assert bucket.try_acquire() is True
+        assert bucket.try_acquire() is False
+
+        clock.now += 100
+        assert bucket.stats()['tokens'] == 10
+
+    def test_acquire_sheds_without_waiting_when_wait_is_too_long(self, bucket):
+        """Test a caller is turned away at once if no token is due in time."""
+        drain(bucket)
+        started = time.monotonic()
+        assert bucket.acquire(timeout=0.5) is False
+        assert time.monotonic() - started < 0.1
+
+    def test_acquire_waits_for_a_token(self):
+        """Test a caller queues until the next token is due."""
+        bucket = QuotaBucket(limit=10, window=0.5)
+        drain(bucket)
+
+        assert bucket.acquire(timeout=1) is True
+        assert bucket.stats()['queued'] == 1
+
+    def test_acquire_async_waits_for_a_token(self):
+        """Test the async acquire waits on the event loop."""
+        bucket = QuotaBucket(limit=10, window=0.5)
+        drain(bucket)
+
+        assert asyncio.run(bucket.acquire_async(timeout=1)) is True
+        assert asyncio.run(bucket.acquire_async(timeout=0)) is False
+
+    def test_sync_lowers_tokens_to_remaining(self, bucket):
+        """Test upstream's remaining count caps the bucket."""
+        bucket.sync(remaining=2)
+        assert [bucket.try_acquire() for _ in range(3)] == [True, True, False]
+
+    def test_sync_adopts_upstream_limit(self, bucket, clock):
+        """Test RateLimit-Limit becomes the bucket size."""
+        bucket.sync(limit=20)
+        clock.now += 100
+        assert bucket.stats()['tokens'] == 20
+
+    def test_sync_keeps_the_configured_share(self, clock):
+        """Test a bucket holding a quarter of the limit keeps a quarter of the advertised one."""
+        bucket = QuotaBucket(limit=120, window=60, share=0.25, timer=clock)
+        assert bucket.stats()['limit'] == 30
+
+        bucket.sync(limit=200)
+        clock.now += 100
+
+        assert bucket.stats()['limit'] == 50
+        assert bucket.stats()['tokens'] == 50
+
+    def test_nothing_remaining_pauses_until_reset(self, bucket, clock):
+        """Test remaining=0 holds the bucket closed until upstream's reset."""
+        bucket.sync(remaining=0, reset=30)
+        clock.now += 20
+        assert bucket.try_acquire() is False
+        assert bucket.stats()['paused_for'] == 10
+
+        clock.now += 10
+        assert bucket.try_acquire() is True
+
+    def test_retry_after_pauses(self, bucket, clock):
+        """Test Retry-After pauses the bucket even with tokens left."""
+        bucket.sync(remaining=5, retry_after=15)
+        clock.now += 14
+        assert bucket.try_acquire() is False
+        clock.now += 1
+        assert bucket.try_acquire() is True
+        assert bucket.stats()['throttled'] == 1
+
+    def test_pause_keeps_the_longer_pause(self, bucket, clock):
+        """Test a shorter pause does not cut an earlier, longer one short."""
+        bucket.pause(30)
+        bucket.pause(5)
+        clock.now += 10
+        assert bucket.try_acquire() is False
+
+    def test_release_returns_a_token(self, bucket):
+        """Test release() gives back a token that was not used."""
+        drain(bucket)
+        bucket.release()
+        assert bucket.try_acquire() is True
+
+    def test_reset(self, bucket):
+        """Test reset() refills the bucket and ends any pause."""
+        bucket.pause(60)
+        bucket.reset()
+        assert bucket.try_acquire() is True
+        assert bucket.stats()['throttled'] == 0
+
+    @pytest.mark.parametrize('limit, window, share', [(0, 60, 1), (10, 0, 1), (10, 60, 0), (10, 60, 1.5)])
+    def test_invalid_settings(self, limit, window, share):
+        """Test a limit below one, a non-positive window or a share outside (0, 1] raises ValueError."""
+        with pytest.raises(ValueError):
+            QuotaBucket(limit=limit, window=window, share=share)
@@ -9,9 +9,12 @@ Tests the Flask application routes including:
 - Response status codes and content
 """
 
+import json
+
 import pytest
-from unittest.mock import patch, Mock
-from app import app
+from unittest.mock import patch, Mock, AsyncMock
+from app import app, stream
+from services.joke_result import JokeResult
 
 
 # ===== Fixtures =====
@@ -272,6 +275,310 @@ class TestCategoryJokeRoute:
             assert 'error' in response_text.lower() or 'failed' in response_text.lower()
 
 
+# ===== Tests for Async Joke Routes =====
+
+class TestAsyncJokeRoutes:
+    """Test suite for the async joke routes."""
+
+    def test_async_joke_route_returns_joke(self, client, mock_single_joke):
+        """Test GET /async/joke renders a joke from get_joke_async."""
+        with patch('app.get_joke_async', new_callable=AsyncMock) as mock_get:
+            mock_get.return_value = mock_single_joke
+
+            response = client.get('/async/joke')
+
+            assert response.status_code == 200
+            mock_get.assert_awaited_once_with('Any')
+            assert b'Java developers' in response.data
+
+    def test_async_category_route_capitalizes_category(self, client, mock_twopart_joke):
+        """Test GET /async/joke/<category> capitalizes the category."""
+        with patch('app.get_joke_async', new_callable=AsyncMock) as mock_get:
+            mock_get.return_value = mock_twopart_joke
+
+            response = client.get('/async/joke/dark')
+
+            assert response.status_code == 200
+            mock_get.assert_awaited_once_with('Dark')
+
+    def test_async_route_displays_error(self, client, mock_error_response):
+        """Test async routes render the error alert."""
+        with patch('app.get_joke_async', new_callable=AsyncMock) as mock_get:
+            mock_get.return_value = mock_error_response
+
+            response = client.get('/async/joke/Programming')
+
+            assert b'Connection failed' in response.data
+
+
+# ===== Tests for JSON API and Content Negotiation =====
+
+class TestJsonJokeRoutes:
+    """Test suite for /api/joke and JSON responses from the /joke routes."""
+
+    def test_api_joke_returns_result_as_json(self, client, mock_single_joke):
+        """Test GET /api/joke returns the get_joke() result as JSON."""
+        with patch('app.get_joke', return_value=mock_single_joke) as mock_get:
+            response = client.get('/api/joke')
+
+        assert response.status_code == 200
+        assert response.mimetype == 'application/json'
+        assert response.get_json() == mock_single_joke
+        mock_get.assert_called_once_with('Any')
+
+    def test_api_category_capitalizes_category(self, client, mock_twopart_joke):
+        """Test GET /api/joke/<category> normalises the category."""
+        with patch('app.get_joke', return_value=mock_twopart_joke) as mock_get:
+            response = client.get('/api/joke/miscellaneous')
+
+        assert response.get_json()['setup'] == 'Why did the chicken cross the road?'
+        mock_get.assert_called_once_with('Miscellaneous')
+
+    def test_api_category_rejects_unknown_category(self, client):
+        """Test unknown categories return 400 without an upstream call."""
+        with patch('app.get_joke') as mock_get:
+            response = client.get('/api/joke/Nope')
+
+        assert response.status_code == 400
+        assert 'Nope' in response.get_json()['error']
+        mock_get.assert_not_called()
+
+    def test_api_failure_is_bad_gateway(self, client, mock_error_response):
+        """Test a failed lookup returns 502 and is not stored by caches."""
+        with patch('app.get_joke', return_value=mock_error_response):
+            response = client.get('/api/joke/Programming')
+
+        assert response.status_code == 502
+        assert response.get_json()['error'].startswith('Connection failed')
+        assert response.cache_control.no_store
+
+    @pytest.mark.parametrize('accept', ['application/json', 'application/json, text/plain, */*'])
+    def test_joke_route_returns_json_when_preferred(self, client, mock_single_joke, accept):
+        """Test /joke/<category> answers JSON clients without rendering HTML."""
+        with patch('app.get_joke', return_value=mock_single_joke), \
+                patch('app.render_template') as mock_render:
+            response = client.get('/joke/Programming', headers={'Accept': accept})
+
+        assert response.mimetype == 'application/json'
+        assert response.get_json() == mock_single_joke
+        mock_render.assert_not_called()
+        assert 'Accept' in response.vary
+
+    @pytest.mark.parametrize('accept', [None, '*/*', 'text/html,application/xhtml+xml,*/*;q=0.8'])
+    def test_joke_route_defaults_to_html(self, client, mock_single_joke, accept):
+        """Test browsers and clients without a preference still get the page."""
+        headers = {'Accept': accept} if accept else {}
+        with patch('app.get_joke', return_value=mock_single_joke):
+            response = client.get('/joke', headers=headers)
+
+        assert response.mimetype == 'text/html'
+        assert b'Java developers' in response.data
+        assert 'Accept' in response.vary
+
+    def test_async_route_negotiates_json(self, client, mock_twopart_joke):
+        """Test the async routes negotiate the same way."""
+        with patch('app.get_joke_async', new_callable=AsyncMock) as mock_get:
+            mock_get.return_value = mock_twopart_joke
+
+            response = client.get('/async/joke/Dark', headers={'Accept': 'application/json'})
+
+        assert response.get_json() == mock_twopart_joke
+
+
+# ===== Tests for Batch API Route (/api/jokes) =====
+
+class TestBatchJokesRoute:
+    """Test suite for the batch joke endpoint."""
+
+    def test_batch_route_streams_ndjson(self, client, mock_single_joke, mock_twopart_joke):
+        """Test /api/jokes streams one JSON result per line."""
+        with patch('app.iter_jokes_batch') as mock_batch:
+            mock_batch.return_value = iter([mock_single_joke, mock_twopart_joke])
+
+            response = client.get('/api/jokes?categories=Programming,miscellaneous&count=2')
+
+            assert response.status_code == 200
+            assert response.mimetype == 'application/x-ndjson'
+            lines = [json.loads(line) for line in response.data.decode().splitlines()]
+            assert lines == [mock_single_joke, mock_twopart_joke]
+
+    def test_batch_route_parses_parameters(self, client):
+        """Test categories are capitalized and passed with count and type."""
+        with patch('app.iter_jokes_batch', return_value=iter([])) as mock_batch:
+            client.get('/api/jokes?categories=programming,pun&count=10&type=single')
+
+            mock_batch.assert_called_once_with(['Programming', 'Pun'], 10, 'single')
+
+    def test_batch_route_defaults(self, client):
+        """Test /api/jokes defaults to one joke from Any."""
+        with patch('app.iter_jokes_batch', return_value=iter([])) as mock_batch:
+            client.get('/api/jokes')
+
+            mock_batch.assert_called_once_with(['Any'], 1, None)
+
+    def test_batch_route_rejects_unknown_category(self, client):
+        """Test unknown categories return 400."""
+        response = client.get('/api/jokes?categories=Programming,Nope')
+
+        assert response.status_code == 400
+        assert 'Nope' in response.get_json()['error']
+
+    @pytest.mark.parametrize('count', ['0', '51'])
+    def test_batch_route_rejects_out_of_range_count(self, client, count):
+        """Test out-of-range counts return 400."""
+        with patch('app.iter_jokes_batch') as mock_batch:
+            response = client.get(f'/api/jokes?count={count}')
+
+            assert response.status_code == 400
+            mock_batch.assert_not_called()
+
+
+# ===== Tests for JokeResult Responses =====
+
+class TestJokeResultRoutes:
+    """Test suite for routes given JokeResult objects instead of dicts."""
+
+    @pytest.fixture
+    def single_result(self):
+        """A single-part JokeResult."""
+        return JokeResult.single('Why do Java developers wear glasses? Because they don\'t C#', 'Programming')
+
+    @pytest.fixture
+    def twopart_result(self):
+        """A two-part JokeResult."""
+        return JokeResult.twopart('Why did the chicken cross the road?', 'To get to the other side!',
+                                  'Miscellaneous')
+
+    def test_joke_route_renders_single_result(self, client, single_result):
+        """Test joke.html renders a single-part JokeResult."""
+        with patch('app.get_joke', return_value=single_result):
+            response = client.get('/joke')
+
+        assert response.status_code == 200
+        assert 'Java developers wear glasses' in response.data.decode()
+
+    def test_joke_route_renders_twopart_result(self, client, twopart_result):
+        """Test joke.html renders a two-part JokeResult."""
+        with patch('app.get_joke', return_value=twopart_result):
+            response_text = client.get('/joke').data.decode()
+
+        assert 'Why did the chicken cross the road?' in response_text
+        assert 'To get to the other side!' in response_text
+
+    def test_joke_route_renders_failure_result(self, client):
+        """Test joke.html shows the error of a failed JokeResult."""
+        failure = JokeResult.failure('Connection failed. Please check your internet connection and try again.')
+        with patch('app.get_joke', return_value=failure):
+            response_text = client.get('/joke').data.decode()
+
+        assert 'Connection failed' in response_text
+
+    def test_api_joke_encodes_result(self, client, single_result):
+        """Test /api/joke encodes a JokeResult with the same keys as the dict result."""
+        with patch('app.get_joke', return_value=single_result):
+            response = client.get('/api/joke')
+
+        assert response.get_json() == single_result.to_dict()
+
+    def test_batch_route_encodes_results(self, client, single_result, twopart_result):
+        """Test /api/jokes streams JokeResults as JSON lines."""
+        with patch('app.iter_jokes_batch', return_value=iter([single_result, twopart_result])):
+            response = client.get('/api/jokes?count=2')
+
+        lines = [json.loads(line) for line in response.data.decode().splitlines()]
+        assert lines == [single_result.to_dict(), twopart_result.to_dict()]
+
+
+# ===== Tests for Joke Stream Route (/stream/jokes) =====
+
+class TestStreamJokesRoute:
+    """Test suite for the Server-Sent Events joke stream."""
+
+    @pytest.fixture
+    def stream_fetch(self, mock_single_joke):
+        """Feed the app's joke stream from a mock and close its feeds afterwards."""
+        with patch('app.stream.fetch', return_value=mock_single_joke) as mock_fetch:
+            yield mock_fetch
+        stream.stop()
+
+    def test_stream_route_pushes_joke_events(self, client, stream_fetch, mock_single_joke):
+        """Test /stream/jokes sends a retry hint and then joke events."""
+        response = client.get('/stream/jokes?category=programming', buffered=False)
+        chunks = iter(response.response)
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        assert response.headers['Cache-Control'] == 'no-cache'
+        assert next(chunks) == b'retry: 3000\n\n'
+        event = next(chunks).decode()
+        assert event.startswith('id: 1\nevent: joke\ndata: ')
+        assert json.loads(event.split('data: ', 1)[1]) == mock_single_joke
+        stream_fetch.assert_called_once_with('Programming')
+        response.close()
+
+    def test_stream_route_closes_subscription(self, client, stream_fetch):
+        """Test closing the response unsubscribes, even before it was read."""
+        response = client.get('/stream/jokes', buffered=False)
+        assert stream.stats()['subscribers'] == 1
+
+        response.close()
+
+        assert stream.stats()['subscribers'] == 0
+
+    def test_stream_route_rejects_unknown_category(self, client):
+        """Test unknown categories return 400."""
+        response = client.get('/stream/jokes?category=Nope')
+
+        assert response.status_code == 400
+        assert 'Nope' in response.get_json()['error']
+
+    def test_stream_route_limits_open_streams(self, client, stream_fetch):
+        """Test a stream beyond the subscriber limit gets 503 with Retry-After."""
+        with patch('app.stream.max_subscribers', 1):
+            first = client.get('/stream/jokes', buffered=False)
+            response = client.get('/stream/jokes')
+            first.close()
+
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '5'
+
+
+# ===== Tests for Prefetched Jokes =====
+
+class TestPrefetchedJokes:
+    """Test suite for serving jokes from the prefetch buffers."""
+
+    def test_joke_route_serves_prefetched_joke(self, client, mock_twopart_joke):
+        """Test /joke uses a buffered joke without calling get_joke."""
+        with patch('app.prefetcher.pop', return_value=mock_twopart_joke) as mock_pop, \
+                patch('app.get_joke') as mock_get:
+            response = client.get('/joke')
+
+            mock_pop.assert_called_once_with('Any')
+            mock_get.assert_not_called()
+            assert b'Why did the chicken cross the road?' in response.data
+
+    def test_category_route_serves_prefetched_joke(self, client, mock_single_joke):
+        """Test /joke/<category> pops from that category's buffer."""
+        with patch('app.prefetcher.pop', return_value=mock_single_joke) as mock_pop, \
+                patch('app.get_joke') as mock_get:
+            response = client.get('/joke/programming')
+
+            mock_pop.assert_called_once_with('Programming')
+            mock_get.assert_not_called()
+            assert response.status_code == 200
+
+    def test_empty_buffer_falls_back_to_get_joke(self, client, mock_single_joke):
+        """Test an empty buffer falls back to a live fetch."""
+        with patch('app.prefetcher.pop', return_value=None), \
+                patch('app.get_joke') as mock_get:
+            mock_get.return_value = mock_single_joke
+
+            client.get('/joke/Pun')
+
+            mock_get.assert_called_once_with('Pun')
+
+
 # ===== Tests for Health Check Route (/health) =====
 
 class TestHealthRoute:
@@ -294,6 +601,210 @@ class TestHealthRoute:
         assert json_data is not None
         assert json_data['status'] == 'ok'
 
+    def test_health_route_reports_circuit_state(self, client):
+        """Test /health exposes the circuit breaker state."""
+        json_data = client.get('/health').get_json()
+        assert json_data['circuit']['state'] == 'closed'
+        assert json_data['circuit']['transitions'] == []
+
+    def test_health_route_degraded_when_circuit_open(self, client):
+        """Test /health reports degraded while the circuit is open."""
+        with patch('app.joke_service.is_circuit_closed', return_value=False):
+            json_data = client.get('/health').get_json()
+        assert json_data['status'] == 'degraded'
+
+    def test_health_route_reports_prefetch_buffers(self, client):
+        """Test /health exposes prefetch buffer state."""
+        json_data = client.get('/health').get_json()
+        assert 'Programming' in json_data['prefetch']['buffers']
+
+    def test_health_route_reports_joke_streams(self, client):
+        """Test /health exposes the open joke streams."""
+        json_data = client.get('/health').get_json()
+        assert json_data['stream']['subscribers'] == 0
+
+
+class TestMetricsRoute:
+    """Test suite for the Prometheus metrics endpoint."""
+
+    def test_metrics_route_counts_page_views(self, client):
+        """Test /metrics reports requests to earlier routes."""
+        client.get('/about')
+        text = client.get('/metrics').get_data(as_text=True)
+        assert 'jokeapp_http_requests_total{method="GET",route="/about",status="200"}' in text
+
+    def test_metrics_route_exposes_joke_service(self, client):
+        """Test /metrics includes the upstream and circuit breaker metrics."""
+        text = client.get('/metrics').get_data(as_text=True)
+        assert '# TYPE jokeapp_upstream_requests counter' in text
+        assert 'jokeapp_circuit_open 0' in text
+
+
+# ===== Tests for the Application Factory =====
+
+@pytest.fixture
+def build_app():
+    """Create apps with create_app() and stop their joke streams afterwards."""
+    from app import create_app
+    created = []
+
+    def build(config=None):
+        built = create_app({'WARMUP_ENABLED': False, 'JOKE_PREFETCH_ENABLED': False, **(config or {})})
+        created.append(built)
+        return built
+
+    yield build
+    for built in created:
+        built.extensions['joke_stream'].stop()
+
+
+class TestCreateApp:
+    """Test suite for the create_app() factory."""
+
+    def test_apps_are_independent(self, build_app):
+        """Test each app gets its own prefetcher, joke stream and page cache."""
+        built = build_app()
+
+        for name in ('prefetcher', 'joke_stream', 'page_cache'):
+            assert built.extensions[name] is not app.extensions[name]
+        assert built.extensions['joke_stream'] is not stream
+
+    def test_registers_every_route(self, build_app):
+        """Test the new app serves the same endpoints as the module app."""
+        built = build_app()
+
+        assert {rule.endpoint for rule in built.url_map.iter_rules()} == \
+               {rule.endpoint for rule in app.url_map.iter_rules()}
+        assert built.test_client().get('/about').status_code == 200
+
+    def test_config_overrides_environment_and_defaults(self, build_app, monkeypatch):
+        """Test config wins over FLASK_ variables, which win over the defaults."""
+        monkeypatch.setenv('FLASK_JOKE_STREAM_INTERVAL', '3')
+        monkeypatch.setenv('FLASK_JOKE_STREAM_BACKLOG', '4')
+
+        built = build_app({'JOKE_STREAM_INTERVAL': 2})
+
+        assert built.extensions['joke_stream'].interval == 2
+        assert built.extensions['joke_stream'].backlog == 4
+        assert built.config['JOKE_STREAM_MAX_SUBSCRIBERS'] == app.config['JOKE_STREAM_MAX_SUBSCRIBERS']
+
+    def test_no_exit_hooks_per_app(self, build_app):
+        """Test building an app registers no atexit hook holding its prefetcher or stream."""
+        with patch('atexit.register') as register:
+            built = build_app({'JOKE_PREFETCH_ENABLED': True})
+        built.extensions['prefetcher'].stop(wait=False)
+
+        owners = {getattr(call.args[0], '__self__', None) for call in register.call_args_list}
+        assert built.extensions['prefetcher'] not in owners
+        assert built.extensions['joke_stream'] not in owners
+
+    def test_prefetch_disabled_by_config(self, build_app):
+        """Test JOKE_PREFETCH_ENABLED=False leaves the prefetcher stopped."""
+        built = build_app()
+        assert built.extensions['prefetcher'].stats()['running'] is False
+
+    def test_templates_not_precompiled_by_default(self, build_app, tmp_path):
+        """Test building an app loads no templates unless TEMPLATE_PRECOMPILE is set."""
+        assert len(build_app().jinja_env.cache) == 0
+
+        built = build_app({'TEMPLATE_PRECOMPILE': True, 'TEMPLATE_CACHE_DIR': str(tmp_path)})
+        assert len(built.jinja_env.cache) == len(built.jinja_env.list_templates())
+
+    def test_warm_up_makes_no_upstream_calls(self, build_app, tmp_path):
+        """Test WARMUP_ENABLED renders the static-content pages without fetching a joke."""
+        with patch('app.get_joke') as mock_get, patch('app.get_joke_async') as mock_get_async:
+            built = build_app({'WARMUP_ENABLED': True, 'TEMPLATE_CACHE_DIR': str(tmp_path)})
+
+        mock_get.assert_not_called()
+        mock_get_async.assert_not_called()
+        assert built.extensions['page_cache'].stats()['size'] == 3
+
+
+# ===== Tests for HTTP Caching =====
+
+class TestHttpCaching:
+    """Test suite for ETags, conditional GET and Cache-Control policies."""
+
+    @pytest.mark.parametrize('path', ['/', '/about', '/contact'])
+    def test_pages_have_strong_etag_and_max_age(self, client, path):
+        """Test static-content pages are cacheable with a strong ETag."""
+        response = client.get(path)
+        assert response.status_code == 200
+        etag, weak = response.get_etag()
+        assert etag and not weak
+        assert response.cache_control.public is True
+        assert response.cache_control.max_age == app.config['PAGE_CACHE_MAX_AGE']
+
+    @pytest.mark.parametrize('path', ['/', '/about', '/contact'])
+    def test_pages_answer_304_to_matching_etag(self, client, path):
+        """Test a matching If-None-Match gets an empty 304."""
+        etag = client.get(path).headers['ETag']
+        response = client.get(path, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+        assert response.headers['ETag'] == etag
+
+    def test_stale_etag_gets_full_page(self, client):
+        """Test a non-matching If-None-Match gets the full page."""
+        response = client.get('/', headers={'If-None-Match': '"stale"'})
+        assert response.status_code == 200
+        assert b'JokeApp' in response.data
+
+    def test_static_urls_are_fingerprinted(self, client):
+        """Test url_for('static') adds the file's content hash."""
+        with app.test_request_context():
+            from flask import url_for
+            url = url_for('static', filename='dist/critical.css')
+            stylesheet = app.jinja_env.globals['asset_url']('app.css')
+        assert url.startswith('/static/dist/critical.css?v=')
+        assert stylesheet.startswith('/static/dist/app.') and '?v=' in stylesheet
+        assert stylesheet in client.get('/').get_data(as_text=True)
+
+    def test_fingerprinted_static_is_immutable(self, client):
+        """Test fingerprinted static files get a far-future policy."""
+        with app.test_request_context():
+            url = app.jinja_env.globals['asset_url']('app.css')
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.cache_control.immutable is True
+        assert response.cache_control.max_age == app.config['STATIC_CACHE_MAX_AGE']
+        assert response.cache_control.no_cache is None
+
+    @pytest.mark.parametrize('query', ['', '?v=outdated'])
+    def test_unversioned_static_is_revalidated(self, client, query):
+        """Test static files without a current fingerprint are not pinned."""
+        response = client.get('/static/dist/critical.css' + query)
+        assert response.status_code == 200
+        assert not response.cache_control.immutable
+        assert response.cache_control.max_age is None
+
+    @pytest.mark.parametrize('path', ['/joke', '/joke/Programming', '/async/joke', '/health'])
+    def test_joke_routes_are_no_store(self, client, path, mock_single_joke):
+        """Test routes serving fresh jokes are never stored."""
+        with patch('app.get_joke', return_value=mock_single_joke), \
+                patch('app.get_joke_async', new_callable=AsyncMock, return_value=mock_single_joke):
+            response = client.get(path)
+        assert response.cache_control.no_store is True
+        assert response.get_etag() == (None, None)
+
+    def test_joke_max_age_is_configurable(self, client, mock_single_joke):
+        """Test JOKE_CACHE_MAX_AGE switches jokes to a short public max-age."""
+        app.config['JOKE_CACHE_MAX_AGE'] = 5
+        try:
+            with patch('app.get_joke', return_value=mock_single_joke):
+                response = client.get('/joke/Programming')
+        finally:
+            app.config['JOKE_CACHE_MAX_AGE'] = 0
+        assert response.cache_control.max_age == 5
+        assert response.cache_control.public is True
+        assert not response.cache_control.no_store
+
+    def test_batch_errors_are_no_store(self, client):
+        """Test 400 responses from /api/jokes are not stored either."""
+        response = client.get('/api/jokes?count=0')
+        assert response.status_code == 400
+        assert response.cache_control.no_store is True
+
 
 # ===== Tests for Navigation and Links =====
 
@@ -0,0 +1,147 @@
+"""
+Test suite for the single-flight call coalescing primitives.
+
+Tests cover:
+- Sharing one call between concurrent threaded callers
+- Exception propagation to every waiter
+- asyncio coalescing and cancellation
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from services.single_flight import AsyncSingleFlight, SingleFlight
+
+
+# ===== Helpers =====
+
+def run_concurrently(target, count):
+    """Start count threads running target and return their results in order."""
+    results = [None] * count
+
+    def worker(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+# ===== Tests =====
+
+class TestSingleFlight:
+    """Test suite for threaded SingleFlight."""
+
+    def test_concurrent_callers_share_one_call(self):
+        """Test callers arriving during a call share its result."""
+        flight = SingleFlight()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'value': 42}
+
+        results = run_concurrently(lambda: flight.do('key', slow), 10)
+
+        assert len(calls) == 1
+        assert all(result == {'value': 42} for result in results)
+        assert flight.stats() == {'flights': 1, 'coalesced': 9, 'in_flight': 0}
+
+    def test_different_keys_are_not_coalesced(self):
+        """Test each key gets its own call."""
+        flight = SingleFlight()
+
+        assert flight.do('a', lambda: 1) == 1
+        assert flight.do('b', lambda: 2) == 2
+        assert flight.stats()['flights'] == 2
+
+    def test_sequential_calls_run_again(self):
+        """Test a completed call is not reused by later callers."""
+        flight = SingleFlight()
+        counter = iter(range(10))
+
+        assert flight.do('key', lambda: next(counter)) == 0
+        assert flight.do('key', lambda: next(counter)) == 1
+        assert flight.stats()['coalesced'] == 0
+
+    def test_exception_reaches_every_waiter(self):
+        """Test an exception raised by the leader is raised for all callers."""
+        flight = SingleFlight()
+
+        def failing():
+            time.sleep(0.2)
+            raise RuntimeError('boom')
+
+        results = run_concurrently(lambda: flight.do('key', failing), 5)
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert flight.stats()['in_flight'] == 0
+        assert flight.do('key', lambda: 'recovered') == 'recovered'
+
+
+class TestAsyncSingleFlight:
+    """Test suite for AsyncSingleFlight."""
+
+    def test_concurrent_tasks_share_one_call(self):
+        """Test gathered callers share one coroutine run."""
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return 'joke'
+
+        async def main():
+            return await asyncio.gather(*(flight.do('key', slow) for _ in range(20)))
+
+        results = asyncio.run(main())
+
+        assert results == ['joke'] * 20
+        assert len(calls) == 1
+        assert flight.stats() == {'flights': 1, 'coalesced': 19, 'in_flight': 0}
+
+    def test_exception_reaches_every_waiter(self):
+        """Test every caller sees the leader's exception."""
+        flight = AsyncSingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.01)
+            raise ValueError('bad')
+
+        async def main():
+            return await asyncio.gather(
+                *(flight.do('key', failing) for _ in range(3)), return_exceptions=True
+            )
+
+        results = asyncio.run(main())
+
+        assert all(isinstance(result, ValueError) for result in results)
+
+    def test_cancelled_waiter_does_not_cancel_shared_call(self):
+        """Test cancelling one caller leaves the others their result."""
+        flight = AsyncSingleFlight()
+
+        async def slow():
+            await asyncio.sleep(0.05)
+            return 'done'
+
+        async def main():
+            first = asyncio.ensure_future(flight.do('key', slow))
+            second = asyncio.ensure_future(flight.do('key', slow))
+            await asyncio.sleep(0)
+            first.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            return await second
+
+        assert asyncio.run(main()) == 'done'
@@ -0,0 +1,109 @@
+"""
+Test suite for the template bytecode cache and warm-up hook.
+
+Tests cover:
+- Writing and reusing on-disk bytecode
+- The precompile CLI command
+- Warming up routes before serving
+"""
+
+import pytest
+from flask import Flask, Response, render_template
+from services import template_cache
+
+
+# ===== Fixtures =====
+
+@pytest.fixture
+def template_dir(tmp_path):
+    """A template folder with a base and a child template."""
+    templates = tmp_path / 'templates'
+    templates.mkdir()
+    (templates / 'base.html').write_text('<main>{% block content %}{% endblock %}</main>')
+    (templates / 'page.html').write_text('{% extends "base.html" %}{% block content %}hi{% endblock %}')
+    return templates
+
+
+@pytest.fixture
+def make_app(tmp_path, template_dir):
+    """Build a small app using template_dir and a given cache dir."""
+    def make_app(cache_dir):
+        small_app = Flask(__name__, template_folder=str(template_dir))
+        small_app.config['TEMPLATE_CACHE_DIR'] = cache_dir
+        template_cache.init_app(small_app)
+
+        @small_app.route('/page')
+        def page():
+            return render_template('page.html')
+
+        @small_app.route('/item/<name>')
+        def item(name):
+            return name
+
+        @small_app.route('/events')
+        def events():
+            def forever():
+                while True:
+                    yield 'data: tick\n\n'
+            return Response(forever(), mimetype='text/event-stream')
+
+        return small_app
+    return make_app
+
+
+# ===== Tests =====
+
+class TestTemplateCache:
+    """Test suite for template_cache."""
+
+    def test_precompile_writes_bytecode(self, make_app, tmp_path):
+        """Test every template lands in the on-disk cache."""
+        cache_dir = tmp_path / 'bytecode'
+        small_app = make_app(str(cache_dir))
+
+        assert template_cache.precompile(small_app) == 2
+        assert len(list(cache_dir.iterdir())) == 2
+
+    def test_new_process_loads_bytecode(self, make_app, tmp_path):
+        """Test a fresh app reuses the bytecode instead of compiling."""
+        cache_dir = str(tmp_path / 'bytecode')
+        template_cache.precompile(make_app(cache_dir))
+
+        fresh = make_app(cache_dir)
+        compiled = []
+        original = fresh.jinja_env.compile
+        fresh.jinja_env.compile = lambda *args, **kwargs: compiled.append(args) or original(*args, **kwargs)
+        template_cache.precompile(fresh)
+
+        assert compiled == []
+        with fresh.test_client() as client:
+            assert client.get('/page').data == b'<main>hi</main>'
+
+    def test_cache_can_be_disabled(self, make_app):
+        """Test an empty TEMPLATE_CACHE_DIR leaves Jinja without a bytecode cache."""
+        assert make_app('').jinja_env.bytecode_cache is None
+
+    def test_precompile_command(self, make_app, tmp_path):
+        """Test the flask CLI command compiles the templates."""
+        cache_dir = tmp_path / 'bytecode'
+        result = make_app(str(cache_dir)).test_cli_runner().invoke(args=['precompile-templates'])
+
+        assert result.exit_code == 0
+        assert 'Compiled 2 templates' in result.output
+        assert len(list(cache_dir.iterdir())) == 2
+
+    def test_warm_up_requests_default_paths(self, make_app, monkeypatch):
+        """Test warm_up() requests WARMUP_PATHS by default."""
+        monkeypatch.setattr(template_cache, 'WARMUP_PATHS', ('/page', '/missing'))
+        statuses = template_cache.warm_up(make_app(''))
+        assert statuses == {'/page': 200, '/missing': 404}
+
+    def test_warm_up_leaves_event_streams_open(self, make_app, tmp_path):
+        """Test warm_up() does not wait for an event stream to end."""
+        statuses = template_cache.warm_up(make_app(str(tmp_path / 'bytecode')), ['/events', '/page'])
+        assert statuses == {'/events': 200, '/page': 200}
+
+    def test_warm_up_explicit_paths(self, make_app, tmp_path):
+        """Test warm_up() accepts a list of paths."""
+        statuses = template_cache.warm_up(make_app(''), ['/item/a', '/missing'])
+        assert statuses == {'/item/a': 200, '/missing': 404}